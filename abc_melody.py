@@ -0,0 +1,150 @@
+"""
+Melody index for searching tunes by ABC notation.
+
+The live deep search's "by ABC" mode used to run `REPLACE(abc, ' ', '') ILIKE
+'%q%'` against every tune_setting. That scanned every setting's full text, and it
+only found the notes exactly as written, in the same key, with the same
+ornaments and rhythm. This module reduces a melody to its shape instead:
+
+  - `pitches` reads the note letters and octave marks out of an ABC body. Headers,
+    inline fields, chord symbols, decorations, grace notes, rests, durations and
+    bar lines are skipped.
+  - Pitches are diatonic steps (C D E F G A B = 0..6, plus 7 per octave). Accidentals
+    are ignored. A tune moved to another key keeps the same letter-to-letter steps,
+    and a query typed without the key signature still matches.
+  - Repeated notes are collapsed (rhythm-free), and the melody becomes its sequence
+    of intervals. Overlapping runs of GRAM_SIZE intervals are its grams.
+
+`index_setting` stores a setting's grams in tune_setting_melody
+(schema/030_tune_setting_melody.sql), which has a GIN index. Settings are indexed
+when they are cached (cache_default_tune_setting, the setting refresh,
+scripts/cache_missing_settings.py); scripts/rebuild_melody_index.py backfills the
+rest. `search` ranks tunes by how many of the query's grams one of their settings
+contains.
+"""
+
+import re
+
+# Intervals per gram: 3 intervals = 4 distinct successive notes.
+GRAM_SIZE = 3
+
+# Bump when the reduction changes; rebuild_melody_index.py re-indexes older rows.
+MELODY_INDEX_VERSION = 1
+
+# A tune must share at least this fraction of the query's grams to be returned.
+MIN_SHARED_FRACTION = 0.5
+
+_LETTERS = "CDEFGAB"
+
+_HEADER_LINE = re.compile(r"^\s*[A-Za-z]:(?!\|).*$", re.MULTILINE)
+_INLINE_FIELD = re.compile(r"\[[A-Za-z]:[^\]]*\]")
+_COMMENT = re.compile(r"%.*$", re.MULTILINE)
+_QUOTED = re.compile(r'"[^"]*"')
+_DECORATION = re.compile(r"![^!\n]*!|\+[^+\n]*\+")
+_GRACE = re.compile(r"\{[^}]*\}")
+
+
+def pitches(abc):
+    """Diatonic pitch numbers of the notes in an ABC body (accidentals ignored).
+
+    Chords contribute their first note; rests and everything that isn't a note
+    are skipped.
+    """
+    if not abc:
+        return []
+    text = abc
+    for pattern in (_COMMENT, _HEADER_LINE, _INLINE_FIELD, _QUOTED, _DECORATION, _GRACE):
+        text = pattern.sub(" ", text)
+
+    result = []
+    in_chord = False
+    chord_has_note = False
+    i, n = 0, len(text)
+    while i < n:
+        c = text[i]
+        if c == "[" and i + 1 < n and (text[i + 1].upper() in _LETTERS or text[i + 1] in "^_="):
+            in_chord, chord_has_note = True, False  # not "[1" / "[|"
+        elif c == "]":
+            in_chord = False
+        elif c.upper() in _LETTERS and c.isalpha():
+            pitch = _LETTERS.index(c.upper()) + (7 if c.islower() else 0)
+            while i + 1 < n and text[i + 1] in "',":
+                i += 1
+                pitch += 7 if text[i] == "'" else -7
+            if not (in_chord and chord_has_note):
+                result.append(pitch)
+            chord_has_note = in_chord
+        i += 1
+    return result
+
+
+def intervals(notes):
+    """Successive diatonic steps, with repeated notes collapsed."""
+    steps = []
+    previous = None
+    for pitch in notes:
+        if previous is not None and pitch != previous:
+            steps.append(pitch - previous)
+        previous = pitch
+    return steps
+
+
+def grams(abc):
+    """The melody's distinct interval n-grams, e.g. '-1,-1,3'."""
+    steps = intervals(pitches(abc))
+    return sorted({
+        ",".join(str(s) for s in steps[i:i + GRAM_SIZE])
+        for i in range(len(steps) - GRAM_SIZE + 1)
+    })
+
+
+def searchable(q):
+    """True when q has enough notes to search by melody shape."""
+    return len(intervals(pitches(q))) >= GRAM_SIZE
+
+
+def index_setting(cur, setting_id, abc):
+    """Store (or refresh) a setting's grams. Runs in the caller's transaction."""
+    cur.execute(
+        """
+        INSERT INTO tune_setting_melody (setting_id, grams, version)
+        VALUES (%s, %s, %s)
+        ON CONFLICT (setting_id) DO UPDATE
+        SET grams = EXCLUDED.grams, version = EXCLUDED.version,
+            indexed_date = (NOW() AT TIME ZONE 'UTC')
+        """,
+        (setting_id, grams(abc), MELODY_INDEX_VERSION),
+    )
+
+
+def search(cur, q, tune_type=None, limit=25):
+    """Tunes whose melody resembles the ABC fragment q, best first.
+
+    Returns [(tune_id, shared_fraction)]. Needs searchable(q); returns [] otherwise.
+    """
+    query_grams = grams(q)
+    if not query_grams:
+        return []
+    min_shared = max(1, int(len(query_grams) * MIN_SHARED_FRACTION + 0.5))
+    type_filter = "AND t.tune_type = %s" if tune_type else ""
+    params = [query_grams, query_grams] + ([tune_type] if tune_type else []) + [min_shared, limit]
+    cur.execute(
+        f"""
+        SELECT t.tune_id, MAX(s.shared) AS shared
+        FROM tune_setting_melody m
+        JOIN tune_setting ts ON ts.setting_id = m.setting_id
+        JOIN tune t ON t.tune_id = ts.tune_id
+        CROSS JOIN LATERAL (
+            SELECT COUNT(*) AS shared FROM unnest(m.grams) g WHERE g = ANY(%s::text[])
+        ) s
+        WHERE m.grams && %s::text[]
+          AND t.redirect_to_tune_id IS NULL
+          {type_filter}
+        GROUP BY t.tune_id
+        HAVING MAX(s.shared) >= %s
+        ORDER BY shared DESC, MAX(t.tunebook_count_cached) DESC NULLS LAST, t.tune_id
+        LIMIT %s
+        """,
+        params,
+    )
+    return [(tune_id, shared / len(query_grams)) for tune_id, shared in cur.fetchall()]
@@ -0,0 +1,287 @@
+"""
+Shared client for the abc-renderer sidecar (ABC notation -> PNG).
+
+Every caller used to do its own blocking `requests.post` per image, with no
+connection reuse, rendering the full image and the incipit one after the other.
+This module is the one way the app (and scripts) talk to the renderer:
+
+  - Keep-alive: one requests.Session per process, so renders reuse connections.
+  - Batched: render_many() sends all uncached images in one POST to
+    /api/render-batch (chunks of ABC_RENDER_BATCH_SIZE, sent in parallel).
+    A sidecar without the batch endpoint gets single /api/render calls instead.
+  - Bounded: at most ABC_RENDER_CONCURRENCY requests are in flight from this
+    process at once, however many request threads are rendering.
+  - Content-addressed cache: PNGs are cached in memory by a hash of the exact
+    wrapped ABC (+ incipit flag), up to ABC_RENDER_CACHE_MB. The same incipit
+    shared by several settings, or re-rendered by a retry, costs one render.
+    Concurrent requests for the same image wait for the first instead of
+    rendering it again.
+
+Failures are never raised: a render that fails comes back as None, exactly like
+the old render_abc_to_png, and is not cached.
+"""
+
+import os
+import base64
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+SINGLE_TIMEOUT = 15  # seconds, per image (what the old client used)
+CONNECT_TIMEOUT = 5
+
+
+def _int_env(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+BATCH_SIZE = max(1, min(_int_env("ABC_RENDER_BATCH_SIZE", 20), 50))  # sidecar caps batches at 50
+CONCURRENCY = max(1, _int_env("ABC_RENDER_CONCURRENCY", 4))
+CACHE_BYTES = max(0, _int_env("ABC_RENDER_CACHE_MB", 32)) * 1024 * 1024
+
+
+def cache_key(abc_notation, is_incipit=False):
+    """Content hash identifying one rendered image."""
+    digest = hashlib.sha256()
+    digest.update(b"incipit\0" if is_incipit else b"full\0")
+    digest.update(abc_notation.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class _PngCache:
+    """Byte-bounded LRU of rendered PNGs, safe to share across threads."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            png = self._items.get(key)
+            if png is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return png
+
+    def put(self, key, png):
+        if len(png) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._items[key] = png
+            self._bytes += len(png)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._items), "bytes": self._bytes,
+                    "hits": self.hits, "misses": self.misses}
+
+
+_cache = _PngCache(CACHE_BYTES)
+_slots = threading.BoundedSemaphore(CONCURRENCY)
+_inflight = {}  # cache key -> Event set when the rendering thread is done
+_inflight_lock = threading.Lock()
+_state_lock = threading.Lock()
+_session = None
+_session_pid = None
+_executor = None
+_batch_supported = True
+
+
+def _renderer_url():
+    return os.getenv("ABC_RENDERER_URL")
+
+
+def _get_session():
+    """The process's keep-alive session (rebuilt after a fork)."""
+    global _session, _session_pid
+    with _state_lock:
+        if _session is None or _session_pid != os.getpid():
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=CONCURRENCY)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session, _session_pid = session, os.getpid()
+        return _session
+
+
+def _get_executor():
+    global _executor
+    with _state_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=CONCURRENCY, thread_name_prefix="abc-render")
+        return _executor
+
+
+def _post_single(base_url, abc_notation, is_incipit):
+    with _slots:
+        response = _get_session().post(
+            f"{base_url}/api/render",
+            json={"abc": abc_notation, "isIncipit": is_incipit},
+            timeout=(CONNECT_TIMEOUT, SINGLE_TIMEOUT),
+        )
+    if response.status_code != 200:
+        logger.warning("ABC renderer returned status %s: %s", response.status_code, response.text[:200])
+        return None
+    if response.headers.get("content-type") != "image/png":
+        logger.warning("ABC renderer returned unexpected content type %s", response.headers.get("content-type"))
+        return None
+    return response.content
+
+
+def _post_batch(base_url, items):
+    """Render [(abc, is_incipit)] in one round trip. Returns a list of PNG
+    bytes / None, or None if the sidecar has no batch endpoint."""
+    global _batch_supported
+    with _slots:
+        response = _get_session().post(
+            f"{base_url}/api/render-batch",
+            json={"items": [{"abc": abc, "isIncipit": inc} for abc, inc in items]},
+            # the sidecar renders a batch serially; allow each item its share
+            timeout=(CONNECT_TIMEOUT, SINGLE_TIMEOUT + 2 * len(items)),
+        )
+    if response.status_code in (404, 405):
+        logger.info("ABC renderer has no batch endpoint; falling back to single renders")
+        _batch_supported = False
+        return None
+    if response.status_code != 200:
+        logger.warning("ABC renderer batch returned status %s: %s", response.status_code, response.text[:200])
+        return [None] * len(items)
+    results = response.json().get("results") or []
+    pngs = []
+    for i in range(len(items)):
+        result = results[i] if i < len(results) else None
+        if result and result.get("success") and result.get("png"):
+            pngs.append(base64.b64decode(result["png"]))
+        else:
+            if result:
+                logger.warning("ABC renderer could not render item: %s", result.get("error"))
+            pngs.append(None)
+    return pngs
+
+
+def _render_chunk(base_url, items):
+    try:
+        if _batch_supported and len(items) > 1:
+            pngs = _post_batch(base_url, items)
+            if pngs is not None:
+                return pngs
+        return [_post_single(base_url, abc, inc) for abc, inc in items]
+    except (requests.exceptions.RequestException, ValueError) as e:
+        logger.warning("Error calling ABC renderer: %s", e)
+        return [None] * len(items)
+
+
+def render_many(items):
+    """
+    Render several ABC strings to PNG, batching and caching.
+
+    Args:
+        items: Iterable of (abc_notation, is_incipit) pairs; abc_notation must
+               already carry the headers the renderer needs.
+
+    Returns:
+        List of PNG bytes (or None where rendering failed), in input order.
+    """
+    items = list(items)
+    keys = [cache_key(abc, inc) if abc else None for abc, inc in items]
+
+    base_url = _renderer_url()
+    if not base_url:
+        if any(keys):
+            logger.warning("ABC_RENDERER_URL not configured")
+        return [None] * len(items)
+
+    found = {}  # key -> PNG bytes already cached
+    mine = {}  # key -> (abc, is_incipit) this call has to render
+    waiting = {}  # key -> Event of another thread already rendering it
+    for i, key in enumerate(keys):
+        if key is None or key in found or key in mine or key in waiting:
+            continue
+        png = _cache.get(key)
+        if png is not None:
+            found[key] = png
+            continue
+        with _inflight_lock:
+            event = _inflight.get(key)
+            if event is None:
+                _inflight[key] = threading.Event()
+                mine[key] = items[i]
+            else:
+                waiting[key] = event
+
+    if mine:
+        todo = list(mine.items())
+        chunks = [todo[i:i + BATCH_SIZE] for i in range(0, len(todo), BATCH_SIZE)]
+        try:
+            if len(chunks) == 1:
+                outputs = [_render_chunk(base_url, [item for _, item in chunks[0]])]
+            else:
+                outputs = list(_get_executor().map(
+                    lambda chunk: _render_chunk(base_url, [item for _, item in chunk]), chunks
+                ))
+            for chunk, pngs in zip(chunks, outputs):
+                for (key, _), png in zip(chunk, pngs):
+                    if png:
+                        found[key] = png
+                        _cache.put(key, png)
+        finally:
+            with _inflight_lock:
+                for key in mine:
+                    _inflight.pop(key).set()
+
+    for key, event in waiting.items():
+        event.wait(SINGLE_TIMEOUT + CONNECT_TIMEOUT)
+        png = _cache.get(key)
+        if png is not None:
+            found[key] = png
+
+    return [found.get(key) if key else None for key in keys]
+
+
+def render_abc_to_png(abc_notation, is_incipit=False):
+    """
+    Convert ABC notation to a PNG image via the renderer (cached).
+    Returns the PNG image as bytes, or None if rendering fails.
+
+    Args:
+        abc_notation: ABC notation string to render
+        is_incipit: If True, uses minimal padding for compact rendering (default: False)
+    """
+    return render_many([(abc_notation, is_incipit)])[0]
+
+
+def cache_stats():
+    """Hit/miss counters and size of the in-memory PNG cache."""
+    return _cache.stats()
+
+
+def clear_cache():
+    _cache.clear()
@@ -16,14 +16,29 @@ except ImportError:
     from backports.zoneinfo import ZoneInfo
 
 from database import get_db_connection
-from session_instance_auto_create import auto_create_instances_hours_ahead
+from recurrence_utils import parse_recurrence
+from session_instance_auto_create import auto_create_instances_bulk
 
 logger = logging.getLogger(__name__)
 
 
+# Sessions scheduled for round times (e.g. 7:00pm) activate when checked a
+# minute early, so transitions are evaluated this far ahead of now.
+ACTIVATION_LOOKAHEAD = timedelta(minutes=1)
+
+# Channel the schema triggers NOTIFY when an instance's window may have moved
+# (schema/032_session_instance_active_window.sql).
+SCHEDULE_NOTIFY_CHANNEL = 'session_schedule'
+
+
 def update_active_sessions() -> Dict[str, any]:
     """
-    Check all sessions and update their active status based on current time.
+    Activate and deactivate session instances whose windows opened or closed.
+
+    Each instance's active window is precomputed as UTC instants (buffers
+    applied) in session_instance.active_from_utc / active_until_utc, so this
+    is a single set-based pass over the due transitions; see
+    process_due_transitions.
 
     This function looks 1 minute into the future when activating sessions,
     ensuring sessions scheduled for round times (e.g., 7:00pm) become active
@@ -33,126 +48,174 @@ def update_active_sessions() -> Dict[str, any]:
         Dictionary with statistics about activations and deactivations
     """
     conn = get_db_connection()
-    cur = conn.cursor()
+    try:
+        return process_due_transitions(conn)
+    finally:
+        conn.close()
 
+
+def process_due_transitions(conn, now: Optional[datetime] = None, commit: bool = True) -> Dict[str, any]:
+    """
+    Apply every due activation and deactivation in one transaction.
+
+    An instance should be active when it is not cancelled and now (plus
+    ACTIVATION_LOOKAHEAD) falls inside [active_from_utc, active_until_utc].
+    Instances that should be active and aren't are activated; active ones that
+    shouldn't be (window closed, cancelled, or no times) are deactivated. Then
+    the people checked in to the flipped instances, or currently at one, get
+    their at_active_session_instance_id recomputed in one statement, with the
+    same rules as update_person_active_instance.
+
+    Args:
+        conn: Database connection (committed on success, rolled back on error)
+        now: Current time (UTC-aware); defaults to the real clock
+        commit: False to roll back instead (dry run)
+
+    Returns:
+        Dictionary with statistics about activations and deactivations
+    """
+    at = (now or datetime.now(ZoneInfo('UTC'))) + ACTIVATION_LOOKAHEAD
     stats = {
         'activated': [],
         'deactivated': [],
         'errors': []
     }
+    cur = conn.cursor()
 
     try:
-        # Get all active sessions (non-terminated)
         cur.execute("""
-            SELECT session_id, name, recurrence, timezone,
-                   active_buffer_minutes_before, active_buffer_minutes_after,
-                   initiation_date
-            FROM session
-            WHERE (termination_date IS NULL OR termination_date >= CURRENT_DATE)
-            ORDER BY session_id
-        """)
+            WITH due AS (
+                SELECT session_instance_id, TRUE AS activate
+                FROM session_instance
+                WHERE is_active = FALSE AND is_cancelled = FALSE
+                  AND active_until_utc >= %(at)s
+                  AND active_from_utc <= %(at)s
+                UNION ALL
+                SELECT session_instance_id, FALSE
+                FROM session_instance
+                WHERE is_active = TRUE
+                  AND NOT COALESCE(
+                      is_cancelled = FALSE AND active_from_utc <= %(at)s AND active_until_utc >= %(at)s,
+                      FALSE)
+            ),
+            flipped AS (
+                UPDATE session_instance si
+                SET is_active = due.activate
+                FROM due
+                WHERE si.session_instance_id = due.session_instance_id
+                  AND si.is_active IS DISTINCT FROM due.activate
+                RETURNING si.session_instance_id, si.session_id, due.activate
+            )
+            SELECT f.session_instance_id, f.session_id, s.name, f.activate
+            FROM flipped f
+            JOIN session s ON s.session_id = f.session_id
+            ORDER BY f.session_id, f.session_instance_id
+        """, {'at': at})
+
+        for instance_id, session_id, name, activated in cur.fetchall():
+            stats['activated' if activated else 'deactivated'].append({
+                'session_id': session_id,
+                'session_name': name,
+                'instance_id': instance_id
+            })
+
+        activated_ids = [item['instance_id'] for item in stats['activated']]
+        deactivated_ids = [item['instance_id'] for item in stats['deactivated']]
+        if activated_ids or deactivated_ids:
+            stats['people_updated'] = refresh_people_active_instances(cur, activated_ids, deactivated_ids)
+
+        if commit:
+            conn.commit()
+        else:
+            conn.rollback()
 
-        sessions = cur.fetchall()
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Error processing active session transitions: {e}", exc_info=True)
+        stats['activated'], stats['deactivated'] = [], []
+        stats['errors'].append({'session_id': None, 'error': str(e)})
+    finally:
+        cur.close()
 
-        for session_row in sessions:
-            try:
-                (session_id, name, recurrence_json, timezone_str,
-                 buffer_before, buffer_after, initiation_date) = session_row
-
-                # Parse timezone
-                try:
-                    tz = ZoneInfo(timezone_str)
-                except Exception as e:
-                    logger.error(f"Invalid timezone '{timezone_str}' for session {session_id}: {e}")
-                    stats['errors'].append({'session_id': session_id, 'error': f'Invalid timezone: {timezone_str}'})
-                    continue
-
-                # Get current time in session's timezone (look ahead 1 minute)
-                now_utc = datetime.now(ZoneInfo('UTC'))
-                now_local = now_utc.astimezone(tz)
-                lookahead_local = now_local + timedelta(minutes=1)
-
-                # Get all session instances for this session (within reasonable time range)
-                # We check past instances (in case they should still be active) and future ones
-                search_start = (now_local - timedelta(days=1)).date()
-                search_end = (now_local + timedelta(days=2)).date()
-
-                cur.execute("""
-                    SELECT session_instance_id, date, start_time, end_time, is_active, is_cancelled
-                    FROM session_instance
-                    WHERE session_id = %s
-                      AND date BETWEEN %s AND %s
-                      AND is_cancelled = FALSE
-                    ORDER BY date, start_time
-                """, (session_id, search_start, search_end))
-
-                instances = cur.fetchall()
-
-                # Determine which instances should be active
-                instances_that_should_be_active = set()
-                currently_active_instances = set()
-
-                for instance in instances:
-                    inst_id, inst_date, start_time, end_time, is_active, is_cancelled = instance
-
-                    # Track what's currently active
-                    if is_active:
-                        currently_active_instances.add(inst_id)
-
-                    # Skip instances without defined times (can't determine active window)
-                    if start_time is None or end_time is None:
-                        continue
-
-                    # Combine date and time to get full datetimes in session timezone
-                    start_dt = datetime.combine(inst_date, start_time).replace(tzinfo=tz)
-                    end_dt = datetime.combine(inst_date, end_time).replace(tzinfo=tz)
-
-                    # Calculate active window (with buffer)
-                    active_start = start_dt - timedelta(minutes=buffer_before)
-                    active_end = end_dt + timedelta(minutes=buffer_after)
-
-                    # Check if lookahead time is within active window
-                    if active_start <= lookahead_local <= active_end:
-                        instances_that_should_be_active.add(inst_id)
-
-                # Activate instances that should be active but aren't
-                for inst_id in instances_that_should_be_active - currently_active_instances:
-                    activate_session_instance(session_id, inst_id, conn)
-                    stats['activated'].append({
-                        'session_id': session_id,
-                        'session_name': name,
-                        'instance_id': inst_id
-                    })
-
-                # Deactivate instances that are active but shouldn't be
-                for inst_id in currently_active_instances - instances_that_should_be_active:
-                    deactivate_session_instance(session_id, inst_id, conn)
-                    stats['deactivated'].append({
-                        'session_id': session_id,
-                        'session_name': name,
-                        'instance_id': inst_id
-                    })
+    logger.info(
+        f"Active session update completed: "
+        f"{len(stats['activated'])} activated, "
+        f"{len(stats['deactivated'])} deactivated, "
+        f"{len(stats['errors'])} errors"
+    )
 
-            except Exception as e:
-                logger.error(f"Error processing session {session_id}: {e}", exc_info=True)
-                stats['errors'].append({'session_id': session_id, 'error': str(e)})
-                conn.rollback()
-                continue
+    return stats
 
-        conn.commit()
 
-        logger.info(
-            f"Active session update completed: "
-            f"{len(stats['activated'])} activated, "
-            f"{len(stats['deactivated'])} deactivated, "
-            f"{len(stats['errors'])} errors"
+def refresh_people_active_instances(cur, activated_ids: List[int], deactivated_ids: List[int]) -> int:
+    """
+    Recompute at_active_session_instance_id for everyone a batch of transitions
+    affects: people checked in ("yes") to an activated instance, and people
+    currently at a deactivated one.
+
+    Each gets the active instance they checked in to that starts first (most
+    recent check-in on ties), or NULL, as in recalculate_person_active_instance.
+
+    Returns:
+        Number of people whose active instance changed
+    """
+    cur.execute("""
+        WITH affected AS (
+            SELECT person_id FROM session_instance_person
+            WHERE session_instance_id = ANY(%s) AND attendance = 'yes'
+            UNION
+            SELECT person_id FROM person
+            WHERE at_active_session_instance_id = ANY(%s)
+        ),
+        chosen AS (
+            SELECT a.person_id, (
+                SELECT sip.session_instance_id
+                FROM session_instance_person sip
+                JOIN session_instance si ON sip.session_instance_id = si.session_instance_id
+                WHERE sip.person_id = a.person_id
+                  AND sip.attendance = 'yes'
+                  AND si.is_active = TRUE
+                ORDER BY si.date, si.start_time, sip.created_date DESC
+                LIMIT 1
+            ) AS session_instance_id
+            FROM affected a
         )
+        UPDATE person p
+        SET at_active_session_instance_id = chosen.session_instance_id
+        FROM chosen
+        WHERE p.person_id = chosen.person_id
+          AND p.at_active_session_instance_id IS DISTINCT FROM chosen.session_instance_id
+    """, (list(activated_ids), list(deactivated_ids)))
+    return cur.rowcount
 
-        return stats
 
+def next_transition_at(conn, now: Optional[datetime] = None) -> Optional[datetime]:
+    """
+    When the next activation or deactivation falls due (UTC), or None if nothing
+    is scheduled. Already-due transitions return a time at or before now.
+
+    Used by jobs/active_session_scheduler.py to sleep until exactly then.
+    """
+    at = (now or datetime.now(ZoneInfo('UTC'))) + ACTIVATION_LOOKAHEAD
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            SELECT LEAST(
+                (SELECT MIN(active_from_utc) FROM session_instance
+                 WHERE is_active = FALSE AND is_cancelled = FALSE
+                   AND active_until_utc >= %(at)s),
+                (SELECT MIN(active_until_utc) FROM session_instance
+                 WHERE is_active = TRUE)
+            )
+        """, {'at': at})
+        row = cur.fetchone()
+        conn.commit()
     finally:
         cur.close()
-        conn.close()
+    if not row or row[0] is None:
+        return None
+    # Both kinds of transition are evaluated ACTIVATION_LOOKAHEAD ahead of now.
+    return row[0] - ACTIVATION_LOOKAHEAD
 
 
 def auto_create_scheduled_instances() -> Dict[str, any]:
@@ -160,7 +223,10 @@ def auto_create_scheduled_instances() -> Dict[str, any]:
     Auto-create session instances for sessions configured with auto_create_instances=TRUE.
 
     For each eligible session, creates instances that fall within the configured
-    hours_ahead window based on the session's recurrence pattern.
+    hours_ahead window based on the session's recurrence pattern. All sessions
+    are expanded and inserted in one statement (auto_create_instances_bulk), so
+    the cost stays flat as sessions are added; sessions whose pattern or
+    timezone doesn't parse are reported in 'errors' and skipped.
 
     Returns:
         Dictionary with statistics about auto-created instances
@@ -188,37 +254,42 @@ def auto_create_scheduled_instances() -> Dict[str, any]:
 
         sessions = cur.fetchall()
 
-        for session_row in sessions:
+        eligible = []
+        names = {}
+        for session_id, name, recurrence_json, timezone_str, hours_ahead in sessions:
             try:
-                (session_id, name, recurrence_json, timezone_str,
-                 hours_ahead) = session_row
-
-                count, dates = auto_create_instances_hours_ahead(
-                    session_id=session_id,
-                    hours_ahead=hours_ahead,
-                    session_timezone=timezone_str,
-                    recurrence_json=recurrence_json,
-                    conn=conn
-                )
-
-                if count > 0:
-                    stats['auto_created'].append({
-                        'session_id': session_id,
-                        'session_name': name,
-                        'instances_created': count,
-                        'dates': dates
-                    })
-
+                ZoneInfo(timezone_str)
+                parse_recurrence(recurrence_json)
             except Exception as e:
                 logger.error(f"Error auto-creating instances for session {session_id}: {e}")
                 stats['errors'].append({
                     'session_id': session_id,
                     'error': f'Auto-create failed: {str(e)}'
                 })
-                conn.rollback()
                 continue
+            eligible.append((session_id, recurrence_json, timezone_str, hours_ahead))
+            names[session_id] = name
 
-        conn.commit()
+        try:
+            created = auto_create_instances_bulk(eligible, conn=conn)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Error auto-creating instances for {len(eligible)} sessions: {e}")
+            stats['errors'].extend(
+                {'session_id': session_id, 'error': f'Auto-create failed: {str(e)}'}
+                for session_id, _, _, _ in eligible
+            )
+            created = {}
+
+        for session_id, _, _, _ in eligible:
+            if session_id in created:
+                stats['auto_created'].append({
+                    'session_id': session_id,
+                    'session_name': names[session_id],
+                    'instances_created': len(created[session_id]),
+                    'dates': created[session_id]
+                })
 
         total_created = sum(item['instances_created'] for item in stats['auto_created'])
         logger.info(
@@ -12,29 +12,9 @@ from functools import wraps
 from services.person_tune_service import PersonTuneService, UNSET
 from services.thesession_sync_service import ThesessionSyncService
 from database import get_db_connection, get_current_user_id
-import base64
-
-
-def bytea_to_base64(data):
-    """
-    Convert PostgreSQL bytea data to base64 string.
-    Handles different return formats: bytes, memoryview, hex string.
-    """
-    if not data:
-        return None
-
-    if isinstance(data, memoryview):
-        data = data.tobytes()
-    elif isinstance(data, str):
-        # PostgreSQL returns bytea as hex string starting with \x
-        if data.startswith('\\x'):
-            data = bytes.fromhex(data[2:])
-        else:
-            data = data.encode('latin1')
-    elif not isinstance(data, bytes):
-        data = bytes(data)
-
-    return base64.b64encode(data).decode('utf-8')
+from notation_images import image_url
+import job_queue
+import tune_search
 
 
 # Initialize services
@@ -143,7 +123,7 @@ def _build_person_tune_response(person_tune, include_tune_details: bool = True)
             else:
                 response['thesession_url'] = base_url
 
-        # Get ABC notation and images from tune_setting
+        # Get ABC notation and image URLs from tune_setting
         # If setting_id is specified, use that; otherwise, use the first setting for this tune
         abc_notation = None
         conn = get_db_connection()
@@ -152,13 +132,13 @@ def _build_person_tune_response(person_tune, include_tune_details: bool = True)
             if person_tune.setting_id:
                 # Use the specific setting_id if saved
                 cur.execute(
-                    "SELECT abc, incipit_abc, image, incipit_image, key FROM tune_setting WHERE setting_id = %s",
+                    "SELECT abc, incipit_abc, image_hash, incipit_image_hash, key, setting_id FROM tune_setting WHERE setting_id = %s",
                     (person_tune.setting_id,)
                 )
             else:
                 # Fall back to the first setting for this tune (ordered by setting_id)
                 cur.execute(
-                    """SELECT abc, incipit_abc, image, incipit_image, key
+                    """SELECT abc, incipit_abc, image_hash, incipit_image_hash, key, setting_id
                        FROM tune_setting
                        WHERE tune_id = %s
                        ORDER BY setting_id ASC
@@ -169,8 +149,8 @@ def _build_person_tune_response(person_tune, include_tune_details: bool = True)
             if abc_result:
                 abc_notation = abc_result[0]
                 response['incipit_abc'] = abc_result[1]
-                response['image'] = bytea_to_base64(abc_result[2])
-                response['incipit_image'] = bytea_to_base64(abc_result[3])
+                response['image_url'] = image_url(abc_result[5], "full", abc_result[2])
+                response['incipit_image_url'] = image_url(abc_result[5], "incipit", abc_result[3])
                 response['setting_key'] = abc_result[4]
         finally:
             conn.close()
@@ -537,7 +517,7 @@ def add_my_tune():
                     from api_routes import cache_default_tune_setting
                     # new_tune data from frontend doesn't include settings, so pass None
                     # to have the helper fetch full tune data from thesession.org
-                    cache_default_tune_setting(tune_id, None, get_current_user_id(), sync=True)
+                    cache_default_tune_setting(tune_id, None, get_current_user_id(), sync=not job_queue.enabled())
 
                 # Get the tune details after insertion
                 tune_details = _get_tune_details(tune_id)
@@ -599,7 +579,8 @@ def add_my_tune():
                 )
                 if not cur_check.fetchone():
                     # Setting not cached yet - cache it now
-                    cache_default_tune_setting(tune_id, None, user_id, sync=True, target_setting_id=setting_id)
+                    cache_default_tune_setting(tune_id, None, user_id, sync=not job_queue.enabled(),
+                                               target_setting_id=setting_id)
             finally:
                 conn_check.close()
 
@@ -997,7 +978,8 @@ def search_tunes():
     """
     GET /api/tunes/search
 
-    Search for tunes in the tune table by name.
+    Search for tunes in the tune table by name (accent-insensitive; names that
+    only resemble the query, e.g. typos, rank after every substring match).
 
     Query Parameters:
         - q (str, required): Search query
@@ -1071,40 +1053,49 @@ def search_tunes():
                 if not person_id:  # Only add if not already prioritizing by person_tune
                     order_by_fields.append("CASE WHEN st.session_id IS NOT NULL THEN 1 ELSE 0 END")
 
-            # Build match priority case (accent insensitive)
-            select_fields.append("""CASE
-                           WHEN LOWER(unaccent(t.name)) = LOWER(unaccent(%s)) THEN 1
-                           WHEN LOWER(unaccent(t.name)) LIKE LOWER(unaccent(%s)) THEN 2
-                           ELSE 3
-                       END AS match_priority""")
+            # Match priority: exact, prefix, substring, then close spellings (typos)
+            rank_sql, rank_params = tune_search.rank_sql(query)
+            select_fields.append(f"{rank_sql} AS match_priority")
+            similarity_sql, similarity_params = tune_search.similarity_sql(query)
+            select_fields.append(f"{similarity_sql} AS similarity")
             # Soft type preference (matching the set's type sorts first)
             select_fields.append("CASE WHEN t.tune_type = %s THEN 0 ELSE 1 END AS type_pref")
 
+            # Name match (indexed substring, or a close spelling)
+            where_sql, where_params = tune_search.match_sql(query)
+
             # Build final query
             join_clause = " ".join(joins) if joins else ""
             select_clause = ", ".join(select_fields)
 
-            # Construct ORDER BY: matching type first (soft preference), then existing
-            # person/session priority, match priority, tunebook count, name
-            order_by_parts = ["type_pref"] + order_by_fields + ["match_priority", "t.tunebook_count_cached DESC NULLS LAST", "t.name"]
+            # Construct ORDER BY: typo-only matches after every literal match, then
+            # matching type (soft preference), existing person/session priority,
+            # match priority, closeness, tunebook count, name
+            literal_sql, literal_params = tune_search.match_sql(query, fuzzy=False)
+            order_by_parts = (
+                [f"NOT {literal_sql}", "type_pref"] + order_by_fields
+                + ["match_priority", "similarity DESC", "t.tunebook_count_cached DESC NULLS LAST", "t.name"]
+            )
             order_by_clause = ", ".join(order_by_parts)
 
             sql = f"""
                 SELECT {select_clause}
                 FROM tune t
                 {join_clause}
-                WHERE LOWER(unaccent(t.name)) LIKE LOWER(unaccent(%s))
+                WHERE {where_sql}
                   AND t.redirect_to_tune_id IS NULL
                 ORDER BY {order_by_clause}
                 LIMIT %s
             """
 
             # Build final parameter list in order of appearance in SQL:
-            # 1. query params for CASE statement (in SELECT)
+            # 1. rank, similarity and type preference params (in SELECT)
             # 2. query_params for JOINs (person_id, session_id)
-            # 3. query param for WHERE clause
-            # 4. limit param
-            final_params = [query, f"{query}%", prefer_type] + query_params + [f"%{query}%", limit]
+            # 3. match params for WHERE clause
+            # 4. literal-match param for ORDER BY
+            # 5. limit param
+            final_params = (rank_params + similarity_params + [prefer_type] + query_params
+                            + where_params + literal_params + [limit])
             cur.execute(sql, final_params)
 
             rows = cur.fetchall()
@@ -1331,8 +1322,9 @@ def get_common_tunes(other_person_id):
 
             # Add search filter if provided
             if search_query:
-                query += " AND LOWER(t.name) LIKE LOWER(%s)"
-                params.append(f"%{search_query}%")
+                search_sql, search_params = tune_search.match_sql(search_query, fuzzy=False)
+                query += f" AND {search_sql}"
+                params.extend(search_params)
 
             # Add tune type filter if provided
             if tune_type_filter:
@@ -1,27 +1,38 @@
-from flask import request, jsonify, session, send_file
+from flask import request, jsonify, session, send_file, Response, stream_with_context
 from collections import Counter
 import requests
 import re
+import itertools
 import os
 import base64
+import json
 import psycopg2
+import psycopg2.extras
 from flask_login import login_required
 from database import (
     get_db_connection,
     get_current_user_id,
     save_to_history,
+    save_many_to_history,
     find_matching_tune,
     normalize_apostrophes,
     check_in_person as db_check_in_person,
+    TUNE_TYPE_BEATS,
 )
 from email_utils import send_email_via_sendgrid
 from timezone_utils import now_utc, format_datetime_with_timezone, utc_to_local
 from flask_login import current_user
 from functools import wraps
-import qrcode
 from io import BytesIO
 from recurrence_utils import validate_recurrence_json, to_human_readable
 from fractional_indexing import generate_append_position, generate_position_between
+import abc_renderer
+import abc_melody
+from notation_images import image_url
+import job_queue
+import tune_match_index
+import user_cache
+import tune_search
 from recording import upload_chunk_to_s3, generate_presigned_url, get_recording_timeline, compute_checksum, chunk_audio_file
 
 
@@ -78,11 +89,11 @@ def get_tune_detail_global(tune_id):
 
         # A default setting's notation (lowest setting_id) for the rendered incipit/full.
         cur.execute(
-            "SELECT setting_id, abc, incipit_abc, image, incipit_image FROM tune_setting WHERE tune_id = %s ORDER BY setting_id LIMIT 1",
+            "SELECT setting_id, abc, incipit_abc, image_hash, incipit_image_hash FROM tune_setting WHERE tune_id = %s ORDER BY setting_id LIMIT 1",
             (tune_id,),
         )
         s = cur.fetchone()
-        setting_id, abc_notation, incipit_abc, abc_image, incipit_image = s if s else (None, None, None, None, None)
+        setting_id, abc_notation, incipit_abc, image_hash, incipit_image_hash = s if s else (None, None, None, None, None)
 
         person_tune_status = None
         if current_user.is_authenticated:
@@ -107,7 +118,8 @@ def get_tune_detail_global(tune_id):
             "alias": None, "setting_id": setting_id, "key": None, "setting_key": None,
             "name": None, "key_override": None, "setting_override": None,
             "abc": abc_notation, "incipit_abc": incipit_abc,
-            "image": bytea_to_base64(abc_image), "incipit_image": bytea_to_base64(incipit_image),
+            "image_url": image_url(setting_id, "full", image_hash),
+            "incipit_image_url": image_url(setting_id, "incipit", incipit_image_hash),
             "tunebook_count": tunebook_count,
             "tunebook_count_cached_date": tbc_date.isoformat() if tbc_date else None,
             "times_played": 0, "global_play_count": global_play_count, "play_instances": [],
@@ -134,6 +146,7 @@ def admin_set_beta_logging(user_id):
         if cur.rowcount == 0:
             return jsonify({"success": False, "error": "User not found"}), 404
         conn.commit()
+        user_cache.invalidate_user(user_id)
         return jsonify({"success": True, "user_id": user_id, "beta_live_logging": enabled})
     finally:
         conn.close()
@@ -241,28 +254,6 @@ def reconcile_break_records(cur, session_instance_id, set_position_lists, audit_
     return len(sets)
 
 
-def bytea_to_base64(data):
-    """
-    Convert PostgreSQL bytea data to base64 string.
-    Handles different return formats: bytes, memoryview, hex string.
-    """
-    if not data:
-        return None
-
-    if isinstance(data, memoryview):
-        data = data.tobytes()
-    elif isinstance(data, str):
-        # PostgreSQL returns bytea as hex string starting with \x
-        if data.startswith('\\x'):
-            data = bytes.fromhex(data[2:])
-        else:
-            data = data.encode('latin1')
-    elif not isinstance(data, bytes):
-        data = bytes(data)
-
-    return base64.b64encode(data).decode('utf-8')
-
-
 def insert_session_instance_tune(cur, session_id, date, tune_id, setting_id, name, starts_set):
     """
     Insert a tune into session_instance_tune with fractional indexing.
@@ -389,45 +380,13 @@ def render_abc_to_png(abc_notation, is_incipit=False):
     Call the ABC renderer microservice to convert ABC notation to PNG image.
     Returns the PNG image as bytes, or None if rendering fails.
 
+    Goes through the shared abc_renderer client (keep-alive, content-hash cache).
+
     Args:
         abc_notation: ABC notation string to render
         is_incipit: If True, uses minimal padding for compact rendering (default: False)
     """
-    try:
-        abc_renderer_url = os.getenv('ABC_RENDERER_URL')
-        if not abc_renderer_url:
-            print("Warning: ABC_RENDERER_URL not configured")
-            return None
-
-        print(f"Calling ABC renderer with {len(abc_notation)} chars of ABC notation (isIncipit={is_incipit})")
-        response = requests.post(
-            f'{abc_renderer_url}/api/render',
-            json={'abc': abc_notation, 'isIncipit': is_incipit},
-            timeout=15
-        )
-
-        print(f"ABC renderer response: status={response.status_code}, content-type={response.headers.get('content-type')}")
-
-        if response.status_code == 200:
-            if response.headers.get('content-type') == 'image/png':
-                print(f"Successfully got PNG image ({len(response.content)} bytes)")
-                return response.content
-            else:
-                print(f"Unexpected content type: {response.headers.get('content-type')}")
-                print(f"Response body: {response.text[:200]}")
-                return None
-        else:
-            print(f"ABC renderer returned status {response.status_code}: {response.text[:200]}")
-            return None
-
-    except requests.exceptions.RequestException as e:
-        print(f"Error calling ABC renderer: {e}")
-        return None
-    except Exception as e:
-        print(f"Unexpected error in render_abc_to_png: {e}")
-        import traceback
-        traceback.print_exc()
-        return None
+    return abc_renderer.render_abc_to_png(abc_notation, is_incipit=is_incipit)
 
 
 def cache_default_tune_setting(tune_id, tune_data, user_id, sync=True, target_setting_id=None):
@@ -444,22 +403,28 @@ def cache_default_tune_setting(tune_id, tune_data, user_id, sync=True, target_se
                    Must include 'settings' array and 'type' field.
                    If None, will fetch from thesession.org API.
         user_id: ID of user who triggered the operation (for audit trail)
-        sync: If True, process synchronously. If False, skip processing (placeholder for future async).
+        sync: If True, process synchronously. If False, enqueue a background job (job_queue) instead.
         target_setting_id: If provided, cache this specific setting instead of the default (first) one.
 
     Returns:
         Tuple of (success: bool, message: str, setting_id: int or None)
     """
-    # ============================================================================
-    # ASYNC PROCESSING PLACEHOLDER
-    # When sync=False, this is where we would enqueue the setting cache job
-    # for background/async processing. For now, we just skip and return.
-    # Future implementation: Add to a job queue (e.g., Celery, RQ, or custom)
-    # that processes tune settings in the background.
-    # ============================================================================
     if not sync:
-        print(f"[cache_default_tune_setting] Skipping tune {tune_id} - async processing not yet implemented")
-        return True, "Skipped (async not implemented)", None
+        # Hand off to the background worker (jobs/job_worker.py); deduplicated
+        # per tune / setting, so repeated adds queue the work once.
+        try:
+            conn = get_db_connection()
+            try:
+                cur = conn.cursor()
+                job_id = job_queue.enqueue_setting_cache(cur, tune_id, user_id, setting_id=target_setting_id)
+                conn.commit()
+            finally:
+                conn.close()
+        except psycopg2.Error as e:
+            return False, f"Error queueing setting cache: {str(e)}", None
+        if job_id is None:
+            return True, "Already queued for background caching", None
+        return True, f"Queued for background caching (job {job_id})", None
 
     try:
         from database import extract_abc_incipit
@@ -518,6 +483,9 @@ def cache_default_tune_setting(tune_id, tune_data, user_id, sync=True, target_se
                 VALUES (%s, %s, %s, %s, %s, (NOW() AT TIME ZONE 'UTC'), %s, %s)
             """, (setting_id, tune_id, key, abc, incipit_abc, user_id, user_id))
 
+            # Melody n-grams for search by ABC
+            abc_melody.index_setting(cur, setting_id, abc)
+
             # Log INSERT to history
             cur.execute("""
                 INSERT INTO tune_setting_history
@@ -541,15 +509,15 @@ def cache_default_tune_setting(tune_id, tune_data, user_id, sync=True, target_se
             if not abc.startswith('X:'):
                 abc_with_headers = f"X:1\nM:4/4\nL:1/8\nK:{key if key else 'D'}\n{abc}"
 
-            # Render full ABC image
-            full_image = render_abc_to_png(abc_with_headers)
-
-            # Render incipit image
+            # Render full and incipit images in one renderer round trip
+            incipit_with_headers = None
             if incipit_abc:
                 incipit_with_headers = incipit_abc
                 if not incipit_abc.startswith('X:'):
                     incipit_with_headers = f"X:1\nM:4/4\nL:1/8\nK:{key if key else 'D'}\n{incipit_abc}"
-                incipit_image = render_abc_to_png(incipit_with_headers, is_incipit=True)
+            full_image, incipit_image = abc_renderer.render_many(
+                [(abc_with_headers, False), (incipit_with_headers, True)]
+            )
 
             # Update database with images if they were generated
             if full_image or incipit_image:
@@ -1003,6 +971,9 @@ def cache_tune_setting_ajax(tune_id):
             """, ('INSERT', audit_user_id, setting_id))
             action = "cached"
 
+        # Melody n-grams for search by ABC
+        abc_melody.index_setting(cur, setting_id, abc)
+
         conn.commit()
 
         # Generate PNG images for both full ABC and incipit
@@ -1016,15 +987,15 @@ def cache_tune_setting_ajax(tune_id):
             # Construct minimal headers if not present (T: title omitted to avoid text in image)
             abc_with_headers = f"X:1\nM:4/4\nL:1/8\nK:{key if key else 'D'}\n{abc}"
 
-        # Render full ABC image
-        full_image = render_abc_to_png(abc_with_headers)
-
-        # Render incipit image
+        # Render full and incipit images in one renderer round trip
+        incipit_with_headers = None
         if incipit_abc:
             incipit_with_headers = incipit_abc
             if not incipit_abc.startswith('X:'):
                 incipit_with_headers = f"X:1\nM:4/4\nL:1/8\nK:{key if key else 'D'}\n{incipit_abc}"
-            incipit_image = render_abc_to_png(incipit_with_headers, is_incipit=True)
+        full_image, incipit_image = abc_renderer.render_many(
+            [(abc_with_headers, False), (incipit_with_headers, True)]
+        )
 
         # Update database with images if they were generated
         if full_image or incipit_image:
@@ -1043,7 +1014,7 @@ def cache_tune_setting_ajax(tune_id):
 
         # Get the cached setting data
         cur.execute("""
-            SELECT setting_id, tune_id, key, abc, incipit_abc, cache_updated_date, image, incipit_image
+            SELECT setting_id, tune_id, key, abc, incipit_abc, cache_updated_date, image_hash, incipit_image_hash
             FROM tune_setting
             WHERE setting_id = %s
         """, (setting_id,))
@@ -1053,10 +1024,6 @@ def cache_tune_setting_ajax(tune_id):
         cur.close()
         conn.close()
 
-        # Encode images as base64 for JSON transport
-        image_base64 = bytea_to_base64(cached_setting[6])
-        incipit_image_base64 = bytea_to_base64(cached_setting[7])
-
         return jsonify({
             "success": True,
             "message": f"Successfully {action} setting {setting_id}",
@@ -1068,8 +1035,8 @@ def cache_tune_setting_ajax(tune_id):
                 "abc": cached_setting[3],
                 "incipit_abc": cached_setting[4],
                 "cache_updated_date": cached_setting[5].isoformat() if cached_setting[5] else None,
-                "image": image_base64,
-                "incipit_image": incipit_image_base64
+                "image_url": image_url(setting_id, "full", cached_setting[6]),
+                "incipit_image_url": image_url(setting_id, "incipit", cached_setting[7])
             }
         })
 
@@ -1112,7 +1079,9 @@ def get_tune_incipit(tune_id):
         - setting_id (int, optional): Specific setting to fetch incipit for
 
     Returns:
-        JSON with incipit_image (base64 PNG) and/or incipit_abc (text).
+        JSON with incipit_image_url and/or incipit_abc (text). A tune not cached
+        locally has no stored image to link to, so its one-off render comes back
+        inline as incipit_image (base64 PNG) instead.
     """
     try:
         setting_id = request.args.get('setting_id', type=int)
@@ -1123,12 +1092,12 @@ def get_tune_incipit(tune_id):
             cur = conn.cursor()
             if setting_id:
                 cur.execute(
-                    "SELECT incipit_image, incipit_abc FROM tune_setting WHERE setting_id = %s",
+                    "SELECT setting_id, incipit_image_hash, incipit_abc FROM tune_setting WHERE setting_id = %s",
                     (setting_id,)
                 )
             else:
                 cur.execute(
-                    """SELECT incipit_image, incipit_abc
+                    """SELECT setting_id, incipit_image_hash, incipit_abc
                        FROM tune_setting
                        WHERE tune_id = %s
                        ORDER BY setting_id ASC
@@ -1136,13 +1105,12 @@ def get_tune_incipit(tune_id):
                     (tune_id,)
                 )
             row = cur.fetchone()
-            if row and (row[0] or row[1]):
-                result = {"success": True, "incipit_image": None, "incipit_abc": None}
-                if row[0]:
-                    result["incipit_image"] = bytea_to_base64(row[0])
-                if row[1]:
-                    result["incipit_abc"] = row[1]
-                return jsonify(result), 200
+            if row and (row[1] or row[2]):
+                return jsonify({
+                    "success": True,
+                    "incipit_image_url": image_url(row[0], "incipit", row[1]),
+                    "incipit_abc": row[2] or None,
+                }), 200
         finally:
             conn.close()
 
@@ -1151,12 +1119,12 @@ def get_tune_incipit(tune_id):
         api_url = f"https://thesession.org/tunes/{tune_id}?format=json"
         resp = requests.get(api_url, timeout=10)
         if resp.status_code != 200:
-            return jsonify({"success": True, "incipit_image": None, "incipit_abc": None}), 200
+            return jsonify({"success": True, "incipit_image_url": None, "incipit_abc": None}), 200
 
         data = resp.json()
         settings = data.get("settings", [])
         if not settings:
-            return jsonify({"success": True, "incipit_image": None, "incipit_abc": None}), 200
+            return jsonify({"success": True, "incipit_image_url": None, "incipit_abc": None}), 200
 
         # Find the requested setting, or use the first one
         setting = None
@@ -1174,9 +1142,9 @@ def get_tune_incipit(tune_id):
 
         incipit_abc = extract_abc_incipit(abc, tune_type)
         if not incipit_abc:
-            return jsonify({"success": True, "incipit_image": None, "incipit_abc": None}), 200
+            return jsonify({"success": True, "incipit_image_url": None, "incipit_abc": None}), 200
 
-        result = {"success": True, "incipit_image": None, "incipit_abc": incipit_abc}
+        result = {"success": True, "incipit_image_url": None, "incipit_image": None, "incipit_abc": incipit_abc}
 
         # Try to render to PNG
         incipit_with_headers = incipit_abc
@@ -1251,18 +1219,19 @@ def get_session_tune_detail(session_path, tune_id):
         # If setting_id is specified, use that; otherwise, use the first setting for this tune
         abc_notation = None
         incipit_abc = None
-        abc_image = None
-        incipit_image = None
+        image_hash = None
+        incipit_image_hash = None
+        notation_setting_id = None
         setting_key = None
         if setting_id:
             cur.execute(
-                "SELECT abc, incipit_abc, image, incipit_image, key FROM tune_setting WHERE setting_id = %s",
+                "SELECT abc, incipit_abc, image_hash, incipit_image_hash, key, setting_id FROM tune_setting WHERE setting_id = %s",
                 (setting_id,)
             )
         else:
             # Fall back to the first setting for this tune (ordered by setting_id)
             cur.execute(
-                """SELECT abc, incipit_abc, image, incipit_image, key
+                """SELECT abc, incipit_abc, image_hash, incipit_image_hash, key, setting_id
                    FROM tune_setting
                    WHERE tune_id = %s
                    ORDER BY setting_id ASC
@@ -1273,9 +1242,10 @@ def get_session_tune_detail(session_path, tune_id):
         if abc_result:
             abc_notation = abc_result[0]
             incipit_abc = abc_result[1]
-            abc_image = abc_result[2]
-            incipit_image = abc_result[3]
+            image_hash = abc_result[2]
+            incipit_image_hash = abc_result[3]
             setting_key = abc_result[4]
+            notation_setting_id = abc_result[5]
 
         # Get all aliases from session_tune_alias table
         cur.execute(
@@ -1398,8 +1368,8 @@ def get_session_tune_detail(session_path, tune_id):
                     "setting_key": setting_key,
                     "abc": abc_notation,
                     "incipit_abc": incipit_abc,
-                    "image": bytea_to_base64(abc_image),
-                    "incipit_image": bytea_to_base64(incipit_image),
+                    "image_url": image_url(notation_setting_id, "full", image_hash),
+                    "incipit_image_url": image_url(notation_setting_id, "incipit", incipit_image_hash),
                     "tunebook_count": tunebook_count,
                     "tunebook_count_cached_date": (
                         tunebook_count_cached_date.isoformat()
@@ -1787,7 +1757,7 @@ def add_session_tune(session_path):
         # If a new tune was inserted, cache the default setting and generate images
         # This must happen after commit so the tune exists for foreign key constraints
         if new_tune_inserted:
-            cache_default_tune_setting(tune_id, None, get_current_user_id(), sync=True)
+            cache_default_tune_setting(tune_id, None, get_current_user_id(), sync=not job_queue.enabled())
 
         return jsonify({"success": True, "message": "Tune added to session successfully"}), 201
 
@@ -2108,7 +2078,7 @@ def get_next_session_instance_suggestion_ajax(session_path):
     """
     try:
         from datetime import datetime, timedelta
-        from recurrence_utils import SessionRecurrence
+        from recurrence_utils import parse_recurrence
         try:
             from zoneinfo import ZoneInfo
         except ImportError:
@@ -2148,7 +2118,7 @@ def get_next_session_instance_suggestion_ajax(session_path):
         # Parse recurrence pattern
         try:
             tz = ZoneInfo(session_timezone or 'UTC')
-            session_recurrence = SessionRecurrence(recurrence_json)
+            session_recurrence = parse_recurrence(recurrence_json)
         except (ValueError, TypeError) as e:
             cur.close()
             conn.close()
@@ -3454,8 +3424,13 @@ def link_tune_ajax(session_path, date_or_id):
                     save_to_history(cur, "tune", "INSERT", tune_id, user_id=get_current_user_id())
 
                     # Cache the default setting and generate images
-                    # (we already have tune data from the API, pass it to avoid another fetch)
-                    cache_default_tune_setting(tune_id, data, get_current_user_id(), sync=True)
+                    # (we already have tune data from the API, pass it to avoid another fetch).
+                    # With a job worker, queue it in this transaction so the job only
+                    # exists once the tune row does.
+                    if job_queue.enabled():
+                        job_queue.enqueue_setting_cache(cur, tune_id, get_current_user_id())
+                    else:
+                        cache_default_tune_setting(tune_id, data, get_current_user_id(), sync=True)
 
                     # Determine if we need to use an alias
                     alias = tune_name if tune_name != tune_name_from_api else None
@@ -4958,14 +4933,10 @@ def get_session_tunes_grid_ajax(session_path):
         cur.execute(
             """
             WITH session_tune_plays AS (
-                -- Count how many times each tune has been played at this session
-                SELECT
-                    sit.tune_id,
-                    COUNT(DISTINCT si.session_instance_id) as play_count
-                FROM session_instance_tune sit
-                INNER JOIN session_instance si ON sit.session_instance_id = si.session_instance_id
-                WHERE si.session_id = %s AND sit.tune_id IS NOT NULL
-                GROUP BY sit.tune_id
+                -- How many instances of this session each tune was played at
+                SELECT tune_id, instance_count as play_count
+                FROM session_tune_play
+                WHERE session_id = %s
             ),
             session_regulars AS (
                 -- Get the list of regular players for this session
@@ -6881,10 +6852,17 @@ def match_tune_core(cur, session_id, tune_name, previous_tune_type=None, limit=5
         match (session aliases -> session_tune_alias -> tune name w/ "The", accent-insensitive).
       - otherwise a wildcard candidate list ranked by preferred type, this session's
         play-count, then tunebook count (the "pick one" / red state on the client).
+      - when no name contains the string, close spellings (tune_search similarity),
+        closest first; these never set matched.
+
+    Answered from the in-process tune_match_index (same results, no queries once
+    warm); the SQL below is the fallback when TUNE_MATCH_INDEX=0.
     """
     tune_name = normalize_apostrophes((tune_name or "").strip())
     if not tune_name:
         return {"matched": False, "exact_match": False, "results": []}
+    if tune_match_index.enabled():
+        return tune_match_index.match(cur, session_id, tune_name, previous_tune_type, limit)
 
     tune_id, final_name, error_message = find_matching_tune(cur, session_id, tune_name)
     if tune_id and not error_message:
@@ -6906,35 +6884,53 @@ def match_tune_core(cur, session_id, tune_name, previous_tune_type=None, limit=5
             }],
         }
 
+    # Aliases replace the tune's name within the session.
+    column = "COALESCE(LOWER(unaccent(st.alias)), t.name_search)"
+    where_sql, where_params = tune_search.match_sql(tune_name, column, fuzzy=False)
+    results = _match_candidates(cur, session_id, previous_tune_type, column, where_sql, where_params, limit)
+    if results or not tune_search.fuzzy_applies(tune_name):
+        return {"matched": len(results) == 1, "exact_match": False, "results": results}
+
+    # Nothing contains the string: offer close spellings, closest first. A guess at
+    # a typo is a suggestion, never a match.
+    where_sql, where_params = tune_search.similar_sql(tune_name, column)
+    results = _match_candidates(
+        cur, session_id, previous_tune_type, column, where_sql, where_params, limit,
+        closest_first=tune_search.similarity_sql(tune_name, column),
+    )
+    return {"matched": False, "exact_match": False, "results": results}
+
+
+def _match_candidates(cur, session_id, previous_tune_type, column, where_sql, where_params, limit, closest_first=None):
+    """match_tune_core's wildcard query: candidates ranked by preferred type, this
+    session's play count, tunebook count, then name (after closeness, if given)."""
+    closeness, closeness_params = closest_first or ("", [])
+    if closeness:
+        closeness += " DESC,"
     cur.execute(
-        """
+        f"""
         SELECT t.tune_id, COALESCE(st.alias, t.name) AS display_name, t.tune_type,
                CASE WHEN t.tune_type = %s THEN 0 ELSE 1 END AS preferred_tune_type,
-               playcounts.plays, (st.session_id IS NOT NULL) AS in_session
+               playcounts.play_count, (st.session_id IS NOT NULL) AS in_session
         FROM tune t
         LEFT OUTER JOIN session_tune st ON t.tune_id = st.tune_id AND st.session_id = %s
-        LEFT OUTER JOIN (
-            SELECT sit.tune_id, COUNT(*) AS plays
-            FROM session_instance si
-            INNER JOIN session_instance_tune sit ON si.session_instance_id = sit.session_instance_id
-            WHERE si.session_id = %s
-            GROUP BY sit.tune_id
-        ) playcounts ON t.tune_id = playcounts.tune_id
-        WHERE LOWER(unaccent(COALESCE(st.alias, t.name))) LIKE %s
+        LEFT OUTER JOIN session_tune_play playcounts
+            ON playcounts.session_id = %s AND playcounts.tune_id = t.tune_id
+        WHERE {where_sql}
           AND t.redirect_to_tune_id IS NULL
-        ORDER BY preferred_tune_type ASC,
-                 playcounts.plays DESC NULLS LAST,
+        ORDER BY {closeness}
+                 preferred_tune_type ASC,
+                 playcounts.play_count DESC NULLS LAST,
                  t.tunebook_count_cached DESC NULLS LAST,
-                 LOWER(unaccent(COALESCE(st.alias, t.name))) ASC
+                 {column} ASC
         LIMIT %s
         """,
-        (previous_tune_type, session_id, session_id, f"%{tune_name.lower()}%", limit),
+        [previous_tune_type, session_id, session_id] + where_params + closeness_params + [limit],
     )
-    results = [
+    return [
         {"tune_id": m[0], "tune_name": m[1], "tune_type": m[2], "in_session_tune": bool(m[5])}
         for m in cur.fetchall()
     ]
-    return {"matched": len(results) == 1, "exact_match": False, "results": results}
 
 
 @api_login_required
@@ -7586,7 +7582,7 @@ def save_session_instance_tunes_ajax(session_path, date_or_id):
 
             # Cache settings for any newly inserted tunes (must happen after commit)
             for tune_id, api_data in new_tunes_to_cache:
-                cache_default_tune_setting(tune_id, api_data, get_current_user_id(), sync=True)
+                cache_default_tune_setting(tune_id, api_data, get_current_user_id(), sync=not job_queue.enabled())
 
             return jsonify(
                 {
@@ -7648,6 +7644,7 @@ def update_auto_save_preference():
         cur.close()
         conn.commit()
         conn.close()
+        user_cache.invalidate_user(current_user.user_id)  # don't wait for the NOTIFY
 
         return jsonify(
             {
@@ -8783,50 +8780,53 @@ def parse_csv_data(csv_data, session_city=None, session_state=None, session_coun
     Returns:
         List of person dictionaries with detected fields
     """
+    processed_people = list(iter_csv_people(csv_data, session_city, session_state, session_country))
+    if not processed_people:
+        raise ValueError("No valid person records found in CSV data")
+    
+    return processed_people
+
+
+def iter_csv_people(csv_data, session_city=None, session_state=None, session_country=None):
+    """
+    Yield person dictionaries from CSV data one row at a time (see parse_csv_data).
+
+    Raises ValueError for empty input or an unparseable row; rows before the bad
+    one have already been yielded.
+    """
     import csv
-    import io
-    import re
     
     if not csv_data or not csv_data.strip():
         raise ValueError("CSV data is empty")
     
-    lines = csv_data.strip().split('\n')
-    if not lines:
-        raise ValueError("CSV data is empty")
-    
-    reader = csv.reader(lines)
-    rows = list(reader)
-    
-    if not rows:
+    reader = csv.reader(csv_data.strip().split('\n'))
+    first_row = next(reader, None)
+    if not first_row:
         raise ValueError("CSV data is empty")
     
     # Detect if first row is header by checking for typical header words
     header_words = {'first', 'last', 'name', 'email', 'phone', 'sms', 'city', 'state', 'country', 'regular', 'instrument'}
-    first_row_lower = [col.lower().replace(' ', '').replace('_', '') for col in rows[0]]
+    first_row_lower = [col.lower().replace(' ', '').replace('_', '') for col in first_row]
     has_header = any(word in ' '.join(first_row_lower) for word in header_words)
     
-    processed_people = []
-    data_rows = rows[1:] if has_header else rows
-    headers = rows[0] if has_header else None
-    
-    if not data_rows:
-        raise ValueError("No data rows found after header")
+    headers = first_row if has_header else None
+    data_rows = reader if has_header else itertools.chain([first_row], reader)
     
+    seen_data_row = False
     for row_idx, row in enumerate(data_rows):
+        seen_data_row = True
         if not row or all(not cell.strip() for cell in row):
             continue  # Skip empty rows
         
         try:
             person = parse_csv_row(row, headers, session_city, session_state, session_country)
-            if person:
-                processed_people.append(person)
         except Exception as e:
             raise ValueError(f"Error parsing row {row_idx + (2 if has_header else 1)}: {str(e)}")
+        if person:
+            yield person
     
-    if not processed_people:
-        raise ValueError("No valid person records found in CSV data")
-    
-    return processed_people
+    if not seen_data_row:
+        raise ValueError("No data rows found after header")
 
 
 def parse_csv_row(row, headers, session_city=None, session_state=None, session_country=None):
@@ -8983,66 +8983,95 @@ def parse_instruments(value):
     return instruments
 
 
+# Rows per duplicate-detection round / NDJSON line in the streaming import preview.
+BULK_IMPORT_CHUNK_SIZE = 200
+
+
 def find_duplicate_person(person_data, session_id):
     """
     Find if person already exists based on email, phone, or name within session.
     
     Returns: (is_duplicate, existing_person_id, duplicate_reason)
     """
-    conn = get_db_connection()
-    cur = conn.cursor()
-    
     try:
-        # First check by email (exact match)
-        if person_data.get('email'):
-            cur.execute(
-                "SELECT person_id FROM person WHERE email = %s",
-                (person_data['email'],)
-            )
-            result = cur.fetchone()
-            if result:
-                cur.close()
-                conn.close()
-                return True, result[0], "email"
-        
-        # Then check by SMS number (exact match)
-        if person_data.get('sms_number'):
-            cur.execute(
-                "SELECT person_id FROM person WHERE sms_number = %s",
-                (person_data['sms_number'],)
-            )
-            result = cur.fetchone()
-            if result:
-                cur.close()
-                conn.close()
-                return True, result[0], "phone"
-        
-        # Finally check by name within this session
+        conn = get_db_connection()
+        try:
+            return find_duplicate_people(conn.cursor(), [person_data], session_id)[0]
+        finally:
+            conn.close()
+    except Exception:
+        return False, None, None
+
+
+def find_duplicate_people(cur, people, session_id):
+    """
+    Duplicate detection for many people at once, in three queries whatever the count.
+
+    Same rules as find_duplicate_person, in the same precedence: email (exact),
+    then SMS number (exact), then first + last name (case-insensitive) among this
+    session's people.
+
+    Returns: a list of (is_duplicate, existing_person_id, duplicate_reason), one per person
+    """
+    emails = sorted({p['email'] for p in people if p.get('email')})
+    phones = sorted({p['sms_number'] for p in people if p.get('sms_number')})
+
+    by_email = {}
+    if emails:
+        cur.execute(
+            "SELECT DISTINCT ON (email) email, person_id FROM person WHERE email = ANY(%s) ORDER BY email, person_id",
+            (emails,)
+        )
+        by_email = dict(cur.fetchall())
+
+    by_phone = {}
+    if phones:
         cur.execute(
             """
-            SELECT p.person_id 
-            FROM person p
-            JOIN session_person sp ON p.person_id = sp.person_id
-            WHERE sp.session_id = %s 
-            AND LOWER(p.first_name) = LOWER(%s) 
-            AND LOWER(p.last_name) = LOWER(%s)
+            SELECT DISTINCT ON (sms_number) sms_number, person_id
+            FROM person WHERE sms_number = ANY(%s) ORDER BY sms_number, person_id
             """,
-            (session_id, person_data['first_name'], person_data['last_name'])
+            (phones,)
         )
-        result = cur.fetchone()
-        if result:
-            cur.close()
-            conn.close()
-            return True, result[0], "name"
-        
-        cur.close()
-        conn.close()
-        return False, None, None
-        
-    except Exception:
-        cur.close()
-        conn.close()
-        return False, None, None
+        by_phone = dict(cur.fetchall())
+
+    # Names only matter for people not already matched by email or phone
+    unmatched = [p for p in people if p.get('email') not in by_email and p.get('sms_number') not in by_phone]
+    names = sorted({(p['first_name'], p['last_name']) for p in unmatched})
+    by_name = {}
+    if names:
+        cur.execute(
+            """
+            SELECT DISTINCT ON (q.first_name, q.last_name) q.first_name, q.last_name, p.person_id
+            FROM unnest(%s::text[], %s::text[]) AS q(first_name, last_name)
+            JOIN person p ON LOWER(p.first_name) = LOWER(q.first_name) AND LOWER(p.last_name) = LOWER(q.last_name)
+            JOIN session_person sp ON sp.person_id = p.person_id AND sp.session_id = %s
+            ORDER BY q.first_name, q.last_name, p.person_id
+            """,
+            ([n[0] for n in names], [n[1] for n in names], session_id)
+        )
+        by_name = {(first, last): person_id for first, last, person_id in cur.fetchall()}
+
+    results = []
+    for person in people:
+        if person.get('email') in by_email:
+            results.append((True, by_email[person['email']], "email"))
+        elif person.get('sms_number') in by_phone:
+            results.append((True, by_phone[person['sms_number']], "phone"))
+        elif (person['first_name'], person['last_name']) in by_name:
+            results.append((True, by_name[(person['first_name'], person['last_name'])], "name"))
+        else:
+            results.append((False, None, None))
+    return results
+
+
+def _mark_duplicates(cur, people, session_id):
+    """Set is_duplicate (and existing_person_id / duplicate_reason) on each person."""
+    for person, (is_duplicate, existing_id, reason) in zip(people, find_duplicate_people(cur, people, session_id)):
+        person['is_duplicate'] = is_duplicate
+        if is_duplicate:
+            person['existing_person_id'] = existing_id
+            person['duplicate_reason'] = reason
 
 
 @api_login_required  
@@ -9054,7 +9083,8 @@ def bulk_import_preprocess_session(session_id):
     
     Expected JSON payload:
     {
-        "csv_data": "CSV string with person data"
+        "csv_data": "CSV string with person data",
+        "stream": true (optional; NDJSON chunks for large files, see _stream_bulk_import_preview)
     }
     
     Returns processed people with duplicate detection.
@@ -9091,43 +9121,55 @@ def bulk_import_preprocess_session(session_id):
         session_city = session_result[2]
         session_state = session_result[3] 
         session_country = session_result[4]
-        
-        cur.close()
-        conn.close()
+        session_info = {
+            "session_id": session_id,
+            "name": session_result[1],
+            "city": session_city,
+            "state": session_state,
+            "country": session_country
+        }
         
         # Get CSV data from request
         data = request.get_json()
         if data is None:
+            cur.close()
+            conn.close()
             return jsonify({"success": False, "message": "No JSON data provided"}), 400
         
         csv_data = data.get('csv_data', '').strip()
         if not csv_data:
+            cur.close()
+            conn.close()
             return jsonify({"success": False, "message": "csv_data field is required"}), 400
         
+        if data.get('stream'):
+            # The body streams after this view returns, so the generator checks out
+            # its own connection; stream_with_context keeps the request (and its
+            # pooled connections) open until the last chunk is written.
+            cur.close()
+            conn.close()
+            return Response(
+                stream_with_context(_stream_bulk_import_preview(csv_data, session_id, session_info)),
+                mimetype='application/x-ndjson'
+            )
+        
         # Parse CSV data
         try:
             processed_people = parse_csv_data(csv_data, session_city, session_state, session_country)
         except ValueError as e:
+            cur.close()
+            conn.close()
             return jsonify({"success": False, "message": str(e)}), 400
         
-        # Check for duplicates
-        for person in processed_people:
-            is_duplicate, existing_id, reason = find_duplicate_person(person, session_id)
-            person['is_duplicate'] = is_duplicate
-            if is_duplicate:
-                person['existing_person_id'] = existing_id
-                person['duplicate_reason'] = reason
+        # Check for duplicates (set-based: three queries for the whole file)
+        _mark_duplicates(cur, processed_people, session_id)
+        cur.close()
+        conn.close()
         
         return jsonify({
             "success": True,
             "processed_people": processed_people,
-            "session_info": {
-                "session_id": session_id,
-                "name": session_result[1],
-                "city": session_city,
-                "state": session_state,
-                "country": session_country
-            }
+            "session_info": session_info
         })
         
     except Exception as e:
@@ -9136,6 +9178,41 @@ def bulk_import_preprocess_session(session_id):
         return jsonify({"success": False, "error": str(e)}), 500
 
 
+def _stream_bulk_import_preview(csv_data, session_id, session_info):
+    """
+    NDJSON preview for large files: a {"session_info"} line, then one
+    {"processed_people": [...]} line per BULK_IMPORT_CHUNK_SIZE rows (duplicates
+    resolved per chunk), then {"success": true, "count": n}, or
+    {"success": false, "message": ...} if a row can't be parsed.
+    """
+    import json
+    
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        yield json.dumps({"session_info": session_info}) + "\n"
+        people = iter_csv_people(csv_data, session_info["city"], session_info["state"], session_info["country"])
+        count = 0
+        try:
+            while True:
+                chunk = list(itertools.islice(people, BULK_IMPORT_CHUNK_SIZE))
+                if not chunk:
+                    break
+                _mark_duplicates(cur, chunk, session_id)
+                count += len(chunk)
+                yield json.dumps({"processed_people": chunk}) + "\n"
+        except ValueError as e:
+            yield json.dumps({"success": False, "message": str(e)}) + "\n"
+            return
+        if not count:
+            yield json.dumps({"success": False, "message": "No valid person records found in CSV data"}) + "\n"
+            return
+        yield json.dumps({"success": True, "count": count}) + "\n"
+    finally:
+        cur.close()
+        conn.close()
+
+
 @api_login_required
 def bulk_import_save_session(session_id):
     """
@@ -9197,83 +9274,26 @@ def bulk_import_save_session(session_id):
             conn.close()
             return jsonify({"success": False, "message": "processed_people must be an array"}), 400
         
-        created_count = 0
-        skipped_count = 0
-        created_people = []
+        new_people = [p for p in processed_people if not p.get('is_duplicate', False)]
+        skipped_count = len(processed_people) - len(new_people)
         
         # Begin transaction
         cur.execute("BEGIN")
         
         try:
-            for person_data in processed_people:
-                # Skip duplicates
-                if person_data.get('is_duplicate', False):
-                    skipped_count += 1
-                    continue
-
-                # Create person record
-                cur.execute(
-                    """
-                    INSERT INTO person (first_name, last_name, email, sms_number, city, state, country, created_date, created_by_user_id)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, (NOW() AT TIME ZONE 'UTC'), %s)
-                    RETURNING person_id
-                    """,
-                    (
-                        person_data.get('first_name', '').strip(),
-                        person_data.get('last_name', '').strip(),
-                        person_data.get('email'),
-                        person_data.get('sms_number'),
-                        person_data.get('city'),
-                        person_data.get('state'),
-                        person_data.get('country'),
-                        current_user.user_id
-                    )
-                )
-
-                person_id = cur.fetchone()[0]
-
-                # Log person creation
-                save_to_history(cur, 'person', 'INSERT', person_id, user_id=current_user.user_id)
-
-                # Create instruments
-                instruments = person_data.get('instruments', [])
-                for instrument in instruments:
-                    if instrument and instrument.strip():
-                        cur.execute(
-                            """
-                            INSERT INTO person_instrument (person_id, instrument, created_date, created_by_user_id)
-                            VALUES (%s, %s, (NOW() AT TIME ZONE 'UTC'), %s)
-                            """,
-                            (person_id, instrument.strip().lower(), current_user.user_id)
-                        )
-
-                        # Log instrument creation
-                        save_to_history(cur, 'person_instrument', 'INSERT',
-                                      (person_id, instrument.strip().lower()), user_id=current_user.user_id)
-
-                # Create session_person record
-                is_regular = person_data.get('is_regular', False)
-                cur.execute(
-                    """
-                    INSERT INTO session_person (session_id, person_id, is_regular, created_date, created_by_user_id)
-                    VALUES (%s, %s, %s, (NOW() AT TIME ZONE 'UTC'), %s)
-                    """,
-                    (session_id, person_id, is_regular, current_user.user_id)
-                )
-
-                # Log session_person creation
-                save_to_history(cur, 'session_person', 'INSERT',
-                              (session_id, person_id), user_id=current_user.user_id)
-                
-                created_count += 1
-                created_people.append({
+            person_ids = insert_people_batch(cur, new_people, session_id, current_user.user_id)
+            created_count = len(person_ids)
+            created_people = [
+                {
                     "person_id": person_id,
                     "first_name": person_data.get('first_name', ''),
                     "last_name": person_data.get('last_name', ''),
                     "email": person_data.get('email'),
-                    "instruments": instruments,
-                    "is_regular": is_regular
-                })
+                    "instruments": person_data.get('instruments', []),
+                    "is_regular": person_data.get('is_regular', False)
+                }
+                for person_id, person_data in zip(person_ids, new_people)
+            ]
             
             # Commit transaction
             cur.execute("COMMIT")
@@ -9301,17 +9321,103 @@ def bulk_import_save_session(session_id):
         return jsonify({"success": False, "error": str(e)}), 500
 
 
+def insert_people_batch(cur, people, session_id, user_id):
+    """
+    Create people, their instruments and their session_person rows in a few
+    statements, in the caller's transaction, with history rows as save_to_history
+    would write them.
+
+    Person ids are drawn from the sequence up front, so each id is known to
+    belong to its input row (INSERT ... RETURNING order isn't guaranteed).
+
+    Returns: the new person_ids, in input order
+    """
+    if not people:
+        return []
+    cur.execute(
+        "SELECT nextval(pg_get_serial_sequence('person', 'person_id')) FROM generate_series(1, %s)",
+        (len(people),)
+    )
+    person_ids = [row[0] for row in cur.fetchall()]
+
+    psycopg2.extras.execute_values(
+        cur,
+        """
+        INSERT INTO person (person_id, first_name, last_name, email, sms_number, city, state, country,
+                            created_date, created_by_user_id)
+        VALUES %s
+        """,
+        [
+            (
+                person_id,
+                person_data.get('first_name', '').strip(),
+                person_data.get('last_name', '').strip(),
+                person_data.get('email'),
+                person_data.get('sms_number'),
+                person_data.get('city'),
+                person_data.get('state'),
+                person_data.get('country'),
+                user_id,
+            )
+            for person_id, person_data in zip(person_ids, people)
+        ],
+        template="(%s, %s, %s, %s, %s, %s, %s, %s, (NOW() AT TIME ZONE 'UTC'), %s)",
+        page_size=500,
+    )
+    save_many_to_history(cur, 'person', 'INSERT', person_ids, user_id=user_id)
+
+    instruments = []
+    for person_id, person_data in zip(person_ids, people):
+        for instrument in dict.fromkeys(i.strip().lower() for i in person_data.get('instruments', []) if i and i.strip()):
+            instruments.append((person_id, instrument))
+    if instruments:
+        psycopg2.extras.execute_values(
+            cur,
+            "INSERT INTO person_instrument (person_id, instrument, created_date, created_by_user_id) VALUES %s",
+            [(person_id, instrument, user_id) for person_id, instrument in instruments],
+            template="(%s, %s, (NOW() AT TIME ZONE 'UTC'), %s)",
+            page_size=500,
+        )
+        save_many_to_history(cur, 'person_instrument', 'INSERT', instruments, user_id=user_id)
+
+    psycopg2.extras.execute_values(
+        cur,
+        "INSERT INTO session_person (session_id, person_id, is_regular, created_date, created_by_user_id) VALUES %s",
+        [
+            (session_id, person_id, person_data.get('is_regular', False), user_id)
+            for person_id, person_data in zip(person_ids, people)
+        ],
+        template="(%s, %s, %s, (NOW() AT TIME ZONE 'UTC'), %s)",
+        page_size=500,
+    )
+    return person_ids
+
+
+# Longest ?upcoming_days window get_sessions_with_today_status will expand
+SESSIONS_UPCOMING_MAX_DAYS = 31
+
+
 def get_sessions_with_today_status():
     """
     Get all sessions with indicators for today's status:
     - has_instance_today: Boolean indicating if an instance exists for today
     - instance_id_today: The session_instance_id if one exists for today
     - recurrence: The recurrence pattern for client-side parsing
+    - upcoming: With ?upcoming_days=N (1-31), the session's scheduled occurrences
+      from its local today through the next N-1 days
 
     NOTE: "Today" is determined based on each session's timezone, not server time.
     """
     try:
         from timezone_utils import get_today_in_timezone
+        from recurrence_utils import expand_occurrences
+
+        upcoming_days = request.args.get('upcoming_days', type=int)
+        if upcoming_days is not None and not 1 <= upcoming_days <= SESSIONS_UPCOMING_MAX_DAYS:
+            return jsonify({
+                'success': False,
+                'error': f'upcoming_days must be between 1 and {SESSIONS_UPCOMING_MAX_DAYS}'
+            }), 400
 
         conn = get_db_connection()
         cur = conn.cursor()
@@ -9372,6 +9478,13 @@ def get_sessions_with_today_status():
                 'location_override': active_row[5]
             })
 
+        # Expand every session's recurrence in one pass (patterns are shared)
+        upcoming_by_session = {}
+        if upcoming_days:
+            upcoming_by_session = expand_occurrences(
+                ((row[0], row[7], row[8]) for row in session_rows), upcoming_days
+            )
+
         # Now build the sessions list
         sessions = []
         for row in session_rows:
@@ -9393,6 +9506,15 @@ def get_sessions_with_today_status():
                 'location_name': row[10],
                 'active_instances': active_instances
             })
+            if upcoming_days:
+                sessions[-1]['upcoming'] = [
+                    {
+                        'date': start.date().isoformat(),
+                        'start_time': start.time().isoformat(),
+                        'end_time': end.time().isoformat()
+                    }
+                    for start, end in upcoming_by_session.get(session_id, [])
+                ]
 
         cur.close()
         conn.close()
@@ -9540,6 +9662,8 @@ def generate_qr_code(session_id=None):
                 qr_url = f"{base_url}/register"
 
         # Generate QR code
+        import qrcode  # deferred: only this endpoint needs it
+
         qr = qrcode.QRCode(
             version=1,  # Size of QR code (1 is smallest, auto-sizes if data too large)
             error_correction=qrcode.constants.ERROR_CORRECT_L,
@@ -9631,12 +9755,57 @@ def get_person_active_session(person_id):
         return jsonify({"success": False, "error": str(e)}), 500
 
 
+# Keyset pagination for the admin tunes list. Each sort column has a
+# (column, tune_id) index (schema/031_tune_usage_counts.sql).
+ADMIN_TUNES_PAGE_SIZE = 100
+ADMIN_TUNES_MAX_PAGE_SIZE = 500
+ADMIN_TUNE_SORTS = {
+    "name": "t.name_search",
+    "sessions": "t.session_count_cached",
+    "tunelists": "t.tunelist_count_cached",
+    "popularity": "COALESCE(t.tunebook_count_cached, 0)",
+}
+
+_THESESSION_TUNE_URL = re.compile(r"thesession\.org/tunes/(\d+)", re.IGNORECASE)
+
+
+def _admin_tunes_cursor(sort_value, tune_id):
+    """Opaque cursor for the row after which the next page starts."""
+    return base64.urlsafe_b64encode(json.dumps([sort_value, tune_id]).encode()).decode()
+
+
+def _parse_admin_tunes_cursor(cursor, sort):
+    """(sort_value, tune_id) from a cursor; ValueError if it is malformed."""
+    try:
+        sort_value, tune_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    expected = str if sort == "name" else int
+    if not isinstance(sort_value, expected) or not isinstance(tune_id, int):
+        raise ValueError("Invalid cursor")
+    return sort_value, tune_id
+
+
+def _tune_id_in_query(q):
+    """A tune id typed or pasted (as a thesession.org URL) into the search box."""
+    if q.isdigit():
+        return int(q)
+    match = _THESESSION_TUNE_URL.search(q)
+    return int(match.group(1)) if match else None
+
+
 @api_login_required
 def get_admin_tunes():
     """
-    Get all tunes with counts for admin dashboard.
+    Get a page of tunes with counts for the admin dashboard.
 
-    GET /api/admin/tunes
+    GET /api/admin/tunes?q=&type=&sort=name&dir=asc&limit=100&cursor=
+
+    Optional q filters by name (accent-insensitive substring, via tune_search),
+    or by tune id when it is a number or a thesession.org tune URL. type filters
+    by tune_type. sort is one of name, sessions, tunelists, popularity; dir is
+    asc or desc. Pages are keyset-paginated: pass back next_cursor to continue.
+    total (matching tunes) is only computed for the first page.
 
     Returns:
     {
@@ -9651,45 +9820,72 @@ def get_admin_tunes():
                 "tunebook_count_cached": int
             },
             ...
-        ]
+        ],
+        "next_cursor": string or null,
+        "total": int (first page only),
+        "tune_types": [string, ...]
     }
     """
     # Check if user is system admin
     if not current_user.is_system_admin:
         return jsonify({"success": False, "error": "Unauthorized"}), 403
 
+    q = (request.args.get("q") or "").strip()
+    tune_type = (request.args.get("type") or "").strip()
+    sort = request.args.get("sort", "name")
+    direction = request.args.get("dir", "asc")
+    cursor = request.args.get("cursor")
+    if sort not in ADMIN_TUNE_SORTS or direction not in ("asc", "desc"):
+        return jsonify({"success": False, "error": "Invalid sort"}), 400
+    try:
+        limit = min(ADMIN_TUNES_MAX_PAGE_SIZE, max(1, int(request.args.get("limit", ADMIN_TUNES_PAGE_SIZE))))
+        after = _parse_admin_tunes_cursor(cursor, sort) if cursor else None
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    conditions, params = [], []
+    if q:
+        name_sql, name_params = tune_search.match_sql(q, fuzzy=False)
+        tune_id = _tune_id_in_query(q)
+        if tune_id is not None:
+            name_sql = f"({name_sql} OR t.tune_id = %s)"
+            name_params = name_params + [tune_id]
+        conditions.append(name_sql)
+        params += name_params
+    if tune_type:
+        conditions.append("t.tune_type = %s")
+        params.append(tune_type)
+    filter_sql = " AND ".join(conditions) or "TRUE"
+
+    sort_sql = ADMIN_TUNE_SORTS[sort]
+    page_sql, page_params = filter_sql, list(params)
+    if after:
+        page_sql += f" AND ({sort_sql}, t.tune_id) {'>' if direction == 'asc' else '<'} (%s, %s)"
+        page_params += list(after)
+
     conn = get_db_connection()
     try:
         cur = conn.cursor()
 
-        # Get all tunes with counts
-        cur.execute("""
+        cur.execute(f"""
             SELECT
                 t.tune_id,
                 t.name,
                 t.tune_type,
-                COALESCE(session_counts.session_count, 0) as session_count,
-                COALESCE(tunelist_counts.tunelist_count, 0) as tunelist_count,
+                t.session_count_cached,
+                t.tunelist_count_cached,
                 t.tunebook_count_cached,
-                t.redirect_to_tune_id
+                t.redirect_to_tune_id,
+                {sort_sql}
             FROM tune t
-            LEFT JOIN (
-                -- Count distinct sessions where tune has been played
-                SELECT DISTINCT st.tune_id, COUNT(DISTINCT st.session_id) as session_count
-                FROM session_tune st
-                GROUP BY st.tune_id
-            ) session_counts ON t.tune_id = session_counts.tune_id
-            LEFT JOIN (
-                -- Count person tune lists containing this tune
-                SELECT tune_id, COUNT(DISTINCT person_id) as tunelist_count
-                FROM person_tune
-                GROUP BY tune_id
-            ) tunelist_counts ON t.tune_id = tunelist_counts.tune_id
-            ORDER BY t.name
-        """)
+            WHERE {page_sql}
+            ORDER BY {sort_sql} {direction}, t.tune_id {direction}
+            LIMIT %s
+        """, page_params + [limit + 1])
+        rows = cur.fetchall()
 
         tunes = []
-        for row in cur.fetchall():
+        for row in rows[:limit]:
             tunes.append({
                 "tune_id": row[0],
                 "name": row[1],
@@ -9700,10 +9896,16 @@ def get_admin_tunes():
                 "redirect_to_tune_id": row[6]
             })
 
-        return jsonify({
+        result = {
             "success": True,
-            "tunes": tunes
-        })
+            "tunes": tunes,
+            "next_cursor": _admin_tunes_cursor(rows[limit - 1][7], rows[limit - 1][0]) if len(rows) > limit else None,
+            "tune_types": sorted(TUNE_TYPE_BEATS),
+        }
+        if not after:
+            cur.execute(f"SELECT COUNT(*) FROM tune t WHERE {filter_sql}", params)
+            result["total"] = cur.fetchone()[0]
+        return jsonify(result)
 
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
@@ -10459,19 +10661,20 @@ def get_session_instance_tune_detail(session_path, date_or_id, tune_id):
         # Prefer setting_override if available, otherwise use session_setting_id, or fall back to first setting
         abc_notation = None
         incipit_abc = None
-        abc_image = None
-        incipit_image = None
+        image_hash = None
+        incipit_image_hash = None
+        notation_setting_id = None
         setting_key = None
         effective_setting_id = setting_override if setting_override else session_setting_id
         if effective_setting_id:
             cur.execute(
-                "SELECT abc, incipit_abc, image, incipit_image, key FROM tune_setting WHERE setting_id = %s",
+                "SELECT abc, incipit_abc, image_hash, incipit_image_hash, key, setting_id FROM tune_setting WHERE setting_id = %s",
                 (effective_setting_id,)
             )
         else:
             # Fall back to the first setting for this tune (ordered by setting_id)
             cur.execute(
-                """SELECT abc, incipit_abc, image, incipit_image, key
+                """SELECT abc, incipit_abc, image_hash, incipit_image_hash, key, setting_id
                    FROM tune_setting
                    WHERE tune_id = %s
                    ORDER BY setting_id ASC
@@ -10482,9 +10685,10 @@ def get_session_instance_tune_detail(session_path, date_or_id, tune_id):
         if abc_result:
             abc_notation = abc_result[0]
             incipit_abc = abc_result[1]
-            abc_image = abc_result[2]
-            incipit_image = abc_result[3]
+            image_hash = abc_result[2]
+            incipit_image_hash = abc_result[3]
             setting_key = abc_result[4]
+            notation_setting_id = abc_result[5]
 
         # Get play count for this session (all instances)
         cur.execute(
@@ -10597,8 +10801,8 @@ def get_session_instance_tune_detail(session_path, date_or_id, tune_id):
                     # ABC notation
                     "abc": abc_notation,
                     "incipit_abc": incipit_abc,
-                    "image": bytea_to_base64(abc_image),
-                    "incipit_image": bytea_to_base64(incipit_image),
+                    "image_url": image_url(notation_setting_id, "full", image_hash),
+                    "incipit_image_url": image_url(notation_setting_id, "incipit", incipit_image_hash),
                     # Stats
                     "tunebook_count": tunebook_count,
                     "tunebook_count_cached_date": (
@@ -10939,13 +11143,13 @@ def get_admin_tune_detail(tune_id):
         # Get ABC notation from the first setting (ordered by setting_id ASC)
         abc_notation = None
         incipit_abc = None
-        abc_image = None
-        incipit_image = None
+        image_hash = None
+        incipit_image_hash = None
         first_setting_id = None
         setting_key = None
         cur.execute(
             """
-            SELECT setting_id, abc, incipit_abc, image, incipit_image, key
+            SELECT setting_id, abc, incipit_abc, image_hash, incipit_image_hash, key
             FROM tune_setting
             WHERE tune_id = %s
             ORDER BY setting_id ASC
@@ -10958,8 +11162,8 @@ def get_admin_tune_detail(tune_id):
             first_setting_id = setting_result[0]
             abc_notation = setting_result[1]
             incipit_abc = setting_result[2]
-            abc_image = setting_result[3]
-            incipit_image = setting_result[4]
+            image_hash = setting_result[3]
+            incipit_image_hash = setting_result[4]
             setting_key = setting_result[5]
 
         # Get count of distinct sessions playing this tune
@@ -11052,8 +11256,8 @@ def get_admin_tune_detail(tune_id):
                     "setting_key": setting_key,
                     "abc": abc_notation,
                     "incipit_abc": incipit_abc,
-                    "image": bytea_to_base64(abc_image),
-                    "incipit_image": bytea_to_base64(incipit_image),
+                    "image_url": image_url(first_setting_id, "full", image_hash),
+                    "incipit_image_url": image_url(first_setting_id, "incipit", incipit_image_hash),
                     "tunebook_count": tunebook_count,
                     "tunebook_count_cached": tunebook_count,
                     "tunebook_count_cached_date": (
@@ -11422,7 +11626,7 @@ def get_session_tunes_remaining(session_path):
         session_id = session_result[0]
 
         # Get remaining session tunes (skip first 20)
-        # Optimized: Use subquery to calculate play counts more efficiently
+        # Play counts come from the maintained session_tune_play table
         cur.execute(
             """
             SELECT
@@ -11434,13 +11638,8 @@ def get_session_tunes_remaining(session_path):
                 st.setting_id
             FROM session_tune st
             LEFT JOIN tune t ON st.tune_id = t.tune_id
-            LEFT JOIN (
-                SELECT sit.tune_id, COUNT(*) as play_count
-                FROM session_instance_tune sit
-                JOIN session_instance si ON sit.session_instance_id = si.session_instance_id
-                WHERE si.session_id = %s
-                GROUP BY sit.tune_id
-            ) play_counts ON st.tune_id = play_counts.tune_id
+            LEFT JOIN session_tune_play play_counts
+                ON play_counts.session_id = %s AND play_counts.tune_id = st.tune_id
             WHERE st.session_id = %s
             ORDER BY play_count DESC, tunebook_count DESC, tune_name ASC
             OFFSET 20
@@ -2,34 +2,74 @@ from flask import Flask, render_template, request, session, send_from_directory,
 from flask_login import LoginManager
 from werkzeug.routing import BaseConverter
 import os
+import sys
 import random
+import importlib
 import logging
 from datetime import timedelta
 from dotenv import load_dotenv
 
 # Import our custom modules
 from auth import User, SESSION_LIFETIME_WEEKS
-from api_routes import *
-from web_routes import *
-from api_person_tune_routes import (
-    get_my_tunes,
-    get_person_tune_detail,
-    add_my_tune,
-    update_person_tune,
-    delete_person_tune,
-    increment_tune_heard_count,
-    decrement_tune_heard_count,
-    sync_my_tunes,
-    search_tunes,
-    update_my_profile,
-    get_common_tunes
-)
-from live_logging_routes import live_bootstrap, live_op, live_issue_token, live_tune_detail, live_people, live_people_search, live_deep_search, live_incipit, live_match
+from db_pool import release_request_connections
+import user_cache
+import metrics
 from timezone_utils import format_datetime_with_timezone, utc_to_local
 from flask_login import current_user
 
 load_dotenv()
 
+
+# Route modules are imported on first dispatch, not at startup: a cold start
+# (Render's free plan spins the service down when idle) otherwise pays for
+# api_routes' 12k lines and everything it pulls in before serving anything.
+# scripts/check_import_time.py keeps `import app` within its budget.
+class LazyView:
+    """A view function, looked up in its module when first called."""
+
+    def __init__(self, module_name, name):
+        self.module_name = module_name
+        self.__name__ = name
+
+    def __call__(self, *args, **kwargs):
+        # Looked up every call (sys.modules makes that cheap) so patched views apply
+        return getattr(importlib.import_module(self.module_name), self.__name__)(*args, **kwargs)
+
+    def __repr__(self):
+        return f"<LazyView {self.module_name}.{self.__name__}>"
+
+
+class LazyRoutes:
+    """`LazyRoutes("api_routes").get_tune_incipit` -> a LazyView for that function."""
+
+    def __init__(self, module_name):
+        self.module_name = module_name
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return LazyView(self.module_name, name)
+
+
+api = LazyRoutes("api_routes")
+web = LazyRoutes("web_routes")
+person_tunes = LazyRoutes("api_person_tune_routes")
+live = LazyRoutes("live_logging_routes")
+notation_images = LazyRoutes("notation_images")
+
+ROUTE_MODULES = ("api_routes", "web_routes", "api_person_tune_routes", "live_logging_routes", "notation_images")
+
+
+def import_route_modules():
+    """Import every route module now (e.g. in a preloading server's master, so
+    forked workers start warm). Names that don't resolve fail here, not mid-request."""
+    for module_name in ROUTE_MODULES:
+        importlib.import_module(module_name)
+    for view_func in app.view_functions.values():
+        if isinstance(view_func, LazyView):
+            getattr(sys.modules[view_func.module_name], view_func.__name__)
+
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -96,7 +136,16 @@ login_manager.login_message = "Please log in to access this page."
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.get_by_id(int(user_id))
+    # Per-process, NOTIFY-invalidated cache: most requests skip the user join
+    return user_cache.get_user(int(user_id), User.get_by_id)
+
+
+# Give back any pooled DB connections this request checked out (DB_POOL_ENABLED);
+# load_user, the handler and its helpers share one checkout for the whole request.
+app.teardown_request(release_request_connections)
+
+# Per-route latency and per-request query counts, served at /metrics
+metrics.init_app(app)
 
 # Before request handler to capture referrer parameter
 @app.before_request
@@ -196,97 +245,97 @@ def instance_url_id(instance):
         return str(date)
 
 # Register web page routes
-app.add_url_rule("/", "home", home)
-app.add_url_rule("/magic", "magic", magic)
-app.add_url_rule("/db-test", "db_test", db_test)
-app.add_url_rule("/sessions", "sessions", sessions)
-app.add_url_rule("/sessions/<path:session_path>/tunes", "session_tunes", session_tunes)
+app.add_url_rule("/", "home", web.home)
+app.add_url_rule("/magic", "magic", web.magic)
+app.add_url_rule("/db-test", "db_test", web.db_test)
+app.add_url_rule("/sessions", "sessions", web.sessions)
+app.add_url_rule("/sessions/<path:session_path>/tunes", "session_tunes", web.session_tunes)
 app.add_url_rule(
     "/sessions/<path:session_path>/tunes/<int:tune_id>",
     "session_tune_info",
-    session_tune_info,
-)
-app.add_url_rule("/sessions/<path:session_path>/people", "session_people", session_people)
-app.add_url_rule("/sessions/<path:session_path>/people/<int:person_id>", "session_person_detail", session_person_detail)
-app.add_url_rule("/sessions/<path:session_path>/logs", "session_logs", session_logs)
-app.add_url_rule("/sessions/<path:full_path>", "session_handler", session_handler)
-app.add_url_rule("/sessions/<path:full_path>/players", "session_instance_players", session_instance_players)
-app.add_url_rule("/add-session", "add_session", add_session)
-app.add_url_rule("/help", "help_page", help_page)
-app.add_url_rule("/help/sessions", "help_sessions", help_sessions)
-app.add_url_rule("/help/my-tunes", "help_my_tunes", help_my_tunes)
-app.add_url_rule("/help/session-tracking/tunes", "help_session_tunes", help_session_tunes)
-app.add_url_rule("/help/session-tracking/logs", "help_session_logs", help_session_logs)
-app.add_url_rule("/help/session-tracking/members", "help_session_members", help_session_members)
-app.add_url_rule("/help/release-notes/<month>", "help_release_notes", help_release_notes)
-app.add_url_rule("/share", "share_page", share_page)
-app.add_url_rule("/register", "register", register, methods=["GET", "POST"])
-app.add_url_rule("/login", "login", login, methods=["GET", "POST"])
-app.add_url_rule("/logout", "logout", logout)
-app.add_url_rule("/api/auth/check-email", "check_email_api", check_email_api, methods=["POST"])
-app.add_url_rule("/api/auth/login-password", "login_password_api", login_password_api, methods=["POST"])
-app.add_url_rule("/auth/login/<token>", "login_with_token", login_with_token)
-app.add_url_rule("/auth/set-password", "set_password_optional", set_password_optional, methods=["GET", "POST"])
-app.add_url_rule("/auth/setup-profile", "setup_profile", setup_profile, methods=["GET", "POST"])
-app.add_url_rule(
-    "/forgot-password", "forgot_password", forgot_password, methods=["GET", "POST"]
-)
-app.add_url_rule(
-    "/reset-password/<token>", "reset_password", reset_password, methods=["GET", "POST"]
-)
-app.add_url_rule(
-    "/change-password", "change_password", change_password, methods=["GET", "POST"]
-)
-app.add_url_rule("/me", "user_profile", person_details)
-app.add_url_rule("/my-tunes", "my_tunes", my_tunes)
-app.add_url_rule("/my-tunes/add", "add_my_tune_page", add_my_tune_page)
-app.add_url_rule("/my-tunes/sync", "sync_my_tunes_page", sync_my_tunes_page)
-app.add_url_rule("/me/and/<int:person_id>", "common_tunes", common_tunes)
+    web.session_tune_info,
+)
+app.add_url_rule("/sessions/<path:session_path>/people", "session_people", web.session_people)
+app.add_url_rule("/sessions/<path:session_path>/people/<int:person_id>", "session_person_detail", web.session_person_detail)
+app.add_url_rule("/sessions/<path:session_path>/logs", "session_logs", web.session_logs)
+app.add_url_rule("/sessions/<path:full_path>", "session_handler", web.session_handler)
+app.add_url_rule("/sessions/<path:full_path>/players", "session_instance_players", web.session_instance_players)
+app.add_url_rule("/add-session", "add_session", web.add_session)
+app.add_url_rule("/help", "help_page", web.help_page)
+app.add_url_rule("/help/sessions", "help_sessions", web.help_sessions)
+app.add_url_rule("/help/my-tunes", "help_my_tunes", web.help_my_tunes)
+app.add_url_rule("/help/session-tracking/tunes", "help_session_tunes", web.help_session_tunes)
+app.add_url_rule("/help/session-tracking/logs", "help_session_logs", web.help_session_logs)
+app.add_url_rule("/help/session-tracking/members", "help_session_members", web.help_session_members)
+app.add_url_rule("/help/release-notes/<month>", "help_release_notes", web.help_release_notes)
+app.add_url_rule("/share", "share_page", web.share_page)
+app.add_url_rule("/register", "register", web.register, methods=["GET", "POST"])
+app.add_url_rule("/login", "login", web.login, methods=["GET", "POST"])
+app.add_url_rule("/logout", "logout", web.logout)
+app.add_url_rule("/api/auth/check-email", "check_email_api", web.check_email_api, methods=["POST"])
+app.add_url_rule("/api/auth/login-password", "login_password_api", web.login_password_api, methods=["POST"])
+app.add_url_rule("/auth/login/<token>", "login_with_token", web.login_with_token)
+app.add_url_rule("/auth/set-password", "set_password_optional", web.set_password_optional, methods=["GET", "POST"])
+app.add_url_rule("/auth/setup-profile", "setup_profile", web.setup_profile, methods=["GET", "POST"])
+app.add_url_rule(
+    "/forgot-password", "forgot_password", web.forgot_password, methods=["GET", "POST"]
+)
+app.add_url_rule(
+    "/reset-password/<token>", "reset_password", web.reset_password, methods=["GET", "POST"]
+)
+app.add_url_rule(
+    "/change-password", "change_password", web.change_password, methods=["GET", "POST"]
+)
+app.add_url_rule("/me", "user_profile", web.person_details)
+app.add_url_rule("/my-tunes", "my_tunes", web.my_tunes)
+app.add_url_rule("/my-tunes/add", "add_my_tune_page", web.add_my_tune_page)
+app.add_url_rule("/my-tunes/sync", "sync_my_tunes_page", web.sync_my_tunes_page)
+app.add_url_rule("/me/and/<int:person_id>", "common_tunes", web.common_tunes)
 app.add_url_rule(
     "/sessions/<path:session_path>/tunes/add",
     "add_session_tune_page",
-    add_session_tune_page,
+    web.add_session_tune_page,
 )
-app.add_url_rule("/verify-email/<token>", "verify_email", verify_email)
+app.add_url_rule("/verify-email/<token>", "verify_email", web.verify_email)
 app.add_url_rule(
     "/resend-verification",
     "resend_verification",
-    resend_verification,
+    web.resend_verification,
     methods=["GET", "POST"],
 )
-app.add_url_rule("/admin", "admin", admin)
-app.add_url_rule("/admin/sessions", "admin_sessions_list", admin_sessions_list)
-app.add_url_rule("/admin/login-sessions", "admin_login_sessions", admin_login_sessions)
-app.add_url_rule("/admin/login-history", "admin_login_history", admin_login_history)
-app.add_url_rule("/admin/activity", "admin_activity", admin_activity)
-app.add_url_rule("/admin/people", "admin_people", admin_people)
-app.add_url_rule("/admin/tunes", "admin_tunes", admin_tunes)
-app.add_url_rule("/admin/tunes/merge", "admin_tune_merge", admin_tune_merge)
-app.add_url_rule("/admin/tunes/<int:tune_id>", "admin_tune_detail", admin_tune_detail)
-app.add_url_rule("/admin/test-links", "admin_test_links", admin_test_links)
-app.add_url_rule("/admin/cache-settings", "admin_cache_settings", admin_cache_settings)
-app.add_url_rule("/admin/people/<int:person_id>", "person_details", person_details)
-app.add_url_rule("/admin/sessions/<path:session_path>", "session_admin", session_admin)
+app.add_url_rule("/admin", "admin", web.admin)
+app.add_url_rule("/admin/sessions", "admin_sessions_list", web.admin_sessions_list)
+app.add_url_rule("/admin/login-sessions", "admin_login_sessions", web.admin_login_sessions)
+app.add_url_rule("/admin/login-history", "admin_login_history", web.admin_login_history)
+app.add_url_rule("/admin/activity", "admin_activity", web.admin_activity)
+app.add_url_rule("/admin/people", "admin_people", web.admin_people)
+app.add_url_rule("/admin/tunes", "admin_tunes", web.admin_tunes)
+app.add_url_rule("/admin/tunes/merge", "admin_tune_merge", web.admin_tune_merge)
+app.add_url_rule("/admin/tunes/<int:tune_id>", "admin_tune_detail", web.admin_tune_detail)
+app.add_url_rule("/admin/test-links", "admin_test_links", web.admin_test_links)
+app.add_url_rule("/admin/cache-settings", "admin_cache_settings", web.admin_cache_settings)
+app.add_url_rule("/admin/people/<int:person_id>", "person_details", web.person_details)
+app.add_url_rule("/admin/sessions/<path:session_path>", "session_admin", web.session_admin)
 app.add_url_rule(
     "/admin/sessions/<path:session_path>/people",
     "session_admin_players",
-    session_admin_players,
+    web.session_admin_players,
 )
 app.add_url_rule(
     "/admin/sessions/<path:session_path>/people/<int:person_id>",
     "session_admin_person",
-    session_admin_person,
+    web.session_admin_person,
 )
 app.add_url_rule(
-    "/admin/sessions/<path:session_path>/tunes", "session_admin_tunes", session_admin_tunes
+    "/admin/sessions/<path:session_path>/tunes", "session_admin_tunes", web.session_admin_tunes
 )
 app.add_url_rule(
-    "/admin/sessions/<path:session_path>/logs", "session_admin_logs", session_admin_logs
+    "/admin/sessions/<path:session_path>/logs", "session_admin_logs", web.session_admin_logs
 )
 app.add_url_rule(
     "/admin/sessions/<path:session_path>/bulk-import",
     "session_admin_bulk_import",
-    session_admin_bulk_import,
+    web.session_admin_bulk_import,
 )
 
 # Register API routes
@@ -294,61 +343,67 @@ app.add_url_rule(
 app.add_url_rule(
     "/api/live/instances/<int:session_instance_id>/bootstrap",
     "live_bootstrap",
-    live_bootstrap,
+    live.live_bootstrap,
     methods=["GET"],
 )
 app.add_url_rule(
     "/api/live/instances/<int:session_instance_id>/ops",
     "live_op",
-    live_op,
+    live.live_op,
+    methods=["POST"],
+)
+app.add_url_rule(
+    "/api/live/instances/<int:session_instance_id>/ops/batch",
+    "live_op_batch",
+    live.live_op_batch,
     methods=["POST"],
 )
 app.add_url_rule(
     "/api/live/token",
     "live_issue_token",
-    live_issue_token,
+    live.live_issue_token,
     methods=["POST"],
 )
 app.add_url_rule(
     "/api/live/instances/<int:session_instance_id>/tune/<int:tune_id>",
     "live_tune_detail",
-    live_tune_detail,
+    live.live_tune_detail,
     methods=["GET"],
 )
 app.add_url_rule(
     "/api/live/instances/<int:session_instance_id>/people",
     "live_people",
-    live_people,
+    live.live_people,
     methods=["GET"],
 )
 app.add_url_rule(
     "/api/live/instances/<int:session_instance_id>/people/search",
     "live_people_search",
-    live_people_search,
+    live.live_people_search,
     methods=["GET"],
 )
 app.add_url_rule(
     "/api/live/instances/<int:session_instance_id>/deep-search",
     "live_deep_search",
-    live_deep_search,
+    live.live_deep_search,
     methods=["GET"],
 )
 app.add_url_rule(
     "/api/live/instances/<int:session_instance_id>/incipit/<int:tune_id>",
     "live_incipit",
-    live_incipit,
+    live.live_incipit,
     methods=["GET"],
 )
 app.add_url_rule(
     "/api/live/instances/<int:session_instance_id>/match",
     "live_match",
-    live_match,
+    live.live_match,
     methods=["GET"],
 )
 app.add_url_rule(
     "/live/instances/<int:session_instance_id>",
     "live_logging_screen",
-    live_logging_screen,
+    web.live_logging_screen,
 )
 
 # Serve the live-screen service worker at /live/sw.js so its scope is /live/
@@ -365,17 +420,17 @@ def live_service_worker():
 
 app.add_url_rule("/live/sw.js", "live_service_worker", live_service_worker)
 
-app.add_url_rule("/api/sessions/data", "sessions_data", sessions_data)
+app.add_url_rule("/api/sessions/data", "sessions_data", api.sessions_data)
 app.add_url_rule(
     "/api/sessions/<path:session_path>/logs",
     "get_session_logs",
-    get_session_logs,
+    api.get_session_logs,
     methods=["GET"],
 )
 app.add_url_rule(
     "/api/sessions/<path:session_path>/tunes/remaining",
     "get_session_tunes_remaining",
-    get_session_tunes_remaining,
+    api.get_session_tunes_remaining,
     methods=["GET"],
 )
 
@@ -384,79 +439,85 @@ app.add_url_rule(
 app.add_url_rule(
     "/api/sessions/<path:session_path>/tunes/<int:tune_id>/refresh_tunebook_count",
     "refresh_tunebook_count_ajax",
-    refresh_tunebook_count_ajax,
+    api.refresh_tunebook_count_ajax,
     methods=["POST"],
 )
 app.add_url_rule(
     "/api/tunes/<int:tune_id>/settings/cache",
     "cache_tune_setting_ajax",
-    cache_tune_setting_ajax,
+    api.cache_tune_setting_ajax,
     methods=["POST"],
 )
 app.add_url_rule(
     "/api/tunes/<int:tune_id>/incipit",
     "get_tune_incipit",
-    get_tune_incipit,
+    api.get_tune_incipit,
+    methods=["GET"],
+)
+app.add_url_rule(
+    "/api/tune-settings/<int:setting_id>/<any(full, incipit):kind>/<image_hash>.png",
+    "get_notation_image",
+    notation_images.get_notation_image,
     methods=["GET"],
 )
 app.add_url_rule(
     "/api/sessions/<path:session_path>/tunes/<int:tune_id>",
     "get_session_tune_detail",
-    get_session_tune_detail,
+    api.get_session_tune_detail,
     methods=["GET"],
 )
 app.add_url_rule(
     "/api/sessions/<path:session_path>/tunes/<int:tune_id>",
     "update_session_tune_details",
-    update_session_tune_details,
+    api.update_session_tune_details,
     methods=["PUT"],
 )
 app.add_url_rule(
     "/api/sessions/<path:session_path>/tunes/<int:tune_id>",
     "delete_session_tune",
-    delete_session_tune,
+    api.delete_session_tune,
     methods=["DELETE"],
 )
 app.add_url_rule(
     "/api/sessions/<path:session_path>/tunes",
     "add_session_tune",
-    add_session_tune,
+    api.add_session_tune,
     methods=["POST"],
 )
 app.add_url_rule(
     "/api/sessions/<path:session_path>/tunes/<int:tune_id>/aliases",
     "get_session_tune_aliases",
-    get_session_tune_aliases,
+    api.get_session_tune_aliases,
     methods=["GET"],
 )
 app.add_url_rule(
     "/api/sessions/<path:session_path>/tunes/<int:tune_id>/aliases",
     "add_session_tune_alias",
-    add_session_tune_alias,
+    api.add_session_tune_alias,
     methods=["POST"],
 )
 app.add_url_rule(
     "/api/sessions/<path:session_path>/tunes/<int:tune_id>/aliases/<int:alias_id>",
     "delete_session_tune_alias",
-    delete_session_tune_alias,
+    api.delete_session_tune_alias,
     methods=["DELETE"],
 )
 app.add_url_rule(
     "/api/sessions/<path:session_path>/admin-update",
     "update_session_ajax",
-    update_session_ajax,
+    api.update_session_ajax,
     methods=["PUT"],
 )
 app.add_url_rule(
     "/api/sessions/<path:session_path>/add_instance",
     "add_session_instance_ajax",
-    add_session_instance_ajax,
+    api.add_session_instance_ajax,
     methods=["POST"],
 )
 app.add_url_rule(
     "/api/sessions/<path:session_path>/next_instance_suggestion",
     "get_next_session_instance_suggestion_ajax",
-    get_next_session_instance_suggestion_ajax,
+    api.get_next_session_instance_suggestion_ajax,
     methods=["GET"],
 )
 
@@ -465,325 +526,325 @@ app.add_url_rule(
 app.add_url_rule(
     "/api/sessions/<path:session_path>/<date_or_id:date_or_id>/tunes/<int:tune_id>",
     "get_session_instance_tune_detail",
-    get_session_instance_tune_detail,
+    api.get_session_instance_tune_detail,
     methods=["GET"],
 )
 app.add_url_rule(
     "/api/sessions/<path:session_path>/<date_or_id:date_or_id>/tunes/<int:tune_id>",
     "update_session_instance_tune_details",
-    update_session_instance_tune_details,
+    api.update_session_instance_tune_details,
     methods=["PUT"],
 )
 app.add_url_rule(
     "/api/session_instance/<int:session_instance_id>/sets/<int:set_index>/started_by",
     "update_set_started_by",
-    update_set_started_by,
+    api.update_set_started_by,
     methods=["PUT"],
 )
 app.add_url_rule(
     "/api/sessions/<path:session_path>/<date_or_id:date_or_id>/update",
     "update_session_instance_ajax",
-    update_session_instance_ajax,
+    api.update_session_instance_ajax,
     methods=["PUT"],
 )
 app.add_url_rule(
     "/api/sessions/<path:session_path>/<date_or_id:date_or_id>/tune_count",
     "get_session_tune_count_ajax",
-    get_session_tune_count_ajax,
+    api.get_session_tune_count_ajax,
 )
 app.add_url_rule(
     "/api/sessions/<path:session_path>/<date_or_id:date_or_id>/delete",
     "delete_session_instance_ajax",
-    delete_session_instance_ajax,
+    api.delete_session_instance_ajax,
     methods=["DELETE"],
 )
 app.add_url_rule(
     "/api/sessions/<path:session_path>/<date_or_id:date_or_id>/mark_complete",
     "mark_session_log_complete_ajax",
-    mark_session_log_complete_ajax,
+    api.mark_session_log_complete_ajax,
     methods=["POST"],
 )
 app.add_url_rule(
     "/api/sessions/<path:session_path>/<date_or_id:date_or_id>/mark_incomplete",
     "mark_session_log_incomplete_ajax",
-    mark_session_log_incomplete_ajax,
+    api.mark_session_log_incomplete_ajax,
     methods=["POST"],
 )
 app.add_url_rule(
     "/api/sessions/<path:session_path>/<date>/add_tune",
     "add_tune_ajax",
-    add_tune_ajax,
+    api.add_tune_ajax,
     methods=["POST"],
 )
 app.add_url_rule(
     "/api/sessions/delete_tune/<int:session_instance_tune_id>",
     "delete_tune_ajax",
-    delete_tune_ajax,
+    api.delete_tune_ajax,
     methods=["DELETE"],
 )
 app.add_url_rule(
     "/api/sessions/<path:session_path>/<date_or_id>/link_tune",
     "link_tune_ajax",
-    link_tune_ajax,
+    api.link_tune_ajax,
     methods=["POST"],
 )
 app.add_url_rule(
     "/api/sessions/<path:session_path>/<date>/tunes",
     "get_session_tunes_ajax",
-    get_session_tunes_ajax,
+    api.get_session_tunes_ajax,
 )
 app.add_url_rule(
     "/api/sessions/<path:session_path>/<date>/move_set",
     "move_set_ajax",
-    move_set_ajax,
+    api.move_set_ajax,
     methods=["POST"],
 )
 app.add_url_rule(
     "/api/sessions/<path:session_path>/<date>/move_tune",
     "move_tune_ajax",
-    move_tune_ajax,
+    api.move_tune_ajax,
     methods=["POST"],
 )
 app.add_url_rule(
     "/api/sessions/<path:session_path>/<date>/add_tunes_to_set",
     "add_tunes_to_set_ajax",
-    add_tunes_to_set_ajax,
+    api.add_tunes_to_set_ajax,
     methods=["POST"],
 )
 app.add_url_rule(
     "/api/sessions/<path:session_path>/<date>/edit_tune",
     "edit_tune_ajax",
-    edit_tune_ajax,
+    api.edit_tune_ajax,
     methods=["POST"],
 )
 app.add_url_rule(
     "/api/sessions/<path:session_path>/<date_or_id:date_or_id>/match_tune",
     "match_tune_ajax",
-    match_tune_ajax,
+    api.match_tune_ajax,
     methods=["POST"],
 )
 app.add_url_rule(
     "/api/sessions/<path:session_path>/<date>/test_match_tune",
     "test_match_tune_ajax",
-    test_match_tune_ajax,
+    api.test_match_tune_ajax,
     methods=["GET"],
 )
 app.add_url_rule(
     "/api/tunes/<int:tune_id>/detail",
     "get_tune_detail_global",
-    get_tune_detail_global,
+    api.get_tune_detail_global,
     methods=["GET"],
 )
 app.add_url_rule(
     "/api/admin/users/<int:user_id>/beta-logging",
     "admin_set_beta_logging",
-    admin_set_beta_logging,
+    api.admin_set_beta_logging,
     methods=["POST"],
 )
 app.add_url_rule(
     "/api/admin/instances/<int:session_instance_id>/logging-mode",
     "admin_reset_logging_mode",
-    admin_reset_logging_mode,
+    api.admin_reset_logging_mode,
     methods=["POST"],
 )
 app.add_url_rule(
     "/api/sessions/<path:session_path>/<date_or_id:date_or_id>/save_tunes",
     "save_session_instance_tunes_ajax",
-    save_session_instance_tunes_ajax,
+    api.save_session_instance_tunes_ajax,
     methods=["POST"],
 )
 app.add_url_rule(
     "/api/check-existing-session",
     "check_existing_session_ajax",
-    check_existing_session_ajax,
+    api.check_existing_session_ajax,
     methods=["POST"],
 )
 app.add_url_rule(
     "/api/search-sessions",
     "search_sessions_ajax",
-    search_sessions_ajax,
+    api.search_sessions_ajax,
     methods=["POST"],
 )
 app.add_url_rule(
     "/api/fetch-session-data",
     "fetch_session_data_ajax",
-    fetch_session_data_ajax,
+    api.fetch_session_data_ajax,
     methods=["POST"],
 )
 app.add_url_rule(
-    "/api/add-session", "add_session_ajax", add_session_ajax, methods=["POST"]
+    "/api/add-session", "add_session_ajax", api.add_session_ajax, methods=["POST"]
 )
 app.add_url_rule(
     "/api/admin/sessions/<path:session_path>/people",
     "get_session_players_ajax",
-    get_session_players_ajax,
+    api.get_session_players_ajax,
 )
 app.add_url_rule(
     "/api/admin/sessions/<path:session_path>/people/<int:person_id>/regular",
     "update_session_player_regular_status",
-    update_session_player_regular_status,
+    api.update_session_player_regular_status,
     methods=["PUT"],
 )
 app.add_url_rule(
     "/api/admin/sessions/<path:session_path>/people/<int:person_id>/admin",
     "update_session_player_admin_status",
-    update_session_player_admin_status,
+    api.update_session_player_admin_status,
     methods=["PUT"],
 )
 app.add_url_rule(
     "/api/admin/sessions/<path:session_path>/people/<int:person_id>/details",
     "update_session_player_details",
-    update_session_player_details,
+    api.update_session_player_details,
     methods=["PUT"],
 )
 app.add_url_rule(
     "/api/admin/sessions/<path:session_path>/people/<int:person_id>",
     "delete_session_player",
-    delete_session_player,
+    api.delete_session_player,
     methods=["DELETE"],
 )
 app.add_url_rule(
     "/api/sessions/<path:session_path>/leave",
     "leave_session_membership",
-    leave_session_membership,
+    api.leave_session_membership,
     methods=["DELETE"],
 )
 app.add_url_rule(
     "/api/admin/sessions/<path:session_path>/logs",
     "get_session_logs_ajax",
-    get_session_logs_ajax,
+    api.get_session_logs_ajax,
 )
 app.add_url_rule(
     "/api/admin/sessions/<path:session_path>/tunes",
     "get_session_tunes_grid_ajax",
-    get_session_tunes_grid_ajax,
+    api.get_session_tunes_grid_ajax,
 )
 app.add_url_rule(
     "/api/admin/sessions/<path:session_path>/terminate",
     "terminate_session",
-    terminate_session,
+    api.terminate_session,
     methods=["PUT"],
 )
 app.add_url_rule(
     "/api/admin/sessions/<path:session_path>/reactivate",
     "reactivate_session",
-    reactivate_session,
+    api.reactivate_session,
     methods=["PUT"],
 )
 app.add_url_rule(
     "/api/person/<int:person_id>/attended",
     "get_person_attendance_ajax",
-    get_person_attendance_ajax,
+    api.get_person_attendance_ajax,
 )
 app.add_url_rule(
     "/api/person/<int:person_id>/logins",
     "get_person_logins_ajax",
-    get_person_logins_ajax,
+    api.get_person_logins_ajax,
 )
 app.add_url_rule(
     "/api/person/<int:person_id>/tunes",
     "get_person_tunes_ajax",
-    get_person_tunes_ajax,
+    api.get_person_tunes_ajax,
 )
 app.add_url_rule(
     "/api/person/<int:person_id>/tunes-stats",
     "get_person_tunes_stats",
-    get_person_tunes_stats,
+    api.get_person_tunes_stats,
 )
 app.add_url_rule(
     "/api/check-username-availability",
     "check_username_availability",
-    check_username_availability,
+    api.check_username_availability,
     methods=["POST"],
 )
 app.add_url_rule(
     "/api/person/<int:person_id>/update",
     "update_person_details",
-    update_person_details,
+    api.update_person_details,
     methods=["PUT"],
 )
 app.add_url_rule(
     "/api/admin/user/<int:user_id>/verify-email",
     "admin_verify_email",
-    admin_verify_email,
+    api.admin_verify_email,
     methods=["POST"],
 )
 app.add_url_rule(
     "/api/admin/person/<int:person_id>/active",
     "toggle_person_active",
-    toggle_person_active,
+    api.toggle_person_active,
     methods=["PUT"],
 )
 app.add_url_rule(
     "/api/person/<int:person_id>/available-sessions",
     "get_available_sessions_for_person",
-    get_available_sessions_for_person,
+    api.get_available_sessions_for_person,
 )
 app.add_url_rule(
     "/api/person/<int:person_id>/search-sessions",
     "search_sessions_for_person",
-    search_sessions_for_person,
+    api.search_sessions_for_person,
     methods=["POST"],
 )
 app.add_url_rule(
     "/api/add-person-to-session",
     "add_person_to_session",
-    add_person_to_session,
+    api.add_person_to_session,
     methods=["POST"],
 )
 app.add_url_rule(
     "/api/validate-thesession-user",
     "validate_thesession_entity",
-    validate_thesession_entity,
+    api.validate_thesession_entity,
     methods=["POST"],
 )
 app.add_url_rule(
-    "/api/parse-person-name", "parse_person_name", parse_person_name, methods=["POST"]
+    "/api/parse-person-name", "parse_person_name", api.parse_person_name, methods=["POST"]
 )
 app.add_url_rule(
-    "/api/create-person", "create_new_person", create_new_person, methods=["POST"]
+    "/api/create-person", "create_new_person", api.create_new_person, methods=["POST"]
 )
-app.add_url_rule("/api/sessions/list", "get_available_sessions", get_available_sessions)
+app.add_url_rule("/api/sessions/list", "get_available_sessions", api.get_available_sessions)
 app.add_url_rule(
     "/api/sessions/<path:session_path>/people",
     "get_session_people_list",
-    get_session_people_list,
+    api.get_session_people_list,
     methods=["GET"],
 )
 app.add_url_rule(
     "/api/sessions/<path:session_path>/people/<int:person_id>",
     "get_session_person_detail",
-    get_session_person_detail,
+    api.get_session_person_detail,
     methods=["GET"],
 )
 app.add_url_rule(
     "/api/sessions/<path:session_path>/people/add",
     "add_person_to_session_people_tab",
-    add_person_to_session_people_tab,
+    api.add_person_to_session_people_tab,
     methods=["POST"],
 )
 app.add_url_rule(
     "/api/sessions/<path:session_path>/people/search",
     "search_people_for_session",
-    search_people_for_session,
+    api.search_people_for_session,
     methods=["GET"],
 )
 app.add_url_rule(
     "/api/sessions/<path:session_path>/people/add-existing",
     "add_existing_person_to_session",
-    add_existing_person_to_session,
+    api.add_existing_person_to_session,
     methods=["POST"],
 )
 app.add_url_rule(
     "/api/sessions/<path:session_path>/join",
     "join_session",
-    join_session,
+    api.join_session,
     methods=["POST"],
 )
 app.add_url_rule(
     "/api/user/auto-save-preference",
     "update_auto_save_preference",
-    update_auto_save_preference,
+    api.update_auto_save_preference,
     methods=["POST"],
 )
 
@@ -791,61 +852,61 @@ app.add_url_rule(
 app.add_url_rule(
     "/api/session_instance/<int:session_instance_id>/attendees",
     "get_session_attendees",
-    get_session_attendees,
+    api.get_session_attendees,
     methods=["GET"],
 )
 app.add_url_rule(
     "/api/session_instance/<int:session_instance_id>/attendees/checkin",
     "check_in_person",
-    check_in_person,
+    api.check_in_person,
     methods=["POST"],
 )
 app.add_url_rule(
     "/api/person",
     "create_person_with_instruments",
-    create_person_with_instruments,
+    api.create_person_with_instruments,
     methods=["POST"],
 )
 app.add_url_rule(
     "/api/person/<int:person_id>/instruments",
     "get_person_instruments",
-    get_person_instruments,
+    api.get_person_instruments,
     methods=["GET"],
 )
 app.add_url_rule(
     "/api/person/<int:person_id>/instruments",
     "update_person_instruments",
-    update_person_instruments,
+    api.update_person_instruments,
     methods=["PUT"],
 )
 app.add_url_rule(
     "/api/session_instance/<int:session_instance_id>/attendees/<int:person_id>",
     "remove_person_attendance",
-    remove_person_attendance,
+    api.remove_person_attendance,
     methods=["DELETE"],
 )
 app.add_url_rule(
     "/api/session/<int:session_id>/people/search",
     "search_session_people",
-    search_session_people,
+    api.search_session_people,
     methods=["GET"],
 )
 app.add_url_rule(
     "/api/session/<int:session_id>/people/session-people",
     "get_session_people",
-    get_session_people,
+    api.get_session_people,
     methods=["GET"],
 )
 app.add_url_rule(
     "/api/session/<int:session_id>/active_instance",
     "get_session_active_instance",
-    get_session_active_instance,
+    api.get_session_active_instance,
     methods=["GET"],
 )
 app.add_url_rule(
     "/api/person/<int:person_id>/active_session",
     "get_person_active_session",
-    get_person_active_session,
+    api.get_person_active_session,
     methods=["GET"],
 )
 
@@ -853,13 +914,13 @@ app.add_url_rule(
 app.add_url_rule(
     "/api/session/<int:session_id>/bulk-import/preprocess",
     "bulk_import_preprocess_session",
-    bulk_import_preprocess_session,
+    api.bulk_import_preprocess_session,
     methods=["POST"],
 )
 app.add_url_rule(
     "/api/session/<int:session_id>/bulk-import/save",
     "bulk_import_save_session",
-    bulk_import_save_session,
+    api.bulk_import_save_session,
     methods=["POST"],
 )
 
@@ -867,68 +928,68 @@ app.add_url_rule(
 app.add_url_rule(
     "/api/my-tunes",
     "get_my_tunes",
-    get_my_tunes,
+    person_tunes.get_my_tunes,
     methods=["GET"],
 )
 app.add_url_rule(
     "/api/my-tunes/<int:person_tune_id>",
     "get_person_tune_detail",
-    get_person_tune_detail,
+    person_tunes.get_person_tune_detail,
     methods=["GET"],
 )
 app.add_url_rule(
     "/api/my-tunes/<int:person_tune_id>",
     "update_person_tune",
-    update_person_tune,
+    person_tunes.update_person_tune,
     methods=["PUT"],
 )
 app.add_url_rule(
     "/api/my-tunes/<int:person_tune_id>",
     "delete_person_tune",
-    delete_person_tune,
+    person_tunes.delete_person_tune,
     methods=["DELETE"],
 )
 app.add_url_rule(
     "/api/my-tunes",
     "add_my_tune",
-    add_my_tune,
+    person_tunes.add_my_tune,
     methods=["POST"],
 )
 
 app.add_url_rule(
     "/api/my-tunes/<int:person_tune_id>/heard",
     "increment_tune_heard_count",
-    increment_tune_heard_count,
+    person_tunes.increment_tune_heard_count,
     methods=["POST"],
 )
 app.add_url_rule(
     "/api/my-tunes/<int:person_tune_id>/heard",
     "decrement_tune_heard_count",
-    decrement_tune_heard_count,
+    person_tunes.decrement_tune_heard_count,
     methods=["DELETE"],
 )
 app.add_url_rule(
     "/api/my-tunes/sync",
     "sync_my_tunes",
-    sync_my_tunes,
+    person_tunes.sync_my_tunes,
     methods=["POST"],
 )
 app.add_url_rule(
     "/api/my-tunes/common/<int:other_person_id>",
     "get_common_tunes",
-    get_common_tunes,
+    person_tunes.get_common_tunes,
     methods=["GET"],
 )
 app.add_url_rule(
     "/api/tunes/search",
     "search_tunes",
-    search_tunes,
+    person_tunes.search_tunes,
     methods=["GET"],
 )
 app.add_url_rule(
     "/api/person/me",
     "update_my_profile",
-    update_my_profile,
+    person_tunes.update_my_profile,
     methods=["PATCH"],
 )
 
@@ -936,13 +997,13 @@ app.add_url_rule(
 app.add_url_rule(
     "/api/sessions/with-today-status",
     "get_sessions_with_today_status",
-    get_sessions_with_today_status,
+    api.get_sessions_with_today_status,
     methods=["GET"],
 )
 app.add_url_rule(
     "/api/sessions/<path:session_path>/instances/today",
     "create_or_get_today_session_instance",
-    create_or_get_today_session_instance,
+    api.create_or_get_today_session_instance,
     methods=["POST"],
 )
 
@@ -950,13 +1011,13 @@ app.add_url_rule(
 app.add_url_rule(
     "/api/qr/<int:session_id>",
     "generate_qr_code_with_session",
-    generate_qr_code,
+    api.generate_qr_code,
     methods=["GET"],
 )
 app.add_url_rule(
     "/api/qr",
     "generate_qr_code_general",
-    lambda: generate_qr_code(0),
+    lambda: api.generate_qr_code(0),
     methods=["GET"],
 )
 
@@ -964,49 +1025,49 @@ app.add_url_rule(
 app.add_url_rule(
     "/api/admin/tunes",
     "get_admin_tunes",
-    get_admin_tunes,
+    api.get_admin_tunes,
     methods=["GET"],
 )
 app.add_url_rule(
     "/api/admin/tunes/<int:tune_id>",
     "get_admin_tune_detail",
-    get_admin_tune_detail,
+    api.get_admin_tune_detail,
     methods=["GET"],
 )
 app.add_url_rule(
     "/api/admin/tunes/<int:tune_id>",
     "update_admin_tune",
-    update_admin_tune,
+    api.update_admin_tune,
     methods=["PUT"],
 )
 app.add_url_rule(
     "/api/admin/tunes/<int:tune_id>/refresh_tunebook_count",
     "refresh_admin_tune_tunebook_count",
-    refresh_admin_tune_tunebook_count,
+    api.refresh_admin_tune_tunebook_count,
     methods=["POST"],
 )
 app.add_url_rule(
     "/api/admin/tunes/merge",
     "merge_tune",
-    merge_tune,
+    api.merge_tune,
     methods=["POST"],
 )
 app.add_url_rule(
     "/api/admin/cache_settings/run",
     "run_cache_settings",
-    run_cache_settings,
+    api.run_cache_settings,
     methods=["POST"],
 )
 app.add_url_rule(
     "/api/admin/cache_settings/stats",
     "get_cache_settings_stats",
-    get_cache_settings_stats,
+    api.get_cache_settings_stats,
     methods=["GET"],
 )
 app.add_url_rule(
     "/api/admin/history/<entity_type>/<path:entity_id>",
     "api_admin_history",
-    api_admin_history,
+    api.api_admin_history,
     methods=["GET"],
 )
 
@@ -1014,37 +1075,37 @@ app.add_url_rule(
 app.add_url_rule(
     "/api/person/tunes/<int:tune_id>",
     "get_person_tune_status",
-    get_person_tune_status,
+    api.get_person_tune_status,
     methods=["GET"],
 )
 app.add_url_rule(
     "/api/person/tunes",
     "add_person_tune",
-    add_person_tune,
+    api.add_person_tune,
     methods=["POST"],
 )
 app.add_url_rule(
     "/api/person/tunes/<int:tune_id>/status",
     "update_person_tune_status",
-    update_person_tune_status,
+    api.update_person_tune_status,
     methods=["PUT"],
 )
 app.add_url_rule(
     "/api/person/tunes/<int:tune_id>/increment_heard",
     "increment_person_tune_heard_count",
-    increment_person_tune_heard_count,
+    api.increment_person_tune_heard_count,
     methods=["PUT"],
 )
 app.add_url_rule(
     "/api/user/admin-sessions",
     "get_user_admin_sessions",
-    get_user_admin_sessions,
+    api.get_user_admin_sessions,
     methods=["GET"],
 )
 app.add_url_rule(
     "/api/tunes/copy",
     "copy_tunes_to_destination",
-    copy_tunes_to_destination,
+    api.copy_tunes_to_destination,
     methods=["POST"],
 )
 
@@ -1052,37 +1113,37 @@ app.add_url_rule(
 app.add_url_rule(
     "/api/session_instance/<int:session_instance_id>/recordings",
     "start_recording",
-    start_recording,
+    api.start_recording,
     methods=["POST"],
 )
 app.add_url_rule(
     "/api/session_instance/<int:session_instance_id>/recordings",
     "list_recordings",
-    list_recordings,
+    api.list_recordings,
     methods=["GET"],
 )
 app.add_url_rule(
     "/api/recordings/<int:recording_id>/chunks",
     "upload_chunk",
-    upload_chunk,
+    api.upload_chunk,
     methods=["POST"],
 )
 app.add_url_rule(
     "/api/recordings/<int:recording_id>/status",
     "update_recording_status",
-    update_recording_status,
+    api.update_recording_status,
     methods=["PUT"],
 )
 app.add_url_rule(
     "/api/recordings/<int:recording_id>/playback",
     "get_recording_playback",
-    get_recording_playback,
+    api.get_recording_playback,
     methods=["GET"],
 )
 app.add_url_rule(
     "/api/session_instance/<int:session_instance_id>/recordings/upload",
     "upload_recording_file",
-    upload_recording_file,
+    api.upload_recording_file,
     methods=["POST"],
 )
 
@@ -2,7 +2,6 @@ import secrets
 import bcrypt
 import json
 from datetime import timedelta
-from flask_login import UserMixin
 from database import get_db_connection
 from timezone_utils import now_utc
 
@@ -10,7 +9,44 @@ from timezone_utils import now_utc
 SESSION_LIFETIME_WEEKS = 6
 
 
-class User(UserMixin):
+class _SlottedUserMixin:
+    """flask_login.UserMixin's members, without the instance __dict__ that a
+    slot-less base class would give every subclass."""
+
+    __slots__ = ()
+
+    @property
+    def is_active(self):
+        return True
+
+    @property
+    def is_authenticated(self):
+        return self.is_active
+
+    @property
+    def is_anonymous(self):
+        return False
+
+    def get_id(self):
+        return str(self.id)
+
+    def __eq__(self, other):
+        if isinstance(other, _SlottedUserMixin):
+            return self.get_id() == other.get_id()
+        return NotImplemented
+
+    __hash__ = object.__hash__
+
+
+class User(_SlottedUserMixin):
+    # One of these is cached per logged-in user in every worker (user_cache.py)
+    __slots__ = (
+        "id", "user_id", "person_id", "username", "_is_active", "is_system_admin",
+        "first_name", "last_name", "email", "timezone", "email_verified",
+        "auto_save_tunes", "auto_save_interval", "active_session", "beta_live_logging",
+        "hashed_password",
+    )
+
     def __init__(
         self,
         user_id,
@@ -32,7 +68,7 @@ class User(UserMixin):
         self.user_id = user_id
         self.person_id = person_id
         self.username = username
-        self._is_active = is_active  # Store internally to avoid conflict with UserMixin
+        self._is_active = is_active  # Store internally to avoid conflict with the is_active property
         self.is_system_admin = is_system_admin
         self.first_name = first_name
         self.last_name = last_name
@@ -47,7 +83,7 @@ class User(UserMixin):
 
     @property
     def is_active(self):
-        """Override UserMixin's is_active property"""
+        """Override _SlottedUserMixin's is_active property"""
         return self._is_active
 
     def get_id(self):
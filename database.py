@@ -1,6 +1,9 @@
 import os
 import psycopg2
 
+import db_pool
+import metrics
+
 
 def get_current_user_id():
     """Get current user_id for audit logging, or None for system actions.
@@ -224,8 +227,9 @@ def extract_abc_incipit(abc_notation, tune_type=None):
     return abc_notation[:incipit_end]
 
 
-def get_db_connection():
-    conn = psycopg2.connect(
+def _connect():
+    """Open a new raw psycopg2 connection from the PG* environment."""
+    return psycopg2.connect(
         host=os.environ.get("PGHOST"),
         database=os.environ.get("PGDATABASE"),
         user=os.environ.get("PGUSER"),
@@ -237,8 +241,21 @@ def get_db_connection():
         # dev match it, so `NOW() AT TIME ZONE 'UTC'` writes aren't skewed by a
         # non-UTC server timezone.
         options="-c timezone=utc",
+        # Counts and times each query against the current request (see metrics)
+        cursor_factory=metrics.TimedCursor,
     )
-    return conn
+
+
+def get_db_connection():
+    """Get a database connection; close() it when done.
+
+    With DB_POOL_ENABLED set this is a pooled, request-scoped connection (see
+    db_pool): close() hands it back instead of tearing down the socket, and the
+    next call in the same request reuses it. Otherwise a fresh connection.
+    """
+    if db_pool.pool_enabled():
+        return db_pool.checkout(_connect)
+    return _connect()
 
 
 def save_to_history(cur, table_name, operation, record_id, user_id=None):
@@ -452,6 +469,48 @@ def save_to_history(cur, table_name, operation, record_id, user_id=None):
         )
 
 
+def save_many_to_history(cur, table_name, operation, record_ids, user_id=None):
+    """save_to_history for many records of one table in a single statement.
+
+    Supports the tables bulk writers use: 'person' (record_ids are person_ids)
+    and 'person_instrument' (record_ids are (person_id, instrument) tuples).
+    """
+    if not record_ids:
+        return
+    if table_name == "person":
+        cur.execute(
+            """
+            INSERT INTO person_history
+            (person_id, operation, changed_by_user_id, first_name, last_name, email, sms_number,
+             city, state, country, thesession_user_id, created_date, last_modified_date,
+             created_by_user_id, last_modified_user_id)
+            SELECT person_id, %s, %s, first_name, last_name, email, sms_number,
+                   city, state, country, thesession_user_id, created_date, last_modified_date,
+                   created_by_user_id, last_modified_user_id
+            FROM person WHERE person_id = ANY(%s)
+        """,
+            (operation, user_id, list(record_ids)),
+        )
+
+    elif table_name == "person_instrument":
+        cur.execute(
+            """
+            INSERT INTO person_instrument_history
+            (person_id, instrument, operation, changed_by_user_id, changed_at, created_date,
+             created_by_user_id, last_modified_user_id)
+            SELECT pi.person_id, pi.instrument, %s, %s, (NOW() AT TIME ZONE 'UTC'), pi.created_date,
+                   pi.created_by_user_id, pi.last_modified_user_id
+            FROM person_instrument pi
+            JOIN unnest(%s::int[], %s::text[]) AS r(person_id, instrument)
+              ON pi.person_id = r.person_id AND pi.instrument = r.instrument
+        """,
+            (operation, user_id, [r[0] for r in record_ids], [r[1] for r in record_ids]),
+        )
+
+    else:
+        raise ValueError(f"save_many_to_history does not support {table_name}")
+
+
 def find_matching_tune(
     cur, session_id, tune_name, allow_multiple_session_aliases=False
 ):
@@ -0,0 +1,384 @@
+"""
+Postgres connection pool with request-scoped checkout.
+
+`database.get_db_connection()` used to open a brand-new psycopg2 connection (TCP +
+TLS + auth) on every call, and a single request often calls it several times
+(`load_user`, the handler, helpers). With DB_POOL_ENABLED set it hands out pooled
+connections instead:
+
+  - Bounded + thread-safe: at most DB_POOL_MAX_CONNECTIONS are open. A checkout
+    beyond that waits up to DB_POOL_TIMEOUT seconds, then raises PoolExhausted.
+  - Request-scoped: inside a Flask request, a connection given back with close()
+    is parked on the request and handed to the next get_db_connection() in that
+    same request, so load_user, the handler and its helpers share one checkout.
+    A nested open (a helper opening its own connection while the caller's is
+    still open) gets a separate connection, so transactions never interleave.
+    Everything the request holds goes back to the pool at request teardown.
+  - Health-checked: a connection idle longer than DB_POOL_HEALTHCHECK_SECONDS is
+    pinged with `SELECT 1` before reuse; a dead one is replaced transparently.
+  - close() keeps psycopg2 semantics for callers: uncommitted work is rolled
+    back and `autocommit` is reset before the connection is reused.
+
+The switch is the environment, so the cron jobs and scripts (which all go through
+get_db_connection) pick up the same pool by setting the same variables.
+"""
+
+import os
+import time
+import logging
+import threading
+
+import psycopg2
+import psycopg2.extensions
+
+logger = logging.getLogger(__name__)
+
+
+def _env_flag(name):
+    return os.environ.get(name, "").lower() in ("1", "true", "yes")
+
+
+def pool_enabled():
+    """True if get_db_connection() should hand out pooled connections."""
+    return _env_flag("DB_POOL_ENABLED")
+
+
+class PoolExhausted(psycopg2.OperationalError):
+    """No connection became free within the pool's checkout timeout.
+
+    Subclasses OperationalError so existing `except psycopg2.Error` handlers
+    treat it like any other "database unavailable" failure."""
+
+
+class ConnectionPool:
+    """A bounded pool of psycopg2 connections, safe to share across threads.
+
+    Args:
+        connect: Zero-arg callable that opens a new raw connection
+        maxconn: Upper bound on open connections (idle + checked out)
+        timeout: Seconds a checkout waits for a free connection before giving up
+        health_check_interval: Idle seconds after which a connection is pinged
+            before it is handed out again (0 pings every time)
+    """
+
+    def __init__(self, connect, maxconn=10, timeout=10.0, health_check_interval=30.0):
+        self._connect = connect
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self._cond = threading.Condition()
+        self._idle = []  # [(conn, idle_since)], LIFO so warm connections are reused first
+        self._size = 0  # open connections, idle + checked out
+        self._in_use = 0
+        self._closed = False
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "wait_seconds": 0.0,
+            "exhausted": 0,
+            "created": 0,
+            "discarded": 0,
+            "health_checks": 0,
+            "health_check_failures": 0,
+            "peak_in_use": 0,
+        }
+
+    def getconn(self):
+        """Check out a connection, waiting (bounded) if the pool is at capacity."""
+        waited_since = None
+        with self._cond:
+            if self._closed:
+                raise psycopg2.InterfaceError("connection pool is closed")
+            self._stats["checkouts"] += 1
+            while True:
+                if self._idle:
+                    conn, idle_since = self._idle.pop()
+                    break
+                if self._size < self.maxconn:
+                    self._size += 1  # reserve the slot; connect outside the lock
+                    conn, idle_since = None, None
+                    break
+                now = time.monotonic()
+                if waited_since is None:
+                    waited_since = now
+                    self._stats["waits"] += 1
+                remaining = self.timeout - (now - waited_since)
+                if remaining <= 0:
+                    self._stats["exhausted"] += 1
+                    self._stats["wait_seconds"] += now - waited_since
+                    logger.warning(
+                        "DB pool exhausted: %d/%d connections in use after waiting %.1fs",
+                        self._in_use, self.maxconn, self.timeout,
+                    )
+                    raise PoolExhausted(
+                        f"no database connection free within {self.timeout}s "
+                        f"({self._in_use}/{self.maxconn} in use)"
+                    )
+                self._cond.wait(remaining)
+            if waited_since is not None:
+                self._stats["wait_seconds"] += time.monotonic() - waited_since
+            self._in_use += 1
+            self._stats["peak_in_use"] = max(self._stats["peak_in_use"], self._in_use)
+
+        try:
+            if conn is not None and not self._healthy(conn, idle_since):
+                self._close_quietly(conn)
+                with self._cond:
+                    self._stats["discarded"] += 1
+                conn = None
+            if conn is None:
+                conn = self._connect()
+                with self._cond:
+                    self._stats["created"] += 1
+        except Exception:
+            # Give the slot back so a failed connect can't shrink the pool forever.
+            with self._cond:
+                self._size -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        return conn
+
+    def putconn(self, conn, discard=False):
+        """Return a checked-out connection, resetting its session state first.
+
+        A connection that is closed, broken or fails to reset is dropped instead
+        of being reused; its slot frees up for a fresh connection."""
+        if not discard and not self._reset(conn):
+            discard = True
+        with self._cond:
+            self._in_use -= 1
+            if discard or self._closed:
+                self._size -= 1
+                self._stats["discarded"] += 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+        if discard or self._closed:
+            self._close_quietly(conn)
+
+    def closeall(self):
+        """Close every idle connection and refuse further checkouts.
+
+        Connections still checked out are closed as they come back."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn, _ in idle:
+            self._close_quietly(conn)
+
+    def stats(self):
+        """Snapshot of pool occupancy and counters (for logging / metrics)."""
+        with self._cond:
+            snapshot = dict(self._stats)
+            snapshot.update(
+                size=self._size,
+                idle=len(self._idle),
+                in_use=self._in_use,
+                maxconn=self.maxconn,
+            )
+        return snapshot
+
+    def _healthy(self, conn, idle_since):
+        if conn.closed:
+            return False
+        if time.monotonic() - idle_since < self.health_check_interval:
+            return True
+        with self._cond:
+            self._stats["health_checks"] += 1
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1")
+            cur.fetchone()
+            cur.close()
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            with self._cond:
+                self._stats["health_check_failures"] += 1
+            return False
+
+    @staticmethod
+    def _reset(conn):
+        """Roll back anything uncommitted and restore the default session state.
+        Returns False if the connection is unusable."""
+        if conn.closed:
+            return False
+        try:
+            status = conn.get_transaction_status()
+            if status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+                return False
+            if status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+            if conn.autocommit:
+                conn.autocommit = False
+            return True
+        except psycopg2.Error:
+            return False
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+class PooledConnection:
+    """A psycopg2 connection handle whose close() gives the connection back.
+
+    Everything else (cursor, commit, rollback, autocommit, `with conn:`) goes
+    straight to the underlying connection, so callers written against a plain
+    psycopg2 connection work unchanged."""
+
+    __slots__ = ("_conn", "_release")
+
+    def __init__(self, conn, release):
+        object.__setattr__(self, "_conn", conn)
+        object.__setattr__(self, "_release", release)
+
+    def __getattr__(self, name):
+        conn = object.__getattribute__(self, "_conn")
+        if conn is None:
+            raise psycopg2.InterfaceError("connection already closed")
+        return getattr(conn, name)
+
+    def __setattr__(self, name, value):
+        conn = object.__getattribute__(self, "_conn")
+        if conn is None:
+            raise psycopg2.InterfaceError("connection already closed")
+        setattr(conn, name, value)
+
+    @property
+    def closed(self):
+        conn = object.__getattribute__(self, "_conn")
+        return 1 if conn is None else conn.closed
+
+    def close(self):
+        conn = object.__getattribute__(self, "_conn")
+        if conn is None:
+            return
+        object.__setattr__(self, "_conn", None)
+        object.__getattribute__(self, "_release")(conn)
+
+    def __enter__(self):
+        self.__getattr__("__enter__")()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return self.__getattr__("__exit__")(exc_type, exc, tb)
+
+    def __del__(self):
+        # A handle dropped without close() must not leak its pool slot.
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool(connect):
+    """The process-wide pool, created on first use from the DB_POOL_* settings."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    connect,
+                    maxconn=int(os.environ.get("DB_POOL_MAX_CONNECTIONS", 10)),
+                    timeout=float(os.environ.get("DB_POOL_TIMEOUT", 10)),
+                    health_check_interval=float(os.environ.get("DB_POOL_HEALTHCHECK_SECONDS", 30)),
+                )
+    return _pool
+
+
+def reset_pool():
+    """Close and forget the process-wide pool (the next checkout builds a new one)."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.closeall()
+
+
+def get_pool_stats():
+    """Occupancy and counters of the process-wide pool, or None if not in use."""
+    return _pool.stats() if _pool is not None else None
+
+
+_inherited_pools = []  # pools forked from a parent process: kept, never used or closed
+
+
+def _after_fork_in_child():
+    """A forked worker starts with no pool. The parent's connections share its
+    sockets, so the child must neither use them nor close them (closing would end
+    the parent's sessions); they stay referenced here so they're never finalized."""
+    global _pool, _pool_lock
+    if _pool is not None:
+        _inherited_pools.append(_pool)
+    _pool = None
+    _pool_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def _request_scope():
+    """Per-request bookkeeping dict on flask.g, or None outside a request."""
+    try:
+        from flask import g, has_request_context
+    except ImportError:
+        return None
+    if not has_request_context():
+        return None
+    scope = g.get("_db_pool_scope")
+    if scope is None:
+        scope = {"parked": [], "handles": []}
+        g._db_pool_scope = scope
+    return scope
+
+
+def checkout(connect):
+    """Hand out a pooled connection, reusing the current request's if it is free."""
+    pool = get_pool(connect)
+    scope = _request_scope()
+    if scope is None:
+        return PooledConnection(pool.getconn(), pool.putconn)
+
+    conn = scope["parked"].pop() if scope["parked"] else pool.getconn()
+
+    def park(raw):
+        # Keep it for the rest of the request, reset exactly as the pool would.
+        if pool._reset(raw):
+            scope["parked"].append(raw)
+        else:
+            pool.putconn(raw, discard=True)
+
+    handle = PooledConnection(conn, park)
+    scope["handles"].append(handle)
+    return handle
+
+
+def release_request_connections(exc=None):
+    """Flask teardown hook: return everything this request checked out."""
+    try:
+        from flask import g
+        scope = g.pop("_db_pool_scope", None)
+    except (ImportError, RuntimeError):
+        return
+    if not scope:
+        return
+    for handle in scope["handles"]:
+        handle.close()  # no-op if the handler already closed it
+    pool = _pool
+    for conn in scope["parked"]:
+        if pool is not None:
+            pool.putconn(conn)
+        else:
+            ConnectionPool._close_quietly(conn)
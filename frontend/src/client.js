@@ -46,6 +46,32 @@ export async function sendOp(config, op_type, payload = {}, op_id = crypto.rando
   return json // {success, rejected?, reason?, event_id?, record?, ...}
 }
 
+// Batch op POST: an ordered list of ops applied in one server transaction (the
+// offline-queue flush). Resolves to one ack per op, each shaped like sendOp's result;
+// a rejected op doesn't stop the ops after it.
+export async function sendOps(config, ops) {
+  const ctrl = new AbortController()
+  const timer = setTimeout(() => ctrl.abort(), 30000)
+  let res
+  try {
+    res = await fetch(`/api/live/instances/${config.sessionInstanceId}/ops/batch`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      credentials: 'same-origin',
+      body: JSON.stringify({ ops }),
+      signal: ctrl.signal,
+    })
+  } catch (e) {
+    e.networkError = true
+    throw e
+  } finally {
+    clearTimeout(timer)
+  }
+  const json = await res.json().catch(() => ({}))
+  if (!res.ok) throw new Error(json.error || `batch failed: ${res.status}`)
+  return json.acks || []
+}
+
 // Ephemeral typing signal, POSTed straight to the streaming service (spec 024 §F):
 // no DB, no op feed. `typing:false` clears it (on submit/blur); the service also
 // times it out after ~10s of silence.
@@ -141,7 +167,7 @@ export async function deepSearch(config, q, type, preferType, mode) {
   }
 }
 
-// Incipit image (base64) for a tune — rendered+cached server-side on demand if
+// Incipit image URL for a tune — rendered+cached server-side on demand if
 // missing. `kind='both'` also renders the full image. Returns null if no notation.
 export async function fetchIncipit(config, tuneId, kind) {
   const q = kind ? `?kind=${kind}` : ''
@@ -152,7 +178,7 @@ export async function fetchIncipit(config, tuneId, kind) {
     })
     if (!res.ok) return null
     const json = await res.json()
-    return json.image || null
+    return json.image_url || null
   } catch {
     return null
   }
@@ -212,6 +238,19 @@ export function openStream(config, lastEventId, handlers) {
     handlers.onOp?.(data)
   })
 
+  // Bounded replay: a client far behind gets the instance's state (bootstrap shape)
+  // as of an event id, then only the ops after it. Its id: advances Last-Event-ID.
+  es.addEventListener('snapshot', (e) => {
+    kick()
+    let data
+    try {
+      data = JSON.parse(e.data)
+    } catch {
+      return
+    }
+    handlers.onSnapshot?.(data)
+  })
+
   // Ephemeral presence (no id:, never advances Last-Event-ID).
   es.addEventListener('presence', (e) => {
     kick()
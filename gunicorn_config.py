@@ -0,0 +1,133 @@
+"""
+Gunicorn settings for the production web service (render.yaml).
+
+    gunicorn -c gunicorn_config.py app:app
+
+Preforked gthread workers: a slow renderer call or thesession.org fetch ties up
+one thread, not the whole site as it did under `flask run`. The app and all its
+route modules are imported once in the master (preload) so workers fork warm
+and share that memory copy-on-write. Everything that holds a connection or a
+thread is per worker: the DB pool (db_pool), the cache invalidation listeners
+(user_cache, tune_match_index) and the HTTP clients (abc_renderer,
+thesession_client) each rebuild themselves after a fork. The in-memory caches
+they feed fill per worker on first use.
+
+Configuration (environment):
+    PORT                      listen port (default 8000)
+    WEB_CONCURRENCY           worker processes (default 2)
+    GUNICORN_THREADS          threads per worker (default 4; keep <= DB_POOL_MAX_CONNECTIONS)
+    GUNICORN_TIMEOUT          seconds before a silent worker is restarted (default 60)
+    GUNICORN_PRELOAD          import the app in the master (default 1)
+    GUNICORN_MAX_REQUESTS     recycle a worker after this many requests (default 2000, 0 = never)
+    LATENCY_LOG_EVERY         requests between a worker's latency summaries (default 500, 0 = off)
+    METRICS_MULTIPROC_DIR     where workers share /metrics counts (default a temp dir per port)
+
+Reloading: SIGHUP starts fresh workers and retires the old ones gracefully
+(each finishes its in-flight requests within graceful_timeout). With preload
+the code itself is only reloaded by a restart or a USR2 binary upgrade; set
+GUNICORN_PRELOAD=0 to have SIGHUP pick up new code too.
+"""
+
+import os
+import time
+import tempfile
+import threading
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 60))
+graceful_timeout = 30
+keepalive = 5
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1").lower() not in ("0", "false", "no")
+
+# Recycling bounds slow leaks; the jitter keeps workers from restarting together.
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 2000))
+max_requests_jitter = max_requests // 10
+
+# Workers share their metric counts here, so whichever one answers /metrics
+# reports the whole service (metrics.py); emptied when the master starts.
+metrics_dir = os.environ.get("METRICS_MULTIPROC_DIR") or os.path.join(
+    tempfile.gettempdir(), f"ceol-metrics-{os.environ.get('PORT', '8000')}"
+)
+raw_env = [f"METRICS_MULTIPROC_DIR={metrics_dir}"]
+
+accesslog = "-"
+# pid and request time (ms) on every line, so latency can be read per worker
+access_log_format = '%(p)s %(h)s "%(r)s" %(s)s %(B)s %(M)sms'
+
+LATENCY_LOG_EVERY = int(os.environ.get("LATENCY_LOG_EVERY", 500))
+
+
+def on_starting(server):
+    import metrics
+
+    metrics.clear_worker_files(metrics_dir)
+
+
+def when_ready(server):
+    if preload_app:
+        # Route modules load on first dispatch (app.LazyView); import them here,
+        # once, instead of in every worker's first requests.
+        import app
+
+        app.import_route_modules()
+        server.log.info("Route modules preloaded")
+
+
+def post_fork(server, worker):
+    worker.latency = LatencyStats()
+    server.log.info(f"Worker {worker.pid} started ({threads} threads)")
+
+
+def pre_request(worker, req):
+    req.started_at = time.monotonic()
+
+
+def post_request(worker, req, environ, resp):
+    started_at = getattr(req, "started_at", None)
+    if started_at is None:
+        return
+    summary = worker.latency.record(time.monotonic() - started_at)
+    if summary:
+        worker.log.info(f"Worker {worker.pid} latency: {summary}")
+
+
+def worker_exit(server, worker):
+    import metrics
+
+    metrics.REGISTRY.flush()  # its last counts outlive it (folded into the totals)
+    summary = worker.latency.summary() if hasattr(worker, "latency") else None
+    if summary:
+        server.log.info(f"Worker {worker.pid} exiting; latency since last report: {summary}")
+
+
+class LatencyStats:
+    """Request durations since the last report, summarized every `every` requests."""
+
+    def __init__(self, every=LATENCY_LOG_EVERY):
+        self.every = every
+        self._lock = threading.Lock()
+        self._durations = []
+
+    def record(self, seconds):
+        """Add one request; returns a summary (and starts over) every `every` requests."""
+        with self._lock:
+            self._durations.append(seconds)
+            if not self.every or len(self._durations) < self.every:
+                return None
+            return self._summarize()
+
+    def summary(self):
+        with self._lock:
+            return self._summarize() if self._durations else None
+
+    def _summarize(self):
+        durations, self._durations = sorted(self._durations), []
+        n = len(durations)
+
+        def pct(p):
+            return durations[min(n - 1, int(p * n))] * 1000
+
+        return f"n={n} p50={pct(0.50):.0f}ms p95={pct(0.95):.0f}ms p99={pct(0.99):.0f}ms max={durations[-1] * 1000:.0f}ms"
@@ -0,0 +1,348 @@
+"""
+Postgres-backed background job queue (schema: 027_background_job.sql).
+
+Work that used to run inside a request -- fetching a tune's setting from
+thesession.org and rendering its two images -- or that was skipped entirely
+(bulk tunebook imports) is enqueued here and done by jobs/job_worker.py:
+
+  - enqueue() / enqueue_many() take the caller's cursor, so a job becomes
+    visible exactly when the caller's transaction commits (and not at all if it
+    rolls back). A dedupe_key makes enqueueing the same work twice a no-op while
+    the first job is still pending or running.
+  - claim() hands one due job to one worker (FOR UPDATE SKIP LOCKED), so any
+    number of workers can share the table.
+  - A job that raises is retried with exponential backoff up to max_attempts;
+    JobError(retry=False) fails it immediately. Jobs held by a worker that died
+    are put back by requeue_stale().
+  - throttle() spaces requests to a remote host across all workers (one shared
+    row per host), so thesession.org is never hit faster than its interval.
+
+Handlers are plain functions registered in HANDLERS by job type, called as
+handler(conn, payload). BACKGROUND_JOBS_ENABLED tells the web app that a worker
+is running, i.e. that it may hand work off instead of doing it inline.
+"""
+
+import os
+import time
+import random
+import socket
+import logging
+from collections import namedtuple
+
+import psycopg2.extras
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = "background_job"
+DEFAULT_MAX_ATTEMPTS = 5
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 6 * 60 * 60
+STALE_LOCK_SECONDS = 15 * 60
+THESESSION_HOST = "thesession.org"
+
+
+def enabled():
+    """True if a job worker is deployed, so request handlers may enqueue
+    background work instead of doing it inline."""
+    return os.environ.get("BACKGROUND_JOBS_ENABLED", "").lower() in ("1", "true", "yes")
+
+
+def worker_id():
+    """Identifies this worker in background_job.locked_by."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+Job = namedtuple("Job", "job_id job_type payload attempts max_attempts")
+
+
+class JobError(Exception):
+    """A handler failure. retry=False marks the job failed without retrying
+    (e.g. the tune has no settings on thesession.org)."""
+
+    def __init__(self, message, retry=True):
+        super().__init__(message)
+        self.retry = retry
+
+
+# job_type -> handler(conn, payload)
+HANDLERS = {}
+
+
+def handler(job_type):
+    """Register a function as the handler for job_type."""
+    def register(func):
+        HANDLERS[job_type] = func
+        return func
+    return register
+
+
+_ENQUEUE_SQL = """
+    INSERT INTO background_job (job_type, dedupe_key, payload, max_attempts, run_after)
+    VALUES %s
+    ON CONFLICT (job_type, dedupe_key)
+        WHERE status IN ('pending', 'running') AND dedupe_key IS NOT NULL
+        DO NOTHING
+    RETURNING job_id
+"""
+_ENQUEUE_TEMPLATE = "(%s, %s, %s, %s, NOW() + make_interval(secs => %s))"
+
+
+def enqueue(cur, job_type, payload=None, dedupe_key=None, delay_seconds=0, max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """
+    Add a job in the caller's transaction.
+
+    Returns:
+        The new job_id, or None if a live job with the same dedupe_key exists
+    """
+    psycopg2.extras.execute_values(
+        cur, _ENQUEUE_SQL,
+        [(job_type, dedupe_key, psycopg2.extras.Json(payload or {}), max_attempts, delay_seconds)],
+        template=_ENQUEUE_TEMPLATE,
+    )
+    row = cur.fetchone()
+    return row[0] if row else None
+
+
+def enqueue_many(cur, jobs, max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """
+    Add many jobs in one statement, in the caller's transaction.
+
+    Args:
+        jobs: Iterable of (job_type, payload, dedupe_key)
+
+    Returns:
+        Number of jobs actually added (duplicates of live jobs are skipped)
+    """
+    rows, seen = [], set()
+    for job_type, payload, dedupe_key in jobs:
+        if dedupe_key is not None:
+            if (job_type, dedupe_key) in seen:
+                continue
+            seen.add((job_type, dedupe_key))
+        rows.append((job_type, dedupe_key, psycopg2.extras.Json(payload or {}), max_attempts, 0))
+    if not rows:
+        return 0
+    inserted = psycopg2.extras.execute_values(
+        cur, _ENQUEUE_SQL, rows, template=_ENQUEUE_TEMPLATE, page_size=500, fetch=True
+    )
+    return len(inserted)
+
+
+def enqueue_setting_cache(cur, tune_id, user_id=None, setting_id=None):
+    """Queue caching of a tune's setting (the default one unless setting_id is
+    given) plus its images. Deduplicated per tune / per setting."""
+    dedupe_key = f"setting:{setting_id}" if setting_id else f"tune:{tune_id}"
+    return enqueue(
+        cur, "cache_tune_setting",
+        {"tune_id": tune_id, "setting_id": setting_id, "user_id": user_id},
+        dedupe_key=dedupe_key,
+    )
+
+
+def claim(conn, worker, job_types=None):
+    """Lock the next due job for this worker and commit the claim.
+    Returns a Job, or None if nothing is due."""
+    type_filter = "AND job_type = ANY(%s)" if job_types else ""
+    params = [worker] + ([list(job_types)] if job_types else [])
+    cur = conn.cursor()
+    cur.execute(
+        f"""
+        UPDATE background_job
+        SET status = 'running', attempts = attempts + 1, locked_by = %s, locked_at = NOW()
+        WHERE job_id = (
+            SELECT job_id FROM background_job
+            WHERE status = 'pending' AND run_after <= NOW() {type_filter}
+            ORDER BY run_after, job_id
+            FOR UPDATE SKIP LOCKED
+            LIMIT 1
+        )
+        RETURNING job_id, job_type, payload, attempts, max_attempts
+        """,
+        params,
+    )
+    row = cur.fetchone()
+    conn.commit()
+    cur.close()
+    return Job(*row) if row else None
+
+
+def complete(conn, job_id):
+    cur = conn.cursor()
+    cur.execute(
+        """
+        UPDATE background_job
+        SET status = 'done', finished_date = NOW(), locked_by = NULL, locked_at = NULL, last_error = NULL
+        WHERE job_id = %s
+        """,
+        (job_id,),
+    )
+    conn.commit()
+    cur.close()
+
+
+def backoff_seconds(attempts):
+    """Delay before retry number `attempts`: doubling from BACKOFF_BASE_SECONDS,
+    capped, with +/-20% jitter so failed batches don't retry in lockstep."""
+    delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** max(0, attempts - 1))
+    return delay * random.uniform(0.8, 1.2)
+
+
+def fail(conn, job, error, retry=True):
+    """Record a failed attempt: back to 'pending' after a backoff, or 'failed'
+    for good once attempts are used up (or retry is False)."""
+    cur = conn.cursor()
+    if retry and job.attempts < job.max_attempts:
+        cur.execute(
+            """
+            UPDATE background_job
+            SET status = 'pending', run_after = NOW() + make_interval(secs => %s),
+                locked_by = NULL, locked_at = NULL, last_error = %s
+            WHERE job_id = %s
+            """,
+            (backoff_seconds(job.attempts), error, job.job_id),
+        )
+    else:
+        cur.execute(
+            """
+            UPDATE background_job
+            SET status = 'failed', finished_date = NOW(), locked_by = NULL, locked_at = NULL, last_error = %s
+            WHERE job_id = %s
+            """,
+            (error, job.job_id),
+        )
+    conn.commit()
+    cur.close()
+
+
+def requeue_stale(conn, older_than_seconds=STALE_LOCK_SECONDS):
+    """Put back jobs whose worker disappeared mid-job. Returns how many."""
+    cur = conn.cursor()
+    cur.execute(
+        """
+        UPDATE background_job
+        SET status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'pending' END,
+            finished_date = CASE WHEN attempts >= max_attempts THEN NOW() END,
+            last_error = 'worker lost: lock expired', locked_by = NULL, locked_at = NULL
+        WHERE status = 'running' AND locked_at < NOW() - make_interval(secs => %s)
+        """,
+        (older_than_seconds,),
+    )
+    count = cur.rowcount
+    conn.commit()
+    cur.close()
+    return count
+
+
+def throttle(conn, host, min_interval):
+    """
+    Wait for this worker's turn to call `host`, at most one call per
+    min_interval seconds across all workers. Commits on conn.
+
+    Returns:
+        Seconds slept
+    """
+    cur = conn.cursor()
+    cur.execute("INSERT INTO job_rate_limit (host) VALUES (%s) ON CONFLICT (host) DO NOTHING", (host,))
+    cur.execute(
+        """
+        UPDATE job_rate_limit
+        SET next_allowed_at = GREATEST(next_allowed_at, clock_timestamp()) + make_interval(secs => %s)
+        WHERE host = %s
+        RETURNING EXTRACT(EPOCH FROM (next_allowed_at - make_interval(secs => %s) - clock_timestamp()))
+        """,
+        (min_interval, host, min_interval),
+    )
+    wait = max(0.0, float(cur.fetchone()[0]))
+    conn.commit()
+    cur.close()
+    if wait:
+        time.sleep(wait)
+    return wait
+
+
+def run_job(conn, job):
+    """Run one claimed job and record the outcome. Returns True on success."""
+    func = HANDLERS.get(job.job_type)
+    if func is None:
+        fail(conn, job, f"no handler for job type {job.job_type!r}", retry=False)
+        return False
+    try:
+        func(conn, job.payload or {})
+    except JobError as e:
+        conn.rollback()
+        logger.warning("Job %s (%s) failed: %s", job.job_id, job.job_type, e)
+        fail(conn, job, str(e), retry=e.retry)
+        return False
+    except Exception as e:
+        conn.rollback()
+        logger.exception("Job %s (%s) raised", job.job_id, job.job_type)
+        fail(conn, job, f"{type(e).__name__}: {e}")
+        return False
+    complete(conn, job.job_id)
+    return True
+
+
+def work(conn, worker, job_types=None, max_jobs=None, should_stop=None):
+    """Claim and run due jobs until none are left (or max_jobs / should_stop).
+    Returns (succeeded, failed)."""
+    succeeded = failed = 0
+    while max_jobs is None or succeeded + failed < max_jobs:
+        if should_stop and should_stop():
+            break
+        job = claim(conn, worker, job_types)
+        if job is None:
+            break
+        if run_job(conn, job):
+            succeeded += 1
+        else:
+            failed += 1
+    return succeeded, failed
+
+
+# -----------------------------------------------------------------------------
+# Handlers
+# -----------------------------------------------------------------------------
+
+def _thesession_interval():
+    return float(os.environ.get("THESESSION_MIN_INTERVAL_SECONDS", 1.0))
+
+
+@handler("cache_tune_setting")
+def _cache_tune_setting(conn, payload):
+    """Fetch a tune's setting from thesession.org, store it and render its images."""
+    tune_id = payload["tune_id"]
+    setting_id = payload.get("setting_id")
+
+    cur = conn.cursor()
+    if setting_id:
+        cur.execute("SELECT 1 FROM tune_setting WHERE setting_id = %s", (setting_id,))
+    else:
+        cur.execute("SELECT 1 FROM tune_setting WHERE tune_id = %s LIMIT 1", (tune_id,))
+    already_cached = cur.fetchone() is not None
+    conn.commit()
+    cur.close()
+    if already_cached:
+        return
+
+    throttle(conn, THESESSION_HOST, _thesession_interval())
+
+    # Lazy import: api_routes imports this module to enqueue
+    from api_routes import cache_default_tune_setting
+    success, message, _ = cache_default_tune_setting(
+        tune_id, None, payload.get("user_id"), sync=True, target_setting_id=setting_id
+    )
+    if not success:
+        permanent = message.startswith("No settings found") or "status: 404" in message
+        raise JobError(message, retry=not permanent)
+
+
+@handler("snapshot_session_instance")
+def _snapshot_session_instance(conn, payload):
+    """Record a live-feed snapshot for an instance (bounded SSE replay)."""
+    from live_logging_routes import record_snapshot
+
+    cur = conn.cursor()
+    cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+    record_snapshot(cur, payload["session_instance_id"])
+    conn.commit()
+    cur.close()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Active Session Scheduler
+
+Long-running alternative to the 15-minute check_active_sessions.py cron. Every
+instance's active window is stored as UTC instants (session_instance.active_from_utc
+/ active_until_utc, schema/032_session_instance_active_window.sql), so the
+scheduler can ask Postgres when the next activation or deactivation falls due,
+sleep until exactly then, and apply it with one set-based pass. Sessions go live
+to the minute instead of up to 15 minutes late.
+
+It LISTENs on 'session_schedule' (instance created, moved, re-timed, cancelled;
+session timezone or buffers changed) and recomputes its wake-up time when the
+timeline changes. Auto-creation of upcoming instances still runs on an interval.
+A database error (a dropped connection, a failover) doesn't end the worker: it
+reopens both connections, re-issues the LISTEN and carries on after a back-off.
+
+Usage:
+    python3 jobs/active_session_scheduler.py
+    python3 jobs/active_session_scheduler.py --max-sleep 120 --auto-create-interval 0
+"""
+
+import sys
+import os
+import time
+import select
+import signal
+import logging
+import argparse
+from datetime import datetime, timezone
+import psycopg2
+from dotenv import load_dotenv
+
+# Load environment variables from .env file (for local development)
+# In production on Render, env vars should be set in the dashboard
+load_dotenv()
+
+# Add parent directory to path so we can import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import active_session_manager
+from database import get_db_connection
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+logger = logging.getLogger(__name__)
+
+# Deactivation is strict (the window end must have passed), so wake just after.
+WAKE_SLACK_SECONDS = 1.0
+
+# After a failed pass or a lost connection, wait at least this long before retrying.
+ERROR_BACKOFF_SECONDS = 30.0
+
+_stopping = False
+
+
+def _request_stop(signum, frame):
+    global _stopping
+    logger.info(f"Received signal {signum}; exiting")
+    _stopping = True
+
+
+def seconds_until(next_at, now, max_sleep):
+    """How long to sleep before next_at (UTC), capped at max_sleep."""
+    if next_at is None:
+        return max_sleep
+    return min(max_sleep, max(0.0, (next_at - now).total_seconds() + WAKE_SLACK_SECONDS))
+
+
+def _connect():
+    """Open the scheduler's connections: one for passes, one LISTENing on the schedule channel."""
+    conn = get_db_connection()
+    try:
+        listen_conn = get_db_connection()
+        listen_conn.autocommit = True
+        listen_conn.cursor().execute(f"LISTEN {active_session_manager.SCHEDULE_NOTIFY_CHANNEL}")
+    except Exception:
+        _close(conn)
+        raise
+    return conn, listen_conn
+
+
+def _close(*conns):
+    for conn in conns:
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+
+def _backoff(seconds):
+    """Sleep, but return promptly on SIGTERM/SIGINT."""
+    deadline = time.monotonic() + seconds
+    while not _stopping and time.monotonic() < deadline:
+        time.sleep(min(1.0, deadline - time.monotonic()))
+
+
+def _wait(listen_conn, timeout):
+    """Block until a 'session_schedule' NOTIFY arrives or timeout elapses."""
+    if select.select([listen_conn], [], [], timeout) != ([], [], []):
+        listen_conn.poll()
+        listen_conn.notifies.clear()
+
+
+def _log_transitions(stats):
+    for kind in ('activated', 'deactivated'):
+        for item in stats[kind]:
+            logger.info(f"{kind.capitalize()} {item['session_name']} (session_id={item['session_id']}, "
+                        f"instance_id={item['instance_id']})")
+    for item in stats['errors']:
+        logger.error(f"Transition error: {item['error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Activate and deactivate session instances on time.")
+    parser.add_argument("--max-sleep", type=float, default=300.0,
+                        help="Longest sleep between passes, in seconds (NOTIFY and due transitions wake sooner)")
+    parser.add_argument("--auto-create-interval", type=float, default=15.0,
+                        help="Minutes between auto-create runs (0 to leave them to the cron job)")
+    args = parser.parse_args()
+
+    signal.signal(signal.SIGTERM, _request_stop)
+    signal.signal(signal.SIGINT, _request_stop)
+
+    logger.info("Active session scheduler started")
+    run(args)
+
+    logger.info("Active session scheduler exiting")
+    sys.exit(0)
+
+
+def run(args):
+    """The scheduler loop, until SIGTERM/SIGINT."""
+    conn = listen_conn = None
+    last_auto_create = 0.0
+
+    try:
+        while not _stopping:
+            try:
+                if conn is None:
+                    conn, listen_conn = _connect()
+
+                stats = active_session_manager.process_due_transitions(conn)
+                _log_transitions(stats)
+
+                if args.auto_create_interval > 0 and time.monotonic() - last_auto_create >= args.auto_create_interval * 60:
+                    auto_stats = active_session_manager.auto_create_scheduled_instances()
+                    for item in auto_stats['errors']:
+                        logger.error(f"Auto-create error for session {item['session_id']}: {item['error']}")
+                    last_auto_create = time.monotonic()
+
+                now = datetime.now(timezone.utc)
+                next_at = active_session_manager.next_transition_at(conn, now)
+                timeout = seconds_until(next_at, now, args.max_sleep)
+                if stats['errors']:
+                    timeout = max(timeout, ERROR_BACKOFF_SECONDS)
+                if next_at is not None:
+                    logger.debug(f"Next transition at {next_at.isoformat()}; sleeping {timeout:.0f}s")
+                _wait(listen_conn, timeout)
+            except psycopg2.Error as e:
+                # Both connections are reopened (and the LISTEN re-issued): a NOTIFY
+                # sent while we were disconnected is lost, but the next pass reads
+                # the whole timeline anyway.
+                logger.error(f"Database error: {e}; reconnecting in {ERROR_BACKOFF_SECONDS:.0f}s", exc_info=True)
+                _close(conn, listen_conn)
+                conn = listen_conn = None
+                _backoff(ERROR_BACKOFF_SECONDS)
+    finally:
+        _close(conn, listen_conn)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,9 @@ and buffer windows.
 
 It uses a 1-minute lookahead to ensure sessions scheduled for round times become
 active right at that time (e.g., sessions at 7:00pm become active when this runs at 6:59pm).
+
+For activation to the minute, run jobs/active_session_scheduler.py as a worker;
+both apply the same idempotent transitions, so they can run side by side.
 """
 
 import sys
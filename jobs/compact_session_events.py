@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Compact Session Events - Cron Job Script
+
+Keeps live-logging reconnects cheap (spec 024 §B replay) however long an
+instance's session_event log grows:
+
+  1. Snapshots every instance with events newer than its session_snapshot (the
+     job worker already does this during busy sessions; this catches the rest).
+  2. Folds events covered by a snapshot and older than the retention window
+     into it (deletes them); clients with an older cursor get the snapshot.
+
+Usage:
+    python3 jobs/compact_session_events.py
+    python3 jobs/compact_session_events.py --retention-days 14 --dry-run
+"""
+
+import sys
+import os
+import logging
+import argparse
+from dotenv import load_dotenv
+
+# Load environment variables from .env file (for local development)
+# In production on Render, env vars should be set in the dashboard
+load_dotenv()
+
+# Add parent directory to path so we can import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import get_db_connection
+from live_logging_routes import record_snapshot, compact_events, EVENT_RETENTION_DAYS
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+logger = logging.getLogger(__name__)
+
+
+def stale_instances(cur):
+    """Instances with events the snapshot doesn't cover yet."""
+    cur.execute(
+        """
+        SELECT e.session_instance_id
+        FROM session_event e
+        LEFT JOIN session_snapshot snap ON snap.session_instance_id = e.session_instance_id
+        GROUP BY e.session_instance_id, snap.event_id
+        HAVING MAX(e.event_id) > COALESCE(snap.event_id, 0)
+        ORDER BY e.session_instance_id
+        """
+    )
+    return [row[0] for row in cur.fetchall()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Snapshot live-logging feeds and fold old events.")
+    parser.add_argument("--retention-days", type=int, default=EVENT_RETENTION_DAYS,
+                        help="Keep events younger than this many days (default: %(default)s)")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would change, then roll back")
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    has_errors = False
+    snapshotted = folded = 0
+    try:
+        cur = conn.cursor()
+        instances = stale_instances(cur)
+        conn.commit()
+        logger.info(f"{len(instances)} instances have events newer than their snapshot")
+
+        for instance_id in instances:
+            try:
+                cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+                if record_snapshot(cur, instance_id) is not None:
+                    snapshotted += 1
+                if args.dry_run:
+                    conn.rollback()
+                else:
+                    conn.commit()
+            except Exception as e:
+                conn.rollback()
+                has_errors = True
+                logger.error(f"Snapshot failed for instance {instance_id}: {e}")
+
+        cur.execute("SELECT session_instance_id FROM session_snapshot ORDER BY session_instance_id")
+        for (instance_id,) in cur.fetchall():
+            try:
+                folded += compact_events(cur, instance_id, args.retention_days)
+                if args.dry_run:
+                    conn.rollback()
+                else:
+                    conn.commit()
+            except Exception as e:
+                conn.rollback()
+                has_errors = True
+                logger.error(f"Compaction failed for instance {instance_id}: {e}")
+    finally:
+        conn.close()
+
+    verb = "Would snapshot" if args.dry_run else "Snapshotted"
+    logger.info(f"{verb} {snapshotted} instances; folded {folded} events older than {args.retention_days} days")
+    sys.exit(1 if has_errors else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Background Job Worker
+
+Long-running worker for the Postgres job queue (job_queue.py). Claims due jobs
+with SKIP LOCKED (so several workers can run side by side), runs them, and
+retries failures with backoff. Between jobs it LISTENs on 'background_job' so
+new work starts immediately instead of waiting for the next poll.
+
+Usage:
+    python3 jobs/job_worker.py                 # run until SIGTERM / Ctrl-C
+    python3 jobs/job_worker.py --once          # drain due jobs, then exit
+    python3 jobs/job_worker.py --types cache_tune_setting --poll 30
+"""
+
+import sys
+import os
+import time
+import select
+import signal
+import logging
+import argparse
+from dotenv import load_dotenv
+
+# Load environment variables from .env file (for local development)
+# In production on Render, env vars should be set in the dashboard
+load_dotenv()
+
+# Add parent directory to path so we can import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import job_queue
+from database import get_db_connection
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+logger = logging.getLogger(__name__)
+
+STALE_CHECK_INTERVAL = 60  # seconds between checks for jobs orphaned by dead workers
+
+_stopping = False
+
+
+def _request_stop(signum, frame):
+    global _stopping
+    logger.info(f"Received signal {signum}; finishing the current job and exiting")
+    _stopping = True
+
+
+def _wait_for_work(listen_conn, timeout):
+    """Block until a 'background_job' NOTIFY arrives or timeout elapses."""
+    if select.select([listen_conn], [], [], timeout) != ([], [], []):
+        listen_conn.poll()
+        listen_conn.notifies.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run background jobs from the job queue.")
+    parser.add_argument("--once", action="store_true", help="Process all due jobs, then exit")
+    parser.add_argument("--types", help="Comma-separated job types to handle (default: all)")
+    parser.add_argument("--poll", type=float, default=15.0,
+                        help="Seconds between polls when idle (NOTIFY wakes sooner)")
+    args = parser.parse_args()
+
+    job_types = [t.strip() for t in args.types.split(",")] if args.types else None
+    worker = job_queue.worker_id()
+
+    signal.signal(signal.SIGTERM, _request_stop)
+    signal.signal(signal.SIGINT, _request_stop)
+
+    conn = get_db_connection()
+    listen_conn = None
+    if not args.once:
+        listen_conn = get_db_connection()
+        listen_conn.autocommit = True
+        listen_conn.cursor().execute(f"LISTEN {job_queue.NOTIFY_CHANNEL}")
+
+    logger.info(f"Job worker {worker} started (types: {', '.join(job_types) if job_types else 'all'})")
+    total_ok = total_failed = 0
+    last_stale_check = 0.0
+
+    try:
+        while not _stopping:
+            now = time.monotonic()
+            if now - last_stale_check >= STALE_CHECK_INTERVAL:
+                requeued = job_queue.requeue_stale(conn)
+                if requeued:
+                    logger.warning(f"Requeued {requeued} jobs whose worker stopped responding")
+                last_stale_check = now
+
+            ok, failed = job_queue.work(conn, worker, job_types, should_stop=lambda: _stopping)
+            total_ok += ok
+            total_failed += failed
+            if ok or failed:
+                logger.info(f"Processed {ok + failed} jobs ({ok} ok, {failed} failed); "
+                            f"totals: {total_ok} ok, {total_failed} failed")
+
+            if args.once:
+                break
+            _wait_for_work(listen_conn, args.poll)
+    finally:
+        conn.close()
+        if listen_conn is not None:
+            listen_conn.close()
+
+    logger.info(f"Job worker {worker} exiting: {total_ok} ok, {total_failed} failed")
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -213,38 +213,20 @@ def run_dry_run_check():
     """
     print(f"{Colors.WARNING}Running in DRY RUN mode - simulating changes only{Colors.ENDC}\n")
 
-    # Import and mock the database operations
-    from unittest.mock import patch
     import active_session_manager
+    from database import get_db_connection
 
-    # Track what would have been changed
-    dry_run_stats = {
-        'activated': [],
-        'deactivated': [],
-        'errors': []
-    }
-
-    # Mock the activate/deactivate functions to just log
-    original_activate = active_session_manager.activate_session_instance
-    original_deactivate = active_session_manager.deactivate_session_instance
-
-    def mock_activate(session_id, instance_id, conn=None):
-        print(f"  {Colors.OKGREEN}[DRY RUN] Would activate session {session_id}, instance {instance_id}{Colors.ENDC}")
-        # Don't actually call the original function
-
-    def mock_deactivate(session_id, instance_id, conn=None):
-        print(f"  {Colors.OKCYAN}[DRY RUN] Would deactivate session {session_id}, instance {instance_id}{Colors.ENDC}")
-        # Don't actually call the original function
-
-    active_session_manager.activate_session_instance = mock_activate
-    active_session_manager.deactivate_session_instance = mock_deactivate
-
+    # Apply the transitions, report them, then roll back
+    conn = get_db_connection()
     try:
-        stats = active_session_manager.update_active_sessions()
+        stats = active_session_manager.process_due_transitions(conn, commit=False)
     finally:
-        # Restore original functions
-        active_session_manager.activate_session_instance = original_activate
-        active_session_manager.deactivate_session_instance = original_deactivate
+        conn.close()
+
+    for item in stats['activated']:
+        print(f"  {Colors.OKGREEN}[DRY RUN] Would activate session {item['session_id']}, instance {item['instance_id']}{Colors.ENDC}")
+    for item in stats['deactivated']:
+        print(f"  {Colors.OKCYAN}[DRY RUN] Would deactivate session {item['session_id']}, instance {item['instance_id']}{Colors.ENDC}")
 
     return stats
 
@@ -25,10 +25,14 @@ effects), server-generated corroborate/merge detection (§H30), presence (§F).
 """
 
 import json
+import time
 import uuid
+import hashlib
+import threading
+from collections import OrderedDict
 
 import psycopg2
-from flask import request, jsonify
+from flask import request, jsonify, Response
 from flask_login import current_user
 
 from database import (
@@ -43,8 +47,14 @@ from database import (
     extract_abc_incipit,
 )
 from auth import create_session
-from api_routes import api_login_required, segment_records_into_sets, render_abc_to_png, bytea_to_base64, match_tune_core
+from api_routes import api_login_required, segment_records_into_sets, match_tune_core
+from notation_images import image_url
 from fractional_indexing import generate_append_position, generate_position_between
+import abc_renderer
+import abc_melody
+import job_queue
+import tune_match_index
+import tune_search
 
 
 # One global LISTEN/NOTIFY channel for the whole feed (spec 024 §A4). The payload
@@ -620,20 +630,106 @@ HANDLERS = {
 # --- Endpoints ------------------------------------------------------------
 
 
-@api_login_required
-def live_op(session_instance_id):
-    """Generic op endpoint: dispatch by op_type, one atomic txn, idempotent by op_id."""
-    data = request.get_json(silent=True) or {}
+class OpInvalid(Exception):
+    """A malformed op (unknown op_type, bad op_id): a client bug, not a conflict."""
+
+
+MAX_BATCH_OPS = 100
+
+
+def _parse_op(data):
+    """(handler, op_type, normalized op_id) for an op body, or raise OpInvalid."""
     op_type = data.get("op_type")
     op_id = data.get("op_id")
     handler = HANDLERS.get(op_type)
     if handler is None:
-        return jsonify({"success": False, "error": f"unknown op_type '{op_type}'"}), 400
+        raise OpInvalid(f"unknown op_type '{op_type}'")
     if op_id is not None:
         try:
             op_id = str(uuid.UUID(str(op_id)))  # normalize/validate
         except ValueError:
-            return jsonify({"success": False, "error": "op_id must be a UUID"}), 400
+            raise OpInvalid("op_id must be a UUID")
+    return handler, op_type, op_id
+
+
+def _duplicate_ack(cur, op_id):
+    """The cached ack for an op_id that already has its event (§C), or None."""
+    cur.execute("SELECT event_id, op_type, payload FROM session_event WHERE op_id = %s", (op_id,))
+    row = cur.fetchone()
+    if not row:
+        return None
+    return {"success": True, "duplicate": True, "event_id": row[0],
+            "op_id": op_id, "op_type": row[1], **row[2]}
+
+
+def _apply_op(cur, session_instance_id, data, handler, op_type, op_id, user_id):
+    """
+    Run one op's handler and append its feed row, in the caller's transaction.
+
+    Returns:
+        (ack dict, event_id). Raises OpRejected, or UniqueViolation when a
+        concurrent retry of the same op_id inserted first.
+    """
+    payload = handler(cur, session_instance_id, data, user_id)
+
+    # Stamp the actor (person, per §D) so observers can render "Sarah added …"
+    # notices and, later, attribution colors. user_id is the audit fact; the
+    # person is what the UI shows.
+    payload["actor"] = {
+        "person_id": getattr(current_user, "person_id", None),
+        "name": (getattr(current_user, "first_name", "") or ""),
+    }
+
+    # A handler may emit a different event type than the client requested
+    # (e.g. add_tune that collapsed into a server-generated `corroborate`, §H30).
+    event_op_type = payload.pop("_op_type", op_type)
+
+    # Feed write (same txn). Truth and feed cannot diverge (§B).
+    cur.execute(
+        """
+        INSERT INTO session_event (session_instance_id, op_type, payload, op_id, created_by_user_id)
+        VALUES (%s, %s, %s, %s, %s) RETURNING event_id
+        """,
+        (session_instance_id, event_op_type, json.dumps(payload), op_id, user_id),
+    )
+    event_id = cur.fetchone()[0]
+    return {"success": True, "event_id": event_id, "op_id": op_id,
+            "op_type": event_op_type, **payload}, event_id
+
+
+def _finish_ops(cur, session_instance_id, event_ids):
+    """After a transaction's ops: claim the instance for the live editor, NOTIFY the
+    new events (one NOTIFY however many), and queue a feed snapshot."""
+    # Claim this instance for the live editor (one-way lock): once a live op lands,
+    # the legacy editor is read-only for it (spec 024 beta rollout). No-op after the
+    # first claim; an admin can reset logging_mode back to 'legacy'.
+    cur.execute(
+        "UPDATE session_instance SET logging_mode = 'live' WHERE session_instance_id = %s AND logging_mode <> 'live'",
+        (session_instance_id,),
+    )
+    # "<instance_id>:<event_id>[,<event_id>...]"; a batch of MAX_BATCH_OPS stays well
+    # under NOTIFY's 8000-byte payload limit.
+    cur.execute(
+        "SELECT pg_notify(%s, %s)",
+        (LIVE_EVENT_CHANNEL, f"{session_instance_id}:{','.join(str(e) for e in event_ids)}"),
+    )
+    if job_queue.enabled():
+        # At most one pending per instance, so an active session is snapshotted
+        # every SNAPSHOT_DELAY_SECONDS and a quiet one not at all.
+        job_queue.enqueue(
+            cur, "snapshot_session_instance", {"session_instance_id": session_instance_id},
+            dedupe_key=f"instance:{session_instance_id}", delay_seconds=SNAPSHOT_DELAY_SECONDS,
+        )
+
+
+@api_login_required
+def live_op(session_instance_id):
+    """Generic op endpoint: dispatch by op_type, one atomic txn, idempotent by op_id."""
+    data = request.get_json(silent=True) or {}
+    try:
+        handler, op_type, op_id = _parse_op(data)
+    except OpInvalid as e:
+        return jsonify({"success": False, "error": str(e)}), 400
 
     user_id = get_current_user_id()
     conn = get_db_connection()
@@ -646,66 +742,132 @@ def live_op(session_instance_id):
 
         # Idempotency fast path: a known op_id returns its cached ack (§C).
         if op_id is not None:
-            cur.execute(
-                "SELECT event_id, op_type, payload FROM session_event WHERE op_id = %s",
-                (op_id,),
-            )
-            existing = cur.fetchone()
+            existing = _duplicate_ack(cur, op_id)
             if existing:
                 cur.execute("ROLLBACK")
-                return jsonify({"success": True, "duplicate": True, "event_id": existing[0],
-                                "op_id": op_id, "op_type": existing[1], **existing[2]})
+                return jsonify(existing)
 
         try:
-            payload = handler(cur, session_instance_id, data, user_id)
+            ack, event_id = _apply_op(cur, session_instance_id, data, handler, op_type, op_id, user_id)
         except OpRejected as r:
             cur.execute("ROLLBACK")
             return jsonify({"success": False, "rejected": True, "reason": r.reason,
                             "message": r.message, "op_id": op_id, "op_type": op_type})
-
-        # Stamp the actor (person, per §D) so observers can render "Sarah added …"
-        # notices and, later, attribution colors. user_id is the audit fact; the
-        # person is what the UI shows.
-        payload["actor"] = {
-            "person_id": getattr(current_user, "person_id", None),
-            "name": (getattr(current_user, "first_name", "") or ""),
-        }
-
-        # A handler may emit a different event type than the client requested
-        # (e.g. add_tune that collapsed into a server-generated `corroborate`, §H30).
-        event_op_type = payload.pop("_op_type", op_type)
-
-        # Feed write (same txn) + NOTIFY. Truth and feed cannot diverge (§B).
-        try:
-            cur.execute(
-                """
-                INSERT INTO session_event (session_instance_id, op_type, payload, op_id, created_by_user_id)
-                VALUES (%s, %s, %s, %s, %s) RETURNING event_id
-                """,
-                (session_instance_id, event_op_type, json.dumps(payload), op_id, user_id),
-            )
         except psycopg2.errors.UniqueViolation:
             # Concurrent retry of the same op_id won the race; discard ours, return theirs.
             cur.execute("ROLLBACK")
-            cur.execute("SELECT event_id, op_type, payload FROM session_event WHERE op_id = %s", (op_id,))
-            row = cur.fetchone()
-            if row:
-                return jsonify({"success": True, "duplicate": True, "event_id": row[0],
-                                "op_id": op_id, "op_type": row[1], **row[2]})
+            existing = _duplicate_ack(cur, op_id)
+            if existing:
+                return jsonify(existing)
             raise
-        event_id = cur.fetchone()[0]
-        # Claim this instance for the live editor (one-way lock): once a live op lands,
-        # the legacy editor is read-only for it (spec 024 beta rollout). No-op after the
-        # first claim; an admin can reset logging_mode back to 'legacy'.
-        cur.execute(
-            "UPDATE session_instance SET logging_mode = 'live' WHERE session_instance_id = %s AND logging_mode <> 'live'",
-            (session_instance_id,),
-        )
-        cur.execute("SELECT pg_notify(%s, %s)", (LIVE_EVENT_CHANNEL, f"{session_instance_id}:{event_id}"))
+
+        _finish_ops(cur, session_instance_id, [event_id])
         cur.execute("COMMIT")
+        invalidate_bootstrap(session_instance_id)
+        return jsonify(ack)
+    except Exception as e:
+        try:
+            cur.execute("ROLLBACK")
+        except Exception:
+            pass
+        return jsonify({"success": False, "error": str(e)}), 500
+    finally:
+        conn.close()
+
 
-        return jsonify({"success": True, "event_id": event_id, "op_id": op_id,
-                        "op_type": event_op_type, **payload})
+def _resolve_batch_refs(data, refs):
+    """
+    Swap client temp ids ("temp-<op_id>") for the real record ids created by
+    earlier ops in the same batch. An unresolved anchor degrades to append (as
+    with a vanished anchor); an unresolved target rejects the op.
+    """
+    def is_temp(v):
+        return isinstance(v, str) and v.startswith("temp-")
+
+    data = dict(data)
+    for key in ("after_record_id", "before_record_id"):
+        if is_temp(data.get(key)):
+            data[key] = refs.get(data[key])
+    if is_temp(data.get("record_id")):
+        if data["record_id"] not in refs:
+            raise OpRejected("target_missing", "That tune was never saved.")
+        data["record_id"] = refs[data["record_id"]]
+    return data
+
+
+@api_login_required
+def live_op_batch(session_instance_id):
+    """
+    Apply an ordered list of ops in ONE transaction (the offline-queue flush).
+
+    Body: {"ops": [{op_id, op_type, ...}, ...]} (at most MAX_BATCH_OPS). Returns
+    {"success": true, "acks": [...]}, one ack per op in order, each shaped exactly
+    like live_op's response. Each op runs under its own savepoint, so a rejected or
+    failed op is undone alone and later ops still apply. Ops stay idempotent by
+    op_id, may anchor on / target an earlier op's record by its client temp id, and
+    all new events go out in a single NOTIFY.
+    """
+    data = request.get_json(silent=True) or {}
+    ops = data.get("ops")
+    if not isinstance(ops, list) or not ops:
+        return jsonify({"success": False, "error": "ops must be a non-empty list"}), 400
+    if len(ops) > MAX_BATCH_OPS:
+        return jsonify({"success": False, "error": f"at most {MAX_BATCH_OPS} ops per batch"}), 400
+
+    user_id = get_current_user_id()
+    conn = get_db_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute("BEGIN")
+        if not _instance_exists(cur, session_instance_id):
+            cur.execute("ROLLBACK")
+            return jsonify({"success": False, "error": "Session instance not found"}), 404
+
+        acks, event_ids, refs = [], [], {}
+        for op in ops:
+            if not isinstance(op, dict):
+                acks.append({"success": False, "error": "op must be an object"})
+                continue
+            try:
+                handler, op_type, op_id = _parse_op(op)
+            except OpInvalid as e:
+                acks.append({"success": False, "error": str(e),
+                             "op_id": op.get("op_id"), "op_type": op.get("op_type")})
+                continue
+
+            cur.execute("SAVEPOINT live_op")
+            try:
+                ack = _duplicate_ack(cur, op_id) if op_id is not None else None
+                if ack is None:
+                    ack, event_id = _apply_op(
+                        cur, session_instance_id, _resolve_batch_refs(op, refs),
+                        handler, op_type, op_id, user_id,
+                    )
+                    event_ids.append(event_id)
+                cur.execute("RELEASE SAVEPOINT live_op")
+            except OpRejected as r:
+                cur.execute("ROLLBACK TO SAVEPOINT live_op")
+                ack = {"success": False, "rejected": True, "reason": r.reason,
+                       "message": r.message, "op_id": op_id, "op_type": op_type}
+            except psycopg2.errors.UniqueViolation:
+                cur.execute("ROLLBACK TO SAVEPOINT live_op")
+                ack = _duplicate_ack(cur, op_id) or {
+                    "success": False, "error": "duplicate op_id", "op_id": op_id, "op_type": op_type}
+            except Exception as e:
+                cur.execute("ROLLBACK TO SAVEPOINT live_op")
+                ack = {"success": False, "error": str(e), "op_id": op_id, "op_type": op_type}
+
+            record = ack.get("record") if ack.get("success") else None
+            if op_id is not None and isinstance(record, dict) and record.get("session_instance_tune_id"):
+                refs[f"temp-{op_id}"] = record["session_instance_tune_id"]
+            acks.append(ack)
+
+        if event_ids:
+            _finish_ops(cur, session_instance_id, event_ids)
+        cur.execute("COMMIT")
+        if event_ids:
+            invalidate_bootstrap(session_instance_id)
+        return jsonify({"success": True, "acks": acks})
     except Exception as e:
         try:
             cur.execute("ROLLBACK")
@@ -735,13 +897,12 @@ def live_tune_detail(session_instance_id, tune_id):
 
         cur.execute(
             """
-            SELECT COUNT(*) FROM session_instance_tune sit
-            JOIN session_instance si ON si.session_instance_id = sit.session_instance_id
-            WHERE si.session_id = %s AND sit.tune_id = %s AND sit.record_type = 'tune' AND sit.deleted = FALSE
+            SELECT play_count FROM session_tune_play WHERE session_id = %s AND tune_id = %s
             """,
             (session_id, tune_id),
         )
-        played_here = cur.fetchone()[0]
+        row = cur.fetchone()
+        played_here = row[0] if row else 0
 
         cur.execute(
             "SELECT COUNT(*) FROM session_instance_tune WHERE tune_id = %s AND record_type = 'tune' AND deleted = FALSE",
@@ -865,34 +1026,33 @@ def _wrap_abc(notes, key, tune_type):
 
 
 def _ensure_incipit(cur, tune_id, want_full=False):
-    """Return the cached incipit image (base64), rendering it from ABC via the
+    """Return the cached incipit image's URL, rendering it from ABC via the
     abc-renderer service and caching it if missing (notation is always the service's
     job — the app never renders client-side). Optionally also render+cache the full
     image (for the drawer's incipit/full toggle). None if there's no ABC to render."""
     cur.execute(
         """
-        SELECT ts.setting_id, ts.key, ts.incipit_abc, ts.abc, ts.incipit_image, ts.image, t.tune_type
+        SELECT ts.setting_id, ts.key, ts.incipit_abc, ts.abc, ts.incipit_image_hash, ts.image_hash, t.tune_type
         FROM tune_setting ts JOIN tune t ON t.tune_id = ts.tune_id
-        WHERE ts.tune_id = %s ORDER BY (ts.incipit_image IS NULL), ts.setting_id LIMIT 1
+        WHERE ts.tune_id = %s ORDER BY (ts.incipit_image_hash IS NULL), ts.setting_id LIMIT 1
         """,
         (tune_id,),
     )
     row = cur.fetchone()
     if not row:
         return None
-    setting_id, key, incipit_abc, abc, incipit_image, image, tune_type = row
-    need_inc = incipit_image is None
-    need_full = want_full and image is None
+    setting_id, key, incipit_abc, abc, incipit_hash, image_hash, tune_type = row
+    need_inc = incipit_hash is None
+    need_full = want_full and image_hash is None
     if not need_inc and not need_full:
-        return bytea_to_base64(incipit_image)
+        return image_url(setting_id, "incipit", incipit_hash)
 
     inc_text = (incipit_abc or "").strip() or (extract_abc_incipit(abc, tune_type) if abc else "")
-    inc_png = None
-    if need_inc and inc_text:
-        inc_png = render_abc_to_png(_wrap_abc(inc_text, key, tune_type), is_incipit=True)
-    full_png = None
-    if need_full and abc:
-        full_png = render_abc_to_png(_wrap_abc(abc, key, tune_type), is_incipit=False)
+    # both images (when both are missing) go to the renderer in one round trip
+    inc_png, full_png = abc_renderer.render_many([
+        (_wrap_abc(inc_text, key, tune_type) if need_inc else None, True),
+        (_wrap_abc(abc, key, tune_type) if need_full else None, False),
+    ])
 
     sets, params = [], []
     if inc_png:
@@ -902,19 +1062,22 @@ def _ensure_incipit(cur, tune_id, want_full=False):
     if sets:
         sets.append("cache_updated_date = (NOW() AT TIME ZONE 'UTC')")
         params.append(setting_id)
-        cur.execute(f"UPDATE tune_setting SET {', '.join(sets)} WHERE setting_id = %s", params)
+        cur.execute(
+            f"UPDATE tune_setting SET {', '.join(sets)} WHERE setting_id = %s RETURNING incipit_image_hash",
+            params,
+        )
+        incipit_hash = cur.fetchone()[0]
 
-    if inc_png:
-        import base64
-        return base64.b64encode(inc_png).decode()
-    return bytea_to_base64(incipit_image)
+    return image_url(setting_id, "incipit", incipit_hash)
 
 
 @api_login_required
 def live_deep_search(session_instance_id):
     """Deep catalog search for the live screen (spec 021 §D "search deeper").
 
-    Modes: by name (default) or by ABC (`mode=abc` — matches the notation text).
+    Modes: by name (default) or by ABC (`mode=abc` — ranked by melodic similarity
+    via abc_melody, so a phrase typed in any key finds the tune; fragments too short
+    for a melody shape match the notation text).
     `type` is a hard tune-type filter (the popout); `prefer_type` is a soft sort
     preference (the set you're logging into) so matching-type tunes sort first.
     Returns rich cards: popularity, "on your list" / "in this session" flags, plays
@@ -940,40 +1103,58 @@ def live_deep_search(session_instance_id):
         session_id = srow[0]
         person_id = getattr(current_user, "person_id", None)
 
-        # SELECT-clause params first (subqueries + type_pref), then rank, then WHERE, then LIMIT.
+        # SELECT-clause params first (subqueries + type_pref), then rank, then the
+        # melody join, then WHERE, then ORDER BY, then LIMIT.
         params = [person_id, session_id, session_id, prefer_type]
+        order_params = []
         rank = "0"
+        melody_join = ""
         order = "type_pref, t.tunebook_count_cached DESC NULLS LAST, t.name"
         if q and mode == "name":
-            rank = """CASE WHEN LOWER(unaccent(t.name)) = LOWER(unaccent(%s)) THEN 1
-                           WHEN LOWER(unaccent(t.name)) LIKE LOWER(unaccent(%s)) THEN 2 ELSE 3 END"""
-            params += [q, f"{q}%"]
-            order = "type_pref, rank, t.tunebook_count_cached DESC NULLS LAST, t.name"
+            # exact, prefix, substring, then close spellings (typos) after every literal match
+            rank, rank_params = tune_search.rank_sql(q)
+            literal, literal_params = tune_search.match_sql(q, fuzzy=False)
+            similarity, similarity_params = tune_search.similarity_sql(q)
+            params += rank_params
+            order_params = literal_params + similarity_params
+            order = (f"NOT {literal}, type_pref, rank, {similarity} DESC, "
+                     "t.tunebook_count_cached DESC NULLS LAST, t.name")
+        elif q and mode == "abc" and abc_melody.searchable(q):
+            # melody shape from the n-gram index (any key, any rhythm), most similar first
+            matches = abc_melody.search(cur, q, tune_type, limit)
+            if not matches:
+                return jsonify({"success": True, "results": []})
+            rank = "melody.score"
+            melody_join = "JOIN unnest(%s::int[], %s::float8[]) AS melody(tune_id, score) ON melody.tune_id = t.tune_id"
+            params += [[m[0] for m in matches], [m[1] for m in matches]]
+            order = "melody.score DESC, type_pref, t.tunebook_count_cached DESC NULLS LAST, t.name"
 
         where = ["t.redirect_to_tune_id IS NULL"]
-        if q and mode == "abc":
-            # match the notation text (ignoring spaces, so "GED" finds "G E D")
+        if q and mode == "abc" and not melody_join:
+            # too few notes for a melody shape: match the notation text (ignoring
+            # spaces, so "GED" finds "G E D")
             where.append("EXISTS(SELECT 1 FROM tune_setting ts WHERE ts.tune_id = t.tune_id AND REPLACE(ts.abc, ' ', '') ILIKE %s)")
             params.append(f"%{q.replace(' ', '')}%")
         elif q:
-            where.append("LOWER(unaccent(t.name)) LIKE LOWER(unaccent(%s))")
-            params.append(f"%{q}%")
+            match, match_params = tune_search.match_sql(q)
+            where.append(match)
+            params += match_params
         if tune_type:
             where.append("t.tune_type = %s")
             params.append(tune_type)
+        params += order_params
         params.append(limit)
 
         sql = f"""
             SELECT t.tune_id, t.name, t.tune_type, t.tunebook_count_cached,
                    EXISTS(SELECT 1 FROM person_tune pt WHERE pt.tune_id = t.tune_id AND pt.person_id = %s) AS on_list,
                    EXISTS(SELECT 1 FROM session_tune st WHERE st.tune_id = t.tune_id AND st.session_id = %s) AS in_session,
-                   (SELECT COUNT(*) FROM session_instance_tune sit
-                      JOIN session_instance si ON si.session_instance_id = sit.session_instance_id
-                      WHERE si.session_id = %s AND sit.tune_id = t.tune_id
-                        AND sit.record_type = 'tune' AND sit.deleted = FALSE) AS played_here,
+                   COALESCE((SELECT stp.play_count FROM session_tune_play stp
+                      WHERE stp.session_id = %s AND stp.tune_id = t.tune_id), 0) AS played_here,
                    CASE WHEN t.tune_type = %s THEN 0 ELSE 1 END AS type_pref,
                    {rank} AS rank
             FROM tune t
+            {melody_join}
             WHERE {' AND '.join(where)}
             ORDER BY {order}
             LIMIT %s
@@ -987,26 +1168,26 @@ def live_deep_search(session_instance_id):
             for r in rows
         ]
 
-        # one pass for the cached incipit IMAGE + whether the tune is renderable (has
-        # ABC). Notation is rendered server-side by the abc-renderer service; the card
-        # shows the cached image inline, or lazily asks the incipit endpoint to render
+        # one pass for the cached incipit IMAGE's URL + whether the tune is renderable
+        # (has ABC). Notation is rendered server-side by the abc-renderer service; the
+        # card shows the cached image, or lazily asks the incipit endpoint to render
         # + cache it (no client-side rendering).
         if results:
             ids = [r["tune_id"] for r in results]
             cur.execute(
                 """
-                SELECT DISTINCT ON (tune_id) tune_id, incipit_image,
+                SELECT DISTINCT ON (tune_id) tune_id, setting_id, incipit_image_hash,
                        ((incipit_abc IS NOT NULL AND incipit_abc <> '') OR abc IS NOT NULL) AS can_render
                 FROM tune_setting WHERE tune_id = ANY(%s)
-                ORDER BY tune_id, (incipit_image IS NULL), setting_id
+                ORDER BY tune_id, (incipit_image_hash IS NULL), setting_id
                 """,
                 (ids,),
             )
             settings = {row[0]: row for row in cur.fetchall()}
             for r in results:
                 s = settings.get(r["tune_id"])
-                r["incipit_image"] = bytea_to_base64(s[1]) if (s and s[1]) else None
-                r["can_render"] = bool(s[2]) if s else False
+                r["incipit_image_url"] = image_url(s[1], "incipit", s[2]) if s else None
+                r["can_render"] = bool(s[3]) if s else False
 
         return jsonify({"success": True, "results": results})
     finally:
@@ -1038,6 +1219,7 @@ def live_match(session_instance_id):
         srow = cur.fetchone()
         if not srow:
             return jsonify({"success": False, "error": "Session instance not found"}), 404
+        tune_match_index.note_instance_session(session_instance_id, srow[0])
         result = match_tune_core(cur, srow[0], q, prefer_type, limit)
         return jsonify({"success": True, **result})
     finally:
@@ -1046,7 +1228,7 @@ def live_match(session_instance_id):
 
 @api_login_required
 def live_incipit(session_instance_id, tune_id):
-    """Incipit image (base64) for a tune, rendered+cached on demand via the renderer
+    """Incipit image URL for a tune, rendered+cached on demand via the renderer
     service if missing. `?kind=both` also renders the full image (drawer toggle).
     Used by the deep-search cards (lazy, background) so notation is always service-
     rendered, never client-side."""
@@ -1055,15 +1237,15 @@ def live_incipit(session_instance_id, tune_id):
     try:
         cur = conn.cursor()
         try:
-            img = _ensure_incipit(cur, tune_id, want_full=(kind == "both"))
+            url = _ensure_incipit(cur, tune_id, want_full=(kind == "both"))
             conn.commit()
         except Exception:
             try:
                 conn.rollback()
             except Exception:
                 pass
-            img = None
-        return jsonify({"success": True, "image": img})
+            url = None
+        return jsonify({"success": True, "image_url": url})
     finally:
         conn.close()
 
@@ -1086,69 +1268,250 @@ def live_issue_token():
     return jsonify({"success": True, "token": token, "token_type": "Bearer"})
 
 
+def _instance_state(cur, session_instance_id, high_water=None):
+    """
+    The shared part of the live screen's snapshot: current (non-deleted) records,
+    their segmentation into sets (as lists of record ids, so each record is
+    serialized once), instance/session metadata, and the feed high-water mark (max
+    event_id). live_bootstrap adds the per-viewer fields; record_snapshot stores it
+    in session_snapshot for bounded replays.
+
+    The mark is read (or passed in, already read) BEFORE the records, so the
+    records are at least as new as it: an op committed in between leaves the
+    state ahead of its mark, which is harmless (the client replays that op and
+    re-puts its record), never behind it with the op skipped.
+    """
+    if high_water is None:
+        cur.execute("SELECT COALESCE(MAX(event_id), 0) FROM session_event WHERE session_instance_id = %s", (session_instance_id,))
+        high_water = cur.fetchone()[0]
+
+    cur.execute(
+        f"""
+        SELECT {_RECORD_COLS} {_RECORD_FROM}
+        WHERE sit.session_instance_id = %s AND sit.deleted = FALSE
+        ORDER BY sit.order_position
+        """,
+        (session_instance_id,),
+    )
+    rows = cur.fetchall()
+    records = [_record_to_dict(r) for r in rows]
+    # record_type is index 4 in _RECORD_COLS; segment into sets, dropping breaks.
+    sets = [[r[0] for r in s] for s in segment_records_into_sets(rows, type_index=4)]
+
+    cur.execute(
+        """
+        SELECT si.session_id, si.comments, si.log_complete_date, si.date, s.name, s.path, s.timezone
+        FROM session_instance si JOIN session s ON s.session_id = si.session_id
+        WHERE si.session_instance_id = %s
+        """,
+        (session_instance_id,),
+    )
+    meta = cur.fetchone()
+    session_date = meta[3].strftime("%a · %b %-d, %Y") if meta and meta[3] else ""
+
+    return {
+        "session_instance_id": int(session_instance_id),
+        "session_timezone": meta[6] if meta else None,
+        "session_id": meta[0] if meta else None,
+        "notes": meta[1] if meta else None,
+        "log_complete": bool(meta[2]) if meta else False,
+        "session_name": meta[4] if meta else "",
+        "session_path": meta[5] if meta else None,
+        "session_date": session_date,
+        "records": records,
+        "sets": sets,
+        "last_event_id": high_water,
+    }
+
+
+# --- Bootstrap cache ---------------------------------------------------------
+# Everyone opens the live screen at once when a session starts, and the state only
+# changes when an event is appended, so each process keeps the serialized instance
+# state keyed on the instance's high-water event_id. A request costs one cheap
+# MAX(event_id) lookup; a new event (from any process) is a miss. live_op also
+# drops its own process's entry on commit. The TTL bounds staleness from writes
+# that don't append an event (a session rename, the legacy editor before the
+# live editor claims the instance).
+
+BOOTSTRAP_CACHE_SIZE = 64
+BOOTSTRAP_CACHE_TTL_SECONDS = 60
+
+# instance_id -> (high_water, built_at, state JSON text, state digest)
+_bootstrap_cache = OrderedDict()
+_bootstrap_lock = threading.Lock()
+
+
+def _cached_state(session_instance_id, high_water):
+    with _bootstrap_lock:
+        entry = _bootstrap_cache.get(session_instance_id)
+        if entry is None:
+            return None
+        if entry[0] != high_water or time.monotonic() - entry[1] > BOOTSTRAP_CACHE_TTL_SECONDS:
+            del _bootstrap_cache[session_instance_id]
+            return None
+        _bootstrap_cache.move_to_end(session_instance_id)
+        return entry
+
+
+def _store_state(session_instance_id, state):
+    text = json.dumps(state, separators=(",", ":"))
+    entry = (state["last_event_id"], time.monotonic(), text, hashlib.sha1(text.encode()).hexdigest()[:16])
+    with _bootstrap_lock:
+        _bootstrap_cache[session_instance_id] = entry
+        _bootstrap_cache.move_to_end(session_instance_id)
+        while len(_bootstrap_cache) > BOOTSTRAP_CACHE_SIZE:
+            _bootstrap_cache.popitem(last=False)
+    return entry
+
+
+def invalidate_bootstrap(session_instance_id):
+    """Drop this process's cached bootstrap state for an instance."""
+    with _bootstrap_lock:
+        _bootstrap_cache.pop(session_instance_id, None)
+
+
 @api_login_required
 def live_bootstrap(session_instance_id):
     """
     Bootstrap snapshot for the live screen (spec 024 §H).
 
-    Current (non-deleted) records, both flat and segmented into sets, plus the
-    feed high-water mark (max event_id). The client renders this, then opens the
-    SSE stream with that mark so it receives only the delta.
+    Current (non-deleted) records plus their set segmentation (record ids), and
+    the feed high-water mark (max event_id). The client renders this, then opens
+    the SSE stream with that mark so it receives only the delta.
+
+    Served from the per-process bootstrap cache with an ETag; a matching
+    If-None-Match gets a 304 (the browser revalidates on every load).
     """
     conn = get_db_connection()
     try:
         cur = conn.cursor()
-        if not _instance_exists(cur, session_instance_id):
-            return jsonify({"success": False, "error": "Session instance not found"}), 404
-
-        cur.execute(
-            f"""
-            SELECT {_RECORD_COLS} {_RECORD_FROM}
-            WHERE sit.session_instance_id = %s AND sit.deleted = FALSE
-            ORDER BY sit.order_position
-            """,
-            (session_instance_id,),
-        )
-        rows = cur.fetchall()
-        records = [_record_to_dict(r) for r in rows]
-        # record_type is index 4 in _RECORD_COLS; segment into sets, dropping breaks.
-        sets = [[_record_to_dict(r) for r in s] for s in segment_records_into_sets(rows, type_index=4)]
-
         cur.execute(
             """
-            SELECT si.session_id, si.comments, si.log_complete_date, si.date, s.name, s.path, s.timezone
-            FROM session_instance si JOIN session s ON s.session_id = si.session_id
-            WHERE si.session_instance_id = %s
+            SELECT (SELECT COALESCE(MAX(event_id), 0) FROM session_event
+                    WHERE session_instance_id = si.session_instance_id)
+            FROM session_instance si WHERE si.session_instance_id = %s
             """,
             (session_instance_id,),
         )
-        meta = cur.fetchone()
-        session_date = meta[3].strftime("%a · %b %-d, %Y") if meta and meta[3] else ""
-
-        cur.execute("SELECT COALESCE(MAX(event_id), 0) FROM session_event WHERE session_instance_id = %s", (session_instance_id,))
-        high_water = cur.fetchone()[0]
+        row = cur.fetchone()
+        if row is None:
+            return jsonify({"success": False, "error": "Session instance not found"}), 404
 
-        return jsonify({
-            "success": True,
-            "session_instance_id": int(session_instance_id),
-            "current_person": {
-                "person_id": getattr(current_user, "person_id", None),
-                "first_name": getattr(current_user, "first_name", ""),
-                "last_name": getattr(current_user, "last_name", ""),
-            },
-            # Display tz for "logged at" times: viewer's own tz wins, session tz is
-            # the fallback (mirrors the app's format_datetime_tz precedence).
-            "user_timezone": getattr(current_user, "timezone", None),
-            "session_timezone": meta[6] if meta else None,
-            "session_id": meta[0] if meta else None,
-            "notes": meta[1] if meta else None,
-            "log_complete": bool(meta[2]) if meta else False,
-            "session_name": meta[4] if meta else "",
-            "session_path": meta[5] if meta else None,
-            "session_date": session_date,
-            "records": records,
-            "sets": sets,
-            "last_event_id": high_water,
-        })
+        entry = _cached_state(session_instance_id, row[0])
+        if entry is None:
+            # Built at the mark just looked up, so it is cached under that key.
+            entry = _store_state(session_instance_id, _instance_state(cur, session_instance_id, high_water=row[0]))
     finally:
         conn.close()
+
+    viewer = json.dumps({
+        "success": True,
+        "current_person": {
+            "person_id": getattr(current_user, "person_id", None),
+            "first_name": getattr(current_user, "first_name", ""),
+            "last_name": getattr(current_user, "last_name", ""),
+        },
+        # Display tz for "logged at" times: viewer's own tz wins, session tz is
+        # the fallback (mirrors the app's format_datetime_tz precedence).
+        "user_timezone": getattr(current_user, "timezone", None),
+    }, separators=(",", ":"))
+    high_water, _, state_text, state_digest = entry
+    viewer_digest = hashlib.sha1(viewer.encode()).hexdigest()[:8]
+    etag = f"{session_instance_id}-{high_water}-{state_digest}-{viewer_digest}"
+
+    if request.if_none_match.contains(etag):
+        resp = Response(status=304)
+    else:
+        # Splice the shared state text onto the per-viewer fields (both are
+        # JSON objects) rather than re-serializing the records per request.
+        resp = Response(viewer[:-1] + "," + state_text[1:], mimetype="application/json")
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "private, no-cache"
+    return resp
+
+
+# --- Feed snapshots / compaction (bounded replay, schema 028) --------------
+# A reconnecting client far behind (or past compacted events) gets the latest
+# session_snapshot plus the events after it instead of the whole op log; see
+# the streaming service's replay. Snapshots are taken by the job worker a few
+# minutes into a burst of ops (live_op enqueues one per instance, deduplicated)
+# and by jobs/compact_session_events.py, which also folds old events away.
+
+SNAPSHOT_DELAY_SECONDS = 300
+# Events this recent aren't covered by a new snapshot: a lower event_id can still
+# be uncommitted while a higher one is visible, and a snapshot must not claim to
+# include it. Its state being AHEAD of its event_id is harmless (replayed ops
+# just re-put records).
+SNAPSHOT_SETTLE_SECONDS = 10
+EVENT_RETENTION_DAYS = 7  # also bounds op_id idempotency for very late retries
+
+
+def record_snapshot(cur, session_instance_id):
+    """
+    Store the instance's current state in session_snapshot, at the newest settled
+    event. Caller commits; run it in its own REPEATABLE READ transaction so the
+    records and the event mark come from one database snapshot.
+
+    Returns:
+        The snapshot's event_id, or None if there was nothing new to cover
+    """
+    cur.execute(
+        """
+        SELECT MAX(event_id) FROM session_event
+        WHERE session_instance_id = %s
+          AND server_ts <= (NOW() AT TIME ZONE 'UTC') - make_interval(secs => %s)
+        """,
+        (session_instance_id, SNAPSHOT_SETTLE_SECONDS),
+    )
+    event_id = cur.fetchone()[0]
+    if event_id is None:
+        return None
+    cur.execute("SELECT event_id FROM session_snapshot WHERE session_instance_id = %s", (session_instance_id,))
+    row = cur.fetchone()
+    if row and row[0] >= event_id:
+        return None
+
+    state = _instance_state(cur, session_instance_id, high_water=event_id)
+    cur.execute(
+        """
+        INSERT INTO session_snapshot (session_instance_id, event_id, payload)
+        VALUES (%s, %s, %s)
+        ON CONFLICT (session_instance_id) DO UPDATE
+        SET event_id = EXCLUDED.event_id, payload = EXCLUDED.payload,
+            created_date = (NOW() AT TIME ZONE 'UTC')
+        WHERE session_snapshot.event_id < EXCLUDED.event_id
+        """,
+        (session_instance_id, event_id, json.dumps(state)),
+    )
+    return event_id
+
+
+def compact_events(cur, session_instance_id, retention_days=EVENT_RETENTION_DAYS):
+    """
+    Fold events already covered by the instance's snapshot and older than
+    retention_days into it: delete them and advance compacted_through, so
+    clients whose cursor is older are sent the snapshot. Caller commits.
+
+    Returns:
+        Number of events deleted
+    """
+    cur.execute(
+        """
+        WITH folded AS (
+            DELETE FROM session_event e
+            USING session_snapshot snap
+            WHERE snap.session_instance_id = %s
+              AND e.session_instance_id = snap.session_instance_id
+              AND e.event_id <= snap.event_id
+              AND e.server_ts < (NOW() AT TIME ZONE 'UTC') - make_interval(days => %s)
+            RETURNING e.event_id
+        )
+        UPDATE session_snapshot
+        SET compacted_through = GREATEST(compacted_through, (SELECT MAX(event_id) FROM folded))
+        WHERE session_instance_id = %s AND EXISTS (SELECT 1 FROM folded)
+        RETURNING (SELECT COUNT(*) FROM folded)
+        """,
+        (session_instance_id, retention_days, session_instance_id),
+    )
+    row = cur.fetchone()
+    return row[0] if row else 0
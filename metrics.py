@@ -0,0 +1,524 @@
+"""
+Request, SQL and process metrics, served at /metrics in the Prometheus text format.
+
+The web app records, per route (the URL rule, e.g. /api/sessions/<path:session_path>):
+
+  - ceol_http_request_duration_seconds   latency histogram
+  - ceol_http_requests_total             requests by status
+  - ceol_db_queries_per_request          queries each request ran (histogram)
+  - ceol_db_query_seconds_total          time spent in cursor.execute
+  - ceol_db_repeated_queries_total       N+1 flags, by the function issuing the query
+
+Queries are counted by TimedCursor, the cursor_factory of every connection
+database._connect opens. A statement run METRICS_N_PLUS_ONE_THRESHOLD or more
+times in one request (a query inside a loop) is logged once per request with
+the function that ran it, and a request slower than METRICS_SLOW_REQUEST_MS is
+logged with its query count and time.
+
+Counts are kept per process. Under gunicorn (gunicorn_config.py sets
+METRICS_MULTIPROC_DIR) each worker also writes its counts to a file there every
+few seconds, and whichever worker answers a scrape adds up every worker's, plus
+the final counts of workers that have exited, so a scrape sees the whole
+service and recycled workers don't reset counters or add series. Without the
+directory (`flask run`) the series carry a `pid` label instead. The streaming
+service (streaming/service.py) keeps its own Registry and serves it the same way.
+
+Configuration (environment):
+    METRICS_TOKEN                  /metrics requires `Authorization: Bearer <token>`; unset, it
+                                   answers loopback clients only (local runs, the benchmark)
+    METRICS_MULTIPROC_DIR          where workers share their counts (set by gunicorn_config.py)
+    METRICS_FLUSH_SECONDS          how often a worker writes its counts there (default 5)
+    METRICS_N_PLUS_ONE_THRESHOLD   same statement this many times in a request is flagged (default 10, 0 = off)
+    METRICS_SLOW_REQUEST_MS        requests slower than this are logged (default 1000, 0 = off)
+"""
+
+import os
+import sys
+import hmac
+import json
+import math
+import time
+import fcntl
+import logging
+import ipaddress
+import threading
+
+import psycopg2.extensions
+from flask import Response, g, has_request_context, request
+
+logger = logging.getLogger(__name__)
+
+N_PLUS_ONE_THRESHOLD = int(os.environ.get("METRICS_N_PLUS_ONE_THRESHOLD", 10))
+SLOW_REQUEST_SECONDS = float(os.environ.get("METRICS_SLOW_REQUEST_MS", 1000)) / 1000
+MULTIPROCESS_DIR = os.environ.get("METRICS_MULTIPROC_DIR") or None
+FLUSH_SECONDS = float(os.environ.get("METRICS_FLUSH_SECONDS", 5))
+
+# Seconds; from a cached lookup to a slow thesession.org fetch or render.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# --- Metric types -----------------------------------------------------------
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}  # label values tuple -> value
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def snapshot(self):
+        """{label values tuple: value}, a consistent copy."""
+        with self._lock:
+            return {key: list(value) if isinstance(value, list) else value for key, value in self._values.items()}
+
+    def samples(self, values=None):
+        """[(sample name, ((label, value), ...), value)] of `values` (default: this process's)."""
+        values = self.snapshot() if values is None else values
+        return [(self.name, tuple(zip(self.labelnames, key)), value) for key, value in values.items()]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                # per-bucket (not cumulative) counts, then sum
+                counts = self._values[key] = [0] * len(self.buckets) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            counts[-1] += value
+
+    def count(self, **labels):
+        with self._lock:
+            counts = self._values.get(self._key(labels))
+            return sum(counts[:-1]) if counts else 0
+
+    def samples(self, values=None):
+        values = self.snapshot() if values is None else values
+        out = []
+        for key, counts in values.items():
+            labels = tuple(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                out.append((self.name + "_bucket", labels + (("le", _format_value(float(bound))),), cumulative))
+            out.append((self.name + "_sum", labels, counts[-1]))
+            out.append((self.name + "_count", labels, cumulative))
+        return out
+
+
+def _add_values(total, values):
+    """Add one process's {key: value} into `total` (histogram counts element-wise)."""
+    for key, value in values.items():
+        current = total.get(key)
+        if current is None:
+            total[key] = list(value) if isinstance(value, list) else value
+        elif isinstance(current, list):
+            total[key] = [a + b for a, b in zip(current, value)]
+        else:
+            total[key] = current + value
+
+
+class Registry:
+    """A set of metrics rendered together. Collectors run at each render, to set
+    gauges from state owned elsewhere (pool occupancy, connected clients)."""
+
+    def __init__(self, per_process=False, multiprocess_dir=None):
+        self.per_process = per_process  # add a pid label to every sample
+        # shared with the other workers; then samples are totals and have no pid label
+        self.workers = _WorkerFiles(multiprocess_dir) if multiprocess_dir else None
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def on_collect(self, fn):
+        self._collectors.append(fn)
+        return fn
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def snapshot(self):
+        """{metric name: {"kind", "values"}} of this process, as JSON-ready lists."""
+        return {
+            metric.name: {"kind": metric.kind, "values": [[list(key), value] for key, value in metric.snapshot().items()]}
+            for metric in self._metrics
+        }
+
+    def flush(self):
+        """Write this process's counts for the other workers' scrapes."""
+        if self.workers is not None:
+            self.workers.write(os.getpid(), self.snapshot())
+
+    def _totals(self):
+        """{metric name: {key: value}} summed over every worker, this one live."""
+        totals = {}
+        for snapshot in self.workers.read(os.getpid()):
+            for name, entry in snapshot.items():
+                _add_values(totals.setdefault(name, {}), {tuple(key): value for key, value in entry["values"]})
+        for metric in self._metrics:
+            _add_values(totals.setdefault(metric.name, {}), metric.snapshot())
+        return totals
+
+    def render(self):
+        for fn in self._collectors:
+            try:
+                fn()
+            except Exception:
+                logger.exception("metrics collector %s failed", getattr(fn, "__name__", fn))
+        totals = self._totals() if self.workers is not None else {}
+        extra = (("pid", str(os.getpid())),) if self.per_process and self.workers is None else ()
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples(totals.get(metric.name)):
+                labels = labels + extra
+                if labels:
+                    name += "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+                lines.append(f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class _WorkerFiles:
+    """
+    Per-worker snapshots in a directory shared by a gunicorn master's workers:
+    <pid>.json for each worker (rewritten every FLUSH_SECONDS and as it exits)
+    and exited.json, the counters and histograms of workers that are gone. A
+    reader folds dead workers' files into exited.json, so totals stay monotonic
+    across worker recycling; their gauges (pool occupancy etc.) are dropped.
+    """
+
+    EXITED = "exited.json"
+
+    def __init__(self, path):
+        self.path = path
+
+    def clear(self):
+        """Start empty (the master, before forking workers)."""
+        os.makedirs(self.path, exist_ok=True)
+        for name in os.listdir(self.path):
+            if name.endswith((".json", ".tmp")):
+                os.remove(os.path.join(self.path, name))
+
+    def write(self, pid, snapshot, name=None):
+        name = name or f"{pid}.json"
+        os.makedirs(self.path, exist_ok=True)
+        tmp = os.path.join(self.path, f".{name}.{threading.get_ident()}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(snapshot, f, separators=(",", ":"))
+        os.replace(tmp, os.path.join(self.path, name))  # readers never see half a file
+
+    def _load(self, name):
+        try:
+            with open(os.path.join(self.path, name)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def read(self, own_pid):
+        """Snapshots of the exited workers (one, combined) and the other live ones."""
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, ".lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)  # two scrapes must not both fold a dead worker
+            exited = self._load(self.EXITED) or {}
+            live = []
+            folded = False
+            for name in os.listdir(self.path):
+                if not name.endswith(".json") or name == self.EXITED or name == f"{own_pid}.json":
+                    continue
+                snapshot = self._load(name)
+                if snapshot is None:
+                    continue
+                if _pid_alive(int(name[:-5])):
+                    live.append(snapshot)
+                    continue
+                for metric, entry in snapshot.items():
+                    if entry["kind"] == "gauge":
+                        continue
+                    target = exited.setdefault(metric, {"kind": entry["kind"], "values": []})
+                    values = {tuple(key): value for key, value in target["values"]}
+                    _add_values(values, {tuple(key): value for key, value in entry["values"]})
+                    target["values"] = [[list(key), value] for key, value in values.items()]
+                os.remove(os.path.join(self.path, name))
+                folded = True
+            if folded:
+                self.write(own_pid, exited, name=self.EXITED)
+        return [exited] + live
+
+
+def clear_worker_files(path):
+    """Empty a METRICS_MULTIPROC_DIR before its workers start (gunicorn on_starting)."""
+    _WorkerFiles(path).clear()
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def authorized(authorization_header, client_address=None):
+    """
+    Whether a scrape may read metrics: with the METRICS_TOKEN bearer token, or,
+    when no token is configured, only from loopback (a local run or the
+    benchmark), so a deploy that forgot the token doesn't publish its metrics.
+    """
+    token = os.environ.get("METRICS_TOKEN")
+    if token:
+        return hmac.compare_digest(authorization_header or "", f"Bearer {token}")
+    try:
+        return ipaddress.ip_address(client_address or "").is_loopback
+    except ValueError:
+        return False
+
+
+# --- Web app ----------------------------------------------------------------
+
+REGISTRY = Registry(per_process=True, multiprocess_dir=MULTIPROCESS_DIR)
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    "ceol_http_request_duration_seconds", "Time to handle a request, by URL rule.", ("method", "route")
+)
+REQUESTS = REGISTRY.counter("ceol_http_requests_total", "Requests handled, by URL rule and status.", ("method", "route", "status"))
+REQUEST_QUERIES = REGISTRY.histogram(
+    "ceol_db_queries_per_request", "Queries executed while handling a request.", ("route",), QUERY_COUNT_BUCKETS
+)
+QUERY_SECONDS = REGISTRY.counter("ceol_db_query_seconds_total", "Time spent executing queries, by URL rule.", ("route",))
+REPEATED_QUERIES = REGISTRY.counter(
+    "ceol_db_repeated_queries_total",
+    "Requests that ran one statement at least METRICS_N_PLUS_ONE_THRESHOLD times (likely N+1).",
+    ("route", "caller"),
+)
+POOL_CONNECTIONS = REGISTRY.gauge("ceol_db_pool_connections", "Pooled connections by state (db_pool).", ("state",))
+POOL_EVENTS = REGISTRY.gauge("ceol_db_pool_events", "db_pool counters since the worker started.", ("event",))
+RENDER_CACHE = REGISTRY.gauge("ceol_abc_render_cache", "In-memory rendered PNG cache (abc_renderer).", ("field",))
+
+
+class _RequestStats:
+    __slots__ = ("started", "queries", "query_seconds", "statements")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.statements = {}  # statement -> [times run, function that first ran it]
+
+
+class TimedCursor(psycopg2.extensions.cursor):
+    """Counts and times every statement against the current request, if any."""
+
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            _record_query(query, time.perf_counter() - started)
+
+    def executemany(self, query, vars_list):
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            _record_query(query, time.perf_counter() - started)
+
+
+def _record_query(query, seconds):
+    if not has_request_context():
+        return
+    stats = g.get("_metrics")
+    if stats is None:
+        return
+    stats.queries += 1
+    stats.query_seconds += seconds
+    key = query if isinstance(query, (str, bytes)) else repr(query)  # sql.Composed isn't hashable
+    seen = stats.statements.get(key)
+    if seen is not None:
+        seen[0] += 1
+        return
+    # Who ran it: the frame that called TimedCursor.execute. Looked up once per
+    # distinct statement, so a loop pays for it on its first query only.
+    frame = sys._getframe(2)
+    stats.statements[key] = [1, f"{frame.f_code.co_name} ({os.path.basename(frame.f_code.co_filename)})"]
+
+
+def _start_request():
+    if REGISTRY.workers is not None and not _flusher_started:
+        _start_flusher()
+    g._metrics = _RequestStats()
+
+
+def _record_status(response):
+    g._metrics_status = response.status_code
+    return response
+
+
+def _finish_request(exc=None):
+    stats = g.pop("_metrics", None)
+    if stats is None:
+        return
+    elapsed = time.perf_counter() - stats.started
+    status = g.pop("_metrics_status", 500)
+    route = request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+    method = request.method
+
+    REQUEST_SECONDS.observe(elapsed, method=method, route=route)
+    REQUESTS.inc(method=method, route=route, status=status)
+    REQUEST_QUERIES.observe(stats.queries, route=route)
+    if stats.queries:
+        QUERY_SECONDS.inc(stats.query_seconds, route=route)
+
+    if N_PLUS_ONE_THRESHOLD:
+        for statement, (times, caller) in stats.statements.items():
+            if times >= N_PLUS_ONE_THRESHOLD:
+                REPEATED_QUERIES.inc(route=route, caller=caller)
+                text = statement.decode(errors="replace") if isinstance(statement, bytes) else statement
+                logger.warning(
+                    "Possible N+1: %s %s ran the same query %d times from %s: %s",
+                    method, route, times, caller, " ".join(text.split())[:200],
+                )
+    if SLOW_REQUEST_SECONDS and elapsed >= SLOW_REQUEST_SECONDS:
+        logger.warning(
+            "Slow request: %s %s took %.0fms (%d queries, %.0fms in the database)",
+            method, request.path, elapsed * 1000, stats.queries, stats.query_seconds * 1000,
+        )
+
+
+# --- Sharing counts between workers -----------------------------------------
+
+_flusher_started = False
+_flusher_lock = threading.Lock()
+
+
+def _start_flusher():
+    """Write this worker's counts every FLUSH_SECONDS (started on its first request)."""
+    global _flusher_started
+    with _flusher_lock:
+        if _flusher_started:
+            return
+        _flusher_started = True
+    threading.Thread(target=_flush_forever, name="metrics-flusher", daemon=True).start()
+
+
+def _flush_forever():
+    while True:
+        time.sleep(FLUSH_SECONDS)
+        try:
+            REGISTRY.flush()
+        except Exception:
+            logger.exception("metrics flush failed")
+
+
+def _after_fork_in_child():
+    """The flusher thread doesn't survive a fork; a worker starts its own."""
+    global _flusher_started, _flusher_lock
+    _flusher_started = False
+    _flusher_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+@REGISTRY.on_collect
+def _collect_process_stats():
+    import db_pool
+
+    pool = db_pool.get_pool_stats()
+    if pool is not None:
+        POOL_CONNECTIONS.set(pool["idle"], state="idle")
+        POOL_CONNECTIONS.set(pool["in_use"], state="in_use")
+        for event in ("checkouts", "waits", "wait_seconds", "exhausted", "created", "discarded", "health_check_failures"):
+            POOL_EVENTS.set(pool[event], event=event)
+    # Only if something in this worker has rendered; don't import it just to report zeros.
+    abc_renderer = sys.modules.get("abc_renderer")
+    if abc_renderer is not None:
+        for field, value in abc_renderer.cache_stats().items():
+            RENDER_CACHE.set(value, field=field)
+
+
+def init_app(app):
+    """Record every request's latency and queries, and serve GET /metrics."""
+    app.before_request(_start_request)
+    app.after_request(_record_status)
+    app.teardown_request(_finish_request)
+    app.add_url_rule("/metrics", "metrics", metrics_view)
+
+
+def metrics_view():
+    """GET /metrics: the service's metrics (or this process's) in the Prometheus text format."""
+    if not authorized(request.headers.get("Authorization"), request.remote_addr):
+        return Response("unauthorized\n", status=401, mimetype="text/plain")
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
@@ -0,0 +1,95 @@
+"""
+Rendered notation images (tune_setting.image / incipit_image) as cacheable URLs.
+
+The detail and search APIs used to inline each PNG as base64 in their JSON, a
+third bigger than the PNG and never cacheable by the browser. They now return a
+URL instead:
+
+    /api/tune-settings/<setting_id>/<kind>/<hash>.png    kind: full | incipit
+
+where <hash> is the content hash kept by the database (the image_hash /
+incipit_image_hash generated columns from schema/035_tune_setting_image_hash.sql).
+A re-render changes the hash and therefore the URL, so a URL's bytes never change:
+responses carry the hash as a strong ETag and `Cache-Control: immutable`, and a
+revalidation is answered 304 without touching the database.
+"""
+
+from flask import Response, redirect, request
+
+from database import get_db_connection
+
+# URL kind -> (image column, hash column)
+KINDS = {
+    "full": ("image", "image_hash"),
+    "incipit": ("incipit_image", "incipit_image_hash"),
+}
+
+# A year, the longest max-age caches honour.
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+def image_url(setting_id, kind, image_hash):
+    """URL of a setting's rendered image, or None if it hasn't been rendered."""
+    if not (setting_id and image_hash):
+        return None
+    return f"/api/tune-settings/{setting_id}/{kind}/{image_hash}.png"
+
+
+def image_bytes(data):
+    """
+    The PNG bytes of a stored image.
+    Handles the formats the column comes back in: bytes, memoryview, '\\x' hex string.
+    """
+    if not data:
+        return None
+    if isinstance(data, memoryview):
+        return data.tobytes()
+    if isinstance(data, str):
+        # psycopg2.Binary written into the TEXT column lands as its hex form
+        if data.startswith('\\x'):
+            return bytes.fromhex(data[2:])
+        return data.encode('latin1')
+    return bytes(data)
+
+
+def get_notation_image(setting_id, kind, image_hash):
+    """
+    GET /api/tune-settings/<setting_id>/<kind>/<hash>.png
+
+    The rendered PNG for a setting. A stale hash (the setting was re-rendered
+    since the URL was handed out) redirects to the current image.
+    """
+    if kind not in KINDS:
+        return Response(status=404)
+    if request.if_none_match.contains_weak(image_hash):
+        # The URL names the content, so a client holding this hash holds the bytes
+        return _immutable(Response(status=304), image_hash)
+
+    image_column, hash_column = KINDS[kind]
+    conn = get_db_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute(
+            f"SELECT {hash_column}, {image_column} FROM tune_setting WHERE setting_id = %s",
+            (setting_id,),
+        )
+        row = cur.fetchone()
+    finally:
+        conn.close()
+
+    if not row or not row[0]:
+        return Response(status=404)
+    current_hash, data = row
+    if current_hash != image_hash:
+        resp = redirect(image_url(setting_id, kind, current_hash))
+        resp.headers["Cache-Control"] = "no-cache"
+        return resp
+
+    resp = Response(image_bytes(data), mimetype="image/png")
+    return _immutable(resp, image_hash)
+
+
+def _immutable(resp, image_hash):
+    resp.set_etag(image_hash)
+    resp.headers["Cache-Control"] = f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+    return resp
@@ -6,14 +6,14 @@ Handles S3 upload/download and audio file chunking for session recordings.
 import os
 import hashlib
 import tempfile
-import boto3
-from botocore.exceptions import ClientError
 
 CHUNK_DURATION_MS = 30000  # 30 seconds
 
 
 def get_s3_client():
     """Create and return an S3 client using environment variables."""
+    import boto3  # deferred: boto3 costs ~100ms to import and few requests touch S3
+
     return boto3.client(
         "s3",
         aws_access_key_id=os.environ.get("AWS_ACCESS_KEY_ID"),
@@ -5,8 +5,9 @@ Handles parsing, validation, and calculation of session recurrence patterns.
 """
 
 import json
+import functools
 from datetime import datetime, date, time, timedelta
-from typing import List, Dict, Optional, Tuple
+from typing import Iterable, List, Dict, Optional, Tuple
 import calendar
 try:
     from zoneinfo import ZoneInfo
@@ -31,6 +32,9 @@ WEEKDAY_TO_ISO = {
 # Mapping from ISO weekday to name
 ISO_TO_WEEKDAY = {v: k for k, v in WEEKDAY_TO_ISO.items()}
 
+# Distinct recurrence JSON texts kept parsed by parse_recurrence
+RECURRENCE_CACHE_SIZE = 1024
+
 
 class RecurrenceSchedule:
     """Represents one schedule pattern within a recurrence."""
@@ -137,18 +141,14 @@ class RecurrenceSchedule:
         search_date = after_dt.date() + timedelta(days=1)
         max_date = search_date + timedelta(days=365)  # Search up to 1 year ahead
 
-        while search_date <= max_date:
-            # Check if this date matches the pattern
-            if self._date_matches_pattern(search_date, reference_date):
-                # Construct datetime with start time
-                next_dt = datetime.combine(search_date, self.start_time)
-                next_dt = next_dt.replace(tzinfo=timezone)
-
-                # Make sure it's actually after after_dt
-                if next_dt > after_dt:
-                    return next_dt
+        for occurrence_date in self._iter_dates(search_date, max_date, reference_date):
+            # Construct datetime with start time
+            next_dt = datetime.combine(occurrence_date, self.start_time)
+            next_dt = next_dt.replace(tzinfo=timezone)
 
-            search_date += timedelta(days=1)
+            # Make sure it's actually after after_dt
+            if next_dt > after_dt:
+                return next_dt
 
         return None
 
@@ -172,19 +172,14 @@ class RecurrenceSchedule:
             List of (start_datetime, end_datetime) tuples for each occurrence
         """
         occurrences = []
-        current_date = start_date
-
-        while current_date <= end_date:
-            if self._date_matches_pattern(current_date, reference_date):
-                start_dt = datetime.combine(current_date, self.start_time)
-                start_dt = start_dt.replace(tzinfo=timezone)
+        for occurrence_date in self._iter_dates(start_date, end_date, reference_date):
+            start_dt = datetime.combine(occurrence_date, self.start_time)
+            start_dt = start_dt.replace(tzinfo=timezone)
 
-                end_dt = datetime.combine(current_date, self.end_time)
-                end_dt = end_dt.replace(tzinfo=timezone)
+            end_dt = datetime.combine(occurrence_date, self.end_time)
+            end_dt = end_dt.replace(tzinfo=timezone)
 
-                occurrences.append((start_dt, end_dt))
-
-            current_date += timedelta(days=1)
+            occurrences.append((start_dt, end_dt))
 
         return occurrences
 
@@ -265,28 +260,55 @@ class RecurrenceSchedule:
         Returns:
             1-4 for first through fourth occurrence, -1 for last occurrence
         """
-        # Get all occurrences of this weekday in this month
-        year = check_date.year
-        month = check_date.month
-        target_isoweekday = WEEKDAY_TO_ISO[self.weekday]
+        if check_date.isoweekday() != WEEKDAY_TO_ISO[self.weekday]:
+            return 0  # Not this weekday
 
-        occurrences = []
-        for day in range(1, calendar.monthrange(year, month)[1] + 1):
-            d = date(year, month, day)
-            if d.isoweekday() == target_isoweekday:
-                occurrences.append(d)
+        # Check if it's the last occurrence (no same weekday a week later this month)
+        if check_date.day + 7 > calendar.monthrange(check_date.year, check_date.month)[1]:
+            return -1
 
-        # Find position
-        try:
-            position = occurrences.index(check_date) + 1  # 1-indexed
-        except ValueError:
-            return 0  # Not found
+        return (check_date.day - 1) // 7 + 1
 
-        # Check if it's the last occurrence
-        if position == len(occurrences):
-            return -1
+    def _iter_dates(self, start_date: date, end_date: date, reference_date: Optional[date] = None):
+        """
+        Yield the dates matching this schedule's pattern within a range, in order.
+
+        Computed directly (first matching weekday, then fixed steps; per month for
+        nth-weekday rules) rather than by testing each day; yields exactly the
+        dates _date_matches_pattern accepts.
 
-        return position
+        Args:
+            start_date: Start of range (inclusive)
+            end_date: End of range (inclusive)
+            reference_date: Reference date for week interval calculations
+        """
+        target_isoweekday = WEEKDAY_TO_ISO[self.weekday]
+
+        if self.type == "weekly":
+            current = start_date + timedelta(days=(target_isoweekday - start_date.isoweekday()) % 7)
+            step = 1
+            if self.every_n_weeks > 1 and reference_date is not None:
+                # (current + 7k - reference).days // 7 == weeks + k; advance k to a multiple of n
+                weeks = (current - reference_date).days // 7
+                current += timedelta(weeks=(-weeks) % self.every_n_weeks)
+                step = self.every_n_weeks
+            while current <= end_date:
+                yield current
+                current += timedelta(weeks=step)
+
+        elif self.type == "monthly_nth_weekday":
+            year, month = start_date.year, start_date.month
+            while date(year, month, 1) <= end_date:
+                days_in_month = calendar.monthrange(year, month)[1]
+                first_day = 1 + (target_isoweekday - date(year, month, 1).isoweekday()) % 7
+                count = (days_in_month - first_day) // 7 + 1
+                for position in range(1, count + 1):
+                    # The last occurrence is -1 (and only -1), as in _get_nth_weekday_of_month
+                    if (-1 if position == count else position) in self.which:
+                        occurrence_date = date(year, month, first_day + 7 * (position - 1))
+                        if start_date <= occurrence_date <= end_date:
+                            yield occurrence_date
+                year, month = (year + 1, 1) if month == 12 else (year, month + 1)
 
 
 class SessionRecurrence:
@@ -404,6 +426,70 @@ class SessionRecurrence:
         return len(self.schedules) > 0
 
 
+@functools.lru_cache(maxsize=RECURRENCE_CACHE_SIZE)
+def parse_recurrence(recurrence_json: Optional[str]) -> SessionRecurrence:
+    """
+    Parse recurrence JSON, memoized on the JSON text.
+
+    Sessions share a handful of patterns and the cron, auto-create and the
+    sessions list parse the same text over and over. The returned object is
+    shared between callers, so treat it as read-only.
+
+    Args:
+        recurrence_json: JSON string containing recurrence definition, or None
+
+    Returns:
+        SessionRecurrence for the text
+
+    Raises:
+        ValueError: If the JSON is invalid (not cached; raised on every call)
+    """
+    return SessionRecurrence(recurrence_json)
+
+
+def expand_occurrences(
+    sessions: Iterable[Tuple[int, Optional[str], Optional[str]]],
+    days: int,
+    now: Optional[datetime] = None,
+) -> Dict[int, List[Tuple[datetime, datetime]]]:
+    """
+    Occurrences for many sessions over the next N days, in one call.
+
+    Each session's window is its own local today through today + days - 1.
+    Sessions sharing a pattern, timezone and local today (most of them) are
+    expanded once.
+
+    Args:
+        sessions: (session_id, recurrence_json, timezone name) rows
+        days: Number of local days to cover, starting today
+        now: Current time (timezone-aware); defaults to the real clock
+
+    Returns:
+        Dict of session_id -> sorted (start_datetime, end_datetime) tuples; sessions
+        with no, or an invalid, recurrence or timezone map to []
+    """
+    now = now or datetime.now(ZoneInfo("UTC"))
+    expanded = {}
+    result = {}
+    for session_id, recurrence_json, timezone_name in sessions:
+        result[session_id] = []
+        if not recurrence_json or days < 1:
+            continue
+        try:
+            tz = ZoneInfo(timezone_name or "UTC")
+            recurrence = parse_recurrence(recurrence_json)
+        except (ValueError, KeyError):
+            continue
+        start_date = now.astimezone(tz).date()
+        key = (recurrence_json, tz.key, start_date)
+        if key not in expanded:
+            expanded[key] = recurrence.get_occurrences_in_range(
+                start_date, start_date + timedelta(days=days - 1), tz
+            )
+        result[session_id] = expanded[key]
+    return result
+
+
 def validate_recurrence_json(recurrence_json: Optional[str]) -> Tuple[bool, Optional[str]]:
     """
     Validate recurrence JSON format.
@@ -418,7 +504,7 @@ def validate_recurrence_json(recurrence_json: Optional[str]) -> Tuple[bool, Opti
         return (True, None)
 
     try:
-        SessionRecurrence(recurrence_json)
+        parse_recurrence(recurrence_json)
         return (True, None)
     except ValueError as e:
         return (False, str(e))
@@ -435,7 +521,7 @@ def to_human_readable(recurrence_json: Optional[str]) -> str:
         Human-readable description
     """
     try:
-        recurrence = SessionRecurrence(recurrence_json)
+        recurrence = parse_recurrence(recurrence_json)
         return recurrence.to_human_readable()
     except ValueError:
         return "Invalid recurrence pattern"
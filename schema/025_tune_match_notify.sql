@@ -0,0 +1,59 @@
+-- =============================================================================
+-- 025 Tune Match Invalidation Notifications
+-- =============================================================================
+-- The type-ahead matcher (tune_match_index.py) keeps tune names and per-session
+-- aliases in each web process's memory. These triggers tell every process when
+-- its copy is stale, whichever code path did the write (API handlers, the
+-- merge_tune_ids procedure, scripts, other workers):
+--
+--   * session_tune / session_tune_alias  -> pg_notify('tune_match_invalidate', 'session:<session_id>')
+--   * tune (name/type/count/redirect)     -> pg_notify('tune_match_invalidate', 'tune:<tune_id>')
+--
+-- NOTIFY is transactional (delivered on commit) and identical payloads are
+-- collapsed within a transaction, so bulk writes stay cheap.
+--
+-- Idempotent.
+-- =============================================================================
+
+CREATE OR REPLACE FUNCTION notify_tune_match_session()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM pg_notify('tune_match_invalidate', 'session:' || OLD.session_id);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM pg_notify('tune_match_invalidate', 'session:' || NEW.session_id);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION notify_tune_match_tune()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        PERFORM pg_notify('tune_match_invalidate', 'tune:' || OLD.tune_id);
+    ELSE
+        PERFORM pg_notify('tune_match_invalidate', 'tune:' || NEW.tune_id);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_session_tune_match_notify ON session_tune;
+CREATE TRIGGER trigger_session_tune_match_notify
+    AFTER INSERT OR UPDATE OR DELETE ON session_tune
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_tune_match_session();
+
+DROP TRIGGER IF EXISTS trigger_session_tune_alias_match_notify ON session_tune_alias;
+CREATE TRIGGER trigger_session_tune_alias_match_notify
+    AFTER INSERT OR UPDATE OR DELETE ON session_tune_alias
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_tune_match_session();
+
+DROP TRIGGER IF EXISTS trigger_tune_match_notify ON tune;
+CREATE TRIGGER trigger_tune_match_notify
+    AFTER INSERT OR DELETE OR UPDATE OF name, tune_type, tunebook_count_cached, redirect_to_tune_id ON tune
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_tune_match_tune();
@@ -0,0 +1,186 @@
+-- =============================================================================
+-- 026 Maintained Per-Session Tune Play Counts
+-- =============================================================================
+-- "How often has this session played this tune" used to be recomputed on every
+-- read by joining session_instance_tune to session_instance and grouping, on
+-- the type-ahead matcher, the live deep search, the session tunes grid and the
+-- session tunes pages. session_tune_play keeps the answer per
+-- (session_id, tune_id):
+--
+--   play_count      live 'tune' rows (deleted = FALSE) logged at the session
+--   instance_count  distinct session instances those rows are in
+--   last_played     date of the latest of those instances
+--
+-- Statement-level triggers on session_instance_tune (and on session_instance
+-- date/session changes) recount exactly the pairs a statement touched, in the
+-- same transaction. That covers every writer -- live op handlers, the bulk
+-- save, delete_tune_ajax, merge_tune_ids, scripts -- without each call site
+-- having to remember. A pair whose count falls to zero is removed.
+--
+-- scripts/rebuild_session_tune_plays.py rebuilds or verifies the whole table.
+--
+-- Idempotent.
+-- =============================================================================
+
+CREATE TABLE IF NOT EXISTS session_tune_play (
+    session_id INTEGER NOT NULL REFERENCES session(session_id) ON DELETE CASCADE,
+    tune_id INTEGER NOT NULL REFERENCES tune(tune_id) ON DELETE CASCADE,
+    play_count INTEGER NOT NULL DEFAULT 0,
+    instance_count INTEGER NOT NULL DEFAULT 0,
+    last_played DATE,
+    PRIMARY KEY (session_id, tune_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_session_tune_play_tune_id ON session_tune_play (tune_id);
+
+-- Recount the given (session_id, tune_id) pairs from session_instance_tune.
+CREATE OR REPLACE FUNCTION refresh_session_tune_play(p_session_ids INTEGER[], p_tune_ids INTEGER[])
+RETURNS VOID AS $$
+BEGIN
+    WITH pairs AS (
+        SELECT DISTINCT p.session_id, p.tune_id
+        FROM unnest(p_session_ids, p_tune_ids) AS p(session_id, tune_id)
+        WHERE p.session_id IS NOT NULL AND p.tune_id IS NOT NULL
+    ),
+    counts AS (
+        SELECT pairs.session_id, pairs.tune_id,
+               COUNT(sit.session_instance_tune_id) AS play_count,
+               COUNT(DISTINCT sit.session_instance_id) AS instance_count,
+               MAX(si.date) AS last_played
+        FROM pairs
+        LEFT JOIN (session_instance si
+                   JOIN session_instance_tune sit
+                     ON sit.session_instance_id = si.session_instance_id
+                    AND sit.record_type = 'tune'
+                    AND sit.deleted = FALSE)
+               ON si.session_id = pairs.session_id AND sit.tune_id = pairs.tune_id
+        GROUP BY pairs.session_id, pairs.tune_id
+    ),
+    gone AS (
+        DELETE FROM session_tune_play stp
+        USING counts c
+        WHERE stp.session_id = c.session_id AND stp.tune_id = c.tune_id AND c.play_count = 0
+    )
+    INSERT INTO session_tune_play (session_id, tune_id, play_count, instance_count, last_played)
+    SELECT session_id, tune_id, play_count, instance_count, last_played
+    FROM counts
+    WHERE play_count > 0
+    ON CONFLICT (session_id, tune_id) DO UPDATE
+        SET play_count = EXCLUDED.play_count,
+            instance_count = EXCLUDED.instance_count,
+            last_played = EXCLUDED.last_played;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Statement-level maintenance: recount the pairs a statement's rows belong to.
+-- UPDATEs that leave tune_id / record_type / deleted / instance alone (reorders,
+-- key overrides, timestamps) touch no pairs and cost nothing.
+CREATE OR REPLACE FUNCTION maintain_session_tune_play()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_session_ids INTEGER[];
+    v_tune_ids INTEGER[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(si.session_id), array_agg(n.tune_id)
+          INTO v_session_ids, v_tune_ids
+          FROM new_rows n
+          JOIN session_instance si ON si.session_instance_id = n.session_instance_id
+         WHERE n.tune_id IS NOT NULL;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(si.session_id), array_agg(o.tune_id)
+          INTO v_session_ids, v_tune_ids
+          FROM old_rows o
+          JOIN session_instance si ON si.session_instance_id = o.session_instance_id
+         WHERE o.tune_id IS NOT NULL;
+    ELSE
+        WITH changed AS (
+            SELECT o.session_instance_id AS old_instance, o.tune_id AS old_tune,
+                   n.session_instance_id AS new_instance, n.tune_id AS new_tune
+              FROM old_rows o
+              JOIN new_rows n ON n.session_instance_tune_id = o.session_instance_tune_id
+             WHERE o.tune_id IS DISTINCT FROM n.tune_id
+                OR o.session_instance_id IS DISTINCT FROM n.session_instance_id
+                OR o.record_type IS DISTINCT FROM n.record_type
+                OR o.deleted IS DISTINCT FROM n.deleted
+        ),
+        touched AS (
+            SELECT old_instance AS session_instance_id, old_tune AS tune_id FROM changed
+            UNION
+            SELECT new_instance, new_tune FROM changed
+        )
+        SELECT array_agg(si.session_id), array_agg(t.tune_id)
+          INTO v_session_ids, v_tune_ids
+          FROM touched t
+          JOIN session_instance si ON si.session_instance_id = t.session_instance_id
+         WHERE t.tune_id IS NOT NULL;
+    END IF;
+
+    IF v_tune_ids IS NOT NULL THEN
+        PERFORM refresh_session_tune_play(v_session_ids, v_tune_ids);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_session_tune_play_insert ON session_instance_tune;
+CREATE TRIGGER trigger_session_tune_play_insert
+    AFTER INSERT ON session_instance_tune
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION maintain_session_tune_play();
+
+DROP TRIGGER IF EXISTS trigger_session_tune_play_update ON session_instance_tune;
+CREATE TRIGGER trigger_session_tune_play_update
+    AFTER UPDATE ON session_instance_tune
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION maintain_session_tune_play();
+
+DROP TRIGGER IF EXISTS trigger_session_tune_play_delete ON session_instance_tune;
+CREATE TRIGGER trigger_session_tune_play_delete
+    AFTER DELETE ON session_instance_tune
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION maintain_session_tune_play();
+
+-- Moving an instance to another date or session changes last_played (and, for
+-- a session move, which session the plays count toward).
+CREATE OR REPLACE FUNCTION maintain_session_tune_play_instance()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF OLD.session_id IS DISTINCT FROM NEW.session_id OR OLD.date IS DISTINCT FROM NEW.date THEN
+        PERFORM refresh_session_tune_play(
+            array_agg(s.session_id), array_agg(s.tune_id))
+        FROM (
+            SELECT DISTINCT OLD.session_id AS session_id, sit.tune_id
+              FROM session_instance_tune sit
+             WHERE sit.session_instance_id = NEW.session_instance_id AND sit.tune_id IS NOT NULL
+            UNION
+            SELECT DISTINCT NEW.session_id, sit.tune_id
+              FROM session_instance_tune sit
+             WHERE sit.session_instance_id = NEW.session_instance_id AND sit.tune_id IS NOT NULL
+        ) s;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_session_tune_play_instance ON session_instance;
+CREATE TRIGGER trigger_session_tune_play_instance
+    AFTER UPDATE OF session_id, date ON session_instance
+    FOR EACH ROW
+    EXECUTE FUNCTION maintain_session_tune_play_instance();
+
+-- Backfill (also what the rebuild script runs).
+INSERT INTO session_tune_play (session_id, tune_id, play_count, instance_count, last_played)
+SELECT si.session_id, sit.tune_id,
+       COUNT(*), COUNT(DISTINCT sit.session_instance_id), MAX(si.date)
+FROM session_instance_tune sit
+JOIN session_instance si ON si.session_instance_id = sit.session_instance_id
+WHERE sit.tune_id IS NOT NULL AND sit.record_type = 'tune' AND sit.deleted = FALSE
+GROUP BY si.session_id, sit.tune_id
+ON CONFLICT (session_id, tune_id) DO UPDATE
+    SET play_count = EXCLUDED.play_count,
+        instance_count = EXCLUDED.instance_count,
+        last_played = EXCLUDED.last_played;
@@ -0,0 +1,67 @@
+-- =============================================================================
+-- 027 Background Job Queue
+-- =============================================================================
+-- A small Postgres-backed queue (job_queue.py, worker: jobs/job_worker.py) for
+-- work that should not run inside a web request: caching tune settings from
+-- thesession.org and rendering their images.
+--
+--   * Workers claim with SELECT ... FOR UPDATE SKIP LOCKED, so any number of
+--     them can poll the same table without blocking each other.
+--   * Failed jobs go back to 'pending' with run_after pushed out (exponential
+--     backoff) until max_attempts, then stay 'failed' for inspection.
+--   * dedupe_key (e.g. 'tune:1234', 'setting:5678') is unique among jobs that
+--     are still pending or running, so enqueueing the same work twice is a no-op.
+--   * job_rate_limit holds the next free slot per remote host, shared by all
+--     workers, so thesession.org sees at most one request per interval.
+--   * Enqueueing NOTIFYs 'background_job' so idle workers wake immediately.
+--
+-- Idempotent.
+-- =============================================================================
+
+CREATE TABLE IF NOT EXISTS background_job (
+    job_id BIGSERIAL PRIMARY KEY,
+    job_type VARCHAR(64) NOT NULL,
+    dedupe_key VARCHAR(128),
+    payload JSONB NOT NULL DEFAULT '{}'::jsonb,
+    status VARCHAR(16) NOT NULL DEFAULT 'pending',  -- 'pending' | 'running' | 'done' | 'failed'
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 5,
+    run_after TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    locked_by VARCHAR(128),
+    locked_at TIMESTAMPTZ,
+    last_error TEXT,
+    created_date TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    finished_date TIMESTAMPTZ,
+    CONSTRAINT background_job_status_check CHECK (status IN ('pending', 'running', 'done', 'failed'))
+);
+
+-- What workers scan: due pending jobs, oldest first.
+CREATE INDEX IF NOT EXISTS idx_background_job_due
+    ON background_job (run_after, job_id) WHERE status = 'pending';
+
+-- Dedupe among live jobs only; finished jobs don't block re-enqueueing.
+CREATE UNIQUE INDEX IF NOT EXISTS idx_background_job_dedupe
+    ON background_job (job_type, dedupe_key) WHERE status IN ('pending', 'running') AND dedupe_key IS NOT NULL;
+
+-- Stale-lock recovery looks at running jobs by lock age.
+CREATE INDEX IF NOT EXISTS idx_background_job_running
+    ON background_job (locked_at) WHERE status = 'running';
+
+CREATE TABLE IF NOT EXISTS job_rate_limit (
+    host VARCHAR(255) PRIMARY KEY,
+    next_allowed_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE OR REPLACE FUNCTION notify_background_job()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('background_job', '');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_background_job_notify ON background_job;
+CREATE TRIGGER trigger_background_job_notify
+    AFTER INSERT ON background_job
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION notify_background_job();
@@ -0,0 +1,27 @@
+-- =============================================================================
+-- 028 Session Snapshot  (bounded live-logging replay)
+-- =============================================================================
+-- One row per session instance: the live screen's state (the shape
+-- /api/live/instances/<id>/bootstrap returns, minus the per-viewer fields) as of
+-- event_id. The streaming service replays "snapshot + events after it" instead
+-- of the whole session_event log when a client's cursor is far behind, so a
+-- reconnect costs the same however long the session ran.
+--
+--   * event_id           the snapshot reflects every event up to and including it.
+--   * compacted_through  events of this instance up to here were folded into a
+--                        snapshot and deleted (jobs/compact_session_events.py);
+--                        a cursor older than this must start from the snapshot.
+--
+-- Written by the job worker (live_op enqueues 'snapshot_session_instance') and
+-- the compaction cron job; read by streaming/service.py.
+--
+-- Idempotent.
+-- =============================================================================
+
+CREATE TABLE IF NOT EXISTS session_snapshot (
+    session_instance_id INTEGER PRIMARY KEY REFERENCES session_instance(session_instance_id) ON DELETE CASCADE,
+    event_id            BIGINT NOT NULL,
+    payload             JSONB NOT NULL,
+    compacted_through   BIGINT NOT NULL DEFAULT 0,
+    created_date        TIMESTAMPTZ NOT NULL DEFAULT (NOW() AT TIME ZONE 'UTC')
+);
@@ -0,0 +1,43 @@
+-- =============================================================================
+-- 029 Tune Name Search  (indexed, typo-tolerant tune-name search)
+-- =============================================================================
+-- Every tune-name search used to filter with LOWER(unaccent(t.name)) LIKE '%q%',
+-- which no index can serve (unaccent() is not IMMUTABLE, so it can't back an
+-- expression index or a generated column), so each keystroke scanned `tune`.
+--
+--   * tune.name_search   LOWER(unaccent(name)), kept current by a BEFORE trigger
+--                        on insert / rename.
+--   * pg_trgm GIN index  serves both LIKE '%q%' (q of 3+ characters) and the
+--                        word-similarity operator (q <% name_search) that
+--                        tune_search.py uses for typo tolerance.
+--
+-- Read through tune_search.py; no caller should spell the normalization itself.
+--
+-- Idempotent.
+-- =============================================================================
+
+CREATE EXTENSION IF NOT EXISTS unaccent;
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+ALTER TABLE tune ADD COLUMN IF NOT EXISTS name_search TEXT;
+
+CREATE OR REPLACE FUNCTION set_tune_name_search()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.name_search := LOWER(unaccent(NEW.name));
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_tune_name_search ON tune;
+CREATE TRIGGER trigger_tune_name_search
+    BEFORE INSERT OR UPDATE OF name ON tune
+    FOR EACH ROW
+    EXECUTE FUNCTION set_tune_name_search();
+
+-- Backfill (only rows not yet normalized, so a re-run is cheap).
+UPDATE tune SET name_search = LOWER(unaccent(name))
+WHERE name_search IS DISTINCT FROM LOWER(unaccent(name));
+
+CREATE INDEX IF NOT EXISTS idx_tune_name_search_trgm
+    ON tune USING GIN (name_search gin_trgm_ops);
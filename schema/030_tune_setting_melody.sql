@@ -0,0 +1,28 @@
+-- =============================================================================
+-- 030 Tune Setting Melody Index  (search by ABC notation)
+-- =============================================================================
+-- One row per cached tune_setting. It holds the melody's transposition-invariant
+-- interval n-grams (abc_melody.py): diatonic steps between successive distinct
+-- notes, in runs of three. The GIN index turns "which settings contain these
+-- grams" into index lookups, replacing the per-query
+-- REPLACE(abc, ' ', '') ILIKE '%q%' scan over every setting's ABC text.
+--
+--   * grams    sorted distinct n-grams, e.g. '-1,-1,3'. The tune comes from
+--              tune_setting, so merge_tune_ids moving a setting needs no change here.
+--   * version  abc_melody.MELODY_INDEX_VERSION at indexing time. Rows behind the
+--              current version are rebuilt by scripts/rebuild_melody_index.py.
+--
+-- Written when a setting is cached or refreshed. Backfill existing settings
+-- with scripts/rebuild_melody_index.py.
+--
+-- Idempotent.
+-- =============================================================================
+
+CREATE TABLE IF NOT EXISTS tune_setting_melody (
+    setting_id    INTEGER PRIMARY KEY REFERENCES tune_setting(setting_id) ON DELETE CASCADE,
+    grams         TEXT[] NOT NULL,
+    version       SMALLINT NOT NULL,
+    indexed_date  TIMESTAMPTZ NOT NULL DEFAULT (NOW() AT TIME ZONE 'UTC')
+);
+
+CREATE INDEX IF NOT EXISTS idx_tune_setting_melody_grams ON tune_setting_melody USING GIN (grams);
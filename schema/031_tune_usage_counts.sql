@@ -0,0 +1,128 @@
+-- =============================================================================
+-- 031 Tune Usage Counts  (maintained counters for the admin tunes list)
+-- =============================================================================
+-- /api/admin/tunes recomputed two aggregates over session_tune and person_tune
+-- for every tune on every request, so it could neither page nor sort by them
+-- without reading both tables in full.
+--
+--   * tune.session_count_cached    sessions with the tune in session_tune
+--   * tune.tunelist_count_cached   people with the tune in person_tune
+--
+-- Both tables have one row per (owner, tune), so each count is COUNT(*). They
+-- are kept current by statement-level triggers that recount the tunes a
+-- statement touched (merges that move rows between tunes recount both sides).
+-- The (count, tune_id) and (name_search, tune_id) indexes serve the keyset
+-- pagination in get_admin_tunes, in either direction.
+--
+-- Idempotent.
+-- =============================================================================
+
+ALTER TABLE tune ADD COLUMN IF NOT EXISTS session_count_cached INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE tune ADD COLUMN IF NOT EXISTS tunelist_count_cached INTEGER NOT NULL DEFAULT 0;
+
+-- Recount the given tunes from session_tune and person_tune.
+CREATE OR REPLACE FUNCTION refresh_tune_usage_counts(p_tune_ids INTEGER[])
+RETURNS VOID AS $$
+BEGIN
+    UPDATE tune t
+    SET session_count_cached = c.session_count, tunelist_count_cached = c.tunelist_count
+    FROM (
+        SELECT ids.tune_id,
+               (SELECT COUNT(*) FROM session_tune st WHERE st.tune_id = ids.tune_id) AS session_count,
+               (SELECT COUNT(*) FROM person_tune pt WHERE pt.tune_id = ids.tune_id) AS tunelist_count
+        FROM unnest(p_tune_ids) AS ids(tune_id)
+    ) c
+    WHERE t.tune_id = c.tune_id
+      AND (t.session_count_cached, t.tunelist_count_cached) IS DISTINCT FROM (c.session_count, c.tunelist_count);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Shared by both tables. For UPDATEs, only tunes whose row multiplicity changed
+-- (rows moved onto or off them) are recounted.
+CREATE OR REPLACE FUNCTION maintain_tune_usage_counts()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_tune_ids INTEGER[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(DISTINCT tune_id) INTO v_tune_ids FROM new_rows;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(DISTINCT tune_id) INTO v_tune_ids FROM old_rows;
+    ELSE
+        SELECT array_agg(DISTINCT tune_id) INTO v_tune_ids
+        FROM (
+            (SELECT tune_id FROM old_rows EXCEPT ALL SELECT tune_id FROM new_rows)
+            UNION
+            (SELECT tune_id FROM new_rows EXCEPT ALL SELECT tune_id FROM old_rows)
+        ) moved;
+    END IF;
+
+    IF v_tune_ids IS NOT NULL THEN
+        PERFORM refresh_tune_usage_counts(v_tune_ids);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_session_tune_usage_insert ON session_tune;
+CREATE TRIGGER trigger_session_tune_usage_insert
+    AFTER INSERT ON session_tune
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION maintain_tune_usage_counts();
+
+DROP TRIGGER IF EXISTS trigger_session_tune_usage_update ON session_tune;
+CREATE TRIGGER trigger_session_tune_usage_update
+    AFTER UPDATE ON session_tune
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION maintain_tune_usage_counts();
+
+DROP TRIGGER IF EXISTS trigger_session_tune_usage_delete ON session_tune;
+CREATE TRIGGER trigger_session_tune_usage_delete
+    AFTER DELETE ON session_tune
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION maintain_tune_usage_counts();
+
+DROP TRIGGER IF EXISTS trigger_person_tune_usage_insert ON person_tune;
+CREATE TRIGGER trigger_person_tune_usage_insert
+    AFTER INSERT ON person_tune
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION maintain_tune_usage_counts();
+
+DROP TRIGGER IF EXISTS trigger_person_tune_usage_update ON person_tune;
+CREATE TRIGGER trigger_person_tune_usage_update
+    AFTER UPDATE ON person_tune
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION maintain_tune_usage_counts();
+
+DROP TRIGGER IF EXISTS trigger_person_tune_usage_delete ON person_tune;
+CREATE TRIGGER trigger_person_tune_usage_delete
+    AFTER DELETE ON person_tune
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION maintain_tune_usage_counts();
+
+-- Backfill (only tunes whose counts are off, so a re-run is cheap).
+WITH counts AS (
+    SELECT t.tune_id,
+           COALESCE(s.n, 0) AS session_count,
+           COALESCE(p.n, 0) AS tunelist_count
+    FROM tune t
+    LEFT JOIN (SELECT tune_id, COUNT(*) AS n FROM session_tune GROUP BY tune_id) s ON s.tune_id = t.tune_id
+    LEFT JOIN (SELECT tune_id, COUNT(*) AS n FROM person_tune GROUP BY tune_id) p ON p.tune_id = t.tune_id
+)
+UPDATE tune t
+SET session_count_cached = c.session_count, tunelist_count_cached = c.tunelist_count
+FROM counts c
+WHERE c.tune_id = t.tune_id
+  AND (t.session_count_cached, t.tunelist_count_cached) IS DISTINCT FROM (c.session_count, c.tunelist_count);
+
+-- Keyset pagination orders (see get_admin_tunes).
+CREATE INDEX IF NOT EXISTS idx_tune_admin_name ON tune (name_search, tune_id);
+CREATE INDEX IF NOT EXISTS idx_tune_admin_sessions ON tune (session_count_cached, tune_id);
+CREATE INDEX IF NOT EXISTS idx_tune_admin_tunelists ON tune (tunelist_count_cached, tune_id);
+CREATE INDEX IF NOT EXISTS idx_tune_admin_popularity ON tune ((COALESCE(tunebook_count_cached, 0)), tune_id);
@@ -0,0 +1,129 @@
+-- =============================================================================
+-- 032 Session Instance Active Window  (precomputed activation timeline)
+-- =============================================================================
+-- update_active_sessions used to load every live session, query each one's
+-- instances for a 3-day window and work out the active windows in Python, every
+-- 15 minutes. Now each instance carries its window as UTC instants, buffers
+-- applied:
+--
+--   * session_instance.active_from_utc    (date + start_time) in the session's
+--                                         timezone, minus active_buffer_minutes_before
+--   * session_instance.active_until_utc   (date + end_time) plus active_buffer_minutes_after
+--
+-- NULL when the instance has no start or end time (it never activates) or the
+-- session's timezone is not one Postgres knows. Kept current by a BEFORE trigger
+-- on the instance and by a trigger on session when its timezone or buffers
+-- change. A partial index over not-yet-closed windows keeps the due-transition
+-- query in active_session_manager.process_due_transitions (and the scheduler's
+-- "when is the next one" probe) off the instance history.
+--
+-- Idempotent.
+-- =============================================================================
+
+ALTER TABLE session_instance ADD COLUMN IF NOT EXISTS active_from_utc TIMESTAMPTZ;
+ALTER TABLE session_instance ADD COLUMN IF NOT EXISTS active_until_utc TIMESTAMPTZ;
+
+-- Local date + time in a named zone, shifted by p_offset_minutes. NULL for a
+-- NULL time or an unknown zone (an instance insert must never fail over this).
+CREATE OR REPLACE FUNCTION session_local_to_utc(p_date DATE, p_time TIME, p_timezone TEXT, p_offset_minutes INTEGER)
+RETURNS TIMESTAMPTZ AS $$
+BEGIN
+    IF p_time IS NULL THEN
+        RETURN NULL;
+    END IF;
+    RETURN ((p_date + p_time) AT TIME ZONE p_timezone) + make_interval(mins => p_offset_minutes);
+EXCEPTION WHEN invalid_parameter_value THEN
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+CREATE OR REPLACE FUNCTION set_session_instance_active_window()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_timezone TEXT;
+    v_before INTEGER;
+    v_after INTEGER;
+BEGIN
+    SELECT timezone, active_buffer_minutes_before, active_buffer_minutes_after
+      INTO v_timezone, v_before, v_after
+      FROM session WHERE session_id = NEW.session_id;
+
+    IF NEW.start_time IS NULL OR NEW.end_time IS NULL THEN
+        NEW.active_from_utc := NULL;
+        NEW.active_until_utc := NULL;
+    ELSE
+        NEW.active_from_utc := session_local_to_utc(NEW.date, NEW.start_time, v_timezone, -v_before);
+        NEW.active_until_utc := session_local_to_utc(NEW.date, NEW.end_time, v_timezone, v_after);
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_session_instance_active_window ON session_instance;
+CREATE TRIGGER trigger_session_instance_active_window
+    BEFORE INSERT OR UPDATE OF session_id, date, start_time, end_time ON session_instance
+    FOR EACH ROW
+    EXECUTE FUNCTION set_session_instance_active_window();
+
+-- A session's timezone or buffers moved: recompute its instances' windows.
+CREATE OR REPLACE FUNCTION refresh_session_active_windows()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF OLD.timezone IS DISTINCT FROM NEW.timezone
+       OR OLD.active_buffer_minutes_before IS DISTINCT FROM NEW.active_buffer_minutes_before
+       OR OLD.active_buffer_minutes_after IS DISTINCT FROM NEW.active_buffer_minutes_after THEN
+        UPDATE session_instance
+        SET active_from_utc = session_local_to_utc(date, start_time, NEW.timezone, -NEW.active_buffer_minutes_before),
+            active_until_utc = session_local_to_utc(date, end_time, NEW.timezone, NEW.active_buffer_minutes_after)
+        WHERE session_id = NEW.session_id
+          AND start_time IS NOT NULL AND end_time IS NOT NULL;
+        PERFORM pg_notify('session_schedule', NEW.session_id::text);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_session_active_windows ON session;
+CREATE TRIGGER trigger_session_active_windows
+    AFTER UPDATE OF timezone, active_buffer_minutes_before, active_buffer_minutes_after ON session
+    FOR EACH ROW
+    EXECUTE FUNCTION refresh_session_active_windows();
+
+-- Wake the scheduler (jobs/active_session_scheduler.py) when the timeline changes.
+CREATE OR REPLACE FUNCTION notify_session_schedule()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('session_schedule', '');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_session_instance_schedule_notify ON session_instance;
+CREATE TRIGGER trigger_session_instance_schedule_notify
+    AFTER INSERT OR UPDATE OF session_id, date, start_time, end_time, is_cancelled ON session_instance
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION notify_session_schedule();
+
+-- Backfill (only rows whose window is off, so a re-run is cheap).
+UPDATE session_instance si
+SET active_from_utc = w.active_from_utc, active_until_utc = w.active_until_utc
+FROM (
+    SELECT si2.session_instance_id,
+           CASE WHEN si2.end_time IS NOT NULL
+                THEN session_local_to_utc(si2.date, si2.start_time, s.timezone, -s.active_buffer_minutes_before)
+           END AS active_from_utc,
+           CASE WHEN si2.start_time IS NOT NULL
+                THEN session_local_to_utc(si2.date, si2.end_time, s.timezone, s.active_buffer_minutes_after)
+           END AS active_until_utc
+    FROM session_instance si2
+    JOIN session s ON s.session_id = si2.session_id
+) w
+WHERE w.session_instance_id = si.session_instance_id
+  AND (si.active_from_utc, si.active_until_utc) IS DISTINCT FROM (w.active_from_utc, w.active_until_utc);
+
+-- Pending windows: inactive, not cancelled, by when they close. Only windows
+-- that haven't closed are ever read, so history stays out of the range scan.
+-- (Active instances are few; idx_session_instance_is_active covers them.)
+CREATE INDEX IF NOT EXISTS idx_session_instance_pending_window
+    ON session_instance (active_until_utc)
+    WHERE is_active = FALSE AND is_cancelled = FALSE;
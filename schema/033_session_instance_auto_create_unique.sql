@@ -0,0 +1,45 @@
+-- =============================================================================
+-- 033 Session Instance Auto-Create Uniqueness  (set-based auto-creation)
+-- =============================================================================
+-- session_instance_auto_create.auto_create_instances_bulk expands every
+-- auto-create session's upcoming occurrences in Python and inserts the missing
+-- rows with one INSERT ... SELECT FROM unnest(...) ... ON CONFLICT DO NOTHING.
+--
+-- Instances created by hand may share a date (nothing else constrains that),
+-- so the index only covers system-created rows (created_by_user_id IS NULL):
+-- at most one auto-created instance per session and date. It is what makes
+-- overlapping runs (the 15-minute cron, the scheduler, a manual run) unable to
+-- double-create. Dates that already have any instance are skipped by the
+-- insert's NOT EXISTS.
+--
+-- Older data may already hold duplicate system rows; then the index is left
+-- out with a NOTICE (the insert still works, minus the race protection) until
+-- they are resolved and this file is re-run.
+--
+-- Idempotent.
+-- =============================================================================
+
+DO $$
+DECLARE
+    dup_count INTEGER;
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_indexes
+        WHERE indexname = 'idx_session_instance_auto_created_date'
+    ) THEN
+        SELECT COUNT(*) INTO dup_count
+        FROM (
+            SELECT session_id, date FROM session_instance
+            WHERE created_by_user_id IS NULL
+            GROUP BY session_id, date HAVING COUNT(*) > 1
+        ) dups;
+
+        IF dup_count > 0 THEN
+            RAISE NOTICE 'Found % session date(s) with several system-created instances; skipping idx_session_instance_auto_created_date', dup_count;
+        ELSE
+            CREATE UNIQUE INDEX idx_session_instance_auto_created_date
+                ON session_instance (session_id, date)
+                WHERE created_by_user_id IS NULL;
+        END IF;
+    END IF;
+END $$;
@@ -0,0 +1,75 @@
+-- =============================================================================
+-- 034 User Cache Invalidation Notifications
+-- =============================================================================
+-- Flask-Login's load_user is answered from a per-process cache (user_cache.py)
+-- instead of running User.get_by_id's join on every request. These triggers tell
+-- every process when a cached user is stale, whichever code path did the write:
+--
+--   * user_account (loaded columns, delete)   -> 'user:<user_id>'
+--   * person (name, email, active instance)   -> 'person:<person_id>'
+--   * session_instance (date, times, location) -> 'instance:<session_instance_id>'
+--   * session (name, path)                    -> 'session:<session_id>'
+--
+-- all on channel 'user_cache_invalidate'. WHEN clauses skip no-op updates, so
+-- token, password and bookkeeping writes stay silent.
+--
+-- Idempotent.
+-- =============================================================================
+
+CREATE OR REPLACE FUNCTION notify_user_cache()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_TABLE_NAME = 'user_account' THEN
+        PERFORM pg_notify('user_cache_invalidate', 'user:' || OLD.user_id);
+    ELSIF TG_TABLE_NAME = 'person' THEN
+        PERFORM pg_notify('user_cache_invalidate', 'person:' || OLD.person_id);
+    ELSIF TG_TABLE_NAME = 'session_instance' THEN
+        PERFORM pg_notify('user_cache_invalidate', 'instance:' || OLD.session_instance_id);
+    ELSE
+        PERFORM pg_notify('user_cache_invalidate', 'session:' || OLD.session_id);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_user_account_cache_notify ON user_account;
+CREATE TRIGGER trigger_user_account_cache_notify
+    AFTER UPDATE ON user_account
+    FOR EACH ROW
+    WHEN ((OLD.person_id, OLD.username, OLD.is_active, OLD.is_system_admin, OLD.timezone, OLD.email_verified,
+           OLD.auto_save_tunes, OLD.auto_save_interval, OLD.beta_live_logging)
+          IS DISTINCT FROM
+          (NEW.person_id, NEW.username, NEW.is_active, NEW.is_system_admin, NEW.timezone, NEW.email_verified,
+           NEW.auto_save_tunes, NEW.auto_save_interval, NEW.beta_live_logging))
+    EXECUTE FUNCTION notify_user_cache();
+
+DROP TRIGGER IF EXISTS trigger_user_account_cache_notify_delete ON user_account;
+CREATE TRIGGER trigger_user_account_cache_notify_delete
+    AFTER DELETE ON user_account
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_user_cache();
+
+DROP TRIGGER IF EXISTS trigger_person_user_cache_notify ON person;
+CREATE TRIGGER trigger_person_user_cache_notify
+    AFTER UPDATE ON person
+    FOR EACH ROW
+    WHEN ((OLD.first_name, OLD.last_name, OLD.email, OLD.at_active_session_instance_id)
+          IS DISTINCT FROM
+          (NEW.first_name, NEW.last_name, NEW.email, NEW.at_active_session_instance_id))
+    EXECUTE FUNCTION notify_user_cache();
+
+DROP TRIGGER IF EXISTS trigger_session_instance_user_cache_notify ON session_instance;
+CREATE TRIGGER trigger_session_instance_user_cache_notify
+    AFTER UPDATE ON session_instance
+    FOR EACH ROW
+    WHEN ((OLD.session_id, OLD.date, OLD.start_time, OLD.end_time, OLD.location_override)
+          IS DISTINCT FROM
+          (NEW.session_id, NEW.date, NEW.start_time, NEW.end_time, NEW.location_override))
+    EXECUTE FUNCTION notify_user_cache();
+
+DROP TRIGGER IF EXISTS trigger_session_user_cache_notify ON session;
+CREATE TRIGGER trigger_session_user_cache_notify
+    AFTER UPDATE ON session
+    FOR EACH ROW
+    WHEN ((OLD.name, OLD.path) IS DISTINCT FROM (NEW.name, NEW.path))
+    EXECUTE FUNCTION notify_user_cache();
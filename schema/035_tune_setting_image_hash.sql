@@ -0,0 +1,21 @@
+-- =============================================================================
+-- 035 Tune Setting Image Hashes  (cacheable notation image URLs)
+-- =============================================================================
+-- The tune detail and search APIs no longer inline rendered PNGs as base64;
+-- they return /api/tune-settings/<setting_id>/<kind>/<hash>.png URLs
+-- (notation_images.py) that browsers may cache forever. <hash> is one of these
+-- generated columns: an md5 of the stored image, kept current by Postgres on
+-- every write path (cache_tune_setting, the background job, the live incipit
+-- renderer, scripts), so a re-render always yields a new URL.
+--
+-- Readers select the 32-character hash instead of the image itself, so listing
+-- URLs never detoasts the PNGs.
+--
+-- Idempotent.
+-- =============================================================================
+
+ALTER TABLE tune_setting
+    ADD COLUMN IF NOT EXISTS image_hash TEXT GENERATED ALWAYS AS (md5(image)) STORED;
+
+ALTER TABLE tune_setting
+    ADD COLUMN IF NOT EXISTS incipit_image_hash TEXT GENERATED ALWAYS AS (md5(incipit_image)) STORED;
@@ -0,0 +1,69 @@
+-- =============================================================================
+-- 036 Serialize session_tune_play Recounts  (fixes lost updates from 026)
+-- =============================================================================
+-- refresh_session_tune_play (026) recounted a pair, then upserted the count. Two
+-- transactions adding plays of the same (session, tune) -- several loggers in one
+-- live instance -- each counted under READ COMMITTED without seeing the other's
+-- uncommitted row; the second waited on the first's row lock, then wrote its own
+-- stale count, leaving play_count / instance_count one short for good.
+--
+-- The function now takes a transaction-scoped advisory lock per pair, in sorted
+-- order, before counting. Run scripts/rebuild_session_tune_plays.py afterwards
+-- to repair counts that drifted before this migration.
+--
+-- Idempotent.
+-- =============================================================================
+
+-- Recount the given (session_id, tune_id) pairs from session_instance_tune.
+--
+-- Each pair is locked (transaction-scoped advisory lock, in a fixed order so two
+-- writers can't deadlock) before it is counted. Without the lock, two concurrent
+-- transactions adding plays of the same tune each counted without seeing the
+-- other's uncommitted row, and the one that upserted second wrote its stale count.
+-- Under READ COMMITTED the count below takes a fresh snapshot after the locks are
+-- held, so it sees every earlier writer's committed rows.
+CREATE OR REPLACE FUNCTION refresh_session_tune_play(p_session_ids INTEGER[], p_tune_ids INTEGER[])
+RETURNS VOID AS $$
+BEGIN
+    PERFORM pg_advisory_xact_lock(k.lock_key)
+    FROM unnest(ARRAY(
+        SELECT DISTINCT hashtext('session_tune_play:' || p.session_id || ':' || p.tune_id)
+        FROM unnest(p_session_ids, p_tune_ids) AS p(session_id, tune_id)
+        WHERE p.session_id IS NOT NULL AND p.tune_id IS NOT NULL
+        ORDER BY 1
+    )) AS k(lock_key);
+
+    WITH pairs AS (
+        SELECT DISTINCT p.session_id, p.tune_id
+        FROM unnest(p_session_ids, p_tune_ids) AS p(session_id, tune_id)
+        WHERE p.session_id IS NOT NULL AND p.tune_id IS NOT NULL
+    ),
+    counts AS (
+        SELECT pairs.session_id, pairs.tune_id,
+               COUNT(sit.session_instance_tune_id) AS play_count,
+               COUNT(DISTINCT sit.session_instance_id) AS instance_count,
+               MAX(si.date) AS last_played
+        FROM pairs
+        LEFT JOIN (session_instance si
+                   JOIN session_instance_tune sit
+                     ON sit.session_instance_id = si.session_instance_id
+                    AND sit.record_type = 'tune'
+                    AND sit.deleted = FALSE)
+               ON si.session_id = pairs.session_id AND sit.tune_id = pairs.tune_id
+        GROUP BY pairs.session_id, pairs.tune_id
+    ),
+    gone AS (
+        DELETE FROM session_tune_play stp
+        USING counts c
+        WHERE stp.session_id = c.session_id AND stp.tune_id = c.tune_id AND c.play_count = 0
+    )
+    INSERT INTO session_tune_play (session_id, tune_id, play_count, instance_count, last_played)
+    SELECT session_id, tune_id, play_count, instance_count, last_played
+    FROM counts
+    WHERE play_count > 0
+    ON CONFLICT (session_id, tune_id) DO UPDATE
+        SET play_count = EXCLUDED.play_count,
+            instance_count = EXCLUDED.instance_count,
+            last_played = EXCLUDED.last_played;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,105 @@
+-- =============================================================================
+-- 037 Tune Usage Counter Deltas  (fixes lost updates from 031)
+-- =============================================================================
+-- The 031 triggers recounted a tune's session_tune / person_tune rows and wrote
+-- the count. Two transactions adding the same popular tune to different tune
+-- lists each counted without the other's uncommitted row; the second, after
+-- waiting on the tune's row lock, either skipped its write (the IS DISTINCT FROM
+-- guard now compared against the first's value) or wrote its stale count, so
+-- tunelist_count_cached / session_count_cached undercounted for good.
+--
+--   * The triggers now add each statement's per-tune row-count change to the
+--     counter, locking the tune rows in tune_id order first.
+--   * trigger_tune_last_modified_date fired on the counter updates too, so
+--     tune.last_modified_date tracked tune list adds rather than tune edits; it
+--     now fires only for updates of the tune's own columns.
+--   * The backfill below repairs counts that drifted before this migration.
+--
+-- Idempotent.
+-- =============================================================================
+
+-- Shared by both tables. Applies each statement's per-tune change in row count
+-- (its transition tables) to the counter, rather than recounting: a recount
+-- under READ COMMITTED misses concurrent transactions' uncommitted rows and,
+-- written after waiting on the tune's row lock, would overwrite their update.
+-- The tune rows are locked in tune_id order first, so two bulk writers (tunebook
+-- syncs) touching overlapping tunes queue instead of deadlocking. The lock is
+-- NO KEY UPDATE, not FOR UPDATE: each inserted row's foreign-key check already
+-- holds KEY SHARE on its tune, which FOR UPDATE conflicts with (two writers of
+-- the same tune would each wait on the other's KEY SHARE).
+CREATE OR REPLACE FUNCTION maintain_tune_usage_counts()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_tune_ids INTEGER[];
+    v_deltas INTEGER[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(tune_id ORDER BY tune_id), array_agg(n ORDER BY tune_id)
+          INTO v_tune_ids, v_deltas
+          FROM (SELECT tune_id, COUNT(*)::INTEGER AS n FROM new_rows GROUP BY tune_id) d
+         WHERE tune_id IS NOT NULL;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(tune_id ORDER BY tune_id), array_agg(n ORDER BY tune_id)
+          INTO v_tune_ids, v_deltas
+          FROM (SELECT tune_id, -COUNT(*)::INTEGER AS n FROM old_rows GROUP BY tune_id) d
+         WHERE tune_id IS NOT NULL;
+    ELSE
+        -- Only tunes rows moved onto or off (merges) change
+        SELECT array_agg(tune_id ORDER BY tune_id), array_agg(n ORDER BY tune_id)
+          INTO v_tune_ids, v_deltas
+          FROM (
+              SELECT tune_id, SUM(n)::INTEGER AS n
+                FROM (SELECT tune_id, 1 AS n FROM new_rows
+                      UNION ALL
+                      SELECT tune_id, -1 FROM old_rows) r
+               GROUP BY tune_id
+              HAVING SUM(n) <> 0
+          ) d
+         WHERE tune_id IS NOT NULL;
+    END IF;
+
+    IF v_tune_ids IS NULL THEN
+        RETURN NULL;
+    END IF;
+
+    PERFORM 1 FROM tune WHERE tune_id = ANY(v_tune_ids) ORDER BY tune_id FOR NO KEY UPDATE;
+    IF TG_TABLE_NAME = 'session_tune' THEN
+        UPDATE tune t
+        SET session_count_cached = t.session_count_cached + d.delta
+        FROM unnest(v_tune_ids, v_deltas) AS d(tune_id, delta)
+        WHERE t.tune_id = d.tune_id;
+    ELSE
+        UPDATE tune t
+        SET tunelist_count_cached = t.tunelist_count_cached + d.delta
+        FROM unnest(v_tune_ids, v_deltas) AS d(tune_id, delta)
+        WHERE t.tune_id = d.tune_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_tune_last_modified_date ON tune;
+-- last_modified_date records edits to the tune itself, so the trigger lists the
+-- columns that make one; the usage counters (031) change with every tune list
+-- or session add and are left out. A new editable column belongs in this list.
+CREATE TRIGGER trigger_tune_last_modified_date
+    BEFORE UPDATE OF tune_id, name, tune_type, tunebook_count_cached, tunebook_count_cached_date,
+                     redirect_to_tune_id, created_date, created_by_user_id, last_modified_user_id, name_search
+    ON tune
+    FOR EACH ROW
+    EXECUTE FUNCTION update_tune_last_modified_date();
+
+-- Repair drift (only tunes whose counts are off).
+WITH counts AS (
+    SELECT t.tune_id,
+           COALESCE(s.n, 0) AS session_count,
+           COALESCE(p.n, 0) AS tunelist_count
+    FROM tune t
+    LEFT JOIN (SELECT tune_id, COUNT(*) AS n FROM session_tune GROUP BY tune_id) s ON s.tune_id = t.tune_id
+    LEFT JOIN (SELECT tune_id, COUNT(*) AS n FROM person_tune GROUP BY tune_id) p ON p.tune_id = t.tune_id
+)
+UPDATE tune t
+SET session_count_cached = c.session_count, tunelist_count_cached = c.tunelist_count
+FROM counts c
+WHERE c.tune_id = t.tune_id
+  AND (t.session_count_cached, t.tunelist_count_cached) IS DISTINCT FROM (c.session_count, c.tunelist_count);
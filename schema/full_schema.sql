@@ -17,6 +17,9 @@
 -- Enable unaccent extension for accent-insensitive text searches
 CREATE EXTENSION IF NOT EXISTS unaccent;
 
+-- Trigram matching for indexed substring / typo-tolerant tune-name search (029)
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 -- =============================================================================
 -- BASE TABLES (no foreign key dependencies)
 -- =============================================================================
@@ -116,7 +119,10 @@ CREATE TABLE tune (
     created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     last_modified_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     created_by_user_id INTEGER,
-    last_modified_user_id INTEGER
+    last_modified_user_id INTEGER,
+    name_search TEXT,
+    session_count_cached INTEGER NOT NULL DEFAULT 0,
+    tunelist_count_cached INTEGER NOT NULL DEFAULT 0
 );
 
 CREATE INDEX idx_tune_created_by ON tune(created_by_user_id);
@@ -160,8 +166,13 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql;
 
+-- last_modified_date records edits to the tune itself, so the trigger lists the
+-- columns that make one (037); the usage counters (031) change with every tune list
+-- or session add and are left out. A new editable column belongs in this list.
 CREATE TRIGGER trigger_tune_last_modified_date
-    BEFORE UPDATE ON tune
+    BEFORE UPDATE OF tune_id, name, tune_type, tunebook_count_cached, tunebook_count_cached_date,
+                     redirect_to_tune_id, created_date, created_by_user_id, last_modified_user_id, name_search
+    ON tune
     FOR EACH ROW
     EXECUTE FUNCTION update_tune_last_modified_date();
 
@@ -189,7 +200,9 @@ CREATE TABLE session_instance (
     created_date TIMESTAMPTZ DEFAULT (NOW() AT TIME ZONE 'UTC'),
     last_modified_date TIMESTAMPTZ DEFAULT (NOW() AT TIME ZONE 'UTC'),
     created_by_user_id INTEGER,
-    last_modified_user_id INTEGER
+    last_modified_user_id INTEGER,
+    active_from_utc TIMESTAMPTZ,
+    active_until_utc TIMESTAMPTZ
 );
 
 CREATE INDEX idx_session_instance_session_id ON session_instance(session_id);
@@ -1315,6 +1328,577 @@ $$;
 COMMENT ON FUNCTION merge_tune_ids(INTEGER, INTEGER, INTEGER) IS
 'Merges all references from old_tune_id to new_tune_id across tables. Marks old tune with redirect_to_tune_id.';
 
+-- -----------------------------------------------------------------------------
+-- Tune match invalidation (tune_match_index.py) -- see 025_tune_match_notify.sql
+-- -----------------------------------------------------------------------------
+-- NOTIFY 'tune_match_invalidate' so every web process drops its in-memory copy
+-- of tune names / session aliases when they change.
+CREATE OR REPLACE FUNCTION notify_tune_match_session()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM pg_notify('tune_match_invalidate', 'session:' || OLD.session_id);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM pg_notify('tune_match_invalidate', 'session:' || NEW.session_id);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION notify_tune_match_tune()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        PERFORM pg_notify('tune_match_invalidate', 'tune:' || OLD.tune_id);
+    ELSE
+        PERFORM pg_notify('tune_match_invalidate', 'tune:' || NEW.tune_id);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trigger_session_tune_match_notify
+    AFTER INSERT OR UPDATE OR DELETE ON session_tune
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_tune_match_session();
+
+CREATE TRIGGER trigger_session_tune_alias_match_notify
+    AFTER INSERT OR UPDATE OR DELETE ON session_tune_alias
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_tune_match_session();
+
+CREATE TRIGGER trigger_tune_match_notify
+    AFTER INSERT OR DELETE OR UPDATE OF name, tune_type, tunebook_count_cached, redirect_to_tune_id ON tune
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_tune_match_tune();
+
+-- -----------------------------------------------------------------------------
+-- Per-session tune play counts -- see 026_session_tune_play.sql
+-- -----------------------------------------------------------------------------
+-- Maintained by statement-level triggers on session_instance_tune so readers
+-- (matcher, live deep search, session tunes pages) skip the GROUP BY.
+CREATE TABLE session_tune_play (
+    session_id INTEGER NOT NULL REFERENCES session(session_id) ON DELETE CASCADE,
+    tune_id INTEGER NOT NULL REFERENCES tune(tune_id) ON DELETE CASCADE,
+    play_count INTEGER NOT NULL DEFAULT 0,
+    instance_count INTEGER NOT NULL DEFAULT 0,
+    last_played DATE,
+    PRIMARY KEY (session_id, tune_id)
+);
+
+CREATE INDEX idx_session_tune_play_tune_id ON session_tune_play (tune_id);
+
+-- Recount the given (session_id, tune_id) pairs from session_instance_tune,
+-- serialized per pair (036).
+--
+-- Each pair is locked (transaction-scoped advisory lock, in a fixed order so two
+-- writers can't deadlock) before it is counted. Without the lock, two concurrent
+-- transactions adding plays of the same tune each counted without seeing the
+-- other's uncommitted row, and the one that upserted second wrote its stale count.
+-- Under READ COMMITTED the count below takes a fresh snapshot after the locks are
+-- held, so it sees every earlier writer's committed rows.
+CREATE OR REPLACE FUNCTION refresh_session_tune_play(p_session_ids INTEGER[], p_tune_ids INTEGER[])
+RETURNS VOID AS $$
+BEGIN
+    PERFORM pg_advisory_xact_lock(k.lock_key)
+    FROM unnest(ARRAY(
+        SELECT DISTINCT hashtext('session_tune_play:' || p.session_id || ':' || p.tune_id)
+        FROM unnest(p_session_ids, p_tune_ids) AS p(session_id, tune_id)
+        WHERE p.session_id IS NOT NULL AND p.tune_id IS NOT NULL
+        ORDER BY 1
+    )) AS k(lock_key);
+
+    WITH pairs AS (
+        SELECT DISTINCT p.session_id, p.tune_id
+        FROM unnest(p_session_ids, p_tune_ids) AS p(session_id, tune_id)
+        WHERE p.session_id IS NOT NULL AND p.tune_id IS NOT NULL
+    ),
+    counts AS (
+        SELECT pairs.session_id, pairs.tune_id,
+               COUNT(sit.session_instance_tune_id) AS play_count,
+               COUNT(DISTINCT sit.session_instance_id) AS instance_count,
+               MAX(si.date) AS last_played
+        FROM pairs
+        LEFT JOIN (session_instance si
+                   JOIN session_instance_tune sit
+                     ON sit.session_instance_id = si.session_instance_id
+                    AND sit.record_type = 'tune'
+                    AND sit.deleted = FALSE)
+               ON si.session_id = pairs.session_id AND sit.tune_id = pairs.tune_id
+        GROUP BY pairs.session_id, pairs.tune_id
+    ),
+    gone AS (
+        DELETE FROM session_tune_play stp
+        USING counts c
+        WHERE stp.session_id = c.session_id AND stp.tune_id = c.tune_id AND c.play_count = 0
+    )
+    INSERT INTO session_tune_play (session_id, tune_id, play_count, instance_count, last_played)
+    SELECT session_id, tune_id, play_count, instance_count, last_played
+    FROM counts
+    WHERE play_count > 0
+    ON CONFLICT (session_id, tune_id) DO UPDATE
+        SET play_count = EXCLUDED.play_count,
+            instance_count = EXCLUDED.instance_count,
+            last_played = EXCLUDED.last_played;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Statement-level maintenance: recount the pairs a statement's rows belong to.
+-- UPDATEs that leave tune_id / record_type / deleted / instance alone (reorders,
+-- key overrides, timestamps) touch no pairs and cost nothing.
+CREATE OR REPLACE FUNCTION maintain_session_tune_play()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_session_ids INTEGER[];
+    v_tune_ids INTEGER[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(si.session_id), array_agg(n.tune_id)
+          INTO v_session_ids, v_tune_ids
+          FROM new_rows n
+          JOIN session_instance si ON si.session_instance_id = n.session_instance_id
+         WHERE n.tune_id IS NOT NULL;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(si.session_id), array_agg(o.tune_id)
+          INTO v_session_ids, v_tune_ids
+          FROM old_rows o
+          JOIN session_instance si ON si.session_instance_id = o.session_instance_id
+         WHERE o.tune_id IS NOT NULL;
+    ELSE
+        WITH changed AS (
+            SELECT o.session_instance_id AS old_instance, o.tune_id AS old_tune,
+                   n.session_instance_id AS new_instance, n.tune_id AS new_tune
+              FROM old_rows o
+              JOIN new_rows n ON n.session_instance_tune_id = o.session_instance_tune_id
+             WHERE o.tune_id IS DISTINCT FROM n.tune_id
+                OR o.session_instance_id IS DISTINCT FROM n.session_instance_id
+                OR o.record_type IS DISTINCT FROM n.record_type
+                OR o.deleted IS DISTINCT FROM n.deleted
+        ),
+        touched AS (
+            SELECT old_instance AS session_instance_id, old_tune AS tune_id FROM changed
+            UNION
+            SELECT new_instance, new_tune FROM changed
+        )
+        SELECT array_agg(si.session_id), array_agg(t.tune_id)
+          INTO v_session_ids, v_tune_ids
+          FROM touched t
+          JOIN session_instance si ON si.session_instance_id = t.session_instance_id
+         WHERE t.tune_id IS NOT NULL;
+    END IF;
+
+    IF v_tune_ids IS NOT NULL THEN
+        PERFORM refresh_session_tune_play(v_session_ids, v_tune_ids);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trigger_session_tune_play_insert
+    AFTER INSERT ON session_instance_tune
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION maintain_session_tune_play();
+
+CREATE TRIGGER trigger_session_tune_play_update
+    AFTER UPDATE ON session_instance_tune
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION maintain_session_tune_play();
+
+CREATE TRIGGER trigger_session_tune_play_delete
+    AFTER DELETE ON session_instance_tune
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION maintain_session_tune_play();
+
+-- Moving an instance to another date or session changes last_played (and, for
+-- a session move, which session the plays count toward).
+CREATE OR REPLACE FUNCTION maintain_session_tune_play_instance()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF OLD.session_id IS DISTINCT FROM NEW.session_id OR OLD.date IS DISTINCT FROM NEW.date THEN
+        PERFORM refresh_session_tune_play(
+            array_agg(s.session_id), array_agg(s.tune_id))
+        FROM (
+            SELECT DISTINCT OLD.session_id AS session_id, sit.tune_id
+              FROM session_instance_tune sit
+             WHERE sit.session_instance_id = NEW.session_instance_id AND sit.tune_id IS NOT NULL
+            UNION
+            SELECT DISTINCT NEW.session_id, sit.tune_id
+              FROM session_instance_tune sit
+             WHERE sit.session_instance_id = NEW.session_instance_id AND sit.tune_id IS NOT NULL
+        ) s;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trigger_session_tune_play_instance
+    AFTER UPDATE OF session_id, date ON session_instance
+    FOR EACH ROW
+    EXECUTE FUNCTION maintain_session_tune_play_instance();
+
+-- -----------------------------------------------------------------------------
+-- Background job queue (job_queue.py) -- see 027_background_job.sql
+-- -----------------------------------------------------------------------------
+CREATE TABLE background_job (
+    job_id BIGSERIAL PRIMARY KEY,
+    job_type VARCHAR(64) NOT NULL,
+    dedupe_key VARCHAR(128),
+    payload JSONB NOT NULL DEFAULT '{}'::jsonb,
+    status VARCHAR(16) NOT NULL DEFAULT 'pending',  -- 'pending' | 'running' | 'done' | 'failed'
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 5,
+    run_after TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    locked_by VARCHAR(128),
+    locked_at TIMESTAMPTZ,
+    last_error TEXT,
+    created_date TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    finished_date TIMESTAMPTZ,
+    CONSTRAINT background_job_status_check CHECK (status IN ('pending', 'running', 'done', 'failed'))
+);
+
+-- What workers scan: due pending jobs, oldest first.
+CREATE INDEX idx_background_job_due
+    ON background_job (run_after, job_id) WHERE status = 'pending';
+
+-- Dedupe among live jobs only; finished jobs don't block re-enqueueing.
+CREATE UNIQUE INDEX idx_background_job_dedupe
+    ON background_job (job_type, dedupe_key) WHERE status IN ('pending', 'running') AND dedupe_key IS NOT NULL;
+
+-- Stale-lock recovery looks at running jobs by lock age.
+CREATE INDEX idx_background_job_running
+    ON background_job (locked_at) WHERE status = 'running';
+
+CREATE TABLE job_rate_limit (
+    host VARCHAR(255) PRIMARY KEY,
+    next_allowed_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE OR REPLACE FUNCTION notify_background_job()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('background_job', '');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trigger_background_job_notify
+    AFTER INSERT ON background_job
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION notify_background_job();
+
+-- Live-logging feed snapshots (028): state as of event_id, for bounded replay.
+CREATE TABLE session_snapshot (
+    session_instance_id INTEGER PRIMARY KEY REFERENCES session_instance(session_instance_id) ON DELETE CASCADE,
+    event_id            BIGINT NOT NULL,
+    payload             JSONB NOT NULL,
+    compacted_through   BIGINT NOT NULL DEFAULT 0,
+    created_date        TIMESTAMPTZ NOT NULL DEFAULT (NOW() AT TIME ZONE 'UTC')
+);
+
+-- Normalized tune name for search (029): LOWER(unaccent(name)), trigram-indexed.
+CREATE OR REPLACE FUNCTION set_tune_name_search()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.name_search := LOWER(unaccent(NEW.name));
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trigger_tune_name_search
+    BEFORE INSERT OR UPDATE OF name ON tune
+    FOR EACH ROW
+    EXECUTE FUNCTION set_tune_name_search();
+
+CREATE INDEX idx_tune_name_search_trgm ON tune USING GIN (name_search gin_trgm_ops);
+
+-- Melody index for search by ABC (030): interval n-grams per cached setting.
+CREATE TABLE tune_setting_melody (
+    setting_id    INTEGER PRIMARY KEY REFERENCES tune_setting(setting_id) ON DELETE CASCADE,
+    grams         TEXT[] NOT NULL,
+    version       SMALLINT NOT NULL,
+    indexed_date  TIMESTAMPTZ NOT NULL DEFAULT (NOW() AT TIME ZONE 'UTC')
+);
+
+CREATE INDEX idx_tune_setting_melody_grams ON tune_setting_melody USING GIN (grams);
+
+-- Tune usage counters (031): sessions / tune lists per tune, kept by triggers.
+-- Recount the given tunes from session_tune and person_tune (repairs; the
+-- triggers apply per-statement deltas).
+CREATE OR REPLACE FUNCTION refresh_tune_usage_counts(p_tune_ids INTEGER[])
+RETURNS VOID AS $$
+BEGIN
+    UPDATE tune t
+    SET session_count_cached = c.session_count, tunelist_count_cached = c.tunelist_count
+    FROM (
+        SELECT ids.tune_id,
+               (SELECT COUNT(*) FROM session_tune st WHERE st.tune_id = ids.tune_id) AS session_count,
+               (SELECT COUNT(*) FROM person_tune pt WHERE pt.tune_id = ids.tune_id) AS tunelist_count
+        FROM unnest(p_tune_ids) AS ids(tune_id)
+    ) c
+    WHERE t.tune_id = c.tune_id
+      AND (t.session_count_cached, t.tunelist_count_cached) IS DISTINCT FROM (c.session_count, c.tunelist_count);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Shared by both tables (037). Applies each statement's per-tune change in row count
+-- (its transition tables) to the counter, rather than recounting: a recount
+-- under READ COMMITTED misses concurrent transactions' uncommitted rows and,
+-- written after waiting on the tune's row lock, would overwrite their update.
+-- The tune rows are locked in tune_id order first, so two bulk writers (tunebook
+-- syncs) touching overlapping tunes queue instead of deadlocking. The lock is
+-- NO KEY UPDATE, not FOR UPDATE: each inserted row's foreign-key check already
+-- holds KEY SHARE on its tune, which FOR UPDATE conflicts with (two writers of
+-- the same tune would each wait on the other's KEY SHARE).
+CREATE OR REPLACE FUNCTION maintain_tune_usage_counts()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_tune_ids INTEGER[];
+    v_deltas INTEGER[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(tune_id ORDER BY tune_id), array_agg(n ORDER BY tune_id)
+          INTO v_tune_ids, v_deltas
+          FROM (SELECT tune_id, COUNT(*)::INTEGER AS n FROM new_rows GROUP BY tune_id) d
+         WHERE tune_id IS NOT NULL;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(tune_id ORDER BY tune_id), array_agg(n ORDER BY tune_id)
+          INTO v_tune_ids, v_deltas
+          FROM (SELECT tune_id, -COUNT(*)::INTEGER AS n FROM old_rows GROUP BY tune_id) d
+         WHERE tune_id IS NOT NULL;
+    ELSE
+        -- Only tunes rows moved onto or off (merges) change
+        SELECT array_agg(tune_id ORDER BY tune_id), array_agg(n ORDER BY tune_id)
+          INTO v_tune_ids, v_deltas
+          FROM (
+              SELECT tune_id, SUM(n)::INTEGER AS n
+                FROM (SELECT tune_id, 1 AS n FROM new_rows
+                      UNION ALL
+                      SELECT tune_id, -1 FROM old_rows) r
+               GROUP BY tune_id
+              HAVING SUM(n) <> 0
+          ) d
+         WHERE tune_id IS NOT NULL;
+    END IF;
+
+    IF v_tune_ids IS NULL THEN
+        RETURN NULL;
+    END IF;
+
+    PERFORM 1 FROM tune WHERE tune_id = ANY(v_tune_ids) ORDER BY tune_id FOR NO KEY UPDATE;
+    IF TG_TABLE_NAME = 'session_tune' THEN
+        UPDATE tune t
+        SET session_count_cached = t.session_count_cached + d.delta
+        FROM unnest(v_tune_ids, v_deltas) AS d(tune_id, delta)
+        WHERE t.tune_id = d.tune_id;
+    ELSE
+        UPDATE tune t
+        SET tunelist_count_cached = t.tunelist_count_cached + d.delta
+        FROM unnest(v_tune_ids, v_deltas) AS d(tune_id, delta)
+        WHERE t.tune_id = d.tune_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trigger_session_tune_usage_insert
+    AFTER INSERT ON session_tune
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION maintain_tune_usage_counts();
+
+CREATE TRIGGER trigger_session_tune_usage_update
+    AFTER UPDATE ON session_tune
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION maintain_tune_usage_counts();
+
+CREATE TRIGGER trigger_session_tune_usage_delete
+    AFTER DELETE ON session_tune
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION maintain_tune_usage_counts();
+
+CREATE TRIGGER trigger_person_tune_usage_insert
+    AFTER INSERT ON person_tune
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION maintain_tune_usage_counts();
+
+CREATE TRIGGER trigger_person_tune_usage_update
+    AFTER UPDATE ON person_tune
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION maintain_tune_usage_counts();
+
+CREATE TRIGGER trigger_person_tune_usage_delete
+    AFTER DELETE ON person_tune
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION maintain_tune_usage_counts();
+
+-- Keyset pagination orders (see get_admin_tunes).
+CREATE INDEX idx_tune_admin_name ON tune (name_search, tune_id);
+CREATE INDEX idx_tune_admin_sessions ON tune (session_count_cached, tune_id);
+CREATE INDEX idx_tune_admin_tunelists ON tune (tunelist_count_cached, tune_id);
+CREATE INDEX idx_tune_admin_popularity ON tune ((COALESCE(tunebook_count_cached, 0)), tune_id);
+
+-- Session instance active windows (032): UTC activation timeline, kept by triggers.
+-- Local date + time in a named zone, shifted by p_offset_minutes. NULL for a
+-- NULL time or an unknown zone (an instance insert must never fail over this).
+CREATE OR REPLACE FUNCTION session_local_to_utc(p_date DATE, p_time TIME, p_timezone TEXT, p_offset_minutes INTEGER)
+RETURNS TIMESTAMPTZ AS $$
+BEGIN
+    IF p_time IS NULL THEN
+        RETURN NULL;
+    END IF;
+    RETURN ((p_date + p_time) AT TIME ZONE p_timezone) + make_interval(mins => p_offset_minutes);
+EXCEPTION WHEN invalid_parameter_value THEN
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+CREATE OR REPLACE FUNCTION set_session_instance_active_window()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_timezone TEXT;
+    v_before INTEGER;
+    v_after INTEGER;
+BEGIN
+    SELECT timezone, active_buffer_minutes_before, active_buffer_minutes_after
+      INTO v_timezone, v_before, v_after
+      FROM session WHERE session_id = NEW.session_id;
+
+    IF NEW.start_time IS NULL OR NEW.end_time IS NULL THEN
+        NEW.active_from_utc := NULL;
+        NEW.active_until_utc := NULL;
+    ELSE
+        NEW.active_from_utc := session_local_to_utc(NEW.date, NEW.start_time, v_timezone, -v_before);
+        NEW.active_until_utc := session_local_to_utc(NEW.date, NEW.end_time, v_timezone, v_after);
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trigger_session_instance_active_window
+    BEFORE INSERT OR UPDATE OF session_id, date, start_time, end_time ON session_instance
+    FOR EACH ROW
+    EXECUTE FUNCTION set_session_instance_active_window();
+
+-- A session's timezone or buffers moved: recompute its instances' windows.
+CREATE OR REPLACE FUNCTION refresh_session_active_windows()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF OLD.timezone IS DISTINCT FROM NEW.timezone
+       OR OLD.active_buffer_minutes_before IS DISTINCT FROM NEW.active_buffer_minutes_before
+       OR OLD.active_buffer_minutes_after IS DISTINCT FROM NEW.active_buffer_minutes_after THEN
+        UPDATE session_instance
+        SET active_from_utc = session_local_to_utc(date, start_time, NEW.timezone, -NEW.active_buffer_minutes_before),
+            active_until_utc = session_local_to_utc(date, end_time, NEW.timezone, NEW.active_buffer_minutes_after)
+        WHERE session_id = NEW.session_id
+          AND start_time IS NOT NULL AND end_time IS NOT NULL;
+        PERFORM pg_notify('session_schedule', NEW.session_id::text);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trigger_session_active_windows
+    AFTER UPDATE OF timezone, active_buffer_minutes_before, active_buffer_minutes_after ON session
+    FOR EACH ROW
+    EXECUTE FUNCTION refresh_session_active_windows();
+
+-- Wake the scheduler (jobs/active_session_scheduler.py) when the timeline changes.
+CREATE OR REPLACE FUNCTION notify_session_schedule()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('session_schedule', '');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trigger_session_instance_schedule_notify
+    AFTER INSERT OR UPDATE OF session_id, date, start_time, end_time, is_cancelled ON session_instance
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION notify_session_schedule();
+
+-- Pending windows: inactive, not cancelled, by when they close. Only windows
+-- that haven't closed are ever read, so history stays out of the range scan.
+-- (Active instances are few; idx_session_instance_is_active covers them.)
+CREATE INDEX idx_session_instance_pending_window
+    ON session_instance (active_until_utc)
+    WHERE is_active = FALSE AND is_cancelled = FALSE;
+
+-- 033: at most one system-created (auto-created) instance per session and date;
+-- the conflict target for auto_create_instances_bulk's ON CONFLICT DO NOTHING.
+CREATE UNIQUE INDEX idx_session_instance_auto_created_date
+    ON session_instance (session_id, date)
+    WHERE created_by_user_id IS NULL;
+
+-- 034: NOTIFY user_cache.py (load_user's per-process cache) when a cached user is stale.
+CREATE OR REPLACE FUNCTION notify_user_cache()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_TABLE_NAME = 'user_account' THEN
+        PERFORM pg_notify('user_cache_invalidate', 'user:' || OLD.user_id);
+    ELSIF TG_TABLE_NAME = 'person' THEN
+        PERFORM pg_notify('user_cache_invalidate', 'person:' || OLD.person_id);
+    ELSIF TG_TABLE_NAME = 'session_instance' THEN
+        PERFORM pg_notify('user_cache_invalidate', 'instance:' || OLD.session_instance_id);
+    ELSE
+        PERFORM pg_notify('user_cache_invalidate', 'session:' || OLD.session_id);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trigger_user_account_cache_notify
+    AFTER UPDATE ON user_account
+    FOR EACH ROW
+    WHEN ((OLD.person_id, OLD.username, OLD.is_active, OLD.is_system_admin, OLD.timezone, OLD.email_verified,
+           OLD.auto_save_tunes, OLD.auto_save_interval, OLD.beta_live_logging)
+          IS DISTINCT FROM
+          (NEW.person_id, NEW.username, NEW.is_active, NEW.is_system_admin, NEW.timezone, NEW.email_verified,
+           NEW.auto_save_tunes, NEW.auto_save_interval, NEW.beta_live_logging))
+    EXECUTE FUNCTION notify_user_cache();
+
+CREATE TRIGGER trigger_user_account_cache_notify_delete
+    AFTER DELETE ON user_account
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_user_cache();
+
+CREATE TRIGGER trigger_person_user_cache_notify
+    AFTER UPDATE ON person
+    FOR EACH ROW
+    WHEN ((OLD.first_name, OLD.last_name, OLD.email, OLD.at_active_session_instance_id)
+          IS DISTINCT FROM
+          (NEW.first_name, NEW.last_name, NEW.email, NEW.at_active_session_instance_id))
+    EXECUTE FUNCTION notify_user_cache();
+
+CREATE TRIGGER trigger_session_instance_user_cache_notify
+    AFTER UPDATE ON session_instance
+    FOR EACH ROW
+    WHEN ((OLD.session_id, OLD.date, OLD.start_time, OLD.end_time, OLD.location_override)
+          IS DISTINCT FROM
+          (NEW.session_id, NEW.date, NEW.start_time, NEW.end_time, NEW.location_override))
+    EXECUTE FUNCTION notify_user_cache();
+
+CREATE TRIGGER trigger_session_user_cache_notify
+    AFTER UPDATE ON session
+    FOR EACH ROW
+    WHEN ((OLD.name, OLD.path) IS DISTINCT FROM (NEW.name, NEW.path))
+    EXECUTE FUNCTION notify_user_cache();
+
+-- Notation image content hashes (035): name the images in their URLs.
+ALTER TABLE tune_setting
+    ADD COLUMN image_hash TEXT GENERATED ALWAYS AS (md5(image)) STORED;
+
+ALTER TABLE tune_setting
+    ADD COLUMN incipit_image_hash TEXT GENERATED ALWAYS AS (md5(incipit_image)) STORED;
+
 -- =============================================================================
 -- Schema creation complete
 -- =============================================================================
@@ -3,23 +3,34 @@
 Database Backup Script for ceol.io Production Database
 
 This script creates a complete backup of all tables and data in the production database.
-It generates SQL INSERT statements that can be used to restore the data.
+
+The default (copy) format streams each table with COPY ... TO STDOUT straight
+into its own gzipped file. Tables are dumped in parallel, and every worker reads
+from the same exported snapshot, so the backup is as consistent as a
+single-transaction dump. restore_database.py loads it back with COPY FROM.
+
+The sql format is the original single file of INSERT statements (slower, but
+plain SQL you can read or run with psql).
 
 Usage:
-    python backup_database.py
+    python backup_database.py [--yes] [--format copy|sql] [--jobs N]
 
 Environment variables needed (same as your Flask app):
     PGHOST, PGDATABASE, PGUSER, PGPASSWORD, PGPORT
 
-Output:
-    - backup_YYYY-MM-DD_HH-MM-SS.sql file with all data
-    - Compressed backup_YYYY-MM-DD_HH-MM-SS.sql.gz file
+Output (in data/backup/):
+    copy: backup_YYYY-MM-DD_HH-MM-SS/ with manifest.json and one <table>.copy.gz per table
+    sql:  backup_YYYY-MM-DD_HH-MM-SS.sql and compressed backup_YYYY-MM-DD_HH-MM-SS.sql.gz
 """
 
 import os
+import json
+import time
+import argparse
 import psycopg2
 import psycopg2.extras
 from psycopg2 import sql
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import gzip
 import sys
@@ -30,6 +41,15 @@ script_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.dirname(script_dir)
 load_dotenv(os.path.join(project_root, ".env"))
 
+# Tables dumped at once in copy format (one connection each)
+DEFAULT_JOBS = 4
+
+# Copy-format layout, shared with restore_database.py
+MANIFEST_NAME = "manifest.json"
+COPY_SUFFIX = ".copy.gz"
+# Fast gzip level: the dump is I/O bound, level 9 would make it CPU bound
+COPY_COMPRESS_LEVEL = 3
+
 
 def get_db_connection():
     """Create database connection using environment variables"""
@@ -72,6 +92,7 @@ def get_table_schema(cursor, table_name):
         FROM information_schema.columns
         WHERE table_schema = 'public'
         AND table_name = %s
+        AND is_generated = 'NEVER'  -- generated columns are recomputed on restore
         ORDER BY ordinal_position;
     """,
         (table_name,),
@@ -163,6 +184,139 @@ def backup_table_data(cursor, table_name, file_handle):
     print(f"  Completed: {rows_processed} rows")
 
 
+class CountingWriter:
+    """File wrapper that counts the (uncompressed) bytes COPY writes through it."""
+
+    def __init__(self, file_handle):
+        self.file_handle = file_handle
+        self.bytes = 0
+
+    def write(self, data):
+        self.bytes += len(data)
+        return self.file_handle.write(data)
+
+
+def format_throughput(byte_count, seconds):
+    megabytes = byte_count / (1024 * 1024)
+    return f"{megabytes:.1f} MB in {seconds:.1f}s ({megabytes / max(seconds, 0.001):.1f} MB/s)"
+
+
+def get_tables_by_size(cursor, tables):
+    """The tables, largest first, so the parallel dump doesn't end on a big one"""
+    cursor.execute(
+        """
+        SELECT c.relname
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = 'public' AND c.relname = ANY(%s)
+        ORDER BY pg_total_relation_size(c.oid) DESC, c.relname
+    """,
+        (tables,),
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def copy_table_out(snapshot, table_name, columns, path):
+    """
+    Stream one table to path with COPY ... TO STDOUT, inside the exported snapshot.
+    Returns (rows, uncompressed bytes, seconds).
+    """
+    started = time.monotonic()
+    conn = get_db_connection()
+    try:
+        conn.set_session(isolation_level="REPEATABLE READ", readonly=True)
+        cursor = conn.cursor()
+        cursor.execute("SET TRANSACTION SNAPSHOT %s", (snapshot,))
+        copy_sql = sql.SQL("COPY {} ({}) TO STDOUT").format(
+            sql.Identifier(table_name),
+            sql.SQL(", ").join(sql.Identifier(col) for col in columns),
+        )
+        with gzip.open(path, "wb", compresslevel=COPY_COMPRESS_LEVEL) as f:
+            writer = CountingWriter(f)
+            cursor.copy_expert(copy_sql.as_string(conn), writer)
+        rows = cursor.rowcount
+        conn.rollback()
+    finally:
+        conn.close()
+    return rows, writer.bytes, time.monotonic() - started
+
+
+def create_copy_backup(jobs=DEFAULT_JOBS):
+    """Create a copy-format backup: parallel per-table COPY under one snapshot"""
+    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    backup_dir = os.path.join(project_root, "data", "backup", f"backup_{timestamp}")
+    os.makedirs(backup_dir, exist_ok=True)
+
+    print(f"Creating database backup: {backup_dir}")
+    print("=" * 50)
+
+    # The coordinator holds the snapshot open until every worker has finished
+    conn = get_db_connection()
+    conn.set_session(isolation_level="REPEATABLE READ", readonly=True)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("SELECT pg_export_snapshot()")
+        snapshot = cursor.fetchone()[0]
+
+        tables = get_all_tables(cursor)
+        columns = {table: [col[0] for col in get_table_schema(cursor, table)] for table in tables}
+        print(f"Found {len(tables)} tables; dumping with {jobs} jobs from snapshot {snapshot}")
+        print()
+
+        started = time.monotonic()
+        results = {}
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            futures = {
+                table: pool.submit(
+                    copy_table_out, snapshot, table, columns[table],
+                    os.path.join(backup_dir, table + COPY_SUFFIX),
+                )
+                for table in get_tables_by_size(cursor, tables)
+            }
+            for table, future in futures.items():
+                rows, byte_count, seconds = results[table] = future.result()
+                print(f"  {table}: {rows} rows, {format_throughput(byte_count, seconds)}")
+        elapsed = time.monotonic() - started
+
+        manifest = {
+            "format": "copy",
+            "generated": datetime.now().isoformat(),
+            "database": os.environ.get("PGDATABASE"),
+            "host": os.environ.get("PGHOST"),
+            # Restore order: base tables first, then history tables
+            "tables": [
+                {
+                    "name": table,
+                    "file": table + COPY_SUFFIX,
+                    "columns": columns[table],
+                    "rows": results[table][0],
+                    "bytes": results[table][1],
+                }
+                for table in tables
+            ],
+        }
+        with open(os.path.join(backup_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+
+        total_rows = sum(r[0] for r in results.values())
+        total_bytes = sum(r[1] for r in results.values())
+        compressed_size = sum(
+            os.path.getsize(os.path.join(backup_dir, t["file"])) for t in manifest["tables"]
+        ) / (1024 * 1024)
+
+        print(f"\nBackup completed: {backup_dir}")
+        print(f"  {total_rows} rows, {format_throughput(total_bytes, elapsed)}")
+        print(f"  Compressed size: {compressed_size:.1f} MB")
+
+    except Exception as e:
+        print(f"Error during backup: {e}")
+        sys.exit(1)
+    finally:
+        cursor.close()
+        conn.close()
+
+
 def create_backup():
     """Create a complete database backup"""
     timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
@@ -259,6 +413,14 @@ def create_backup():
 
 def main():
     """Main function"""
+    parser = argparse.ArgumentParser(description="Back up every table in the ceol.io database.")
+    parser.add_argument("--yes", action="store_true", help="Don't ask for confirmation")
+    parser.add_argument("--format", choices=["copy", "sql"], default="copy",
+                        help="copy: parallel COPY into per-table gzip files (default); sql: one INSERT script")
+    parser.add_argument("--jobs", type=int, default=DEFAULT_JOBS,
+                        help=f"Tables dumped at once in copy format (default {DEFAULT_JOBS})")
+    args = parser.parse_args()
+
     print("ceol.io Database Backup Script")
     print("=" * 40)
 
@@ -279,7 +441,7 @@ def main():
     print()
 
     # Confirm before proceeding (skip if not interactive or --yes flag)
-    if "--yes" in sys.argv or not sys.stdin.isatty():
+    if args.yes or not sys.stdin.isatty():
         print("Proceeding with backup (non-interactive mode)")
     else:
         response = input("Proceed with backup? (y/N): ")
@@ -287,7 +449,10 @@ def main():
             print("Backup cancelled")
             sys.exit(0)
 
-    create_backup()
+    if args.format == "copy":
+        create_copy_backup(max(1, args.jobs))
+    else:
+        create_backup()
     print("\nBackup completed successfully!")
 
 
@@ -0,0 +1,692 @@
+#!/usr/bin/env python3
+"""
+Load test and benchmark for the live-logging path (spec 024).
+
+Two parts, both compared against a baseline file so a regression in the referee
+(live_op), the fan-out (_dispatch_ops, _Subscriber) or the framing (_sse) shows
+up as a failed run:
+
+  micro   in-process, no servers: the cost of framing one op (_sse) and of
+          fanning one frame out to 100 subscriber outboxes and draining them.
+
+  e2e     the real stack against the local Postgres (.env): starts the Flask
+          referee under gunicorn and streaming.service under uvicorn on free
+          ports (or uses running ones: --flask-url / --stream-url), opens
+          --listeners SSE connections per instance, then has --loggers clients
+          POST --ops add_tune ops each to /api/live/instances/<id>/ops.
+          Reports:
+            ack_ms             POST to ack, per op
+            delivery_ms        POST sent to the op's frame arriving, per listener
+            fanout_ms          NOTIFY to frame write inside the streaming service
+                               (its /metrics histogram; bucket upper bounds)
+            ops_per_second     acked ops over the logging phase
+            frames_per_second  op frames delivered to all listeners
+            rss_kb_per_connection  streaming process RSS growth per SSE connection
+            queries_per_op     queries live_op ran per request (the web /metrics)
+          Rows the run adds (tunes, their history, feed events, snapshots) are
+          deleted afterwards and the instances' logging_mode is restored, unless
+          --keep.
+
+The SSE listeners are raw asyncio connections, so a few thousand fit in this
+process; delivery latency includes this process's own parsing, which is small
+next to the service's but not zero at high fan-out.
+
+Usage:
+    python3 scripts/bench_live_logging.py [--micro-only] [--loggers N] [--listeners M]
+        [--instances ID ...] [--ops N] [--email E --password P]
+        [--baseline FILE] [--save-baseline] [--tolerance 0.5] [--json FILE]
+
+Exit status 1 if a metric is worse than the baseline by more than the tolerance.
+"""
+
+import gc
+import os
+import re
+import sys
+import json
+import math
+import time
+import uuid
+import socket
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+DEFAULT_BASELINE = os.path.join(PROJECT_ROOT, "scripts", "bench_live_logging_baseline.json")
+# Generous: timings on a shared machine vary by a third from run to run.
+DEFAULT_TOLERANCE = 0.5
+OPS_ROUTE = 'route="/api/live/instances/<int:session_instance_id>/ops"'
+
+# Checked against the baseline: metric -> True if bigger is better.
+REGRESSION_CHECKS = {
+    "micro.sse_frame_us": False,
+    "micro.fanout_us_per_op": False,
+    "e2e.ack_ms.p95": False,
+    "e2e.delivery_ms.p95": False,
+    "e2e.fanout_ms.p95": False,
+    "e2e.ops_per_second": True,
+    "e2e.rss_kb_per_connection": False,
+    "e2e.queries_per_op": False,
+}
+
+# An add_tune event as the referee writes it (payload of session_event).
+SAMPLE_PAYLOAD = json.dumps({
+    "record": {
+        "session_instance_tune_id": 123456, "tune_id": 1234, "name": "The Silver Spear",
+        "order_position": "a0V", "record_type": "tune", "source": "human", "confidence": None,
+        "deleted": False, "started_by_person_id": None, "key_override": None,
+        "setting_override": None, "tune_type": "Reel", "logged_at": "2026-01-01T21:14:03.123456",
+        "logged_by": "Sarah", "started_by_name": None, "logged_by_person_id": 42,
+        "logged_by_color": 3,
+    },
+    "actor": {"person_id": 42, "name": "Sarah"},
+})
+
+
+class BenchError(Exception):
+    pass
+
+
+# --- Statistics -----------------------------------------------------------
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of unsorted values (None if empty)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+def summarize_ms(seconds):
+    """p50/p95/p99/max in ms of a list of durations in seconds."""
+    if not seconds:
+        return None
+    return {name: round(percentile(seconds, p) * 1000, 2) for name, p in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99), ("max", 1.0))}
+
+
+def parse_metrics(text):
+    """Prometheus text -> {(sample name, raw label string): value}."""
+    samples = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        series, value = line.rsplit(" ", 1)
+        name, _, labels = series.partition("{")
+        samples[(name, labels.rstrip("}"))] = float(value)
+    return samples
+
+
+def metric_delta(before, after, name, match=""):
+    """Growth of a sample between two scrapes, summed over label sets containing `match`."""
+    return sum(
+        value - before.get(key, 0)
+        for key, value in after.items()
+        if key[0] == name and match in key[1]
+    )
+
+
+def histogram_delta(before, after, metric, match=""):
+    """{upper bound: cumulative count} observed between two scrapes."""
+    buckets = {}
+    for (name, labels), value in after.items():
+        if name != metric + "_bucket" or match not in labels:
+            continue
+        bound = float(re.search(r'le="([^"]+)"', labels).group(1))
+        buckets[bound] = buckets.get(bound, 0) + value - before.get((name, labels), 0)
+    return buckets
+
+
+def histogram_percentile(buckets, p):
+    """Upper bound of the bucket holding the p-th observation (None if empty)."""
+    total = buckets.get(math.inf, 0)
+    if not total:
+        return None
+    for bound in sorted(buckets):
+        if buckets[bound] >= p * total:
+            return bound
+    return math.inf
+
+
+# --- Baseline -------------------------------------------------------------
+
+
+def _flatten(result, prefix=""):
+    flat = {}
+    for key, value in result.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{prefix}{key}."))
+        else:
+            flat[prefix + key] = value
+    return flat
+
+
+def compare(result, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Regressions of `result` against `baseline` (empty if none). Metrics missing
+    from either side, or not measured this run, are skipped."""
+    current, previous = _flatten(result), _flatten(baseline)
+    problems = []
+    for metric, higher_is_better in REGRESSION_CHECKS.items():
+        now, then = current.get(metric), previous.get(metric)
+        if not isinstance(now, (int, float)) or not isinstance(then, (int, float)) or not then:
+            continue
+        change = (now - then) / then
+        if (-change if higher_is_better else change) > tolerance:
+            problems.append(f"{metric} is {now:g}, {abs(change):.0%} {'below' if higher_is_better else 'above'} the baseline {then:g}")
+    return problems
+
+
+# --- Micro-benchmarks -----------------------------------------------------
+
+
+def _best_of(runs, fn):
+    best = math.inf
+    gc.collect()
+    gc.disable()  # a collection landing in one run is noise, not the code's cost
+    try:
+        for _ in range(runs):
+            started = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - started)
+    finally:
+        gc.enable()
+    return best
+
+
+def run_micro(iterations=2000, subscribers=100, runs=7):
+    from streaming import service
+
+    def frame():
+        for event_id in range(iterations):
+            service._sse(event_id, "add_tune", SAMPLE_PAYLOAD)
+
+    fanout_ops = max(1, iterations // 4)
+
+    async def fanout():
+        subs = [service._Subscriber() for _ in range(subscribers)]
+
+        def run():
+            notified_at = time.monotonic()
+            for event_id in range(fanout_ops):
+                service._OP_FRAMES.pop(event_id, None)  # a new event: framed once, then shared
+                shared = service._op_frame(event_id, "add_tune", SAMPLE_PAYLOAD)
+                for sub in subs:
+                    sub.push_op(event_id, shared, notified_at)
+                for sub in subs:
+                    sub.drain()
+
+        return _best_of(runs, run)
+
+    sse_seconds = _best_of(runs, frame)
+    fanout_seconds = asyncio.run(fanout())
+    service._OP_FRAMES.clear()
+    return {
+        "sse_frame_us": round(sse_seconds / iterations * 1e6, 3),
+        "fanout_us_per_op": round(fanout_seconds / fanout_ops * 1e6, 2),
+        "fanout_subscribers": subscribers,
+    }
+
+
+# --- SSE listeners (raw asyncio HTTP) ------------------------------------
+
+
+class SseParser:
+    """Incremental SSE parser: yields (event, id) per complete message."""
+
+    def __init__(self):
+        self._buffer = b""
+
+    def feed(self, data):
+        self._buffer += data
+        *messages, self._buffer = self._buffer.split(b"\n\n")
+        out = []
+        for message in messages:
+            event = event_id = None
+            for line in message.split(b"\n"):
+                if line.startswith(b"event: "):
+                    event = line[7:].decode()
+                elif line.startswith(b"id: "):
+                    event_id = int(line[4:])
+            if event:
+                out.append((event, event_id))
+        return out
+
+
+async def _open_stream(url, path, headers):
+    parts = urlsplit(url)
+    reader, writer = await asyncio.open_connection(parts.hostname, parts.port or 80)
+    request = [f"GET {path} HTTP/1.1", f"Host: {parts.netloc}", "Accept: text/event-stream"]
+    request += [f"{k}: {v}" for k, v in headers.items()]
+    writer.write(("\r\n".join(request) + "\r\n\r\n").encode())
+    await writer.drain()
+    status = await reader.readline()
+    if b" 200 " not in status:
+        writer.close()
+        raise BenchError(f"SSE {path}: {status.decode().strip() or 'connection closed'}")
+    chunked = False
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        if line.lower().startswith(b"transfer-encoding:") and b"chunked" in line.lower():
+            chunked = True
+    return reader, writer, chunked
+
+
+async def _read_chunk(reader, chunked):
+    if not chunked:
+        return await reader.read(65536)
+    size = int((await reader.readline()).split(b";")[0], 16)
+    if size == 0:
+        return b""
+    data = await reader.readexactly(size)
+    await reader.readline()
+    return data
+
+
+class Listener:
+    """One SSE connection; records when each op frame arrived."""
+
+    def __init__(self, instance_id):
+        self.instance_id = instance_id
+        self.arrivals = {}  # event_id -> perf_counter time
+        self.live = asyncio.Event()
+
+    async def run(self, stream_url, cookie_header, since):
+        path = f"/live/instances/{self.instance_id}/events?last_event_id={since}"
+        reader, writer, chunked = await _open_stream(stream_url, path, {"Cookie": cookie_header})
+        parser = SseParser()
+        try:
+            while True:
+                data = await _read_chunk(reader, chunked)
+                if not data:
+                    return
+                now = time.perf_counter()
+                for event, event_id in parser.feed(data):
+                    if event == "op":
+                        self.arrivals.setdefault(event_id, now)
+                    elif event == "presence":
+                        self.live.set()  # sent after the replay: the stream is live
+        finally:
+            writer.close()
+
+
+# --- Loggers --------------------------------------------------------------
+
+
+def _log_ops(session, flask_url, instance_id, count, tag, acks):
+    """One logger: POST `count` add_tune ops back to back; appends (instance, event_id, sent, acked)."""
+    for i in range(count):
+        body = {"op_type": "add_tune", "op_id": str(uuid.uuid4()), "name": f"Bench Reel {tag}-{i}"}
+        sent = time.perf_counter()
+        resp = session.post(f"{flask_url}/api/live/instances/{instance_id}/ops", json=body, timeout=60)
+        acked = time.perf_counter()
+        ack = resp.json() if resp.headers.get("Content-Type", "").startswith("application/json") else {}
+        event_id = ack.get("event_id") if resp.status_code == 200 and ack.get("success") else None
+        acks.append((instance_id, event_id, sent, acked))
+
+
+# --- Servers --------------------------------------------------------------
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class Server:
+    """A service started for the run, its output going to a log file."""
+
+    def __init__(self, name, cmd, env, url, log_dir):
+        self.name, self.url = name, url
+        self.log_path = os.path.join(log_dir, f"{name}.log")
+        with open(self.log_path, "w") as log:
+            self.process = subprocess.Popen(cmd, cwd=PROJECT_ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+    def wait_ready(self, path, timeout=30):
+        import requests
+
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise BenchError(f"{self.name} exited with {self.process.returncode}; see {self.log_path}")
+            try:
+                if requests.get(self.url + path, headers=_metrics_headers(), timeout=2).status_code == 200:
+                    return
+            except requests.ConnectionError:
+                pass
+            time.sleep(0.2)
+        raise BenchError(f"{self.name} not ready after {timeout}s; see {self.log_path}")
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+
+def _start_servers(args, log_dir):
+    env = dict(os.environ, LATENCY_LOG_EVERY="0")
+    flask_port, stream_port = _free_port(), _free_port()
+    flask = Server(
+        "flask",
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn_config.py", "app:app"],
+        dict(env, PORT=str(flask_port), WEB_CONCURRENCY=str(args.workers)),
+        f"http://127.0.0.1:{flask_port}",
+        log_dir,
+    )
+    stream = Server(
+        "streaming",
+        [sys.executable, "-m", "uvicorn", "streaming.service:app", "--port", str(stream_port), "--log-level", "warning"],
+        env,
+        f"http://127.0.0.1:{stream_port}",
+        log_dir,
+    )
+    try:
+        flask.wait_ready("/metrics")
+        stream.wait_ready("/health")
+    except BenchError:
+        flask.stop()
+        stream.stop()
+        raise
+    return flask, stream
+
+
+def _metrics_headers():
+    token = os.environ.get("METRICS_TOKEN")
+    return {"Authorization": f"Bearer {token}"} if token else {}
+
+
+def _scrape(url):
+    import requests
+
+    resp = requests.get(f"{url}/metrics", headers=_metrics_headers(), timeout=10)
+    return parse_metrics(resp.text) if resp.status_code == 200 else {}
+
+
+def _rss_kb(pid):
+    """Resident set size of a local process, from /proc (None where unavailable)."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+# --- Database bookkeeping -------------------------------------------------
+
+
+def _db_state(instances):
+    import psycopg2
+    from database import _connect
+
+    try:
+        conn = _connect()
+    except psycopg2.OperationalError as e:
+        raise BenchError(f"can't reach the database (PG* settings in .env): {e}".strip())
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT COALESCE(MAX(session_instance_tune_id), 0) FROM session_instance_tune")
+        max_tune = cur.fetchone()[0]
+        cur.execute("SELECT COALESCE(MAX(event_id), 0) FROM session_event")
+        max_event = cur.fetchone()[0]
+        cur.execute(
+            "SELECT session_instance_id, logging_mode FROM session_instance WHERE session_instance_id = ANY(%s)",
+            (list(instances),),
+        )
+        modes = dict(cur.fetchall())
+    finally:
+        conn.close()
+    missing = set(instances) - set(modes)
+    if missing:
+        raise BenchError(f"no session instance {', '.join(map(str, sorted(missing)))}")
+    return {"max_tune": max_tune, "max_event": max_event, "modes": modes}
+
+
+def _cleanup(state):
+    from database import _connect
+
+    instances = list(state["modes"])
+    conn = _connect()
+    try:
+        cur = conn.cursor()
+        cur.execute(
+            "DELETE FROM session_instance_tune_history WHERE session_instance_tune_id > %s AND session_instance_id = ANY(%s)",
+            (state["max_tune"], instances),
+        )
+        cur.execute(
+            "DELETE FROM session_instance_tune WHERE session_instance_tune_id > %s AND session_instance_id = ANY(%s)",
+            (state["max_tune"], instances),
+        )
+        cur.execute(
+            "DELETE FROM session_event WHERE event_id > %s AND session_instance_id = ANY(%s)",
+            (state["max_event"], instances),
+        )
+        cur.execute(
+            "DELETE FROM session_snapshot WHERE event_id > %s AND session_instance_id = ANY(%s)",
+            (state["max_event"], instances),
+        )
+        for instance_id, mode in state["modes"].items():
+            cur.execute(
+                "UPDATE session_instance SET logging_mode = %s WHERE session_instance_id = %s",
+                (mode, instance_id),
+            )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+# --- End to end -----------------------------------------------------------
+
+
+def _login(flask_url, email, password):
+    import requests
+
+    session = requests.Session()
+    resp = session.post(f"{flask_url}/api/auth/login-password", json={"email": email, "password": password}, timeout=30)
+    if resp.status_code != 200:
+        raise BenchError(f"login as {email} failed ({resp.status_code}): {resp.text[:200]}")
+    return session
+
+
+async def _run_load(args, flask_url, stream_url, stream_pid):
+    sessions = [_login(flask_url, args.email, args.password) for _ in range(args.loggers)]
+    cookie_header = "; ".join(f"{k}={v}" for k, v in sessions[0].cookies.get_dict().items())
+
+    high_water = {}
+    for instance_id in args.instances:
+        resp = sessions[0].get(f"{flask_url}/api/live/instances/{instance_id}/bootstrap", timeout=30)
+        if resp.status_code != 200 or not resp.json().get("success"):
+            raise BenchError(f"bootstrap of instance {instance_id} failed ({resp.status_code})")
+        high_water[instance_id] = resp.json()["last_event_id"]
+
+    rss_before = _rss_kb(stream_pid) if stream_pid else None
+    listeners = [Listener(i) for i in args.instances for _ in range(args.listeners)]
+    tasks = [asyncio.create_task(listener.run(stream_url, cookie_header, high_water[listener.instance_id])) for listener in listeners]
+    try:
+        ready = asyncio.ensure_future(asyncio.gather(*(listener.live.wait() for listener in listeners)))
+        done, _ = await asyncio.wait([ready, *tasks], timeout=60, return_when=asyncio.FIRST_COMPLETED)
+        if ready not in done:
+            ready.cancel()
+            for task in done:
+                task.result()  # a listener's connect error, if that's what ended the wait
+            raise BenchError("SSE listeners closed or not live within 60s")
+        rss_after = _rss_kb(stream_pid) if stream_pid else None
+
+        web_before, stream_before = _scrape(flask_url), _scrape(stream_url)
+        acks = []
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.loggers) as pool:
+            await asyncio.gather(*(
+                loop.run_in_executor(
+                    pool, _log_ops, session, flask_url,
+                    args.instances[n % len(args.instances)], args.ops, f"{os.getpid()}-{n}", acks,
+                )
+                for n, session in enumerate(sessions)
+            ))
+        logging_seconds = time.perf_counter() - started
+
+        # Let the fan-out catch up before counting what never arrived.
+        expected = {}
+        for instance_id, event_id, _, _ in acks:
+            if event_id is not None:
+                expected.setdefault(instance_id, set()).add(event_id)
+        deadline = time.monotonic() + args.drain_timeout
+        while time.monotonic() < deadline:
+            if all(expected.get(listener.instance_id, set()) <= listener.arrivals.keys() for listener in listeners):
+                break
+            await asyncio.sleep(0.05)
+        delivered_until = time.perf_counter()
+        web_after, stream_after = _scrape(flask_url), _scrape(stream_url)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    sent_at = {event_id: sent for _, event_id, sent, _ in acks if event_id is not None}
+    delivery = [
+        arrived - sent_at[event_id]
+        for listener in listeners
+        for event_id, arrived in listener.arrivals.items()
+        if event_id in sent_at
+    ]
+    missing = sum(len(expected.get(listener.instance_id, set()) - listener.arrivals.keys()) for listener in listeners)
+    fanout = histogram_delta(stream_before, stream_after, "ceol_streaming_fanout_seconds")
+    op_requests = metric_delta(web_before, web_after, "ceol_db_queries_per_request_count", OPS_ROUTE)
+    op_queries = metric_delta(web_before, web_after, "ceol_db_queries_per_request_sum", OPS_ROUTE)
+
+    acked = [a for a in acks if a[1] is not None]
+    return {
+        "ops": len(acks),
+        "errors": len(acks) - len(acked),
+        "ops_per_second": round(len(acked) / logging_seconds, 1) if logging_seconds else None,
+        "ack_ms": summarize_ms([a[3] - a[2] for a in acked]),
+        "delivery_ms": summarize_ms(delivery),
+        "frames_per_second": round(len(delivery) / (delivered_until - started), 1),
+        "missing_deliveries": missing,
+        "fanout_ms": {
+            name: round(bound * 1000, 2) if bound not in (None, math.inf) else bound
+            for name, bound in (("p50", histogram_percentile(fanout, 0.50)), ("p95", histogram_percentile(fanout, 0.95)),
+                                ("p99", histogram_percentile(fanout, 0.99)))
+        } if fanout else None,
+        "rss_kb_per_connection": (
+            round((rss_after - rss_before) / len(listeners), 1) if rss_before is not None and rss_after is not None else None
+        ),
+        "queries_per_op": round(op_queries / op_requests, 1) if op_requests else None,
+    }
+
+
+def run_e2e(args):
+    from dotenv import load_dotenv
+
+    load_dotenv(os.path.join(PROJECT_ROOT, ".env"))
+    state = _db_state(args.instances)
+    servers = []
+    try:
+        if args.flask_url and args.stream_url:
+            flask_url, stream_url, stream_pid = args.flask_url, args.stream_url, args.stream_pid
+        else:
+            log_dir = tempfile.mkdtemp(prefix="bench_live_logging_")
+            print(f"Starting the web app and streaming service (logs in {log_dir})")
+            servers = _start_servers(args, log_dir)
+            flask_url, stream_url, stream_pid = servers[0].url, servers[1].url, servers[1].process.pid
+        return asyncio.run(_run_load(args, flask_url, stream_url, stream_pid))
+    finally:
+        for server in servers:
+            server.stop()
+        if not args.keep:
+            _cleanup(state)
+
+
+# --- CLI ------------------------------------------------------------------
+
+
+def _report(result):
+    for section, values in result.items():
+        if section == "params":
+            print("params: " + ", ".join(f"{k}={v}" for k, v in values.items()))
+            continue
+        print(f"{section}:")
+        for key, value in values.items():
+            if isinstance(value, dict):
+                value = "  ".join(f"{k}={v}" for k, v in value.items())
+            print(f"  {key:24} {value}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the live-logging path against a baseline.")
+    parser.add_argument("--micro-only", action="store_true", help="only the in-process benchmarks (no database)")
+    parser.add_argument("--loggers", type=int, default=4, help="concurrent clients posting ops (default 4)")
+    parser.add_argument("--listeners", type=int, default=50, help="SSE listeners per instance (default 50)")
+    parser.add_argument("--instances", type=int, nargs="+", default=[1], help="session instance ids (default 1)")
+    parser.add_argument("--ops", type=int, default=50, help="ops per logger (default 50)")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn workers when starting the web app (default 2)")
+    parser.add_argument("--email", default="ian@ceol.io", help="login for the loggers and listeners (seed data)")
+    parser.add_argument("--password", default="password123")
+    parser.add_argument("--flask-url", help="use a running web app instead of starting one")
+    parser.add_argument("--stream-url", help="use a running streaming service instead of starting one")
+    parser.add_argument("--stream-pid", type=int, help="pid of that streaming service, for memory per connection")
+    parser.add_argument("--drain-timeout", type=float, default=10, help="seconds to wait for deliveries after logging")
+    parser.add_argument("--keep", action="store_true", help="leave the rows the run added")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="write this run's results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="allowed regression (default 0.5)")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    result = {"micro": run_micro()}
+    if not args.micro_only:
+        result["params"] = {
+            "loggers": args.loggers, "listeners_per_instance": args.listeners,
+            "instances": len(args.instances), "ops_per_logger": args.ops,
+        }
+        try:
+            result["e2e"] = run_e2e(args)
+        except BenchError as e:
+            print(f"FAILED: {e}")
+            sys.exit(1)
+    _report(result)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    if args.save_baseline:
+        # Keep the sections this run didn't measure (e.g. e2e on a --micro-only run).
+        with open(args.baseline, "w") as f:
+            json.dump(dict(baseline or {}, **result), f, indent=2)
+            f.write("\n")
+        print(f"\nBaseline written to {os.path.relpath(args.baseline, PROJECT_ROOT)}")
+        return
+    if baseline is None:
+        print("\nNo baseline to compare against (--save-baseline writes one).")
+        return
+    if baseline.get("params") and result.get("params") and baseline["params"] != result["params"]:
+        print(f"\nNote: the baseline was recorded with {baseline['params']}")
+    problems = compare(result, baseline, args.tolerance)
+    if problems:
+        print("\nREGRESSIONS:")
+        for problem in problems:
+            print(f"  {problem}")
+        sys.exit(1)
+    print(f"\nOK: within {args.tolerance:.0%} of the baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -29,45 +29,8 @@ load_dotenv()
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from database import get_db_connection, extract_abc_incipit
-
-
-def render_abc_to_png(abc_notation, is_incipit=False):
-    """
-    Call the ABC renderer microservice to convert ABC notation to PNG image.
-    Returns the PNG image as bytes, or None if rendering fails.
-
-    Args:
-        abc_notation: ABC notation string to render
-        is_incipit: If True, uses minimal padding for compact rendering (default: False)
-    """
-    try:
-        abc_renderer_url = os.getenv('ABC_RENDERER_URL')
-        if not abc_renderer_url:
-            print("Warning: ABC_RENDERER_URL not configured")
-            return None
-
-        response = requests.post(
-            f'{abc_renderer_url}/api/render',
-            json={'abc': abc_notation, 'isIncipit': is_incipit},
-            timeout=15
-        )
-
-        if response.status_code == 200:
-            if response.headers.get('content-type') == 'image/png':
-                return response.content
-            else:
-                print(f"Unexpected content type: {response.headers.get('content-type')}")
-                return None
-        else:
-            print(f"ABC renderer returned status {response.status_code}")
-            return None
-
-    except requests.exceptions.RequestException as e:
-        print(f"Error calling ABC renderer: {e}")
-        return None
-    except Exception as e:
-        print(f"Unexpected error in render_abc_to_png: {e}")
-        return None
+from abc_renderer import render_many
+from abc_melody import index_setting
 
 
 def collect_setting_ids():
@@ -293,6 +256,7 @@ def cache_setting(tune_id, setting_id):
                         last_modified_date = (NOW() AT TIME ZONE 'UTC')
                     WHERE setting_id = %s
                 """, (key, abc, incipit_abc, setting_id))
+                index_setting(cur, setting_id, abc)
                 conn.commit()
                 action = "ABC updated"
         else:
@@ -304,6 +268,7 @@ def cache_setting(tune_id, setting_id):
                 INSERT INTO tune_setting (setting_id, tune_id, key, abc, incipit_abc, cache_updated_date)
                 VALUES (%s, %s, %s, %s, %s, (NOW() AT TIME ZONE 'UTC'))
             """, (setting_id, tune_id, key, abc, incipit_abc))
+            index_setting(cur, setting_id, abc)
             conn.commit()
             action = "cached"
 
@@ -316,15 +281,15 @@ def cache_setting(tune_id, setting_id):
         if not abc.startswith('X:'):
             abc_with_headers = f"X:1\nM:4/4\nL:1/8\nK:{key if key else 'D'}\n{abc}"
 
-        # Render full ABC image
-        full_image = render_abc_to_png(abc_with_headers)
-
-        # Render incipit image
+        # Render full and incipit images in one renderer round trip
+        incipit_with_headers = None
         if incipit_abc:
             incipit_with_headers = incipit_abc
             if not incipit_abc.startswith('X:'):
                 incipit_with_headers = f"X:1\nM:4/4\nL:1/8\nK:{key if key else 'D'}\n{incipit_abc}"
-            incipit_image = render_abc_to_png(incipit_with_headers, is_incipit=True)
+        full_image, incipit_image = render_many(
+            [(abc_with_headers, False), (incipit_with_headers, True)]
+        )
 
         # Update database with images if they were generated
         if full_image or incipit_image:
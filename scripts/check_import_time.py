@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Import-time profile and budget check for the web app's cold start.
+
+Runs `python -X importtime -c "import app"` (what a fresh worker does before it
+can serve anything), prints the slowest imports, and fails if:
+  - importing app takes longer than the budget (best of --runs), or
+  - app pulls in a module that is meant to load on first use: the route modules
+    (imported on first dispatch, see LazyView in app.py) and heavy optional
+    dependencies that are imported at their call sites.
+
+Usage:
+    python3 scripts/check_import_time.py [--budget-ms N] [--runs N] [--top N]
+
+Exit status 1 on a budget or deferral failure, so it can gate CI.
+"""
+
+import os
+import re
+import sys
+import argparse
+import subprocess
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Generous for the free plan's shared CPU; importing app was ~520ms before the
+# route modules were made lazy and ~220ms after, on a dev machine.
+DEFAULT_BUDGET_MS = 400
+
+# Must not be imported by `import app`.
+DEFERRED_MODULES = (
+    "api_routes",
+    "web_routes",
+    "api_person_tune_routes",
+    "live_logging_routes",
+    "boto3",
+    "qrcode",
+    "pydub",
+)
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def profile_import(target="app"):
+    """One `-X importtime` run: [(module, self_us, cumulative_us, depth)] in report order."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {target} failed:\n{result.stderr[-2000:]}")
+    rows = []
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return rows
+
+
+def check(rows, target="app", budget_ms=DEFAULT_BUDGET_MS):
+    """Problems found in a profile (empty if it passes)."""
+    problems = []
+    total_ms = next((cum for module, _, cum, _ in rows if module == target), 0) / 1000
+    if total_ms > budget_ms:
+        problems.append(f"import {target} took {total_ms:.0f}ms, over the {budget_ms}ms budget")
+    imported = {module for module, _, _, _ in rows}
+    for module in DEFERRED_MODULES:
+        if module in imported:
+            problems.append(f"{module} is imported at startup; it should load on first use")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile and budget-check `import app`.")
+    parser.add_argument("--budget-ms", type=float, default=float(os.environ.get("IMPORT_BUDGET_MS", DEFAULT_BUDGET_MS)))
+    parser.add_argument("--runs", type=int, default=3, help="runs to take the best of (default 3)")
+    parser.add_argument("--top", type=int, default=15, help="slowest imports to list (default 15)")
+    args = parser.parse_args()
+
+    profile_import()  # warm the bytecode cache; a deploy starts with .pyc files written
+    runs = [profile_import() for _ in range(max(1, args.runs))]
+    rows = min(runs, key=lambda r: next((cum for module, _, cum, _ in r if module == "app"), 0))
+
+    print(f"Slowest imports under `import app` (best of {len(runs)}, cumulative ms):")
+    for module, _, cumulative_us, depth in sorted(rows, key=lambda r: -r[2])[: args.top]:
+        print(f"  {cumulative_us / 1000:8.1f}  {'  ' * depth}{module}")
+
+    problems = check(rows, budget_ms=args.budget_ms)
+    if problems:
+        print("\nFAILED:")
+        for problem in problems:
+            print(f"  {problem}")
+        sys.exit(1)
+    print(f"\nOK: within the {args.budget_ms:.0f}ms budget, no deferred modules imported.")
+
+
+if __name__ == "__main__":
+    main()
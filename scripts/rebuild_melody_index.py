@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Script to backfill or rebuild the melody index (tune_setting_melody).
+
+Search by ABC ranks tunes by the interval n-grams abc_melody.py derives from
+each cached setting (see schema/030_tune_setting_melody.sql). Settings cached
+from now on are indexed as they are written; this script indexes the rest:
+  - settings with ABC but no tune_setting_melody row,
+  - rows indexed by an older abc_melody.MELODY_INDEX_VERSION,
+  - or, with --all, every setting.
+Work is committed in batches, so it can be stopped and re-run safely.
+"""
+
+import os
+import sys
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Add parent directory to path so we can import from the main app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import get_db_connection
+from abc_melody import index_setting, MELODY_INDEX_VERSION
+
+BATCH_SIZE = 500
+
+
+def settings_to_index(cur, rebuild_all=False, after_setting_id=0, limit=BATCH_SIZE):
+    """Next batch of (setting_id, abc) needing (re)indexing, in setting_id order."""
+    stale = "" if rebuild_all else "AND (m.setting_id IS NULL OR m.version < %s)"
+    params = (after_setting_id,) + (() if rebuild_all else (MELODY_INDEX_VERSION,)) + (limit,)
+    cur.execute(
+        f"""
+        SELECT ts.setting_id, ts.abc
+        FROM tune_setting ts
+        LEFT JOIN tune_setting_melody m ON m.setting_id = ts.setting_id
+        WHERE ts.setting_id > %s AND ts.abc IS NOT NULL AND ts.abc <> ''
+        {stale}
+        ORDER BY ts.setting_id
+        LIMIT %s
+        """,
+        params,
+    )
+    return cur.fetchall()
+
+
+def rebuild(conn, rebuild_all=False):
+    """Index every setting that needs it. Returns the number of settings indexed."""
+    cur = conn.cursor()
+    indexed = 0
+    last_setting_id = 0
+    while True:
+        batch = settings_to_index(cur, rebuild_all, last_setting_id)
+        if not batch:
+            return indexed
+        for setting_id, abc in batch:
+            index_setting(cur, setting_id, abc)
+        conn.commit()
+        indexed += len(batch)
+        last_setting_id = batch[-1][0]
+        print(f"  indexed {indexed} settings (through setting {last_setting_id})")
+
+
+def main():
+    """Backfill or rebuild tune_setting_melody."""
+
+    # Check for help flag
+    if len(sys.argv) > 1 and sys.argv[1] in ["-h", "--help", "help"]:
+        print(__doc__)
+        print("\nUsage: python3 rebuild_melody_index.py [--all]")
+        print("\nOptions:")
+        print("  --all   Re-index every setting, not just missing or outdated ones")
+        print("\nThe script automatically loads environment variables from .env file.")
+        print("\nRequired environment variables:")
+        print("  PGHOST - PostgreSQL host")
+        print("  PGDATABASE - Database name")
+        print("  PGUSER - Database user")
+        print("  PGPASSWORD - Database password")
+        print("  PGPORT - Database port (optional, defaults to 5432)")
+        sys.exit(0)
+
+    # Check environment variables
+    required_vars = ["PGHOST", "PGDATABASE", "PGUSER", "PGPASSWORD"]
+    missing_vars = [var for var in required_vars if not os.environ.get(var)]
+
+    if missing_vars:
+        print("Error: Missing required environment variables:")
+        for var in missing_vars:
+            print(f"  {var}")
+        print("\nPlease ensure these variables are set in your .env file.")
+        print("Run 'python3 rebuild_melody_index.py --help' for more information.")
+        sys.exit(1)
+
+    rebuild_all = "--all" in sys.argv
+    conn = get_db_connection()
+    try:
+        print(f"Indexing {'all' if rebuild_all else 'missing or outdated'} settings "
+              f"(melody index version {MELODY_INDEX_VERSION})...")
+        indexed = rebuild(conn, rebuild_all)
+        print(f"Done: indexed {indexed} settings.")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Script to rebuild or verify the session_tune_play table.
+
+session_tune_play holds per-(session, tune) play counts and is kept current by
+triggers on session_instance_tune (see schema/026_session_tune_play.sql). This
+script recomputes every pair from session_instance_tune and either:
+  - verifies: reports pairs whose stored counts differ from the recount
+    (missing, stale or extra rows) without writing anything, or
+  - rebuilds: replaces the table contents with the recount in one transaction.
+"""
+
+import os
+import sys
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Add parent directory to path so we can import from the main app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import get_db_connection
+
+# What session_tune_play should contain, straight from the source rows
+RECOUNT_SQL = """
+    SELECT si.session_id, sit.tune_id,
+           COUNT(*) AS play_count,
+           COUNT(DISTINCT sit.session_instance_id) AS instance_count,
+           MAX(si.date) AS last_played
+    FROM session_instance_tune sit
+    JOIN session_instance si ON si.session_instance_id = sit.session_instance_id
+    WHERE sit.tune_id IS NOT NULL AND sit.record_type = 'tune' AND sit.deleted = FALSE
+    {session_filter}
+    GROUP BY si.session_id, sit.tune_id
+"""
+
+
+def _recount_sql(session_id):
+    if session_id is None:
+        return RECOUNT_SQL.format(session_filter=""), ()
+    return RECOUNT_SQL.format(session_filter="AND si.session_id = %s"), (session_id,)
+
+
+def find_mismatches(cur, session_id=None):
+    """
+    Compare session_tune_play with a fresh recount.
+    Returns a list of (session_id, tune_id, stored, expected) where stored and
+    expected are (play_count, instance_count, last_played) tuples or None.
+    """
+    recount, params = _recount_sql(session_id)
+    stored_filter = "WHERE session_id = %s" if session_id is not None else ""
+    cur.execute(
+        f"""
+        WITH expected AS ({recount}),
+        stored AS (
+            SELECT session_id, tune_id, play_count, instance_count, last_played
+            FROM session_tune_play
+            {stored_filter}
+        )
+        SELECT COALESCE(e.session_id, s.session_id), COALESCE(e.tune_id, s.tune_id),
+               s.play_count, s.instance_count, s.last_played,
+               e.play_count, e.instance_count, e.last_played
+        FROM expected e
+        FULL OUTER JOIN stored s ON s.session_id = e.session_id AND s.tune_id = e.tune_id
+        WHERE s.session_id IS NULL OR e.session_id IS NULL
+           OR s.play_count <> e.play_count
+           OR s.instance_count <> e.instance_count
+           OR s.last_played IS DISTINCT FROM e.last_played
+        ORDER BY 1, 2
+        """,
+        params + params if session_id is not None else params,
+    )
+    mismatches = []
+    for row in cur.fetchall():
+        stored = tuple(row[2:5]) if row[2] is not None else None
+        expected = tuple(row[5:8]) if row[5] is not None else None
+        mismatches.append((row[0], row[1], stored, expected))
+    return mismatches
+
+
+def rebuild(cur, session_id=None):
+    """Replace session_tune_play (or one session's rows) with a fresh recount.
+    Returns the number of rows written."""
+    recount, params = _recount_sql(session_id)
+    if session_id is None:
+        cur.execute("DELETE FROM session_tune_play")
+    else:
+        cur.execute("DELETE FROM session_tune_play WHERE session_id = %s", (session_id,))
+    cur.execute(
+        f"""
+        INSERT INTO session_tune_play (session_id, tune_id, play_count, instance_count, last_played)
+        {recount}
+        """,
+        params,
+    )
+    return cur.rowcount
+
+
+def main():
+    """Verify or rebuild session_tune_play."""
+
+    # Check for help flag
+    if len(sys.argv) > 1 and sys.argv[1] in ["-h", "--help", "help"]:
+        print(__doc__)
+        print("\nUsage: python3 rebuild_session_tune_plays.py [--verify] [--session-id ID]")
+        print("\nOptions:")
+        print("  --verify          Report mismatches only; exit 1 if any are found")
+        print("  --session-id ID   Limit the check / rebuild to one session")
+        print("\nThe script automatically loads environment variables from .env file.")
+        print("\nRequired environment variables:")
+        print("  PGHOST - PostgreSQL host")
+        print("  PGDATABASE - Database name")
+        print("  PGUSER - Database user")
+        print("  PGPASSWORD - Database password")
+        print("  PGPORT - Database port (optional, defaults to 5432)")
+        sys.exit(0)
+
+    # Check environment variables
+    required_vars = ["PGHOST", "PGDATABASE", "PGUSER", "PGPASSWORD"]
+    missing_vars = [var for var in required_vars if not os.environ.get(var)]
+
+    if missing_vars:
+        print("Error: Missing required environment variables:")
+        for var in missing_vars:
+            print(f"  {var}")
+        print("\nPlease ensure these variables are set in your .env file.")
+        print("Run 'python3 rebuild_session_tune_plays.py --help' for more information.")
+        sys.exit(1)
+
+    verify_only = "--verify" in sys.argv
+    session_id = None
+    if "--session-id" in sys.argv:
+        try:
+            session_id = int(sys.argv[sys.argv.index("--session-id") + 1])
+        except (IndexError, ValueError):
+            print("Error: --session-id needs a numeric session id")
+            sys.exit(1)
+
+    scope = f"session {session_id}" if session_id is not None else "all sessions"
+    conn = get_db_connection()
+    try:
+        cur = conn.cursor()
+        print(f"Checking session_tune_play for {scope}...")
+        mismatches = find_mismatches(cur, session_id)
+
+        if not mismatches:
+            print("session_tune_play is up to date.")
+            return
+
+        print(f"Found {len(mismatches)} mismatched (session, tune) pairs:")
+        for sid, tid, stored, expected in mismatches[:50]:
+            print(f"  session {sid} tune {tid}: stored={stored} expected={expected}")
+        if len(mismatches) > 50:
+            print(f"  ... and {len(mismatches) - 50} more")
+
+        if verify_only:
+            sys.exit(1)
+
+        print(f"Rebuilding session_tune_play for {scope}...")
+        written = rebuild(cur, session_id)
+        conn.commit()
+        print(f"Done: wrote {written} rows.")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,9 +2,12 @@
 """
 Database Restore Script for ceol.io
 
-This script restores data from a backup file created by backup_database.py
+This script restores data from a backup created by backup_database.py: either a
+copy-format backup directory (loaded table by table with COPY ... FROM STDIN, in
+one transaction) or an sql-format file (executed as is).
 
 Usage:
+    python restore_database.py backup_2024-01-15_14-30-00
     python restore_database.py backup_2024-01-15_14-30-00.sql
     python restore_database.py backup_2024-01-15_14-30-00.sql.gz
 
@@ -17,8 +20,12 @@ Make sure the database schema exists and matches the backup.
 
 import os
 import sys
+import json
+import time
 import gzip
+import argparse
 import psycopg2
+from psycopg2 import sql
 from dotenv import load_dotenv
 
 # Load environment variables from parent directory
@@ -26,6 +33,9 @@ script_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.dirname(script_dir)
 load_dotenv(os.path.join(project_root, ".env"))
 
+# Copy-format layout (see backup_database.py)
+MANIFEST_NAME = "manifest.json"
+
 
 def get_db_connection():
     """Create database connection using environment variables"""
@@ -43,6 +53,93 @@ def get_db_connection():
         sys.exit(1)
 
 
+class CountingReader:
+    """File wrapper that counts the (uncompressed) bytes COPY reads through it."""
+
+    def __init__(self, file_handle):
+        self.file_handle = file_handle
+        self.bytes = 0
+
+    def read(self, size=-1):
+        data = self.file_handle.read(size)
+        self.bytes += len(data)
+        return data
+
+    def readline(self, size=-1):
+        data = self.file_handle.readline(size)
+        self.bytes += len(data)
+        return data
+
+
+def format_throughput(byte_count, seconds):
+    megabytes = byte_count / (1024 * 1024)
+    return f"{megabytes:.1f} MB in {seconds:.1f}s ({megabytes / max(seconds, 0.001):.1f} MB/s)"
+
+
+def reset_sequences(cursor, tables):
+    """Move each serial/identity sequence past the restored ids (COPY doesn't)"""
+    cursor.execute(
+        """
+        SELECT table_name, column_name, pg_get_serial_sequence(quote_ident(table_name), column_name)
+        FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = ANY(%s)
+          AND pg_get_serial_sequence(quote_ident(table_name), column_name) IS NOT NULL
+    """,
+        (tables,),
+    )
+    for table_name, column_name, sequence in cursor.fetchall():
+        cursor.execute(
+            sql.SQL("SELECT setval(%s, COALESCE(MAX({}), 0) + 1, false) FROM {}").format(
+                sql.Identifier(column_name), sql.Identifier(table_name)
+            ),
+            (sequence,),
+        )
+
+
+def restore_from_copy_backup(backup_dir):
+    """Restore a copy-format backup directory with COPY FROM, in one transaction"""
+    with open(os.path.join(backup_dir, MANIFEST_NAME), encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        # Skip triggers and FK checks while loading, as the sql format does
+        cursor.execute("SET session_replication_role = replica")
+
+        started = time.monotonic()
+        total_bytes = 0
+        for table in manifest["tables"]:
+            table_started = time.monotonic()
+            copy_sql = sql.SQL("COPY {} ({}) FROM STDIN").format(
+                sql.Identifier(table["name"]),
+                sql.SQL(", ").join(sql.Identifier(col) for col in table["columns"]),
+            )
+            with gzip.open(os.path.join(backup_dir, table["file"]), "rb") as f:
+                reader = CountingReader(f)
+                cursor.copy_expert(copy_sql.as_string(conn), reader)
+            total_bytes += reader.bytes
+            print(f"  {table['name']}: {cursor.rowcount} rows, "
+                  f"{format_throughput(reader.bytes, time.monotonic() - table_started)}")
+
+        cursor.execute("SET session_replication_role = DEFAULT")
+        reset_sequences(cursor, [table["name"] for table in manifest["tables"]])
+        conn.commit()
+
+        print(f"Restored {len(manifest['tables'])} tables, "
+              f"{format_throughput(total_bytes, time.monotonic() - started)}")
+        print("Restore completed successfully!")
+
+    except Exception as e:
+        print(f"Error during restore: {e}")
+        conn.rollback()
+        sys.exit(1)
+    finally:
+        cursor.close()
+        conn.close()
+
+
 def restore_from_file(backup_file):
     """Restore data from backup file"""
     # If file doesn't exist, try looking in data/backup directory
@@ -57,6 +154,10 @@ def restore_from_file(backup_file):
 
     print(f"Restoring from: {backup_file}")
 
+    if os.path.isdir(backup_file):
+        restore_from_copy_backup(backup_file)
+        return
+
     # Connect to database
     conn = get_db_connection()
     cursor = conn.cursor()
@@ -89,12 +190,12 @@ def restore_from_file(backup_file):
 
 def main():
     """Main function"""
-    if len(sys.argv) != 2:
-        print("Usage: python restore_database.py <backup_file>")
-        print("Example: python restore_database.py backup_2024-01-15_14-30-00.sql")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Restore a backup made by backup_database.py.")
+    parser.add_argument("backup_file", help="Backup directory (copy format) or .sql / .sql.gz file")
+    parser.add_argument("--yes", action="store_true", help="Don't ask for confirmation")
+    args = parser.parse_args()
 
-    backup_file = sys.argv[1]
+    backup_file = args.backup_file
 
     print("ceol.io Database Restore Script")
     print("=" * 40)
@@ -120,10 +221,11 @@ def main():
     )
     print()
 
-    response = input("Proceed with restore? (y/N): ")
-    if response.lower() != "y":
-        print("Restore cancelled")
-        sys.exit(0)
+    if not args.yes:
+        response = input("Proceed with restore? (y/N): ")
+        if response.lower() != "y":
+            print("Restore cancelled")
+            sys.exit(0)
 
     restore_from_file(backup_file)
 
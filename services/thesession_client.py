@@ -0,0 +1,152 @@
+"""
+Shared HTTP client for thesession.org's JSON API.
+
+Every fetch goes through one keep-alive requests.Session per process, a global
+token-bucket rate limiter (so concurrent fetches never exceed what thesession.org
+is happy to serve), and a small on-disk cache of JSON bodies keyed by URL that is
+revalidated with If-None-Match / If-Modified-Since. A 304 costs the upstream
+almost nothing and skips the download.
+
+Configuration (environment):
+    THESESSION_RATE          requests per second, sustained (default 5)
+    THESESSION_BURST         bucket size (default 10)
+    THESESSION_CACHE_DIR     cache directory (default data/thesession_cache; empty disables)
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+_project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+RATE_PER_SECOND = float(os.environ.get("THESESSION_RATE", 5))
+BURST = int(os.environ.get("THESESSION_BURST", 10))
+CACHE_DIR = os.environ.get("THESESSION_CACHE_DIR", os.path.join(_project_root, "data", "thesession_cache"))
+
+# Connections kept open to thesession.org (at least the fetch pipeline's width)
+POOL_SIZE = 10
+
+USER_AGENT = "ceol.io (+https://ceol.io)"
+
+
+class TokenBucket:
+    """Thread-safe token bucket: acquire() blocks until a request may go out."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.cond = threading.Condition()
+
+    def acquire(self) -> None:
+        with self.cond:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                self.cond.wait((1 - self.tokens) / self.rate)
+
+
+class DiskCache:
+    """JSON bodies with their validators (ETag / Last-Modified), one file per URL."""
+
+    def __init__(self, directory: Optional[str]):
+        self.directory = directory or None
+
+    def _path(self, url: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(url.encode("utf-8")).hexdigest() + ".json")
+
+    def load(self, url: str) -> Optional[Dict[str, Any]]:
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(url), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def store(self, url: str, etag: Optional[str], last_modified: Optional[str], data: Any) -> None:
+        if not self.directory:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._path(url)
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"url": url, "etag": etag, "last_modified": last_modified, "data": data}, f)
+            os.replace(tmp, path)  # readers never see a half-written entry
+        except OSError as e:
+            logger.warning(f"Could not cache {url}: {e}")
+
+
+class ThesessionClient:
+    """Rate-limited, caching GETs against thesession.org (safe to share between threads)."""
+
+    def __init__(self, rate: float = RATE_PER_SECOND, burst: int = BURST, cache_dir: Optional[str] = CACHE_DIR):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+        self.session.mount("https://", adapter)
+        self.session.headers["User-Agent"] = USER_AGENT
+        self.limiter = TokenBucket(rate, burst)
+        self.cache = DiskCache(cache_dir)
+
+    def get_json(self, url: str, timeout: float) -> Tuple[int, Any]:
+        """
+        GET a JSON document.
+
+        Returns:
+            (status_code, data); data is None unless the status is 200. A 304
+            against the cached copy is reported as 200 with the cached body.
+
+        Raises:
+            requests.exceptions.RequestException: On transport errors
+        """
+        cached = self.cache.load(url)
+        headers = {}
+        if cached:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        self.limiter.acquire()
+        response = self.session.get(url, timeout=timeout, headers=headers)
+
+        if response.status_code == 304 and cached:
+            return 200, cached["data"]
+        if response.status_code != 200:
+            return response.status_code, None
+
+        data = response.json()
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if etag or last_modified:
+            self.cache.store(url, etag, last_modified, data)
+        return 200, data
+
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> ThesessionClient:
+    """The process-wide client (one connection pool, one rate limit; rebuilt after a fork)."""
+    global _client, _client_pid
+    with _client_lock:
+        if _client is None or _client_pid != os.getpid():
+            _client, _client_pid = ThesessionClient(), os.getpid()
+        return _client
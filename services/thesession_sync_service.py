@@ -7,8 +7,11 @@ creating missing tune records, and bulk importing tunes into personal collection
 
 import requests
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Dict, List, Optional, Tuple, Any, Callable
 from database import get_db_connection, save_to_history, get_current_user_id
+import job_queue
+from services.thesession_client import ThesessionClient, get_client
 
 
 class ThesessionSyncService:
@@ -17,6 +20,10 @@ class ThesessionSyncService:
     
     Handles API integration with thesession.org, fetching tunebook data,
     creating missing tune records, and bulk importing into person_tune table.
+
+    Requests go through the shared ThesessionClient (keep-alive connections,
+    a process-wide rate limit and an ETag-revalidated disk cache), so tunebook
+    pages and tune details can be fetched FETCH_WORKERS at a time.
     """
     
     TUNEBOOK_API_URL = "https://thesession.org/members/{user_id}/tunebook?format=json"
@@ -25,10 +32,15 @@ class ThesessionSyncService:
     MAX_RETRIES = 3  # Maximum number of retry attempts
     RETRY_DELAY = 2  # Seconds to wait between retries
     RETRY_BACKOFF = 2  # Multiplier for exponential backoff
-    
-    def __init__(self):
-        """Initialize the sync service."""
-        pass
+    FETCH_WORKERS = 8  # Concurrent requests (the client's rate limit still applies)
+
+    def __init__(self, client: Optional[ThesessionClient] = None):
+        """Initialize the sync service (with the shared client unless one is given)."""
+        self._client = client
+
+    @property
+    def client(self) -> ThesessionClient:
+        return self._client or get_client()
     
     def _retry_request(
         self,
@@ -81,70 +93,82 @@ class ThesessionSyncService:
         # All retries exhausted
         return False, f"{last_error} (after {max_retries} attempts)", None
     
-    def fetch_tunebook(self, thesession_user_id: int, retry: bool = True) -> Tuple[bool, str, Optional[List[Dict[str, Any]]]]:
+    def fetch_tunebook(
+        self,
+        thesession_user_id: int,
+        retry: bool = True,
+        progress_callback: Optional[Callable[[int, int], None]] = None
+    ) -> Tuple[bool, str, Optional[List[Dict[str, Any]]]]:
         """
         Fetch tunebook data from thesession.org for a given user.
-        Handles pagination to fetch all tunes across multiple pages.
+        Handles pagination: the first page gives the page count, then the
+        remaining pages are fetched concurrently (and retried individually).
 
         Args:
             thesession_user_id: The thesession.org user ID
             retry: Whether to retry on transient failures
+            progress_callback: Optional callback(pages_fetched, total_pages)
 
         Returns:
             Tuple of (success, message, tunebook_data)
             where tunebook_data is a list of tune dictionaries
         """
-        def _fetch():
-            try:
-                all_tunes = []
-                page = 1
-                total_pages = 1
-
-                # Fetch all pages
-                while page <= total_pages:
+        def _fetch_page(page):
+            def _fetch():
+                try:
                     url = f"{self.TUNEBOOK_API_URL.format(user_id=thesession_user_id)}&page={page}"
-                    response = requests.get(url, timeout=self.REQUEST_TIMEOUT)
+                    status_code, data = self.client.get_json(url, self.REQUEST_TIMEOUT)
 
-                    if response.status_code == 404:
+                    if status_code == 404:
                         return False, f"User #{thesession_user_id} not found on thesession.org", None
-                    elif response.status_code != 200:
-                        return False, f"Failed to fetch tunebook (status: {response.status_code})", None
-
-                    data = response.json()
+                    elif status_code != 200:
+                        return False, f"Failed to fetch tunebook (status: {status_code})", None
 
                     # The tunebook API returns a dict with 'tunes' key containing list of tunes
                     if 'tunes' not in data:
                         return False, "Invalid tunebook data received from thesession.org", None
 
-                    tunes = data['tunes']
-
-                    if not isinstance(tunes, list):
+                    if not isinstance(data['tunes'], list):
                         return False, "Invalid tunebook format received from thesession.org", None
 
-                    all_tunes.extend(tunes)
+                    return True, "", data
 
-                    # Update total_pages from API response
-                    if page == 1:
-                        total_pages = data.get('pages', 1)
+                except requests.exceptions.Timeout:
+                    return False, "Request to thesession.org timed out", None
+                except requests.exceptions.ConnectionError:
+                    return False, "Could not connect to thesession.org", None
+                except requests.exceptions.RequestException as e:
+                    return False, f"Error fetching tunebook: {str(e)}", None
+                except Exception as e:
+                    return False, f"Unexpected error: {str(e)}", None
 
-                    page += 1
+            return self._retry_request(_fetch) if retry else _fetch()
 
-                return True, f"Successfully fetched {len(all_tunes)} tunes from {total_pages} page(s)", all_tunes
+        success, message, first = _fetch_page(1)
+        if not success:
+            return False, message, None
 
-            except requests.exceptions.Timeout:
-                return False, "Request to thesession.org timed out", None
-            except requests.exceptions.ConnectionError:
-                return False, "Could not connect to thesession.org", None
-            except requests.exceptions.RequestException as e:
-                return False, f"Error fetching tunebook: {str(e)}", None
-            except Exception as e:
-                return False, f"Unexpected error: {str(e)}", None
+        total_pages = first.get('pages', 1)
+        pages = {1: first['tunes']}
+        if progress_callback:
+            progress_callback(1, total_pages)
+
+        if total_pages > 1:
+            with ThreadPoolExecutor(max_workers=min(self.FETCH_WORKERS, total_pages - 1)) as pool:
+                futures = {pool.submit(_fetch_page, page): page for page in range(2, total_pages + 1)}
+                for future in as_completed(futures):
+                    success, message, data = future.result()
+                    if not success:
+                        for pending in futures:
+                            pending.cancel()
+                        return False, message, None
+                    pages[futures[future]] = data['tunes']
+                    if progress_callback:
+                        progress_callback(len(pages), total_pages)
+
+        all_tunes = [tune for page in sorted(pages) for tune in pages[page]]
+        return True, f"Successfully fetched {len(all_tunes)} tunes from {total_pages} page(s)", all_tunes
 
-        if retry:
-            return self._retry_request(_fetch)
-        else:
-            return _fetch()
-    
     def fetch_tune_metadata(self, tune_id: int, retry: bool = True) -> Tuple[bool, str, Optional[Dict[str, Any]]]:
         """
         Fetch complete tune metadata from thesession.org.
@@ -159,14 +183,12 @@ class ThesessionSyncService:
         def _fetch():
             try:
                 url = self.TUNE_DETAILS_API_URL.format(tune_id=tune_id)
-                response = requests.get(url, timeout=self.REQUEST_TIMEOUT)
-                
-                if response.status_code == 404:
+                status_code, data = self.client.get_json(url, self.REQUEST_TIMEOUT)
+
+                if status_code == 404:
                     return False, f"Tune #{tune_id} not found on thesession.org", None
-                elif response.status_code != 200:
-                    return False, f"Failed to fetch tune data (status: {response.status_code})", None
-                
-                data = response.json()
+                elif status_code != 200:
+                    return False, f"Failed to fetch tune data (status: {status_code})", None
                 
                 # Validate required fields
                 if 'name' not in data or 'type' not in data:
@@ -196,6 +218,34 @@ class ThesessionSyncService:
         else:
             return _fetch()
     
+    def fetch_tunes_metadata(
+        self,
+        tune_ids: List[int],
+        retry: bool = True,
+        progress_callback: Optional[Callable[[int, int], None]] = None
+    ) -> Dict[int, Tuple[bool, str, Optional[Dict[str, Any]]]]:
+        """
+        Fetch metadata for many tunes concurrently (FETCH_WORKERS at a time).
+
+        Args:
+            tune_ids: The thesession.org tune IDs
+            retry: Whether to retry on transient failures
+            progress_callback: Optional callback(tunes_done, total_tunes)
+
+        Returns:
+            Dict of tune_id -> fetch_tune_metadata's (success, message, tune_metadata)
+        """
+        results = {}
+        if not tune_ids:
+            return results
+        with ThreadPoolExecutor(max_workers=min(self.FETCH_WORKERS, len(tune_ids))) as pool:
+            futures = {pool.submit(self.fetch_tune_metadata, tune_id, retry): tune_id for tune_id in tune_ids}
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+                if progress_callback:
+                    progress_callback(len(results), len(tune_ids))
+        return results
+
     def ensure_tune_exists(self, tune_id: int, user_id: Optional[int] = None, retry: bool = True, tune_data: Optional[Dict[str, Any]] = None) -> Tuple[bool, str]:
         """
         Ensure a tune exists in the tune table, fetching from thesession.org if needed.
@@ -257,7 +307,7 @@ class ThesessionSyncService:
             from api_routes import cache_default_tune_setting
             # We may or may not have full tune data (with settings) - if not, the helper will fetch it
             api_data = tune_data if tune_data and 'settings' in tune_data else None
-            cache_default_tune_setting(tune_id, api_data, user_id, sync=True)
+            cache_default_tune_setting(tune_id, api_data, user_id, sync=not job_queue.enabled())
 
             return True, f"Created tune #{tune_id}: {metadata['name']}"
 
@@ -289,8 +339,23 @@ class ThesessionSyncService:
         Returns:
             Tuple of (success, message, results_dict)
         """
+        def _pages_progress(pages_fetched, total_pages):
+            # Tunebook pages stream in over the first 10%
+            progress_callback({
+                'tunes_fetched': 0,
+                'tunes_created': 0,
+                'person_tunes_added': 0,
+                'person_tunes_skipped': 0,
+                'errors': [],
+                'status': 'fetching_tunebook',
+                'progress_percent': (10 * pages_fetched) // total_pages
+            })
+
         # Fetch tunebook from thesession.org (with retry)
-        success, message, tunebook = self.fetch_tunebook(thesession_user_id, retry=True)
+        success, message, tunebook = self.fetch_tunebook(
+            thesession_user_id, retry=True,
+            progress_callback=_pages_progress if progress_callback else None
+        )
         
         if not success:
             return False, message, {
@@ -342,11 +407,49 @@ class ThesessionSyncService:
             existing_tune_ids = set(row[0] for row in cur.fetchall())
             print(f"Found {len(existing_tune_ids)} existing tunes, need to create {len(tune_ids_to_check) - len(existing_tune_ids)}", file=sys.stderr)
 
+            # Entries without a name can't be inserted from the tunebook alone;
+            # fetch their details, concurrently, reporting progress over 10-50%
+            nameless_ids = [t['id'] for t in tunebook
+                            if t.get('id') and t['id'] not in existing_tune_ids and not t.get('name')]
+            fetched = {}
+            if nameless_ids:
+                # Don't hold the connection idle in a transaction (and out of the
+                # pool) through the HTTP fetches; take a fresh one for the inserts.
+                conn.commit()
+                cur.close()
+                conn.close()
+                conn = cur = None
+
+                def _metadata_progress(done, total):
+                    if progress_callback:
+                        progress_callback({
+                            **results,
+                            'status': 'fetching_metadata',
+                            'progress_percent': 10 + (40 * done) // total
+                        })
+
+                for tune_id, (ok, fetch_message, metadata) in self.fetch_tunes_metadata(
+                        nameless_ids, progress_callback=_metadata_progress).items():
+                    if ok:
+                        fetched[tune_id] = metadata
+                    else:
+                        results['errors'].append(f"Tune #{tune_id}: {fetch_message}")
+
+                conn = get_db_connection()
+                cur = conn.cursor()
+
             # Prepare batch insert for new tunes
             tunes_to_create = []
             for tune_entry in tunebook:
                 tune_id = tune_entry.get('id')
-                if tune_id and tune_id not in existing_tune_ids:
+                if not tune_id or tune_id in existing_tune_ids:
+                    continue
+                if tune_id in fetched:
+                    metadata = fetched[tune_id]
+                    tunes_to_create.append((
+                        tune_id, metadata['name'], metadata['tune_type'], metadata['tunebook_count']
+                    ))
+                elif tune_entry.get('name'):
                     tunes_to_create.append((
                         tune_id,
                         tune_entry.get('name'),
@@ -366,31 +469,23 @@ class ThesessionSyncService:
                     VALUES %s
                     ON CONFLICT (tune_id) DO NOTHING
                 """, tunes_with_user, template="(%s, %s, %s, %s, CURRENT_DATE, %s)")
+
+                # Setting caching (thesession.org fetch + image renders per tune) is far
+                # too slow to do inline for a bulk import. With a job worker running,
+                # queue it in this transaction so the jobs appear with the tunes;
+                # otherwise settings are cached on demand when users view tune details.
+                queued = 0
+                if job_queue.enabled():
+                    queued = job_queue.enqueue_many(cur, [
+                        ("cache_tune_setting", {"tune_id": t[0], "setting_id": None, "user_id": user_id}, f"tune:{t[0]}")
+                        for t in tunes_to_create
+                    ])
                 conn.commit()
                 results['tunes_created'] = len(tunes_to_create)
                 print(f"Successfully created {len(tunes_to_create)} tunes", file=sys.stderr)
 
-                # ============================================================================
-                # ASYNC SETTING CACHE PLACEHOLDER
-                #
-                # For bulk tune imports, we skip synchronous setting caching because:
-                # 1. It would make the sync operation extremely slow (each tune requires
-                #    an API call to thesession.org + image rendering)
-                # 2. Users expect bulk imports to complete quickly
-                #
-                # FUTURE IMPLEMENTATION:
-                # When async processing is available, enqueue each newly created tune_id
-                # for background setting cache. Example:
-                #
-                #     from api_routes import cache_default_tune_setting
-                #     for tune_id, _, _, _, _ in tunes_with_user:
-                #         # Enqueue: cache_default_tune_setting(tune_id, None, user_id, sync=False)
-                #         # or: job_queue.enqueue('cache_tune_setting', tune_id=tune_id, user_id=user_id)
-                #         pass
-                #
-                # For now, settings will be cached on-demand when users view tune details.
-                # ============================================================================
-                print(f"[sync_tunebook_to_person] Skipping setting cache for {len(tunes_to_create)} tunes - async not yet implemented", file=sys.stderr)
+                if queued:
+                    print(f"[sync_tunebook_to_person] Queued setting cache for {queued} tunes", file=sys.stderr)
 
             # Report progress
             if progress_callback:
@@ -401,14 +496,17 @@ class ThesessionSyncService:
                 })
 
         except Exception as e:
-            conn.rollback()
+            if conn is not None:
+                conn.rollback()
             print(f"ERROR in batch tune creation: {str(e)}", file=sys.stderr)
             import traceback
             print(traceback.format_exc(), file=sys.stderr)
             results['errors'].append(f"Error creating tunes: {str(e)}")
         finally:
-            cur.close()
-            conn.close()
+            if cur is not None:
+                cur.close()
+            if conn is not None:
+                conn.close()
         
         # Report progress before database operations
         if progress_callback:
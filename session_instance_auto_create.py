@@ -7,7 +7,7 @@ for sessions that have recurrence patterns defined.
 
 import logging
 from datetime import datetime, timedelta
-from typing import List, Tuple, Optional
+from typing import Dict, Iterable, List, Tuple, Optional
 
 try:
     from zoneinfo import ZoneInfo
@@ -15,11 +15,115 @@ except ImportError:
     from backports.zoneinfo import ZoneInfo
 
 from database import get_db_connection
-from recurrence_utils import SessionRecurrence
+from recurrence_utils import expand_occurrences, parse_recurrence
 
 logger = logging.getLogger(__name__)
 
 
+# Window auto_create_instances_for_all_sessions fills for every session
+NEXT_WEEK_HOURS = 7 * 24
+
+
+def auto_create_instances_bulk(
+    sessions: Iterable[Tuple[int, Optional[str], Optional[str], int]],
+    now: Optional[datetime] = None,
+    conn=None
+) -> Dict[int, List[str]]:
+    """
+    Auto-create the missing instances for many sessions in one statement.
+
+    Every session's occurrences are expanded in a single pass
+    (recurrence_utils.expand_occurrences, which shares the work between sessions
+    with the same pattern), and those starting within the session's hours_ahead
+    window are inserted with one INSERT ... SELECT FROM unnest(...). Dates that
+    already have an instance are skipped; ON CONFLICT DO NOTHING (against
+    idx_session_instance_auto_created_date) covers a concurrent run inserting the
+    same rows. Sessions with an invalid pattern or timezone get nothing.
+
+    Args:
+        sessions: (session_id, recurrence_json, timezone, hours_ahead) rows
+        now: Current time (timezone-aware); defaults to the real clock
+        conn: Optional database connection (creates and commits a new one if not provided)
+
+    Returns:
+        Dict of session_id -> created dates (ISO strings, ascending), only for
+        sessions that had instances created
+    """
+    sessions = list(sessions)
+    if not sessions:
+        return {}
+
+    now = now or datetime.now(ZoneInfo('UTC'))
+    # Whole local days covering the longest window, from each session's today
+    days = max(hours_ahead for _, _, _, hours_ahead in sessions) // 24 + 2
+    occurrences = expand_occurrences(
+        ((session_id, recurrence_json, tz) for session_id, recurrence_json, tz, _ in sessions),
+        days, now
+    )
+
+    # One row per session and date: the earliest occurrence starting in the window
+    rows = {}
+    for session_id, _, _, hours_ahead in sessions:
+        window_end = now + timedelta(hours=hours_ahead)
+        for start_dt, end_dt in occurrences.get(session_id, []):
+            if now <= start_dt <= window_end:
+                rows.setdefault((session_id, start_dt.date()), (start_dt.time(), end_dt.time()))
+
+    if not rows:
+        return {}
+
+    should_close = conn is None
+    if conn is None:
+        conn = get_db_connection()
+
+    cur = conn.cursor()
+
+    try:
+        keys = sorted(rows)
+        # System auto-creation, no user
+        cur.execute("""
+            INSERT INTO session_instance (session_id, date, start_time, end_time, created_by_user_id)
+            SELECT v.session_id, v.date, v.start_time, v.end_time, NULL
+            FROM unnest(%s::integer[], %s::date[], %s::time[], %s::time[])
+                AS v(session_id, date, start_time, end_time)
+            WHERE NOT EXISTS (
+                SELECT 1 FROM session_instance si
+                WHERE si.session_id = v.session_id AND si.date = v.date
+            )
+            ON CONFLICT DO NOTHING
+            RETURNING session_instance_id, session_id, date
+        """, (
+            [session_id for session_id, _ in keys],
+            [occ_date for _, occ_date in keys],
+            [rows[key][0] for key in keys],
+            [rows[key][1] for key in keys],
+        ))
+
+        created = {}
+        for instance_id, session_id, occ_date in sorted(cur.fetchall(), key=lambda r: (r[1], r[2])):
+            created.setdefault(session_id, []).append(occ_date.isoformat())
+            start_time, end_time = rows[(session_id, occ_date)]
+            logger.info(
+                f"Auto-created session_instance {instance_id} for session {session_id} "
+                f"on {occ_date} from {start_time} to {end_time}"
+            )
+
+        if should_close:
+            conn.commit()
+
+        return created
+
+    except Exception as e:
+        if should_close:
+            conn.rollback()
+        logger.error(f"Error auto-creating instances for {len(sessions)} sessions: {e}")
+        raise
+    finally:
+        cur.close()
+        if should_close:
+            conn.close()
+
+
 def auto_create_next_week_instances(session_id: int) -> Tuple[int, List[str]]:
     """
     Auto-create session instances for the next 7 days based on recurrence pattern.
@@ -31,7 +135,7 @@ def auto_create_next_week_instances(session_id: int) -> Tuple[int, List[str]]:
         Tuple of (count of instances created, list of created dates as strings)
 
     Raises:
-        ValueError: If session not found or has no recurrence pattern
+        ValueError: If session not found or has an invalid recurrence pattern
     """
     conn = get_db_connection()
     cur = conn.cursor()
@@ -56,61 +160,17 @@ def auto_create_next_week_instances(session_id: int) -> Tuple[int, List[str]]:
 
         # Parse recurrence pattern
         try:
-            session_recurrence = SessionRecurrence(recurrence_json, session_timezone or 'UTC')
+            parse_recurrence(recurrence_json)
         except (ValueError, TypeError) as e:
             logger.error(f"Invalid recurrence pattern for session {session_id}: {e}")
             raise ValueError(f"Invalid recurrence pattern: {e}")
 
-        # Calculate date range: next 7 days starting tomorrow
-        today = datetime.now().date()
-        start_date = today + timedelta(days=1)
-        end_date = today + timedelta(days=7)
-
-        # Get all occurrences in the next 7 days
-        occurrences = session_recurrence.get_occurrences(start_date, end_date)
-
-        if not occurrences:
-            logger.info(f"No occurrences found for session {session_id} in next 7 days")
-            return 0, []
-
-        # Check which instances already exist
-        dates_to_check = [occ['date'] for occ in occurrences]
-        placeholders = ','.join(['%s'] * len(dates_to_check))
-
-        cur.execute(f"""
-            SELECT date
-            FROM session_instance
-            WHERE session_id = %s AND date IN ({placeholders})
-        """, [session_id] + dates_to_check)
-
-        existing_dates = set(row[0] for row in cur.fetchall())
-
-        # Create missing instances
-        created_dates = []
-        for occurrence in occurrences:
-            if occurrence['date'] not in existing_dates:
-                # Insert new session instance (system auto-creation, no user)
-                cur.execute("""
-                    INSERT INTO session_instance (session_id, date, start_time, end_time, created_by_user_id)
-                    VALUES (%s, %s, %s, %s, NULL)
-                    RETURNING session_instance_id
-                """, (
-                    session_id,
-                    occurrence['date'],
-                    occurrence['start_time'],
-                    occurrence['end_time']
-                ))
-
-                new_instance_id = cur.fetchone()[0]
-                created_dates.append(occurrence['date'].isoformat())
-
-                logger.info(
-                    f"Created session_instance {new_instance_id} for session {session_id} "
-                    f"on {occurrence['date']} from {occurrence['start_time']} to {occurrence['end_time']}"
-                )
-
+        created = auto_create_instances_bulk(
+            [(session_id, recurrence_json, session_timezone or 'UTC', NEXT_WEEK_HOURS)], conn=conn
+        )
         conn.commit()
 
+        created_dates = created.get(session_id, [])
         logger.info(
             f"Auto-created {len(created_dates)} instances for session {session_id} ({session_name}): "
             f"{', '.join(created_dates)}"
@@ -137,8 +197,8 @@ def auto_create_instances_hours_ahead(
     """
     Auto-create session instances for a specified number of hours ahead.
 
-    This is called by the cron job for sessions that have auto_create_instances=TRUE.
-    It creates instances that fall within the hours_ahead window from now.
+    Single-session form of auto_create_instances_bulk: creates instances that
+    start within the hours_ahead window from now.
 
     Args:
         session_id: The session ID to create instances for
@@ -150,107 +210,25 @@ def auto_create_instances_hours_ahead(
     Returns:
         Tuple of (count of instances created, list of created dates as strings)
     """
-    should_close = conn is None
-    if conn is None:
-        conn = get_db_connection()
-
-    cur = conn.cursor()
-
+    # Parse timezone
     try:
-        # Parse timezone
-        try:
-            tz = ZoneInfo(session_timezone)
-        except Exception as e:
-            logger.error(f"Invalid timezone '{session_timezone}' for session {session_id}: {e}")
-            return 0, []
-
-        # Parse recurrence pattern
-        try:
-            session_recurrence = SessionRecurrence(recurrence_json)
-        except (ValueError, TypeError) as e:
-            logger.error(f"Invalid recurrence pattern for session {session_id}: {e}")
-            return 0, []
-
-        # Calculate the time window in the session's timezone
-        now_utc = datetime.now(ZoneInfo('UTC'))
-        now_local = now_utc.astimezone(tz)
-        future_local = now_local + timedelta(hours=hours_ahead)
-
-        # Get date range to check (we need whole days for the recurrence lookup)
-        start_date = now_local.date()
-        end_date = future_local.date()
-
-        # Get all occurrences in the date range
-        # Returns list of (start_datetime, end_datetime) tuples
-        occurrences = session_recurrence.get_occurrences_in_range(start_date, end_date, tz)
-
-        if not occurrences:
-            logger.debug(f"No occurrences found for session {session_id} in next {hours_ahead} hours")
-            return 0, []
-
-        # Filter occurrences to only those starting within the hours_ahead window
-        valid_occurrences = []
-        for start_dt, end_dt in occurrences:
-            # Only include if the session starts within the window
-            if now_local <= start_dt <= future_local:
-                valid_occurrences.append((start_dt, end_dt))
-
-        if not valid_occurrences:
-            logger.debug(f"No occurrences starting in next {hours_ahead} hours for session {session_id}")
-            return 0, []
-
-        # Check which instances already exist
-        dates_to_check = [start_dt.date() for start_dt, _ in valid_occurrences]
-        placeholders = ','.join(['%s'] * len(dates_to_check))
-
-        cur.execute(f"""
-            SELECT date
-            FROM session_instance
-            WHERE session_id = %s AND date IN ({placeholders})
-        """, [session_id] + dates_to_check)
-
-        existing_dates = set(row[0] for row in cur.fetchall())
-
-        # Create missing instances
-        created_dates = []
-        for start_dt, end_dt in valid_occurrences:
-            occ_date = start_dt.date()
-            if occ_date not in existing_dates:
-                # Insert new session instance (system auto-creation, no user)
-                cur.execute("""
-                    INSERT INTO session_instance (session_id, date, start_time, end_time, created_by_user_id)
-                    VALUES (%s, %s, %s, %s, NULL)
-                    RETURNING session_instance_id
-                """, (
-                    session_id,
-                    occ_date,
-                    start_dt.time(),
-                    end_dt.time()
-                ))
-
-                new_instance_id = cur.fetchone()[0]
-                created_dates.append(occ_date.isoformat())
-
-                logger.info(
-                    f"Auto-created session_instance {new_instance_id} for session {session_id} "
-                    f"on {occ_date} from {start_dt.time()} to {end_dt.time()} "
-                    f"({hours_ahead}h ahead)"
-                )
-
-        if should_close:
-            conn.commit()
+        ZoneInfo(session_timezone)
+    except Exception as e:
+        logger.error(f"Invalid timezone '{session_timezone}' for session {session_id}: {e}")
+        return 0, []
 
-        return len(created_dates), created_dates
+    # Parse recurrence pattern
+    try:
+        parse_recurrence(recurrence_json)
+    except (ValueError, TypeError) as e:
+        logger.error(f"Invalid recurrence pattern for session {session_id}: {e}")
+        return 0, []
 
-    except Exception as e:
-        if should_close:
-            conn.rollback()
-        logger.error(f"Error auto-creating instances for session {session_id}: {e}")
-        raise
-    finally:
-        cur.close()
-        if should_close:
-            conn.close()
+    created = auto_create_instances_bulk(
+        [(session_id, recurrence_json, session_timezone, hours_ahead)], conn=conn
+    )
+    dates = created.get(session_id, [])
+    return len(dates), dates
 
 
 def auto_create_instances_for_all_sessions() -> dict:
@@ -258,7 +236,8 @@ def auto_create_instances_for_all_sessions() -> dict:
     Auto-create instances for all active sessions with recurrence patterns.
 
     This function can be run periodically (e.g., daily via cron) to ensure
-    upcoming session instances are always created.
+    upcoming session instances are always created. All sessions are expanded
+    and inserted in one pass (auto_create_instances_bulk).
 
     Returns:
         Dictionary with statistics: {
@@ -273,7 +252,7 @@ def auto_create_instances_for_all_sessions() -> dict:
     try:
         # Get all active sessions with recurrence patterns
         cur.execute("""
-            SELECT session_id, name
+            SELECT session_id, name, recurrence, timezone
             FROM session
             WHERE recurrence IS NOT NULL
               AND recurrence != ''
@@ -283,31 +262,28 @@ def auto_create_instances_for_all_sessions() -> dict:
 
         sessions = cur.fetchall()
 
+        created = auto_create_instances_bulk(
+            ((session_id, recurrence_json, timezone_str or 'UTC', NEXT_WEEK_HOURS)
+             for session_id, _, recurrence_json, timezone_str in sessions),
+            conn=conn
+        )
+        conn.commit()
+
         stats = {
-            'sessions_processed': 0,
-            'total_instances_created': 0,
-            'sessions_with_instances': []
+            'sessions_processed': len(sessions),
+            'total_instances_created': sum(len(dates) for dates in created.values()),
+            'sessions_with_instances': [
+                {
+                    'session_id': session_id,
+                    'session_name': session_name,
+                    'instances_created': len(created[session_id]),
+                    'dates': created[session_id]
+                }
+                for session_id, session_name, _, _ in sessions
+                if session_id in created
+            ]
         }
 
-        for session_id, session_name in sessions:
-            try:
-                count, dates = auto_create_next_week_instances(session_id)
-                stats['sessions_processed'] += 1
-                stats['total_instances_created'] += count
-
-                if count > 0:
-                    stats['sessions_with_instances'].append({
-                        'session_id': session_id,
-                        'session_name': session_name,
-                        'instances_created': count,
-                        'dates': dates
-                    })
-
-            except Exception as e:
-                logger.error(f"Failed to auto-create instances for session {session_id} ({session_name}): {e}")
-                # Continue with other sessions
-                continue
-
         logger.info(
             f"Auto-create completed: processed {stats['sessions_processed']} sessions, "
             f"created {stats['total_instances_created']} instances"
@@ -315,6 +291,9 @@ def auto_create_instances_for_all_sessions() -> dict:
 
         return stats
 
+    except Exception:
+        conn.rollback()
+        raise
     finally:
         cur.close()
         conn.close()
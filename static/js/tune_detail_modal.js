@@ -379,16 +379,14 @@ ${abcBody}`;
         // Get ABC notation and images from tuneData
         const abc = tuneData.abc;
         const incipitAbc = tuneData.incipit_abc;
-        const image = tuneData.image;
-        const incipitImage = tuneData.incipit_image;
+        const image = tuneData.image_url;
+        const incipitImage = tuneData.incipit_image_url;
 
         console.log('buildAbcNotationSection called with:', {
             hasAbc: !!abc,
             hasIncipitAbc: !!incipitAbc,
             hasImage: !!image,
-            hasIncipitImage: !!incipitImage,
-            imageLength: image ? image.length : 0,
-            incipitImageLength: incipitImage ? incipitImage.length : 0
+            hasIncipitImage: !!incipitImage
         });
 
         if (!abc && !incipitAbc && !image && !incipitImage) {
@@ -409,9 +407,9 @@ ${abcBody}`;
         // Build initial display content (start with incipit in chosen mode)
         let displayContent = '';
         if (initialMode === 'dots' && incipitImage) {
-            displayContent = `<img src="data:image/png;base64,${incipitImage}" alt="Incipit notation" class="abc-notation-image abc-notation-incipit">`;
+            displayContent = `<img src="${incipitImage}" alt="Incipit notation" class="abc-notation-image abc-notation-incipit">`;
         } else if (initialMode === 'dots' && image) {
-            displayContent = `<img src="data:image/png;base64,${image}" alt="Full notation" class="abc-notation-image abc-notation-full">`;
+            displayContent = `<img src="${image}" alt="Full notation" class="abc-notation-image abc-notation-full">`;
         } else if (initialMode === 'abc' && incipitAbc) {
             const formattedText = incipitAbc.replace(/!/g, '\n');
             displayContent = `<pre class="abc-notation-text abc-notation-incipit">${escapeHtml(formattedText)}</pre>`;
@@ -494,7 +492,7 @@ ${abcBody}`;
         if (isMyTunes) {
             // Show "Refresh" if we have cached data (abc, images, etc.), regardless of whether there's a setting_id
             // (default settings have cached data but no setting_id)
-            const hasCachedData = tuneData.abc || tuneData.incipit_abc || tuneData.image || tuneData.incipit_image;
+            const hasCachedData = tuneData.abc || tuneData.incipit_abc || tuneData.image_url || tuneData.incipit_image_url;
             const buttonText = hasCachedData ? 'Refresh' : 'Fetch';
             fields.push(`
                 <div class="configure-field-group-inline">
@@ -519,7 +517,7 @@ ${abcBody}`;
         } else if (isSession) {
             // Show "Refresh" if we have cached data (abc, images, etc.), regardless of whether there's a setting_id
             // (default settings have cached data but no setting_id)
-            const hasCachedData = tuneData.abc || tuneData.incipit_abc || tuneData.image || tuneData.incipit_image;
+            const hasCachedData = tuneData.abc || tuneData.incipit_abc || tuneData.image_url || tuneData.incipit_image_url;
             const buttonText = hasCachedData ? 'Refresh' : 'Fetch';
             fields.push(`
                 <div class="configure-field-group-inline">
@@ -554,7 +552,7 @@ ${abcBody}`;
         } else if (isSessionInstance) {
             // Show "Refresh" if we have cached data (abc, images, etc.), regardless of whether there's a setting_override
             // (default settings have cached data but no setting_override)
-            const hasCachedData = tuneData.abc || tuneData.incipit_abc || tuneData.image || tuneData.incipit_image;
+            const hasCachedData = tuneData.abc || tuneData.incipit_abc || tuneData.image_url || tuneData.incipit_image_url;
             const buttonText = hasCachedData ? 'Refresh' : 'Fetch';
             fields.push(`
                 <div class="configure-field-group-inline">
@@ -1048,8 +1046,8 @@ ${abcBody}`;
         const hasCachedData = currentTuneData && (
             currentTuneData.abc ||
             currentTuneData.incipit_abc ||
-            currentTuneData.image ||
-            currentTuneData.incipit_image
+            currentTuneData.image_url ||
+            currentTuneData.incipit_image_url
         );
 
         // Update button text based on whether we have cached data and if setting ID matches original
@@ -1195,16 +1193,16 @@ ${abcBody}`;
         let newContent = '';
         if (newMode === 'dots') {
             if (currentSize === 'incipit' && incipitImage) {
-                newContent = `<img src="data:image/png;base64,${incipitImage}" alt="Incipit notation" class="abc-notation-image abc-notation-incipit">`;
+                newContent = `<img src="${incipitImage}" alt="Incipit notation" class="abc-notation-image abc-notation-incipit">`;
             } else if (currentSize === 'full' && fullImage) {
-                newContent = `<img src="data:image/png;base64,${fullImage}" alt="Full notation" class="abc-notation-image abc-notation-full">`;
+                newContent = `<img src="${fullImage}" alt="Full notation" class="abc-notation-image abc-notation-full">`;
             } else if (incipitImage) {
                 // Fallback to incipit if current size not available
-                newContent = `<img src="data:image/png;base64,${incipitImage}" alt="Incipit notation" class="abc-notation-image abc-notation-incipit">`;
+                newContent = `<img src="${incipitImage}" alt="Incipit notation" class="abc-notation-image abc-notation-incipit">`;
                 displayElement.dataset.currentSize = 'incipit';
             } else if (fullImage) {
                 // Fallback to full if incipit not available
-                newContent = `<img src="data:image/png;base64,${fullImage}" alt="Full notation" class="abc-notation-image abc-notation-full">`;
+                newContent = `<img src="${fullImage}" alt="Full notation" class="abc-notation-image abc-notation-full">`;
                 displayElement.dataset.currentSize = 'full';
             }
         } else { // abc mode
@@ -1268,9 +1266,9 @@ ${abcBody}`;
         let newContent = '';
         if (currentMode === 'dots') {
             if (newSize === 'incipit' && incipitImage) {
-                newContent = `<img src="data:image/png;base64,${incipitImage}" alt="Incipit notation" class="abc-notation-image abc-notation-incipit">`;
+                newContent = `<img src="${incipitImage}" alt="Incipit notation" class="abc-notation-image abc-notation-incipit">`;
             } else if (newSize === 'full' && fullImage) {
-                newContent = `<img src="data:image/png;base64,${fullImage}" alt="Full notation" class="abc-notation-image abc-notation-full">`;
+                newContent = `<img src="${fullImage}" alt="Full notation" class="abc-notation-image abc-notation-full">`;
             } else {
                 // Can't toggle - content not available
                 return;
@@ -2196,8 +2194,8 @@ ${abcBody}`;
                 // Update current tune data with the ABC notation, incipit, and images
                 currentTuneData.abc = data.setting.abc;
                 currentTuneData.incipit_abc = data.setting.incipit_abc;
-                currentTuneData.image = data.setting.image;
-                currentTuneData.incipit_image = data.setting.incipit_image;
+                currentTuneData.image_url = data.setting.image_url;
+                currentTuneData.incipit_image_url = data.setting.incipit_image_url;
 
                 // Save the setting_id to the database based on context
                 let saveEndpoint = '';
@@ -0,0 +1,217 @@
+"""
+Shared presence/typing for several streaming nodes (STREAMING_CLUSTER=true).
+
+Ops already reach every node (each one LISTENs live_session_events), but
+presence and typing live in the memory of whichever node holds the SSE
+connection or received the typing POST. With more than one node, each node
+owns a *shard* per session instance -- the people connected to it and the
+typing signals it received -- and is the only writer of that shard:
+
+  - Whenever its shard for an instance changes, the node publishes the whole
+    shard (small: a few dozen people at most) as one message. Receivers replace
+    their copy of that node's shard and rebuild the instance's roster.
+  - A node says "hello" on start (everyone answers by republishing their
+    shards), heartbeats every HEARTBEAT_SECONDS, republishes everything every
+    RESYNC_SECONDS (covers a listener reconnect), and says "bye" on shutdown.
+  - A node not heard from for DEAD_AFTER_HEARTBEATS heartbeats is considered
+    gone and its shards are dropped; its clients reconnect to another node.
+  - Typing TTL is enforced by the owning node, which republishes its shard.
+
+The broker is Postgres LISTEN/NOTIFY (PgBroker, channel 'live_presence') in
+production; LocalBroker is an in-process stand-in so several nodes can run in
+one process for development and tests.
+"""
+
+import json
+import time
+import uuid
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+PRESENCE_CHANNEL = "live_presence"
+HEARTBEAT_SECONDS = 5
+RESYNC_SECONDS = 30
+DEAD_AFTER_HEARTBEATS = 3
+MAX_MESSAGE_BYTES = 7900  # NOTIFY payloads must stay under 8000 bytes
+
+
+class LocalBroker:
+    """In-process stand-in for LISTEN/NOTIFY: every subscriber sees every message,
+    including its own (as with Postgres)."""
+
+    def __init__(self):
+        self._callbacks = []
+
+    async def subscribe(self, callback):
+        self._callbacks.append(callback)
+
+    async def unsubscribe(self, callback):
+        if callback in self._callbacks:
+            self._callbacks.remove(callback)
+
+    async def publish(self, message):
+        for callback in list(self._callbacks):
+            callback(message)
+
+
+class PgBroker:
+    """LISTEN/NOTIFY over the service's dedicated listener connection."""
+
+    def __init__(self, pool, listener):
+        self._pool = pool
+        self._listener = listener
+        self._handlers = {}
+
+    async def subscribe(self, callback):
+        def handler(conn, pid, channel, payload):
+            callback(payload)
+        self._handlers[callback] = handler
+        await self._listener.add_listener(PRESENCE_CHANNEL, handler)
+
+    async def unsubscribe(self, callback):
+        handler = self._handlers.pop(callback, None)
+        if handler is not None:
+            await self._listener.remove_listener(PRESENCE_CHANNEL, handler)
+
+    async def publish(self, message):
+        async with self._pool.acquire() as c:
+            await c.execute("SELECT pg_notify($1, $2)", PRESENCE_CHANNEL, message)
+
+
+class Cluster:
+    """This node's view of the other nodes' presence/typing shards.
+
+    Args:
+        broker: LocalBroker or PgBroker
+        local_shard: callable(instance_id) -> {"people": [...], "typing": [...]}
+            describing this node's own connections / typing signals
+        local_instances: callable() -> instance ids this node has state for
+        on_change: callable(instance_id), run when a remote shard changes
+        node_id: defaults to a random id per process
+    """
+
+    def __init__(self, broker, local_shard, local_instances, on_change, node_id=None):
+        self.node_id = node_id or uuid.uuid4().hex[:12]
+        self._broker = broker
+        self._local_shard = local_shard
+        self._local_instances = local_instances
+        self._on_change = on_change
+        self.shards = {}  # instance_id -> {node_id: {"people": [...], "typing": [...]}}
+        self.nodes = {}  # node_id -> last heard (monotonic)
+        self._task = None
+
+    # --- lifecycle ---------------------------------------------------------
+
+    async def start(self):
+        await self._broker.subscribe(self._receive)
+        await self._send({"t": "hello"})
+        self._task = asyncio.create_task(self._heartbeat_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+        try:
+            await self._send({"t": "bye"})
+        except Exception:
+            pass
+        await self._broker.unsubscribe(self._receive)
+
+    # --- outbound ----------------------------------------------------------
+
+    async def publish_shard(self, instance_id):
+        """Tell the other nodes this node's current shard for instance_id."""
+        shard = self._local_shard(instance_id)
+        await self._send({"t": "shard", "i": instance_id, "people": shard["people"], "typing": shard["typing"]})
+
+    def publish_shard_soon(self, instance_id):
+        """Fire-and-forget publish_shard from sync code."""
+        task = asyncio.get_running_loop().create_task(self.publish_shard(instance_id))
+        task.add_done_callback(_log_failure)
+
+    async def _publish_all(self):
+        for instance_id in list(self._local_instances()):
+            await self.publish_shard(instance_id)
+
+    async def _send(self, message):
+        message["n"] = self.node_id
+        payload = json.dumps(message, separators=(",", ":"))
+        if len(payload.encode()) > MAX_MESSAGE_BYTES:
+            logger.warning("presence shard for instance %s too large to publish (%d bytes)",
+                           message.get("i"), len(payload))
+            return
+        await self._broker.publish(payload)
+
+    # --- inbound -----------------------------------------------------------
+
+    def _receive(self, payload):
+        try:
+            message = json.loads(payload)
+            node = message["n"]
+            kind = message["t"]
+        except (TypeError, ValueError, KeyError):
+            return
+        if node == self.node_id:
+            return
+        if kind == "bye":
+            self.nodes.pop(node, None)
+            self._drop_node(node)
+            return
+        self.nodes[node] = time.monotonic()
+        if kind == "hello":
+            # A node (re)joined: give it our shards now rather than at the next resync.
+            asyncio.get_running_loop().create_task(self._publish_all()).add_done_callback(_log_failure)
+        elif kind == "shard":
+            instance_id = message.get("i")
+            if not isinstance(instance_id, int):
+                return
+            people, typing = message.get("people") or [], message.get("typing") or []
+            shards = self.shards.setdefault(instance_id, {})
+            if people or typing:
+                shards[node] = {"people": people, "typing": typing}
+            else:
+                shards.pop(node, None)
+                if not shards:
+                    self.shards.pop(instance_id, None)
+            self._on_change(instance_id)
+
+    def _drop_node(self, node):
+        for instance_id in [i for i, shards in self.shards.items() if node in shards]:
+            shards = self.shards[instance_id]
+            shards.pop(node, None)
+            if not shards:
+                self.shards.pop(instance_id, None)
+            self._on_change(instance_id)
+
+    async def _heartbeat_loop(self):
+        last_resync = time.monotonic()
+        while True:
+            await asyncio.sleep(HEARTBEAT_SECONDS)
+            now = time.monotonic()
+            try:
+                await self._send({"t": "hb"})
+                if now - last_resync >= RESYNC_SECONDS:
+                    await self._publish_all()
+                    last_resync = now
+            except Exception:
+                logger.exception("presence heartbeat failed")
+            for node, heard in list(self.nodes.items()):
+                if now - heard > HEARTBEAT_SECONDS * DEAD_AFTER_HEARTBEATS:
+                    logger.warning("streaming node %s stopped heartbeating; dropping its presence", node)
+                    self.nodes.pop(node, None)
+                    self._drop_node(node)
+
+    # --- reads -------------------------------------------------------------
+
+    def remote_people(self, instance_id):
+        """[(node_id, person entry)] from every other node's shard."""
+        return [(node, p) for node, shard in self.shards.get(instance_id, {}).items() for p in shard["people"]]
+
+    def remote_typing(self, instance_id):
+        return [t for shard in self.shards.get(instance_id, {}).values() for t in shard["typing"]]
+
+
+def _log_failure(task):
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("presence publish failed: %s", task.exception())
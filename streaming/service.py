@@ -24,10 +24,12 @@ Serves on STREAMING_PORT (default 8080).
 """
 
 import os
+import sys
 import json
 import time
 import asyncio
 import itertools
+from collections import OrderedDict, deque
 from contextlib import asynccontextmanager
 import asyncpg
 from dotenv import load_dotenv
@@ -40,11 +42,38 @@ from starlette.applications import Starlette
 from starlette.responses import JSONResponse, StreamingResponse, Response
 from starlette.routing import Route
 
+# The repo root, for the shared modules (metrics) when run as streaming/service.py
+# rather than `-m streaming.service`; a no-op duplicate entry otherwise.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from streaming import cluster
+except ImportError:  # run as streaming/service.py
+    import cluster
+import metrics
+
 # --- Config ---------------------------------------------------------------
 
 PORT = int(os.environ.get("STREAMING_PORT", 8080))
 SECRET_KEY = os.environ.get("FLASK_SESSION_SECRET_KEY", "dev-secret-key-change-in-production")
 KEEPALIVE_SECONDS = 15
+# Presence/typing changes within this window go out as one snapshot (latest wins).
+COALESCE_SECONDS = float(os.environ.get("STREAMING_COALESCE_MS", 50)) / 1000
+# Slow-consumer limit: a client whose unsent ops exceed either bound is disconnected
+# (its EventSource reconnects and resumes from Last-Event-ID) instead of buffering
+# without limit in this process.
+CLIENT_QUEUE_MAX_FRAMES = int(os.environ.get("STREAMING_CLIENT_QUEUE_MAX_FRAMES", 1000))
+CLIENT_QUEUE_MAX_BYTES = int(os.environ.get("STREAMING_CLIENT_QUEUE_MAX_BYTES", 1024 * 1024))
+# Recently framed ops, shared by live fan-out and by replays (reconnect storms
+# after a deploy replay the same tail to everyone).
+OP_FRAME_CACHE_SIZE = 2048
+REPLAY_CHUNK_ROWS = 200  # replayed frames written per chunk
+# A client more than this many events behind the instance's session_snapshot is
+# sent the snapshot + the tail after it instead of every event (schema 028).
+REPLAY_SNAPSHOT_THRESHOLD = int(os.environ.get("STREAMING_REPLAY_SNAPSHOT_THRESHOLD", 300))
+# Several streaming nodes behind one URL: share presence/typing between them over
+# LISTEN/NOTIFY (see streaming/cluster.py). Off = single node, nothing published.
+CLUSTER_ENABLED = os.environ.get("STREAMING_CLUSTER", "").lower() in ("1", "true", "yes")
 
 # CORS origin allowlist. The SSE/typing endpoints send credentials (the login
 # cookie), so an unrestricted Access-Control-Allow-Origin + Allow-Credentials would
@@ -57,6 +86,7 @@ ALLOWED_ORIGINS = [
 ]
 
 pool: asyncpg.Pool = None
+CLUSTER: "cluster.Cluster" = None  # set in lifespan when CLUSTER_ENABLED
 
 # One global LISTEN channel for the whole feed (must match live_logging_routes).
 # A single dedicated listener connection fans out to all clients via the in-memory
@@ -81,29 +111,35 @@ def _dsn():
     )
 
 
-async def _dispatch_op(instance_id, event_id):
-    """Read a committed event once and fan it out to every connected client's queue.
-    Called from the single global NOTIFY listener — clients do no per-event DB read."""
+async def _dispatch_ops(instance_id, event_ids, notified_at=None):
+    """Read committed events once, frame each once, and hand the same bytes to every
+    connected client's outbox. Called from the single global NOTIFY listener —
+    clients do no per-event DB read and no per-client serialization."""
     async with pool.acquire() as c:
-        row = await c.fetchrow(
-            "SELECT op_type, payload::text AS payload FROM session_event WHERE event_id = $1",
-            event_id,
+        rows = await c.fetch(
+            "SELECT event_id, op_type, payload::text AS payload FROM session_event "
+            "WHERE event_id = ANY($1::bigint[]) ORDER BY event_id",
+            event_ids,
         )
-    if row is None:
-        return
-    for st in list(PRESENCE.get(instance_id, {}).values()):
-        st["queue"].put_nowait(("op", event_id, row["op_type"], row["payload"]))
+    subs = [st["sub"] for st in list(PRESENCE.get(instance_id, {}).values())]
+    for row in rows:
+        frame = _op_frame(row["event_id"], row["op_type"], row["payload"])
+        for sub in subs:
+            sub.push_op(row["event_id"], frame, notified_at)
 
 
 def _on_global_notify(conn, pid, channel, payload):
-    """asyncpg NOTIFY callback (sync): payload is '<instance_id>:<event_id>'."""
+    """asyncpg NOTIFY callback (sync): payload is '<instance_id>:<event_id>', or
+    '<instance_id>:<event_id>,<event_id>,...' for a batch of ops."""
     try:
-        inst_s, eid_s = payload.split(":", 1)
-        instance_id, event_id = int(inst_s), int(eid_s)
+        inst_s, eids_s = payload.split(":", 1)
+        instance_id = int(inst_s)
+        event_ids = [int(e) for e in eids_s.split(",")]
     except (ValueError, AttributeError):
         return
+    NOTIFIES.inc()
     if PRESENCE.get(instance_id):  # only bother if someone's listening
-        asyncio.create_task(_dispatch_op(instance_id, event_id))
+        asyncio.create_task(_dispatch_ops(instance_id, event_ids, time.monotonic()))
 
 
 # --- Auth -----------------------------------------------------------------
@@ -172,6 +208,106 @@ def _cors_headers(request):
     return headers
 
 
+# --- Per-connection outbox ------------------------------------------------
+
+STATS = {"slow_consumer_drops": 0, "presence_flushes": 0, "typing_flushes": 0, "snapshot_replays": 0}
+
+# GET /metrics (Prometheus text format, see metrics.py). Gauges are read from
+# PRESENCE and the outboxes at scrape time; fan-out latency is observed per op.
+METRICS = metrics.Registry()
+FANOUT_SECONDS = METRICS.histogram(
+    "ceol_streaming_fanout_seconds",
+    "From the NOTIFY arriving to the op's frame being written to a client.",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+NOTIFIES = METRICS.counter("ceol_streaming_notifies_total", "Live-event NOTIFYs received.")
+CONNECTIONS = METRICS.gauge(
+    "ceol_streaming_connections", "Open SSE connections on this node, by session instance.", ("session_instance_id",)
+)
+QUEUED_FRAMES = METRICS.gauge(
+    "ceol_streaming_queued_frames", "Ops waiting in client outboxes, by session instance.", ("session_instance_id",)
+)
+QUEUED_BYTES = METRICS.gauge(
+    "ceol_streaming_queued_bytes", "Bytes waiting in client outboxes, by session instance.", ("session_instance_id",)
+)
+MAX_QUEUED_FRAMES = METRICS.gauge("ceol_streaming_max_queued_frames", "The longest client outbox on this node.")
+FANOUT_EVENTS = METRICS.gauge("ceol_streaming_fanout_events", "STATS counters since the node started.", ("event",))
+
+
+class _Subscriber:
+    """One SSE connection's outbox. Ops queue in order (bounded); presence and
+    typing are snapshots, so only the latest unsent one is kept. Every frame is
+    shared bytes built once for all subscribers."""
+
+    __slots__ = ("ops", "op_bytes", "presence", "typing", "overflowed", "wake", "notified")
+
+    def __init__(self):
+        self.ops = deque()  # (event_id, frame, monotonic time its NOTIFY arrived or None)
+        self.op_bytes = 0
+        self.presence = None
+        self.typing = None
+        self.overflowed = False
+        self.wake = asyncio.Event()
+        self.notified = []  # NOTIFY times of the ops in the last drain()
+
+    def push_op(self, event_id, frame, notified_at=None):
+        if self.overflowed:
+            return
+        if len(self.ops) >= CLIENT_QUEUE_MAX_FRAMES or self.op_bytes + len(frame) > CLIENT_QUEUE_MAX_BYTES:
+            # Slow consumer: stop buffering for it; the stream loop disconnects it.
+            self.overflowed = True
+            self.ops.clear()
+            self.op_bytes = 0
+            STATS["slow_consumer_drops"] += 1
+        else:
+            self.ops.append((event_id, frame, notified_at))
+            self.op_bytes += len(frame)
+        self.wake.set()
+
+    def set_presence(self, frame):
+        self.presence = frame
+        self.wake.set()
+
+    def set_typing(self, frame):
+        self.typing = frame
+        self.wake.set()
+
+    def pending(self):
+        return bool(self.ops) or self.presence is not None or self.typing is not None or self.overflowed
+
+    def drain(self, skip_through=0):
+        """Everything waiting, as one chunk of bytes. Ops at or below skip_through
+        (already sent by the replay) are dropped."""
+        parts = [frame for eid, frame, _ in self.ops if eid > skip_through]
+        self.notified = [t for eid, _, t in self.ops if eid > skip_through and t is not None]
+        self.ops.clear()
+        self.op_bytes = 0
+        if self.presence is not None:
+            parts.append(self.presence)
+            self.presence = None
+        if self.typing is not None:
+            parts.append(self.typing)
+            self.typing = None
+        return b"".join(parts)
+
+
+# Coalesced snapshot broadcasts: (kind, instance_id) -> pending TimerHandle
+_pending_flush = {}
+
+
+def _schedule_flush(kind, instance_id, flush):
+    key = (kind, instance_id)
+    if key in _pending_flush:
+        return  # a flush is already due; it will pick up this change too
+    loop = asyncio.get_running_loop()
+
+    def run():
+        _pending_flush.pop(key, None)
+        flush(instance_id)
+
+    _pending_flush[key] = loop.call_later(COALESCE_SECONDS, run)
+
+
 # --- Presence (ephemeral, in the streaming service's memory; spec 024 §F) ----
 # Presence ≡ an open authenticated SSE connection. It never touches the DB and is
 # never replayed (sent as `event: presence` WITHOUT an `id:`, so it doesn't advance
@@ -189,13 +325,17 @@ def _cors_headers(request):
 # Must match the client's PALETTE length in App.svelte (8 colors).
 PALETTE_SIZE = 8
 
-# instance_id -> { conn_id: {queue, person_id, arrival_seq, name} }
+# instance_id -> { conn_id: {sub, person_id, arrival_seq, name} }  — THIS node's connections
 PRESENCE = {}
 # instance_id -> { person_id: {name, arrival_seq, ts} }  — people who just disconnected.
 # They linger as DIMMED avatars (and their rows stay colored) so a brief drop doesn't
 # erase them, until AWAY_TTL passes and they're truly removed from the view (§F).
+# Derived from the merged (all-node) view at each presence flush, so a person on
+# two nodes only goes away once neither has a connection for them.
 AWAY = {}
 AWAY_TTL = 3600  # seconds (1h) a disconnected person stays visible as "away"
+# instance_id -> { person_id: (name, arrival_seq) }  — present as of the last flush
+_PRESENT = {}
 # instance_id -> { person_id: color_idx }  (cache of the persisted color; avoids a DB
 # hit on every typing signal / roster build; populated on connect, never shrinks)
 _COLORS = {}
@@ -253,20 +393,63 @@ async def _session_color(instance_id, person_id):
     return idx
 
 
-def _roster(instance_id):
-    """One entry per person who is present OR recently away. Same person on two devices
-    = one entry. Present people have devices>=1 & away=False; recently-disconnected
-    people have devices=0 & away=True (rendered dimmed) until AWAY_TTL elapses."""
+def _local_people(instance_id):
+    """This node's connections on the instance, one entry per person."""
     by_person = {}
     for st in PRESENCE.get(instance_id, {}).values():
         e = by_person.get(st["person_id"])
         if e is None:
             by_person[st["person_id"]] = {
                 "person_id": st["person_id"], "arrival_seq": st["arrival_seq"],
-                "name": st["name"], "devices": 1, "away": False,
+                "name": st["name"], "devices": 1,
             }
         else:
             e["devices"] += 1
+    return list(by_person.values())
+
+
+def _present_people(instance_id):
+    """person_id -> entry for everyone connected to the instance on ANY node (devices
+    summed across nodes). Colors come from session_logger_color, so a person's
+    arrival_seq is the same whichever node reports them."""
+    by_person = {e["person_id"]: dict(e, away=False) for e in _local_people(instance_id)}
+    if CLUSTER is not None:
+        for _node, p in CLUSTER.remote_people(instance_id):
+            e = by_person.get(p["person_id"])
+            if e is None:
+                by_person[p["person_id"]] = {
+                    "person_id": p["person_id"], "arrival_seq": p["arrival_seq"],
+                    "name": p["name"], "devices": p["devices"], "away": False,
+                }
+            else:
+                e["devices"] += p["devices"]
+    return by_person
+
+
+def _update_away(instance_id, present):
+    """Mark people who were present at the last flush but aren't now as AWAY (rather
+    than vanishing them), and clear AWAY for anyone who's back."""
+    before = _PRESENT.pop(instance_id, {})
+    left = [pid for pid in before if pid not in present]
+    if left or AWAY.get(instance_id):
+        away = AWAY.setdefault(instance_id, {})
+        now = time.monotonic()
+        for pid in left:
+            name, seq = before[pid]
+            away[pid] = {"name": name, "arrival_seq": seq, "ts": now}
+        for pid in present:
+            away.pop(pid, None)
+    current = {pid: (e["name"], e["arrival_seq"]) for pid, e in present.items() if pid is not None}
+    if current:
+        _PRESENT[instance_id] = current
+
+
+def _roster(instance_id):
+    """One entry per person who is present OR recently away. Same person on two devices
+    (or two nodes) = one entry. Present people have devices>=1 & away=False;
+    recently-disconnected people have devices=0 & away=True (rendered dimmed) until
+    AWAY_TTL elapses."""
+    by_person = _present_people(instance_id)
     for pid, a in AWAY.get(instance_id, {}).items():
         if pid not in by_person:  # present beats away
             by_person[pid] = {
@@ -277,9 +460,20 @@ def _roster(instance_id):
 
 
 def _broadcast_presence(instance_id):
-    roster = _roster(instance_id)
-    for st in list(PRESENCE.get(instance_id, {}).values()):
-        st["queue"].put_nowait(("presence", roster))
+    """Send everyone on the instance a fresh roster, coalescing bursts (a deploy's
+    reconnect wave, a phone flapping) into one snapshot per COALESCE_SECONDS."""
+    _schedule_flush("presence", instance_id, _flush_presence)
+
+
+def _flush_presence(instance_id):
+    _update_away(instance_id, _present_people(instance_id))
+    subs = PRESENCE.get(instance_id)
+    if not subs:
+        return
+    frame = _presence_event(_roster(instance_id))  # serialized once for all
+    STATS["presence_flushes"] += 1
+    for st in list(subs.values()):
+        st["sub"].set_presence(frame)
 
 
 # --- Typing (ephemeral, in memory; spec 024 §F) ----------------------------
@@ -291,18 +485,35 @@ TYPING = {}  # instance_id -> { person_id: {name, arrival_seq, anchor, ts(monoto
 TYPING_TTL = 10  # seconds of inactivity before a typing signal expires
 
 
+def _local_typing(instance_id):
+    """Typing signals POSTed to THIS node (the node that enforces their TTL)."""
+    return [
+        {"person_id": pid, "name": e["name"], "arrival_seq": e["arrival_seq"], "anchor": e["anchor"]}
+        for pid, e in TYPING.get(instance_id, {}).items()
+    ]
+
+
 def _typing_list(instance_id):
-    return sorted(
-        ({"person_id": pid, "name": e["name"], "arrival_seq": e["arrival_seq"], "anchor": e["anchor"]}
-         for pid, e in TYPING.get(instance_id, {}).items()),
-        key=lambda x: x["arrival_seq"],
-    )
+    typers = {t["person_id"]: t for t in _local_typing(instance_id)}
+    if CLUSTER is not None:
+        for t in CLUSTER.remote_typing(instance_id):
+            typers.setdefault(t["person_id"], t)
+    return sorted(typers.values(), key=lambda x: x["arrival_seq"])
 
 
 def _broadcast_typing(instance_id):
-    lst = _typing_list(instance_id)
-    for st in list(PRESENCE.get(instance_id, {}).values()):
-        st["queue"].put_nowait(("typing", lst))
+    """Coalesced like presence: keystroke-rate signals become one snapshot per window."""
+    _schedule_flush("typing", instance_id, _flush_typing)
+
+
+def _flush_typing(instance_id):
+    subs = PRESENCE.get(instance_id)
+    if not subs:
+        return
+    frame = _typing_event(_typing_list(instance_id))
+    STATS["typing_flushes"] += 1
+    for st in list(subs.values()):
+        st["sub"].set_typing(frame)
 
 
 async def _typing_sweeper():
@@ -317,6 +528,7 @@ async def _typing_sweeper():
                 t.pop(pid, None)
             if stale:
                 _broadcast_typing(instance_id)
+                _publish_shard(instance_id)
 
 
 async def _away_sweeper():
@@ -333,6 +545,58 @@ async def _away_sweeper():
                 _broadcast_presence(instance_id)
 
 
+# --- Cluster (STREAMING_CLUSTER) -------------------------------------------
+# Each node is the only writer of its own shard -- the people connected to it and
+# the typing signals it received -- and publishes it whenever it changes. Remote
+# shards are merged into _present_people / _typing_list above.
+
+
+def _local_shard(instance_id):
+    return {"people": _local_people(instance_id), "typing": _local_typing(instance_id)}
+
+
+def _local_instances():
+    return [i for i in set(PRESENCE) | set(TYPING) if PRESENCE.get(i) or TYPING.get(i)]
+
+
+def _publish_shard(instance_id):
+    """Tell the other nodes about a change to this node's shard (coalesced)."""
+    if CLUSTER is not None:
+        _schedule_flush("shard", instance_id, CLUSTER.publish_shard_soon)
+
+
+def _on_remote_change(instance_id):
+    """Another node's shard changed: rebuild roster/typing for local clients."""
+    _broadcast_presence(instance_id)
+    _broadcast_typing(instance_id)
+
+
+async def _replay_snapshot(c, instance_id, last):
+    """The instance's session_snapshot row if a client at cursor `last` should
+    start from it: the events it covers were compacted away, or there are at
+    least REPLAY_SNAPSHOT_THRESHOLD of them. Otherwise None (plain replay)."""
+    snapshot = await c.fetchrow(
+        "SELECT event_id, payload::text AS payload, compacted_through "
+        "FROM session_snapshot WHERE session_instance_id = $1",
+        instance_id,
+    )
+    if snapshot is None or snapshot["event_id"] <= last:
+        return None
+    if last < snapshot["compacted_through"]:
+        return snapshot
+    behind = await c.fetchval(
+        """
+        SELECT COUNT(*) FROM (
+            SELECT 1 FROM session_event
+            WHERE session_instance_id = $1 AND event_id > $2 AND event_id <= $3
+            LIMIT $4
+        ) gap
+        """,
+        instance_id, last, snapshot["event_id"], REPLAY_SNAPSHOT_THRESHOLD,
+    )
+    return snapshot if behind >= REPLAY_SNAPSHOT_THRESHOLD else None
+
+
 async def _resolve_person(user_id):
     async with pool.acquire() as c:
         row = await c.fetchrow(
@@ -352,6 +616,31 @@ async def health(request):
     return JSONResponse({"ok": True})
 
 
+async def metrics_endpoint(request):
+    """This node's connection, queue and fan-out metrics (Prometheus text format).
+    One process per node, so its counts are the node's; no worker aggregation."""
+    client = request.client.host if request.client else None
+    if not metrics.authorized(request.headers.get("authorization"), client):
+        return Response("unauthorized\n", status_code=401, media_type="text/plain")
+    return Response(METRICS.render(), headers={"Content-Type": metrics.CONTENT_TYPE})
+
+
+@METRICS.on_collect
+def _collect_gauges():
+    for gauge in (CONNECTIONS, QUEUED_FRAMES, QUEUED_BYTES):
+        gauge.clear()  # instances nobody is connected to any more drop out
+    longest = 0
+    for instance_id, conns in list(PRESENCE.items()):
+        subs = [st["sub"] for st in list(conns.values())]
+        CONNECTIONS.set(len(subs), session_instance_id=instance_id)
+        QUEUED_FRAMES.set(sum(len(sub.ops) for sub in subs), session_instance_id=instance_id)
+        QUEUED_BYTES.set(sum(sub.op_bytes for sub in subs), session_instance_id=instance_id)
+        longest = max([longest] + [len(sub.ops) for sub in subs])
+    MAX_QUEUED_FRAMES.set(longest)
+    for event, value in STATS.items():
+        FANOUT_EVENTS.set(value, event=event)
+
+
 async def cors_preflight(request):
     headers = _cors_headers(request)
     headers["Access-Control-Allow-Methods"] = "GET, POST, OPTIONS"
@@ -388,6 +677,7 @@ async def typing(request):
     else:
         t.pop(pid, None)
     _broadcast_typing(instance_id)
+    _publish_shard(instance_id)
     return JSONResponse({"ok": True}, headers=_cors_headers(request))
 
 
@@ -414,18 +704,18 @@ async def events(request):
     )
 
     async def gen():
-        # One in-memory queue per connection carries both message kinds:
-        #   ("op", eid, op_type, payload)  fanned out by the single global listener
-        #   ("presence", roster)           from the in-process presence broadcaster
-        # No per-connection DB connection is held — only a brief pool.acquire for the
-        # initial replay — so concurrent clients are bounded by memory, not the pool.
-        queue: asyncio.Queue = asyncio.Queue()
+        # One outbox per connection carries both message kinds: ops fanned out by
+        # the single global listener (shared, pre-framed bytes) and the latest
+        # presence/typing snapshots. No per-connection DB connection is held — only
+        # a brief pool.acquire for the initial replay — so concurrent clients are
+        # bounded by memory, not the pool.
+        sub = _Subscriber()
 
         person = await _resolve_person(uid)
         seq = await _session_color(session_instance_id, person["person_id"])
         conn_id = next(_conn_ids)
         PRESENCE.setdefault(session_instance_id, {})[conn_id] = {
-            "queue": queue, "person_id": person["person_id"],
+            "sub": sub, "person_id": person["person_id"],
             "arrival_seq": seq, "name": person["name"],
         }
         AWAY.get(session_instance_id, {}).pop(person["person_id"], None)  # they're back
@@ -435,7 +725,10 @@ async def events(request):
             # 1) REPLAY everything after the client's cursor; note the high-water mark.
             #    Registered in PRESENCE *before* this, so live ops dispatched during
             #    replay queue up and are de-duped below by replayed_through.
+            #    Far behind (or behind compaction): start from the snapshot instead.
             async with pool.acquire() as c:
+                snapshot = await _replay_snapshot(c, session_instance_id, last)
+                since = snapshot["event_id"] if snapshot else last
                 rows = await c.fetch(
                     """
                     SELECT event_id, op_type, payload::text AS payload
@@ -444,51 +737,57 @@ async def events(request):
                     ORDER BY event_id
                     """,
                     session_instance_id,
-                    last,
+                    since,
                 )
-            replayed_through = last
-            for r in rows:
-                replayed_through = r["event_id"]
-                yield _sse(r["event_id"], r["op_type"], r["payload"])
+            replayed_through = since
+            if snapshot:
+                STATS["snapshot_replays"] += 1
+                yield _snapshot_event(snapshot["event_id"], snapshot["payload"])
+            for i in range(0, len(rows), REPLAY_CHUNK_ROWS):
+                chunk = rows[i:i + REPLAY_CHUNK_ROWS]
+                replayed_through = chunk[-1]["event_id"]
+                yield b"".join(_op_frame(r["event_id"], r["op_type"], r["payload"]) for r in chunk)
 
             # Announce arrival: a fresh roster to me + everyone else on this instance,
             # and hand the new client the current typing state.
             _broadcast_presence(session_instance_id)
-            queue.put_nowait(("typing", _typing_list(session_instance_id)))
+            _publish_shard(session_instance_id)
+            sub.set_typing(_typing_event(_typing_list(session_instance_id)))
 
-            # 2) GO LIVE — drain the queue (ops + presence), skipping replayed ops.
+            # 2) GO LIVE — drain the outbox (ops + snapshots), skipping replayed ops.
             #    On client disconnect, Starlette cancels this generator (-> finally).
             while True:
-                try:
-                    msg = await asyncio.wait_for(queue.get(), timeout=KEEPALIVE_SECONDS)
-                except asyncio.TimeoutError:
-                    # Observable keepalive (an `event:`, not a `:` comment) so the client
-                    # can run a liveness watchdog and force a reconnect on a silent
-                    # half-open socket. No `id:` -> doesn't advance Last-Event-ID.
-                    yield b"event: ping\ndata: {}\n\n"
-                    continue
-                if msg[0] == "presence":
-                    yield _presence_event(msg[1])  # no id: -> not a resume cursor
-                elif msg[0] == "typing":
-                    yield _typing_event(msg[1])     # no id: either
-                elif msg[0] == "op":
-                    _, eid, op_type, payload = msg
-                    if eid <= replayed_through:
+                if not sub.pending():
+                    sub.wake.clear()
+                    try:
+                        await asyncio.wait_for(sub.wake.wait(), timeout=KEEPALIVE_SECONDS)
+                    except asyncio.TimeoutError:
+                        # Observable keepalive (an `event:`, not a `:` comment) so the client
+                        # can run a liveness watchdog and force a reconnect on a silent
+                        # half-open socket. No `id:` -> doesn't advance Last-Event-ID.
+                        yield b"event: ping\ndata: {}\n\n"
                         continue
-                    yield _sse(eid, op_type, payload)
+                if sub.overflowed:
+                    # Too far behind: end the stream; the client reconnects and
+                    # resumes from its Last-Event-ID via the replay above.
+                    print(f"[streaming] dropping slow consumer on instance {session_instance_id} (conn {conn_id})")
+                    return
+                chunk = sub.drain(skip_through=replayed_through)
+                if chunk:
+                    yield chunk
+                    written = time.monotonic()
+                    for notified_at in sub.notified:
+                        FANOUT_SECONDS.observe(written - notified_at)
         finally:
             # Sync cleanup so a leave is always broadcast, even if the cancellation
-            # that got us here interrupts anything awaited.
-            st = PRESENCE.get(session_instance_id, {}).pop(conn_id, None)
-            # If that was the person's LAST device, don't vanish them — mark them AWAY
-            # (dimmed avatar, rows stay colored) until the sweeper drops them after an hour.
-            if st and st["person_id"] is not None:
-                still_here = any(s["person_id"] == st["person_id"] for s in PRESENCE.get(session_instance_id, {}).values())
-                if not still_here:
-                    AWAY.setdefault(session_instance_id, {})[st["person_id"]] = {
-                        "name": st["name"], "arrival_seq": st["arrival_seq"], "ts": time.monotonic(),
-                    }
+            # that got us here interrupts anything awaited. If that was the person's
+            # LAST device (on any node), the presence flush marks them AWAY (dimmed
+            # avatar, rows stay colored) until the sweeper drops them after an hour.
+            PRESENCE.get(session_instance_id, {}).pop(conn_id, None)
+            if not PRESENCE.get(session_instance_id):
+                PRESENCE.pop(session_instance_id, None)
             _broadcast_presence(session_instance_id)  # tell the rest I went away
+            _publish_shard(session_instance_id)
 
     return StreamingResponse(gen(), media_type="text/event-stream", headers=_cors_headers(request))
 
@@ -498,6 +797,12 @@ def _presence_event(roster):
     return f"event: presence\ndata: {json.dumps({'roster': roster})}\n\n".encode()
 
 
+def _snapshot_event(event_id, payload_json):
+    """Frame a state snapshot (the bootstrap shape). Its `id:` moves the client's
+    Last-Event-ID to the event the snapshot covers; jsonb text is one line."""
+    return f"id: {int(event_id)}\nevent: snapshot\ndata: {payload_json}\n\n".encode()
+
+
 def _typing_event(typers):
     """Frame a typing snapshot. No `id:` either."""
     return f"event: typing\ndata: {json.dumps({'typing': typers})}\n\n".encode()
@@ -507,18 +812,46 @@ def _sse(event_id, op_type, payload_json):
     """Frame one SSE message. `id:` advances the client's Last-Event-ID cursor.
 
     All ops ride a single `op` event so the client needs one handler; op_type and
-    event_id are folded into the data alongside the referee's payload.
+    event_id are folded into the data alongside the referee's payload. The payload
+    is Postgres' jsonb text (always an object), so the two fields are spliced onto
+    it rather than parsing and re-serializing it; anything unexpected falls back
+    to the parse path.
     """
-    try:
-        data = json.loads(payload_json) if payload_json else {}
-    except (TypeError, ValueError):
-        data = {}
-    data["op_type"] = op_type
-    data["event_id"] = event_id
-    body = json.dumps(data)
+    text = (payload_json or "").strip()
+    extra = f'"op_type": {json.dumps(op_type)}, "event_id": {int(event_id)}'
+    if text.startswith("{") and text.endswith("}"):
+        inner = text[1:-1].strip()
+        body = "{" + (inner + ", " if inner else "") + extra + "}"
+    else:
+        try:
+            data = json.loads(text) if text else {}
+        except (TypeError, ValueError):
+            data = {}
+        if not isinstance(data, dict):
+            data = {}
+        data["op_type"] = op_type
+        data["event_id"] = event_id
+        body = json.dumps(data)
     return f"id: {event_id}\nevent: op\ndata: {body}\n\n".encode()
 
 
+# event_id -> framed bytes (LRU). Events are immutable once committed.
+_OP_FRAMES = OrderedDict()
+
+
+def _op_frame(event_id, op_type, payload_json):
+    """The SSE frame for an op, built once and shared by live fan-out and replays."""
+    frame = _OP_FRAMES.get(event_id)
+    if frame is not None:
+        _OP_FRAMES.move_to_end(event_id)
+        return frame
+    frame = _sse(event_id, op_type, payload_json)
+    _OP_FRAMES[event_id] = frame
+    if len(_OP_FRAMES) > OP_FRAME_CACHE_SIZE:
+        _OP_FRAMES.popitem(last=False)
+    return frame
+
+
 # --- Lifespan / app -------------------------------------------------------
 
 
@@ -532,12 +865,22 @@ async def lifespan(app):
     await listener.add_listener(LIVE_EVENT_CHANNEL, _on_global_notify)
     sweeper = asyncio.create_task(_typing_sweeper())
     away_sweeper = asyncio.create_task(_away_sweeper())
+    global CLUSTER
+    if CLUSTER_ENABLED:
+        CLUSTER = cluster.Cluster(
+            cluster.PgBroker(pool, listener), _local_shard, _local_instances, _on_remote_change
+        )
+        await CLUSTER.start()
+        print(f"[streaming] cluster mode: node {CLUSTER.node_id} sharing presence on '{cluster.PRESENCE_CHANNEL}'")
     print(f"[streaming] live-logging SSE service up on :{PORT} (listening '{LIVE_EVENT_CHANNEL}')")
     try:
         yield
     finally:
         sweeper.cancel()
         away_sweeper.cancel()
+        if CLUSTER is not None:
+            await CLUSTER.stop()
+            CLUSTER = None
         await listener.remove_listener(LIVE_EVENT_CHANNEL, _on_global_notify)
         await pool.release(listener)
         await pool.close()
@@ -546,6 +889,7 @@ async def lifespan(app):
 app = Starlette(
     routes=[
         Route("/health", health),
+        Route("/metrics", metrics_endpoint),
         Route("/live/instances/{session_instance_id:int}/events", events, methods=["GET"]),
         Route("/live/instances/{session_instance_id:int}/events", cors_preflight, methods=["OPTIONS"]),
         Route("/live/instances/{session_instance_id:int}/typing", typing, methods=["POST"]),
@@ -27,6 +27,8 @@ os.environ["PGPASSWORD"] = "test_password"
 os.environ["PGPORT"] = "5432"
 os.environ["SENDGRID_API_KEY"] = "test-sendgrid-key"
 os.environ["MAIL_DEFAULT_SENDER"] = "test@ceol.io"
+# Tests rewrite users directly between requests; load them fresh every time
+os.environ.setdefault("USER_CACHE", "0")
 
 from app import app
 from database import get_db_connection
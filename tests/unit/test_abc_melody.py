@@ -0,0 +1,85 @@
+"""
+Unit tests for the ABC melody index (abc_melody.py): note extraction, the
+transposition-invariant interval grams, and the search query.
+"""
+
+import pytest
+
+import abc_melody
+
+KESH = """X:1
+T:The Kesh
+M:6/8
+K:Gmaj
+|:"G"G3 GAB|!trill!A3 ABd|{g}edd gdd|[1edB dBA:|[2 edB dBA|]
+"""
+
+
+@pytest.mark.unit
+class TestPitches:
+    def test_skips_headers_chords_decorations_and_graces(self):
+        assert abc_melody.pitches(KESH)[:8] == [4, 4, 5, 6, 5, 5, 6, 8]
+
+    def test_octave_marks_and_accidentals(self):
+        assert abc_melody.pitches("C, C c c' ^F _B =E") == [-7, 0, 7, 14, 3, 6, 2]
+
+    def test_chord_contributes_its_first_note(self):
+        assert abc_melody.pitches("[CEG]2 d") == [0, 8]
+
+    def test_repeat_endings_are_not_chords(self):
+        assert abc_melody.pitches("[1 AB :|[2 cd |]") == [5, 6, 7, 8]
+
+    def test_rests_and_durations_are_ignored(self):
+        assert abc_melody.pitches("z2 A3/2 x B>c") == [5, 6, 7]
+
+
+@pytest.mark.unit
+class TestGrams:
+    def test_repeated_notes_collapse(self):
+        assert abc_melody.intervals([4, 4, 5, 5, 4]) == [1, -1]
+
+    def test_transposed_melody_has_the_same_grams(self):
+        assert abc_melody.grams("GABd edBA") == abc_melody.grams("DEFA BAFE")
+        assert abc_melody.grams("GABd edBA") == abc_melody.grams("g'a'b'd'' e''d''b'a'")
+
+    def test_rhythm_does_not_matter(self):
+        assert abc_melody.grams("G3 GAB A3 ABd") == abc_melody.grams("GAB ABd")
+
+    def test_searchable_needs_four_distinct_steps(self):
+        assert not abc_melody.searchable("GED")
+        assert abc_melody.searchable("GEDB")
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+        self.executed = []
+
+    def execute(self, sql, params=None):
+        self.executed.append((" ".join(sql.split()), params))
+
+    def fetchall(self):
+        return self.rows
+
+
+@pytest.mark.unit
+class TestIndexAndSearch:
+    def test_index_setting_upserts_grams_and_version(self):
+        cur = FakeCursor([])
+        abc_melody.index_setting(cur, 42, "GABd edBA")
+        sql, params = cur.executed[0]
+        assert sql.startswith("INSERT INTO tune_setting_melody")
+        assert params == (42, abc_melody.grams("GABd edBA"), abc_melody.MELODY_INDEX_VERSION)
+
+    def test_search_returns_shared_fraction(self):
+        q = "GABd edBA"  # 5 grams; at least 3 must be shared
+        cur = FakeCursor([(7, 5), (9, 4)])
+        assert abc_melody.search(cur, q, tune_type="Jig", limit=5) == [(7, 1.0), (9, 0.8)]
+        sql, params = cur.executed[0]
+        assert "m.grams && %s::text[]" in sql and "t.tune_type = %s" in sql
+        assert params[2:] == ["Jig", 3, 5]
+
+    def test_search_without_a_melody_runs_no_query(self):
+        cur = FakeCursor([])
+        assert abc_melody.search(cur, "GE") == []
+        assert cur.executed == []
@@ -0,0 +1,109 @@
+"""
+Unit tests for the shared ABC renderer client (abc_renderer.py).
+
+A fake session stands in for the abc-renderer sidecar, so the tests can count
+round trips.
+"""
+
+import base64
+from unittest.mock import patch
+
+import pytest
+
+import abc_renderer
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, content=b"", json_body=None, content_type="image/png"):
+        self.status_code = status_code
+        self.content = content
+        self._json = json_body
+        self.headers = {"content-type": content_type}
+        self.text = ""
+
+    def json(self):
+        return self._json
+
+
+class FakeSession:
+    """Renders 'PNG:<abc>' for every item; can pretend the batch endpoint is missing."""
+
+    def __init__(self, batch=True):
+        self.batch = batch
+        self.calls = []
+
+    def post(self, url, json=None, timeout=None):
+        self.calls.append((url.rsplit("/", 1)[-1], json))
+        if url.endswith("/api/render-batch"):
+            if not self.batch:
+                return FakeResponse(404, content_type="text/html")
+            results = [
+                {"success": True, "png": base64.b64encode(f"PNG:{item['abc']}".encode()).decode()}
+                if "bad" not in item["abc"] else {"success": False, "error": "Failed to parse ABC notation"}
+                for item in json["items"]
+            ]
+            return FakeResponse(json_body={"success": True, "results": results}, content_type="application/json")
+        return FakeResponse(content=f"PNG:{json['abc']}".encode())
+
+
+@pytest.fixture
+def session():
+    fake = FakeSession()
+    abc_renderer.clear_cache()
+    with patch.object(abc_renderer, "_get_session", return_value=fake), \
+            patch.object(abc_renderer, "_batch_supported", True), \
+            patch.dict("os.environ", {"ABC_RENDERER_URL": "http://renderer"}):
+        yield fake
+    abc_renderer.clear_cache()
+
+
+@pytest.mark.unit
+class TestRenderMany:
+    def test_full_and_incipit_go_in_one_round_trip(self, session):
+        full, incipit = abc_renderer.render_many([("X:1\nK:D\nABcd|", False), ("X:1\nK:D\nAB|", True)])
+        assert full == b"PNG:X:1\nK:D\nABcd|"
+        assert incipit == b"PNG:X:1\nK:D\nAB|"
+        assert [c[0] for c in session.calls] == ["render-batch"]
+
+    def test_cached_images_are_not_rendered_again(self, session):
+        abc_renderer.render_many([("X:1\nK:G\nGABc|", True)])
+        session.calls.clear()
+        assert abc_renderer.render_abc_to_png("X:1\nK:G\nGABc|", is_incipit=True) == b"PNG:X:1\nK:G\nGABc|"
+        assert session.calls == []
+
+    def test_cache_key_includes_incipit_flag(self, session):
+        abc_renderer.render_abc_to_png("X:1\nK:G\nGABc|", is_incipit=True)
+        abc_renderer.render_abc_to_png("X:1\nK:G\nGABc|", is_incipit=False)
+        assert len(session.calls) == 2
+
+    def test_duplicates_and_blanks_in_one_call(self, session):
+        out = abc_renderer.render_many([("X:1\nK:A\nabc|", True), (None, False), ("X:1\nK:A\nabc|", True)])
+        assert out[0] == out[2] == b"PNG:X:1\nK:A\nabc|"
+        assert out[1] is None
+        # a single distinct image goes through the single-image endpoint
+        assert [c[0] for c in session.calls] == ["render"]
+
+    def test_failed_item_is_none_and_not_cached(self, session):
+        good, bad = abc_renderer.render_many([("X:1\nK:D\nDEF|", False), ("bad abc", False)])
+        assert good and bad is None
+        session.calls.clear()
+        abc_renderer.render_abc_to_png("bad abc")
+        assert len(session.calls) == 1
+
+    def test_falls_back_to_single_renders_without_batch_endpoint(self, session):
+        session.batch = False
+        out = abc_renderer.render_many([("X:1\nK:D\nA|", False), ("X:1\nK:D\nB|", True)])
+        assert out == [b"PNG:X:1\nK:D\nA|", b"PNG:X:1\nK:D\nB|"]
+        assert [c[0] for c in session.calls] == ["render-batch", "render", "render"]
+
+    def test_large_requests_are_chunked(self, session):
+        items = [(f"X:1\nK:D\nA{i}|", False) for i in range(abc_renderer.BATCH_SIZE + 1)]
+        out = abc_renderer.render_many(items)
+        assert all(out)
+        assert sorted(len(c[1]["items"]) if c[0] == "render-batch" else 1 for c in session.calls) == [
+            1, abc_renderer.BATCH_SIZE
+        ]
+
+    def test_no_renderer_configured(self):
+        with patch.dict("os.environ", {"ABC_RENDERER_URL": ""}):
+            assert abc_renderer.render_many([("X:1\nK:D\nA|", False)]) == [None]
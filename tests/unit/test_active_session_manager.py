@@ -25,106 +25,52 @@ def mock_db_connection():
 
 
 class TestUpdateActiveSessions:
-    """Tests for the update_active_sessions function."""
+    """Tests for the update_active_sessions function (one process_due_transitions pass)."""
 
     @patch('active_session_manager.get_db_connection')
-    @patch('active_session_manager.activate_session_instance')
-    @patch('active_session_manager.deactivate_session_instance')
-    def test_activates_session_in_active_window(
-        self, mock_deactivate, mock_activate, mock_get_db
-    ):
-        """Test that a session becomes active when current time is in its active window."""
+    def test_activates_session_in_active_window(self, mock_get_db, mock_db_connection):
+        """An instance whose window contains now + lookahead is activated, and the
+        people checked in to it are moved onto it, in one committed pass."""
         from active_session_manager import update_active_sessions
-        from recurrence_utils import SessionRecurrence
 
-        mock_conn, mock_cur = MagicMock(), MagicMock()
+        mock_conn, mock_cur = mock_db_connection
         mock_get_db.return_value = mock_conn
-        mock_conn.cursor.return_value = mock_cur
+        # Thursday 7:00pm-10:30pm in Austin, run at 6:59pm: the lookahead reaches 7:00pm
+        mock_cur.fetchall.return_value = [(101, 1, "Test Session", True)]
+        mock_cur.rowcount = 2  # people whose active instance changed
 
-        # Session with Thursday 7:00pm-10:30pm schedule, Austin timezone
-        recurrence_json = '''{
-            "schedules": [{
-                "type": "weekly",
-                "weekday": "thursday",
-                "start_time": "19:00",
-                "end_time": "22:30",
-                "every_n_weeks": 1
-            }]
-        }'''
-
-        # Mock session data
-        mock_cur.fetchall.return_value = [(
-            1,  # session_id
-            "Test Session",  # name
-            recurrence_json,  # recurrence
-            "America/Chicago",  # timezone
-            60,  # buffer_before
-            60,  # buffer_after
-            date(2024, 1, 1)  # initiation_date
-        )]
-
-        # Mock session instance on a Thursday
-        mock_cur.fetchall.side_effect = [
-            # First call: sessions
-            [(1, "Test Session", recurrence_json, "America/Chicago", 60, 60, date(2024, 1, 1))],
-            # Second call: instances for this session
-            [(101, date(2024, 3, 14), time(19, 0), time(22, 30), False, False)]  # Thursday
-        ]
-
-        # Run the check at 6:59pm Thursday (look ahead will see 7:00pm in window)
         with patch('active_session_manager.datetime') as mock_dt:
-            # Simulate running at 18:59 (6:59pm) on Thursday, March 14, 2024
-            thursday_659pm = datetime(2024, 3, 14, 18, 59, 0, tzinfo=ZoneInfo('America/Chicago'))
-            mock_dt.utcnow.return_value = thursday_659pm.astimezone(ZoneInfo('UTC')).replace(tzinfo=None)
-
+            mock_dt.now.return_value = datetime(2024, 3, 14, 18, 59, tzinfo=ZoneInfo('America/Chicago'))
             stats = update_active_sessions()
 
-        # Should activate the session
-        assert len(stats['activated']) == 1
-        assert stats['activated'][0]['session_id'] == 1
-        mock_activate.assert_called_once()
+        assert stats['activated'] == [{'session_id': 1, 'session_name': "Test Session", 'instance_id': 101}]
+        assert stats['deactivated'] == [] and stats['errors'] == []
+        assert stats['people_updated'] == 2
+        people_sql, people_params = mock_cur.execute.call_args_list[1][0]
+        assert 'UPDATE person' in people_sql and people_params == ([101], [])
+        mock_conn.commit.assert_called_once()
+        mock_conn.close.assert_called_once()
 
-    @patch('active_session_manager.get_db_connection')
-    def test_timezone_handling(self, mock_get_db):
-        """Test that sessions are activated based on local timezone, not UTC."""
-        from active_session_manager import update_active_sessions
+    def test_timezone_handling(self, mock_db_connection):
+        """Windows are UTC instants, so a local clock is compared as the same
+        instant: 6:59pm CDT (UTC-5) checks 00:00 UTC the next day."""
+        from active_session_manager import process_due_transitions, next_transition_at
 
-        mock_conn, mock_cur = MagicMock(), MagicMock()
-        mock_get_db.return_value = mock_conn
-        mock_conn.cursor.return_value = mock_cur
-
-        # Austin session at 7pm local time
-        austin_recurrence = '''{
-            "schedules": [{
-                "type": "weekly",
-                "weekday": "thursday",
-                "start_time": "19:00",
-                "end_time": "22:30",
-                "every_n_weeks": 1
-            }]
-        }'''
-
-        # Mock two sessions in different timezones
-        mock_cur.fetchall.side_effect = [
-            # Sessions
-            [
-                (1, "Austin", austin_recurrence, "America/Chicago", 60, 60, date(2024, 1, 1)),
-                (2, "NYC", austin_recurrence, "America/New_York", 60, 60, date(2024, 1, 1))
-            ],
-            # Instances for Austin (session 1)
-            [(101, date(2024, 3, 14), time(19, 0), time(22, 30), False, False)],
-            # Instances for NYC (session 2)
-            [(201, date(2024, 3, 14), time(19, 0), time(22, 30), False, False)]
-        ]
+        mock_conn, mock_cur = mock_db_connection
+        mock_cur.fetchall.return_value = [(201, 2, "NYC", False)]
+        austin_now = datetime(2024, 3, 14, 18, 59, tzinfo=ZoneInfo('America/Chicago'))
 
-        # Timezone test: Austin is UTC-5 (or -6 with DST), NYC is UTC-4 (or -5)
-        # At 7pm Austin time, it's 8pm NYC time (1 hour ahead)
-        # So Austin session should be active but NYC shouldn't yet
+        stats = process_due_transitions(mock_conn, now=austin_now)
 
-        stats = update_active_sessions()
+        at = mock_cur.execute.call_args_list[0][0][1]['at']
+        assert at == datetime(2024, 3, 15, 0, 0, tzinfo=ZoneInfo('UTC'))
+        assert stats['activated'] == []
+        assert stats['deactivated'] == [{'session_id': 2, 'session_name': "NYC", 'instance_id': 201}]
 
-        # Both timezones should be handled independently
-        # This is a simplified test - in practice we'd verify exact timing
+        # NYC's 7:00pm-10:30pm EDT window (with its 60-minute buffer) closes at 03:30 UTC
+        closes = datetime(2024, 3, 15, 3, 30, tzinfo=ZoneInfo('UTC'))
+        mock_cur.fetchone.return_value = (closes,)
+        assert next_transition_at(mock_conn, now=austin_now) == closes - timedelta(minutes=1)
 
 
 class TestActivateSessionInstance:
@@ -377,3 +323,78 @@ class TestGetPersonActiveSession:
         result = get_person_active_session(10)
 
         assert result is None
+
+
+class TestProcessDueTransitions:
+    """Tests for the set-based transition pass over precomputed windows."""
+
+    NOW = datetime(2024, 3, 15, 0, 59, tzinfo=ZoneInfo('UTC'))
+
+    def test_splits_flipped_instances_and_refreshes_people(self, mock_db_connection):
+        from active_session_manager import process_due_transitions
+
+        mock_conn, mock_cur = mock_db_connection
+        mock_cur.fetchall.return_value = [
+            (101, 1, "Austin", True),
+            (202, 2, "NYC", False),
+        ]
+        mock_cur.rowcount = 3
+
+        stats = process_due_transitions(mock_conn, now=self.NOW)
+
+        transition_sql, params = mock_cur.execute.call_args_list[0][0]
+        assert params == {'at': self.NOW + timedelta(minutes=1)}
+        assert 'active_from_utc <= %(at)s' in transition_sql
+        assert stats['activated'] == [{'session_id': 1, 'session_name': "Austin", 'instance_id': 101}]
+        assert stats['deactivated'] == [{'session_id': 2, 'session_name': "NYC", 'instance_id': 202}]
+
+        people_sql, people_params = mock_cur.execute.call_args_list[1][0]
+        assert 'UPDATE person' in people_sql
+        assert people_params == ([101], [202])
+        assert stats['people_updated'] == 3
+        mock_conn.commit.assert_called_once()
+
+    def test_nothing_due_runs_one_query(self, mock_db_connection):
+        from active_session_manager import process_due_transitions
+
+        mock_conn, mock_cur = mock_db_connection
+        mock_cur.fetchall.return_value = []
+
+        stats = process_due_transitions(mock_conn, now=self.NOW)
+
+        assert mock_cur.execute.call_count == 1
+        assert stats == {'activated': [], 'deactivated': [], 'errors': []}
+
+    def test_dry_run_rolls_back(self, mock_db_connection):
+        from active_session_manager import process_due_transitions
+
+        mock_conn, mock_cur = mock_db_connection
+        mock_cur.fetchall.return_value = [(101, 1, "Austin", True)]
+
+        stats = process_due_transitions(mock_conn, now=self.NOW, commit=False)
+
+        assert len(stats['activated']) == 1
+        mock_conn.rollback.assert_called_once()
+        mock_conn.commit.assert_not_called()
+
+    def test_error_rolls_back_and_reports(self, mock_db_connection):
+        from active_session_manager import process_due_transitions
+
+        mock_conn, mock_cur = mock_db_connection
+        mock_cur.execute.side_effect = psycopg2.OperationalError("connection lost")
+
+        stats = process_due_transitions(mock_conn, now=self.NOW)
+
+        assert stats['activated'] == [] and len(stats['errors']) == 1
+        mock_conn.rollback.assert_called_once()
+
+    def test_next_transition_is_lookahead_early(self, mock_db_connection):
+        from active_session_manager import next_transition_at
+
+        mock_conn, mock_cur = mock_db_connection
+        opens = datetime(2024, 3, 15, 1, 0, tzinfo=ZoneInfo('UTC'))
+        mock_cur.fetchone.return_value = (opens,)
+        assert next_transition_at(mock_conn, now=self.NOW) == opens - timedelta(minutes=1)
+
+        mock_cur.fetchone.return_value = (None,)
+        assert next_transition_at(mock_conn, now=self.NOW) is None
@@ -0,0 +1,58 @@
+"""
+Unit tests for jobs/active_session_scheduler.py: sleep computation and
+recovery from a lost database connection.
+"""
+
+from argparse import Namespace
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+
+import psycopg2
+import pytest
+
+from jobs import active_session_scheduler as scheduler
+
+
+@pytest.mark.unit
+class TestSecondsUntil:
+    NOW = datetime(2024, 3, 15, 0, 0, tzinfo=timezone.utc)
+
+    def test_sleeps_until_just_after_the_transition(self):
+        assert scheduler.seconds_until(self.NOW + timedelta(seconds=90), self.NOW, 300) == 91.0
+
+    def test_capped_and_never_negative(self):
+        assert scheduler.seconds_until(None, self.NOW, 300) == 300
+        assert scheduler.seconds_until(self.NOW + timedelta(hours=2), self.NOW, 300) == 300
+        assert scheduler.seconds_until(self.NOW - timedelta(minutes=5), self.NOW, 300) == 0.0
+
+
+@pytest.mark.unit
+class TestRun:
+    def test_database_error_reconnects_and_listens_again(self):
+        conns = [MagicMock(name=f"conn{i}") for i in range(4)]
+        waits = []
+
+        def wait(listen_conn, timeout):
+            waits.append(listen_conn)
+            scheduler._stopping = True
+
+        manager = MagicMock()
+        manager.SCHEDULE_NOTIFY_CHANNEL = "session_schedule"
+        manager.process_due_transitions.return_value = {'activated': [], 'deactivated': [], 'errors': []}
+        manager.next_transition_at.side_effect = [psycopg2.OperationalError("server closed the connection"), None]
+
+        with patch.object(scheduler, "get_db_connection", side_effect=conns), \
+                patch.object(scheduler, "active_session_manager", manager), \
+                patch.object(scheduler, "_wait", side_effect=wait), \
+                patch.object(scheduler, "_backoff") as backoff, \
+                patch.object(scheduler, "_stopping", False):
+            scheduler.run(Namespace(max_sleep=300.0, auto_create_interval=0))
+
+        backoff.assert_called_once_with(scheduler.ERROR_BACKOFF_SECONDS)
+        # The broken pair was closed, a new pair opened, and the LISTEN re-issued on it
+        conns[0].close.assert_called_once()
+        conns[1].close.assert_called()
+        for listen_conn in (conns[1], conns[3]):
+            listen_conn.cursor.return_value.execute.assert_called_once_with("LISTEN session_schedule")
+        assert manager.process_due_transitions.call_args_list[1][0][0] is conns[2]
+        assert waits == [conns[3]]
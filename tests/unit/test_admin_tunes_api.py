@@ -0,0 +1,96 @@
+"""
+Unit tests for the admin tunes list (api_routes.get_admin_tunes): keyset
+pagination, server-side filters and sorts, and the maintained counters.
+"""
+
+from unittest.mock import patch, MagicMock
+
+import pytest
+
+from app import app
+import api_routes
+
+
+class FakeCursor:
+    def __init__(self, rows, total=0):
+        self.rows = rows  # (tune_id, name, type, sessions, tunelists, tunebook, redirect, sort_value)
+        self.total = total
+        self.executed = []
+        self._result = []
+
+    def execute(self, sql, params=None):
+        sql = " ".join(sql.split())
+        self.executed.append((sql, params))
+        self._result = [(self.total,)] if sql.startswith("SELECT COUNT(*)") else self.rows[:params[-1]]
+
+    def fetchall(self):
+        return self._result
+
+    def fetchone(self):
+        return self._result[0]
+
+
+def _row(tune_id, name, sessions=0):
+    return (tune_id, name, "Reel", sessions, 1, None, None, name.lower())
+
+
+@pytest.fixture
+def admin_tunes():
+    user = MagicMock(is_system_admin=True)
+
+    def get(query="", rows=(), total=0):
+        cur = FakeCursor(list(rows), total)
+        conn = MagicMock()
+        conn.cursor.return_value = cur
+        with app.test_request_context(f"/api/admin/tunes?{query}"), \
+                patch.object(api_routes, "get_db_connection", return_value=conn), \
+                patch.object(api_routes, "current_user", user):
+            resp = api_routes.get_admin_tunes.__wrapped__()
+        if isinstance(resp, tuple):
+            return resp[0].get_json(), resp[1], cur
+        return resp.get_json(), 200, cur
+
+    return get
+
+
+@pytest.mark.unit
+class TestAdminTunes:
+    def test_first_page_has_total_and_cursor(self, admin_tunes):
+        rows = [_row(1, "Abbey"), _row(2, "Banish"), _row(3, "Cooley")]
+        body, status, cur = admin_tunes("limit=2", rows, total=3)
+
+        assert status == 200
+        assert [t["tune_id"] for t in body["tunes"]] == [1, 2]
+        assert body["tunes"][0]["tunebook_count_cached"] == 0
+        assert body["total"] == 3 and "Reel" in body["tune_types"]
+        assert api_routes._parse_admin_tunes_cursor(body["next_cursor"], "name") == ("banish", 2)
+        page_sql, params = cur.executed[0]
+        assert "ORDER BY t.name_search asc, t.tune_id asc" in page_sql and params[-1] == 3
+
+    def test_cursor_continues_after_last_row(self, admin_tunes):
+        cursor = api_routes._admin_tunes_cursor(12, 40)
+        body, _, cur = admin_tunes(f"sort=sessions&dir=desc&cursor={cursor}", [_row(5, "Drowsy")])
+
+        page_sql, params = cur.executed[0]
+        assert "(t.session_count_cached, t.tune_id) < (%s, %s)" in page_sql
+        assert params[:2] == [12, 40]
+        assert body["next_cursor"] is None and "total" not in body
+        assert len(cur.executed) == 1  # no COUNT(*) after the first page
+
+    def test_filters_by_name_type_and_id(self, admin_tunes):
+        _, _, cur = admin_tunes("q=https://thesession.org/tunes/27&type=Jig")
+        page_sql, params = cur.executed[0]
+        assert "OR t.tune_id = %s" in page_sql and "t.tune_type = %s" in page_sql
+        assert params[1:3] == [27, "Jig"]
+        count_sql, count_params = cur.executed[1]
+        assert count_sql.startswith("SELECT COUNT(*) FROM tune t WHERE") and count_params == params[:-1]
+
+    @pytest.mark.parametrize("query", ["sort=bogus", "dir=up", "cursor=nope", "limit=x",
+                                       f"sort=sessions&cursor={api_routes._admin_tunes_cursor('abc', 1)}"])
+    def test_bad_parameters_are_400(self, admin_tunes, query):
+        assert admin_tunes(query)[1] == 400
+
+    def test_requires_system_admin(self, admin_tunes):
+        with patch.object(api_routes, "current_user", MagicMock(is_system_admin=False)), \
+                app.test_request_context("/api/admin/tunes"):
+            assert api_routes.get_admin_tunes.__wrapped__()[1] == 403
@@ -0,0 +1,66 @@
+"""
+Unit tests for the live-logging benchmark's measurement and baseline logic
+(scripts/bench_live_logging.py). The end-to-end run needs Postgres and isn't
+exercised here.
+"""
+
+import pytest
+
+import metrics
+from scripts import bench_live_logging as bench
+
+
+@pytest.mark.unit
+class TestStatistics:
+    def test_percentiles_in_ms(self):
+        assert bench.summarize_ms([0.001 * n for n in range(1, 101)]) == {"p50": 51.0, "p95": 96.0, "p99": 100.0, "max": 100.0}
+        assert bench.summarize_ms([]) is None
+
+    def test_histogram_percentiles_between_scrapes(self):
+        registry = metrics.Registry()
+        fanout = registry.histogram("fanout_seconds", "Fan-out.", buckets=(0.01, 0.1, 1))
+        fanout.observe(5)  # before the run
+        before = bench.parse_metrics(registry.render())
+        for value in [0.005] * 90 + [0.05] * 9 + [0.5]:
+            fanout.observe(value)
+        after = bench.parse_metrics(registry.render())
+
+        buckets = bench.histogram_delta(before, after, "fanout_seconds")
+        assert buckets[float("inf")] == 100
+        assert [bench.histogram_percentile(buckets, p) for p in (0.5, 0.95, 0.995)] == [0.01, 0.1, 1.0]
+        assert bench.metric_delta(before, after, "fanout_seconds_count") == 100
+
+    def test_queries_per_op_is_read_from_the_ops_route_only(self):
+        before = bench.parse_metrics("")
+        after = bench.parse_metrics(
+            f'ceol_db_queries_per_request_sum{{{bench.OPS_ROUTE},pid="1"}} 24\n'
+            'ceol_db_queries_per_request_sum{route="/api/live/instances/<int:session_instance_id>/ops/batch",pid="1"} 99\n'
+        )
+        assert bench.metric_delta(before, after, "ceol_db_queries_per_request_sum", bench.OPS_ROUTE) == 24
+
+
+@pytest.mark.unit
+class TestBaseline:
+    BASELINE = {"micro": {"sse_frame_us": 2.0}, "e2e": {"ack_ms": {"p95": 40.0}, "ops_per_second": 100.0}}
+
+    def test_slower_or_lower_throughput_is_a_regression(self):
+        result = {"micro": {"sse_frame_us": 3.2}, "e2e": {"ack_ms": {"p95": 41.0}, "ops_per_second": 40.0}}
+        assert bench.compare(result, self.BASELINE, tolerance=0.5) == [
+            "micro.sse_frame_us is 3.2, 60% above the baseline 2",
+            "e2e.ops_per_second is 40, 60% below the baseline 100",
+        ]
+
+    def test_unmeasured_metrics_are_skipped(self):
+        assert bench.compare({"micro": {"sse_frame_us": 1.0}}, self.BASELINE) == []
+
+
+@pytest.mark.unit
+class TestSse:
+    def test_parser_reassembles_messages_split_across_chunks(self):
+        parser = bench.SseParser()
+        assert parser.feed(b": connected\n\nevent: presence\ndata: {}\n\nid: 7\nev") == [("presence", None)]
+        assert parser.feed(b"ent: op\ndata: {}\n\nid: 8\nevent: op\ndata: {}\n\n") == [("op", 7), ("op", 8)]
+
+    def test_micro_benchmarks_run(self):
+        result = bench.run_micro(iterations=20, subscribers=3, runs=1)
+        assert result["sse_frame_us"] > 0 and result["fanout_us_per_op"] > 0
@@ -0,0 +1,175 @@
+"""
+Unit tests for the person CSV import's set-based helpers (api_routes):
+iter_csv_people, find_duplicate_people and insert_people_batch, and the
+streamed preview.
+"""
+
+import json
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import psycopg2.extensions
+import pytest
+
+import api_routes
+import db_pool
+from app import app
+
+
+class FakeCursor:
+    def __init__(self, emails=None, phones=None, names=None, next_id=500):
+        self.emails = emails or {}   # email -> person_id
+        self.phones = phones or {}   # sms_number -> person_id
+        self.names = names or {}     # (first, last) -> person_id, already in the session
+        self.next_id = next_id
+        self.executed = []
+        self._rows = []
+
+    def execute(self, sql, params=None):
+        sql = " ".join(sql.split())
+        self.executed.append((sql, params))
+        if "FROM person WHERE email = ANY" in sql:
+            self._rows = [(e, self.emails[e]) for e in params[0] if e in self.emails]
+        elif "FROM person WHERE sms_number = ANY" in sql:
+            self._rows = [(s, self.phones[s]) for s in params[0] if s in self.phones]
+        elif "FROM unnest" in sql:
+            self._rows = [
+                (first, last, self.names[(first.lower(), last.lower())])
+                for first, last in zip(params[0], params[1])
+                if (first.lower(), last.lower()) in self.names
+            ]
+        elif sql.startswith("SELECT nextval"):
+            self._rows = [(self.next_id + i,) for i in range(params[0])]
+        else:
+            self._rows = []
+
+    def fetchall(self):
+        return self._rows
+
+
+def _person(first, last, email=None, sms_number=None, **extra):
+    return {"first_name": first, "last_name": last, "email": email, "sms_number": sms_number, **extra}
+
+
+@pytest.mark.unit
+class TestIterCsvPeople:
+    def test_header_row_and_rows(self):
+        rows = list(api_routes.iter_csv_people(
+            "First,Last,Email\nAnn,Byrne,ann@example.com\nCal,Doyle,\n", "Austin", "TX", "USA"))
+        assert [(p["first_name"], p["last_name"], p["email"]) for p in rows] == [
+            ("Ann", "Byrne", "ann@example.com"), ("Cal", "Doyle", None)]
+        assert rows[0]["city"] == "Austin"
+
+    def test_without_header_first_row_is_data(self):
+        rows = list(api_routes.iter_csv_people("Ann Byrne\nCal Doyle"))
+        assert [p["last_name"] for p in rows] == ["Byrne", "Doyle"]
+
+    def test_empty_input(self):
+        with pytest.raises(ValueError):
+            list(api_routes.iter_csv_people("  \n"))
+        with pytest.raises(ValueError):
+            api_routes.parse_csv_data("First,Last\n")
+
+
+@pytest.mark.unit
+class TestFindDuplicatePeople:
+    def test_precedence_email_phone_name(self):
+        cur = FakeCursor(
+            emails={"a@x.com": 1},
+            phones={"+15125550100": 2},
+            names={("ann", "byrne"): 3, ("cal", "doyle"): 4},
+        )
+        people = [
+            _person("Ann", "Byrne", email="a@x.com", sms_number="+15125550100"),
+            _person("Ann", "Byrne", sms_number="+15125550100"),
+            _person("cal", "DOYLE"),
+            _person("Eve", "Fahy", email="new@x.com"),
+        ]
+        assert api_routes.find_duplicate_people(cur, people, 9) == [
+            (True, 1, "email"), (True, 2, "phone"), (True, 4, "name"), (False, None, None)]
+
+    def test_one_query_per_kind_whatever_the_count(self):
+        cur = FakeCursor()
+        people = [_person(f"P{i}", "Q", email=f"p{i}@x.com", sms_number=f"+1{i}") for i in range(50)]
+        api_routes.find_duplicate_people(cur, people, 9)
+        assert len(cur.executed) == 3
+        assert cur.executed[2][1][2] == 9  # names are scoped to the session
+
+    def test_names_skipped_when_everyone_matched(self):
+        cur = FakeCursor(emails={"a@x.com": 1})
+        api_routes.find_duplicate_people(cur, [_person("Ann", "Byrne", email="a@x.com")], 9)
+        assert not any("unnest" in sql for sql, _ in cur.executed)
+
+
+@pytest.mark.unit
+class TestInsertPeopleBatch:
+    def test_ids_follow_input_order(self):
+        cur = FakeCursor(next_id=700)
+        people = [
+            _person("Ann", "Byrne", instruments=["Fiddle", "fiddle ", "flute"], is_regular=True),
+            _person("Cal", "Doyle", instruments=[]),
+        ]
+        with patch.object(api_routes.psycopg2.extras, "execute_values") as execute_values, \
+                patch.object(api_routes, "save_many_to_history") as save_many:
+            assert api_routes.insert_people_batch(cur, people, 9, 3) == [700, 701]
+
+        person_rows, instrument_rows, session_rows = [c.args[2] for c in execute_values.call_args_list]
+        assert [row[:3] for row in person_rows] == [(700, "Ann", "Byrne"), (701, "Cal", "Doyle")]
+        assert instrument_rows == [(700, "fiddle", 3), (700, "flute", 3)]
+        assert session_rows == [(9, 700, True, 3), (9, 701, False, 3)]
+        assert [c.args[:3] for c in save_many.call_args_list] == [
+            (cur, "person", "INSERT"), (cur, "person_instrument", "INSERT")]
+
+    def test_nothing_to_insert(self):
+        cur = FakeCursor()
+        assert api_routes.insert_people_batch(cur, [], 9, 3) == []
+        assert cur.executed == []
+
+
+class PreviewConn:
+    """A poolable connection answering the preview's admin and session lookups."""
+
+    closed = 0
+    autocommit = False
+
+    def get_transaction_status(self):
+        return psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+    def cursor(self):
+        rows = iter([(True,), (9, "Thursday", "Austin", "TX", "USA")])
+        return SimpleNamespace(execute=lambda *a: None, fetchone=lambda: next(rows), close=lambda: None)
+
+
+@pytest.mark.unit
+class TestStreamedPreview:
+    def test_stream_holds_its_own_connection_until_the_last_chunk(self):
+        seen = []
+
+        def mark_duplicates(cur, people, session_id):
+            seen.append(db_pool.get_pool_stats()["in_use"])
+            for person in people:
+                person["is_duplicate"] = False
+
+        with patch.dict("os.environ", {"DB_POOL_ENABLED": "true"}), \
+                patch.object(db_pool, "_pool", None), \
+                patch.object(api_routes, "get_db_connection", lambda: db_pool.checkout(PreviewConn)), \
+                patch.object(api_routes, "current_user", SimpleNamespace(user_id=1)), \
+                patch.object(api_routes, "_mark_duplicates", mark_duplicates):
+            body = {"csv_data": "first,last\nAnn,Byrne", "stream": True}
+            with app.test_request_context("/", method="POST", json=body):
+                resp = api_routes.bulk_import_preprocess_session.__wrapped__(9)
+            # The view has returned and its request context is popped, as when the
+            # server starts writing the body.
+            lines = [json.loads(line) for line in resp.response]
+            resp.close()
+            stats = db_pool.get_pool_stats()
+
+        assert lines[-1] == {"success": True, "count": 1}
+        assert seen == [1]  # checked out, not handed back to the pool mid-stream
+        assert stats["in_use"] == 0
@@ -0,0 +1,231 @@
+"""
+Unit tests for the pooled, request-scoped connections in db_pool.py.
+
+Uses a fake psycopg2 connection so no database is needed.
+"""
+
+import threading
+from unittest.mock import patch
+
+import psycopg2
+import psycopg2.extensions
+import pytest
+from flask import Flask
+
+import db_pool
+from db_pool import ConnectionPool, PoolExhausted, PooledConnection
+
+
+class FakeConn:
+    """Just enough of a psycopg2 connection for the pool."""
+
+    def __init__(self):
+        self.closed = 0
+        self.autocommit = False
+        self.status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+        self.rollbacks = 0
+        self.ping_fails = False
+
+    def get_transaction_status(self):
+        return self.status
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+    def cursor(self):
+        conn = self
+
+        class _Cur:
+            def execute(self, sql, params=None):
+                if conn.ping_fails:
+                    raise psycopg2.OperationalError("server closed the connection")
+
+            def fetchone(self):
+                return (1,)
+
+            def close(self):
+                pass
+
+        return _Cur()
+
+
+def _pool(**kwargs):
+    made = []
+
+    def connect():
+        c = FakeConn()
+        made.append(c)
+        return c
+
+    return ConnectionPool(connect, **kwargs), made
+
+
+@pytest.mark.unit
+class TestConnectionPool:
+    def test_reuses_returned_connection(self):
+        pool, made = _pool(maxconn=2)
+        c1 = pool.getconn()
+        pool.putconn(c1)
+        c2 = pool.getconn()
+        assert c1 is c2
+        assert len(made) == 1
+        assert pool.stats()["checkouts"] == 2
+
+    def test_putconn_rolls_back_and_resets_autocommit(self):
+        pool, _ = _pool()
+        c = pool.getconn()
+        c.status = psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+        c.autocommit = True
+        pool.putconn(c)
+        assert c.rollbacks == 1
+        assert c.autocommit is False
+
+    def test_broken_connection_is_discarded(self):
+        pool, made = _pool()
+        c = pool.getconn()
+        c.status = psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN
+        pool.putconn(c)
+        assert c.closed
+        assert pool.stats()["size"] == 0
+        assert pool.getconn() is not c
+
+    def test_exhaustion_times_out_and_is_counted(self):
+        pool, _ = _pool(maxconn=1, timeout=0.05)
+        pool.getconn()
+        with pytest.raises(PoolExhausted):
+            pool.getconn()
+        stats = pool.stats()
+        assert stats["exhausted"] == 1
+        assert stats["waits"] == 1
+        assert stats["in_use"] == 1
+
+    def test_waiter_gets_connection_when_one_is_returned(self):
+        pool, made = _pool(maxconn=1, timeout=2)
+        c1 = pool.getconn()
+        got = []
+        t = threading.Thread(target=lambda: got.append(pool.getconn()))
+        t.start()
+        pool.putconn(c1)
+        t.join(2)
+        assert got == [c1]
+        assert len(made) == 1
+
+    def test_stale_idle_connection_is_health_checked_and_replaced(self):
+        pool, made = _pool(health_check_interval=0)
+        c1 = pool.getconn()
+        pool.putconn(c1)
+        c1.ping_fails = True
+        c2 = pool.getconn()
+        assert c2 is not c1
+        assert c1.closed
+        stats = pool.stats()
+        assert stats["health_check_failures"] == 1
+        assert stats["size"] == 1
+
+    def test_failed_connect_frees_its_slot(self):
+        calls = {"n": 0}
+
+        def connect():
+            calls["n"] += 1
+            if calls["n"] == 1:
+                raise psycopg2.OperationalError("could not connect")
+            return FakeConn()
+
+        pool = ConnectionPool(connect, maxconn=1, timeout=0.05)
+        with pytest.raises(psycopg2.OperationalError):
+            pool.getconn()
+        assert pool.getconn() is not None
+
+
+@pytest.mark.unit
+class TestPooledConnection:
+    def test_close_releases_once_and_blocks_further_use(self):
+        released = []
+        raw = FakeConn()
+        handle = PooledConnection(raw, released.append)
+        handle.autocommit = True
+        assert raw.autocommit is True
+        handle.close()
+        handle.close()
+        assert released == [raw]
+        assert handle.closed
+        with pytest.raises(psycopg2.InterfaceError):
+            handle.cursor()
+
+
+@pytest.mark.unit
+class TestRequestScope:
+    @pytest.fixture(autouse=True)
+    def fresh_pool(self):
+        db_pool.reset_pool()
+        made = []
+
+        def connect():
+            c = FakeConn()
+            made.append(c)
+            return c
+
+        self.connect = connect
+        self.made = made
+        yield
+        db_pool.reset_pool()
+
+    def test_sequential_opens_in_a_request_share_one_connection(self):
+        app = Flask(__name__)
+        with app.test_request_context("/"):
+            a = db_pool.checkout(self.connect)
+            raw_a = a._conn
+            a.close()
+            b = db_pool.checkout(self.connect)
+            assert b._conn is raw_a
+            b.close()
+            db_pool.release_request_connections()
+        assert len(self.made) == 1
+        assert db_pool.get_pool_stats()["in_use"] == 0
+
+    def test_nested_open_gets_its_own_connection(self):
+        app = Flask(__name__)
+        with app.test_request_context("/"):
+            outer = db_pool.checkout(self.connect)
+            inner = db_pool.checkout(self.connect)
+            assert inner._conn is not outer._conn
+            inner.close()
+            outer.close()
+            db_pool.release_request_connections()
+        assert db_pool.get_pool_stats()["in_use"] == 0
+
+    def test_teardown_returns_unclosed_handles(self):
+        app = Flask(__name__)
+        with app.test_request_context("/"):
+            db_pool.checkout(self.connect)
+            assert db_pool.get_pool_stats()["in_use"] == 1
+            db_pool.release_request_connections()
+        assert db_pool.get_pool_stats()["in_use"] == 0
+
+    def test_get_db_connection_uses_pool_only_when_enabled(self):
+        import database
+
+        with patch.object(database, "_connect", side_effect=self.connect):
+            with patch.dict("os.environ", {"DB_POOL_ENABLED": ""}):
+                assert isinstance(database.get_db_connection(), FakeConn)
+            with patch.dict("os.environ", {"DB_POOL_ENABLED": "true"}):
+                conn = database.get_db_connection()
+                assert isinstance(conn, PooledConnection)
+                conn.close()
+
+    def test_forked_child_builds_its_own_pool_without_closing_the_parents(self):
+        parent_conn = db_pool.checkout(self.connect)
+        parent_conn.close()
+        parent_pool = db_pool._pool
+        raw = parent_pool._idle[-1][0]
+
+        db_pool._after_fork_in_child()
+
+        assert db_pool.get_pool_stats() is None
+        assert parent_pool in db_pool._inherited_pools and not raw.closed
+        db_pool._inherited_pools.remove(parent_pool)
+        assert db_pool.get_pool(self.connect) is not parent_pool
@@ -0,0 +1,36 @@
+"""
+Unit tests for the production server hooks in gunicorn_config.py.
+"""
+
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+import gunicorn_config
+
+
+@pytest.mark.unit
+class TestLatencyStats:
+    def test_summarizes_every_n_requests_and_starts_over(self):
+        stats = gunicorn_config.LatencyStats(every=4)
+        assert [stats.record(s) for s in (0.010, 0.020, 0.030)] == [None, None, None]
+        assert stats.record(0.400) == "n=4 p50=30ms p95=400ms p99=400ms max=400ms"
+        assert stats.summary() is None
+
+    def test_zero_disables_periodic_reports(self):
+        stats = gunicorn_config.LatencyStats(every=0)
+        assert stats.record(0.005) is None
+        assert stats.summary().startswith("n=1 ")
+
+    def test_request_hooks_log_per_worker(self):
+        worker = SimpleNamespace(pid=123, log=MagicMock())
+        gunicorn_config.post_fork(MagicMock(), worker)
+        worker.latency.every = 1
+        req = SimpleNamespace()
+
+        gunicorn_config.pre_request(worker, req)
+        gunicorn_config.post_request(worker, req, {}, None)
+
+        message = worker.log.info.call_args[0][0]
+        assert message.startswith("Worker 123 latency: n=1 ")
@@ -0,0 +1,165 @@
+"""
+Unit tests for the background job queue (job_queue.py).
+
+The SQL itself needs Postgres; these cover dispatch, retry decisions and
+enqueue deduplication against a recording fake connection.
+"""
+
+from unittest.mock import patch
+
+import pytest
+
+import job_queue
+from job_queue import Job, JobError
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rowcount = 0
+
+    def execute(self, sql, params=None):
+        self.conn.executed.append((" ".join(sql.split()), params))
+
+    def fetchone(self):
+        return self.conn.rows.pop(0) if self.conn.rows else None
+
+    def close(self):
+        pass
+
+
+class FakeConn:
+    def __init__(self, rows=()):
+        self.rows = list(rows)
+        self.executed = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def statuses(self):
+        """The status each UPDATE of background_job set, in order."""
+        out = []
+        for sql, _ in self.executed:
+            if sql.startswith("UPDATE background_job SET status = '"):
+                out.append(sql.split("'")[1])
+        return out
+
+
+@pytest.fixture
+def handlers():
+    saved = dict(job_queue.HANDLERS)
+    yield job_queue.HANDLERS
+    job_queue.HANDLERS.clear()
+    job_queue.HANDLERS.update(saved)
+
+
+@pytest.mark.unit
+class TestRunJob:
+    def test_success_marks_done(self, handlers):
+        seen = []
+        handlers["demo"] = lambda conn, payload: seen.append(payload)
+        conn = FakeConn()
+        assert job_queue.run_job(conn, Job(1, "demo", {"x": 1}, 1, 5)) is True
+        assert seen == [{"x": 1}]
+        assert conn.statuses() == ["done"]
+
+    def test_error_is_retried_while_attempts_remain(self, handlers):
+        handlers["demo"] = lambda conn, payload: 1 / 0
+        conn = FakeConn()
+        assert job_queue.run_job(conn, Job(1, "demo", {}, 2, 5)) is False
+        assert conn.statuses() == ["pending"]
+        assert conn.rollbacks == 1
+        assert "ZeroDivisionError" in conn.executed[-1][1][1]
+
+    def test_last_attempt_fails_for_good(self, handlers):
+        handlers["demo"] = lambda conn, payload: 1 / 0
+        conn = FakeConn()
+        job_queue.run_job(conn, Job(1, "demo", {}, 5, 5))
+        assert conn.statuses() == ["failed"]
+
+    def test_permanent_job_error_is_not_retried(self, handlers):
+        def boom(conn, payload):
+            raise JobError("No settings found for this tune", retry=False)
+        handlers["demo"] = boom
+        conn = FakeConn()
+        job_queue.run_job(conn, Job(1, "demo", {}, 1, 5))
+        assert conn.statuses() == ["failed"]
+
+    def test_unknown_job_type_fails(self):
+        conn = FakeConn()
+        assert job_queue.run_job(conn, Job(1, "no-such-type", {}, 1, 5)) is False
+        assert conn.statuses() == ["failed"]
+
+
+@pytest.mark.unit
+class TestWork:
+    def test_processes_until_queue_is_empty(self, handlers):
+        handlers["demo"] = lambda conn, payload: None
+        conn = FakeConn()
+        jobs = [Job(1, "demo", {}, 1, 5), Job(2, "demo", {}, 1, 5), None]
+        with patch.object(job_queue, "claim", side_effect=jobs):
+            assert job_queue.work(conn, "w1") == (2, 0)
+
+    def test_should_stop_is_honoured_between_jobs(self, handlers):
+        handlers["demo"] = lambda conn, payload: None
+        with patch.object(job_queue, "claim", return_value=Job(1, "demo", {}, 1, 5)):
+            assert job_queue.work(FakeConn(), "w1", max_jobs=3) == (3, 0)
+            assert job_queue.work(FakeConn(), "w1", should_stop=lambda: True) == (0, 0)
+
+
+@pytest.mark.unit
+class TestBackoff:
+    def test_doubles_and_caps(self):
+        with patch("job_queue.random.uniform", return_value=1.0):
+            assert job_queue.backoff_seconds(1) == job_queue.BACKOFF_BASE_SECONDS
+            assert job_queue.backoff_seconds(3) == job_queue.BACKOFF_BASE_SECONDS * 4
+            assert job_queue.backoff_seconds(40) == job_queue.BACKOFF_MAX_SECONDS
+
+
+@pytest.mark.unit
+class TestEnqueue:
+    def test_setting_cache_dedupe_keys(self):
+        with patch.object(job_queue, "enqueue", return_value=7) as enqueue:
+            job_queue.enqueue_setting_cache(None, 42, user_id=3)
+            job_queue.enqueue_setting_cache(None, 42, setting_id=99)
+        assert enqueue.call_args_list[0].kwargs["dedupe_key"] == "tune:42"
+        assert enqueue.call_args_list[1].kwargs["dedupe_key"] == "setting:99"
+
+    def test_enqueue_many_drops_duplicates_before_insert(self):
+        with patch("job_queue.psycopg2.extras.execute_values", return_value=[(1,), (2,)]) as ev:
+            added = job_queue.enqueue_many(None, [
+                ("cache_tune_setting", {"tune_id": 1}, "tune:1"),
+                ("cache_tune_setting", {"tune_id": 1}, "tune:1"),
+                ("cache_tune_setting", {"tune_id": 2}, "tune:2"),
+            ])
+        assert added == 2
+        assert len(ev.call_args.args[2]) == 2
+
+    def test_enqueue_many_with_nothing_to_add(self):
+        assert job_queue.enqueue_many(None, []) == 0
+
+
+@pytest.mark.unit
+class TestCacheTuneSettingHandler:
+    def test_skips_tunes_that_already_have_a_setting(self):
+        conn = FakeConn(rows=[(1,)])
+        with patch.object(job_queue, "throttle") as throttle:
+            job_queue.HANDLERS["cache_tune_setting"](conn, {"tune_id": 5})
+        throttle.assert_not_called()
+
+    def test_missing_settings_is_a_permanent_failure(self):
+        conn = FakeConn(rows=[None])
+        with patch.object(job_queue, "throttle"), \
+                patch("api_routes.cache_default_tune_setting",
+                      return_value=(False, "No settings found for this tune", None)):
+            with pytest.raises(JobError) as err:
+                job_queue.HANDLERS["cache_tune_setting"](conn, {"tune_id": 5})
+        assert err.value.retry is False
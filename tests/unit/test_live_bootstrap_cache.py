@@ -0,0 +1,127 @@
+"""
+Unit tests for the live_bootstrap cache (live_logging_routes): per-instance state
+keyed on the high-water event id, ETag / If-None-Match, and invalidation.
+"""
+
+from unittest.mock import patch, MagicMock
+
+import pytest
+
+from app import app
+import live_logging_routes
+
+
+class FakeCursor:
+    def __init__(self, high_water):
+        self.high_water = high_water
+
+    def execute(self, sql, params=None):
+        pass
+
+    def fetchone(self):
+        return None if self.high_water is None else (self.high_water,)
+
+
+def _state(high_water):
+    return {"session_instance_id": 12, "records": [{"session_instance_tune_id": 1}],
+            "sets": [[1]], "last_event_id": high_water}
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    live_logging_routes._bootstrap_cache.clear()
+    yield
+    live_logging_routes._bootstrap_cache.clear()
+
+
+@pytest.fixture
+def bootstrap():
+    user = MagicMock(person_id=7, first_name="Ann", last_name="B", timezone="Europe/Dublin")
+    builds = []
+
+    def instance_state(cur, session_instance_id, high_water=None):
+        builds.append(session_instance_id)
+        return _state(high_water)
+
+    def get(high_water, if_none_match=None):
+        conn = MagicMock()
+        conn.cursor.return_value = FakeCursor(high_water)
+        headers = {"If-None-Match": f'"{if_none_match}"'} if if_none_match else {}
+        with app.test_request_context(headers=headers), \
+                patch.object(live_logging_routes, "get_db_connection", return_value=conn), \
+                patch.object(live_logging_routes, "current_user", user), \
+                patch.object(live_logging_routes, "_instance_state", side_effect=instance_state):
+            resp = live_logging_routes.live_bootstrap.__wrapped__(12)
+        return resp[1] if isinstance(resp, tuple) else resp
+
+    get.builds = builds
+    return get
+
+
+@pytest.mark.unit
+class TestBootstrapCache:
+    def test_payload_merges_viewer_and_shared_state(self, bootstrap):
+        body = bootstrap(5).get_json()
+        assert body["success"] is True
+        assert body["current_person"] == {"person_id": 7, "first_name": "Ann", "last_name": "B"}
+        assert body["user_timezone"] == "Europe/Dublin"
+        assert body["sets"] == [[1]] and body["last_event_id"] == 5
+
+    def test_same_high_water_is_served_from_cache(self, bootstrap):
+        first, second = bootstrap(5), bootstrap(5)
+        assert bootstrap.builds == [12]
+        assert first.get_etag() == second.get_etag()
+        assert second.headers["Cache-Control"] == "private, no-cache"
+
+    def test_if_none_match_gets_304(self, bootstrap):
+        etag, _ = bootstrap(5).get_etag()
+        resp = bootstrap(5, if_none_match=etag)
+        assert resp.status_code == 304 and resp.data == b""
+
+    def test_new_event_rebuilds(self, bootstrap):
+        etag, _ = bootstrap(5).get_etag()
+        resp = bootstrap(6, if_none_match=etag)
+        assert resp.status_code == 200 and bootstrap.builds == [12, 12]
+        assert resp.get_json()["last_event_id"] == 6
+
+    def test_invalidate_and_ttl(self, bootstrap):
+        bootstrap(5)
+        live_logging_routes.invalidate_bootstrap(12)
+        bootstrap(5)
+        with patch.object(live_logging_routes, "BOOTSTRAP_CACHE_TTL_SECONDS", -1):
+            bootstrap(5)
+        assert bootstrap.builds == [12, 12, 12]
+
+    def test_missing_instance_is_404(self, bootstrap):
+        assert bootstrap(None) == 404
+
+
+class StateCursor:
+    """Answers _instance_state's queries from canned rows, recording their order."""
+
+    def __init__(self, high_water):
+        self.high_water = high_water
+        self.executed = []
+
+    def execute(self, sql, params=None):
+        self.executed.append(sql)
+
+    def fetchone(self):
+        return (self.high_water,) if "MAX(event_id)" in self.executed[-1] else None
+
+    def fetchall(self):
+        return []
+
+
+@pytest.mark.unit
+class TestInstanceState:
+    def test_high_water_is_read_before_the_records(self):
+        cur = StateCursor(9)
+        state = live_logging_routes._instance_state(cur, 12)
+        assert state["last_event_id"] == 9
+        assert "MAX(event_id)" in cur.executed[0]
+
+    def test_given_high_water_is_not_re_read(self):
+        cur = StateCursor(9)
+        assert live_logging_routes._instance_state(cur, 12, high_water=5)["last_event_id"] == 5
+        assert not any("MAX(event_id)" in sql for sql in cur.executed)
@@ -0,0 +1,136 @@
+"""
+Unit tests for the live logger's batch op endpoint (live_logging_routes.live_op_batch):
+ordered apply in one transaction, per-op savepoints and acks, op_id idempotency,
+temp-id resolution between ops, and the single NOTIFY.
+"""
+
+import uuid
+from unittest.mock import patch, MagicMock
+
+import pytest
+
+from app import app
+import live_logging_routes
+from live_logging_routes import OpRejected
+
+
+class FakeCursor:
+    def __init__(self, existing=None):
+        self.existing = existing or {}  # op_id -> (event_id, op_type, payload)
+        self.executed = []
+        self.next_event_id = 100
+        self._row = None
+
+    def execute(self, sql, params=None):
+        sql = " ".join(sql.split())
+        self.executed.append((sql, params))
+        self._row = None
+        if sql.startswith("SELECT 1 FROM session_instance"):
+            self._row = (1,)
+        elif sql.startswith("SELECT event_id, op_type, payload FROM session_event WHERE op_id"):
+            self._row = self.existing.get(params[0])
+        elif sql.startswith("INSERT INTO session_event"):
+            self.next_event_id += 1
+            self._row = (self.next_event_id,)
+
+    def fetchone(self):
+        return self._row
+
+    def statements(self, prefix):
+        return [(sql, params) for sql, params in self.executed if sql.startswith(prefix)]
+
+
+def _add(cur, session_instance_id, data, user_id):
+    return {"record": {"session_instance_tune_id": data["new_id"]}}
+
+
+def _edit(cur, session_instance_id, data, user_id):
+    if data.get("reject"):
+        cur.execute("UPDATE doomed")
+        raise OpRejected("gone", "That tune was removed.")
+    return {"record": {"session_instance_tune_id": data["record_id"]}, "after": data.get("after_record_id")}
+
+
+@pytest.fixture
+def batch():
+    user = MagicMock(person_id=7, first_name="Ann")
+
+    def post(ops, existing=None):
+        cur = FakeCursor(existing)
+        conn = MagicMock()
+        conn.cursor.return_value = cur
+        with app.test_request_context(json={"ops": ops}), \
+                patch.object(live_logging_routes, "get_db_connection", return_value=conn), \
+                patch.object(live_logging_routes, "get_current_user_id", return_value=3), \
+                patch.object(live_logging_routes, "current_user", user), \
+                patch.dict(live_logging_routes.HANDLERS, {"t_add": _add, "t_edit": _edit}), \
+                patch.object(live_logging_routes.job_queue, "enabled", return_value=False):
+            resp = live_logging_routes.live_op_batch.__wrapped__(12)
+        if isinstance(resp, tuple):
+            return resp[0].get_json(), resp[1], cur
+        return resp.get_json(), 200, cur
+
+    return post
+
+
+def _op(op_type, **payload):
+    return {"op_id": str(uuid.uuid4()), "op_type": op_type, **payload}
+
+
+@pytest.mark.unit
+class TestLiveOpBatch:
+    def test_applies_in_order_with_one_notify(self, batch):
+        first = _op("t_add", new_id=501)
+        second = _op("t_edit", record_id=f"temp-{first['op_id']}", after_record_id=f"temp-{first['op_id']}")
+        body, status, cur = batch([first, second])
+
+        assert status == 200 and body["success"]
+        assert [a["event_id"] for a in body["acks"]] == [101, 102]
+        assert body["acks"][1]["record"]["session_instance_tune_id"] == 501  # temp id resolved
+        assert body["acks"][1]["after"] == 501
+        notifies = cur.statements("SELECT pg_notify")
+        assert len(notifies) == 1 and notifies[0][1][1] == "12:101,102"
+        assert [sql for sql, _ in cur.executed if sql in ("BEGIN", "COMMIT")] == ["BEGIN", "COMMIT"]
+
+    def test_rejected_op_is_rolled_back_alone(self, batch):
+        body, _, cur = batch([_op("t_edit", record_id=9, reject=True), _op("t_add", new_id=502)])
+
+        assert body["acks"][0] == {"success": False, "rejected": True, "reason": "gone",
+                                   "message": "That tune was removed.",
+                                   "op_id": body["acks"][0]["op_id"], "op_type": "t_edit"}
+        assert body["acks"][1]["success"] and body["acks"][1]["event_id"] == 101
+        assert len(cur.statements("ROLLBACK TO SAVEPOINT live_op")) == 1
+        assert cur.statements("SELECT pg_notify")[0][1][1] == "12:101"
+
+    def test_unresolved_temp_target_is_rejected(self, batch):
+        body, _, _ = batch([_op("t_edit", record_id="temp-never-sent")])
+        assert body["acks"][0]["reason"] == "target_missing"
+
+    def test_known_op_id_returns_cached_ack_without_new_event(self, batch):
+        done = _op("t_add", new_id=503)
+        later = _op("t_edit", record_id=f"temp-{done['op_id']}")
+        existing = {done["op_id"]: (77, "t_add", {"record": {"session_instance_tune_id": 503}})}
+        body, _, cur = batch([done, later], existing=existing)
+
+        assert body["acks"][0]["duplicate"] and body["acks"][0]["event_id"] == 77
+        # A replayed op still resolves the temp ids that later ops refer to.
+        assert body["acks"][1]["record"]["session_instance_tune_id"] == 503
+        assert cur.statements("SELECT pg_notify")[0][1][1] == "12:101"
+
+    def test_nothing_new_means_no_notify(self, batch):
+        done = _op("t_add", new_id=503)
+        existing = {done["op_id"]: (77, "t_add", {"record": {"session_instance_tune_id": 503}})}
+        _, _, cur = batch([done], existing=existing)
+        assert cur.statements("SELECT pg_notify") == []
+
+    def test_invalid_ops_get_their_own_error_ack(self, batch):
+        body, status, cur = batch(["nope", {"op_type": "no_such_op"}, _op("t_add", new_id=504)])
+        assert status == 200
+        assert body["acks"][0]["error"] == "op must be an object"
+        assert "unknown op_type" in body["acks"][1]["error"]
+        assert body["acks"][2]["success"]
+
+    def test_rejects_empty_and_oversized_batches(self, batch):
+        assert batch([])[1] == 400
+        with patch.object(live_logging_routes, "MAX_BATCH_OPS", 2):
+            assert batch([_op("t_add", new_id=1)] * 3)[1] == 400
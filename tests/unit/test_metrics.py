@@ -0,0 +1,156 @@
+"""
+Unit tests for metrics (Prometheus text rendering, per-request query counting
+and the /metrics endpoint).
+"""
+
+import os
+import logging
+from unittest.mock import patch
+
+import pytest
+
+import app as app_module
+import metrics
+
+
+def _execute(sql):
+    # stands in for TimedCursor.execute: _record_query names the function above it
+    metrics._record_query(sql, 0.002)
+
+
+def _load_each_person(n):
+    for _ in range(n):
+        _execute("SELECT * FROM person WHERE person_id = %s")
+
+
+@pytest.mark.unit
+class TestRegistry:
+    def test_renders_counters_gauges_and_escaped_labels(self):
+        registry = metrics.Registry()
+        hits = registry.counter("hits_total", "Hits.", ("path",))
+        hits.inc(path='/a"b')
+        hits.inc(2, path='/a"b')
+        registry.gauge("depth", "Depth.").set(1.5)
+
+        assert registry.render() == (
+            "# HELP hits_total Hits.\n"
+            "# TYPE hits_total counter\n"
+            'hits_total{path="/a\\"b"} 3\n'
+            "# HELP depth Depth.\n"
+            "# TYPE depth gauge\n"
+            "depth 1.5\n"
+        )
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = metrics.Registry()
+        latency = registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1))
+        for value in (0.05, 0.5, 0.7, 3):
+            latency.observe(value)
+
+        lines = registry.render().splitlines()[2:]
+        assert lines == [
+            'latency_seconds_bucket{le="0.1"} 1',
+            'latency_seconds_bucket{le="1"} 3',
+            'latency_seconds_bucket{le="+Inf"} 4',
+            "latency_seconds_sum 4.25",
+            "latency_seconds_count 4",
+        ]
+
+    def test_per_process_registry_labels_the_pid(self):
+        registry = metrics.Registry(per_process=True)
+        registry.counter("jobs_total", "Jobs.").inc()
+        assert f'jobs_total{{pid="{os.getpid()}"}} 1' in registry.render()
+
+    def test_workers_sharing_a_directory_report_totals(self, tmp_path):
+        def worker():
+            registry = metrics.Registry(per_process=True, multiprocess_dir=str(tmp_path))
+            jobs = registry.counter("jobs_total", "Jobs.", ("kind",))
+            latency = registry.histogram("latency_seconds", "Latency.", buckets=(1,))
+            return registry, jobs, latency
+
+        this, jobs, latency = worker()
+        jobs.inc(kind="a")
+        latency.observe(0.5)
+        other, other_jobs, other_latency = worker()
+        other_jobs.inc(2, kind="a")
+        other_latency.observe(3)
+        snapshot = other.snapshot()
+        alive, dead = os.getppid(), 2 ** 22 + 1  # another live process; a pid past pid_max
+        other.workers.write(alive, snapshot)
+        other.workers.write(dead, snapshot)
+
+        text = this.render()
+        assert 'jobs_total{kind="a"} 5' in text
+        assert 'latency_seconds_bucket{le="1"} 1' in text and "latency_seconds_count 3" in text
+        assert "pid=" not in text
+        # The exited worker's counts were folded in once, not dropped or doubled.
+        assert not (tmp_path / f"{dead}.json").exists()
+        assert 'jobs_total{kind="a"} 5' in this.render()
+
+    def test_wrong_labels_are_rejected(self):
+        with pytest.raises(ValueError):
+            metrics.Registry().counter("c", "C.", ("route",)).inc(path="/")
+
+
+@pytest.mark.unit
+class TestRequestMetrics:
+    ROUTE = "/api/tune-settings/<int:setting_id>/<any(full, incipit):kind>/<image_hash>.png"
+
+    def _request(self, queries):
+        with app_module.app.test_request_context("/api/tune-settings/1/full/abc.png"):
+            metrics._start_request()
+            _load_each_person(queries)
+            metrics._record_status(app_module.app.response_class(status=200))
+            metrics._finish_request()
+
+    def test_counts_queries_and_latency_per_route(self):
+        route = self.ROUTE
+        before = (
+            metrics.REQUESTS.value(method="GET", route=route, status=200),
+            metrics.REQUEST_SECONDS.count(method="GET", route=route),
+            metrics.QUERY_SECONDS.value(route=route),
+        )
+        self._request(3)
+
+        assert metrics.REQUESTS.value(method="GET", route=route, status=200) == before[0] + 1
+        assert metrics.REQUEST_SECONDS.count(method="GET", route=route) == before[1] + 1
+        assert metrics.QUERY_SECONDS.value(route=route) == pytest.approx(before[2] + 0.006)
+
+    def test_repeated_statement_is_flagged_with_its_caller(self, caplog):
+        caller = "_load_each_person (test_metrics.py)"
+        before = metrics.REPEATED_QUERIES.value(route=self.ROUTE, caller=caller)
+        with caplog.at_level(logging.WARNING, logger="metrics"):
+            self._request(metrics.N_PLUS_ONE_THRESHOLD)
+
+        assert metrics.REPEATED_QUERIES.value(route=self.ROUTE, caller=caller) == before + 1
+        assert f"ran the same query {metrics.N_PLUS_ONE_THRESHOLD} times from {caller}" in caplog.text
+
+    def test_a_few_repeats_are_not_flagged(self, caplog):
+        with caplog.at_level(logging.WARNING, logger="metrics"):
+            self._request(2)
+        assert "N+1" not in caplog.text
+
+    def test_queries_outside_a_request_are_ignored(self):
+        _execute("SELECT 1")  # no request context: nothing to attribute it to
+
+
+@pytest.mark.unit
+class TestMetricsEndpoint:
+    def test_serves_prometheus_text_with_this_workers_requests(self, client):
+        client.get("/metrics")
+        resp = client.get("/metrics")
+
+        assert resp.status_code == 200
+        assert resp.content_type.startswith("text/plain; version=0.0.4")
+        assert f'ceol_http_requests_total{{method="GET",route="/metrics",status="200",pid="{os.getpid()}"}}' in resp.text
+
+    def test_token_is_required_when_configured(self, client):
+        with patch.dict(os.environ, {"METRICS_TOKEN": "s3cret"}):
+            assert client.get("/metrics").status_code == 401
+            assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+            assert client.get("/metrics", headers={"Authorization": "Bearer s3cret"}).status_code == 200
+
+    def test_without_a_token_only_loopback_may_scrape(self, client):
+        with patch.dict(os.environ, {"METRICS_TOKEN": ""}):
+            assert client.get("/metrics").status_code == 200
+            assert client.get("/metrics", environ_base={"REMOTE_ADDR": "10.0.0.5"}).status_code == 401
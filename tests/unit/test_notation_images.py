@@ -0,0 +1,63 @@
+"""
+Unit tests for notation_images (hash-named, immutable notation image URLs).
+"""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import notation_images
+
+PNG = b"\x89PNG\r\n\x1a\nfake"
+HASH = "0123456789abcdef0123456789abcdef"
+URL = f"/api/tune-settings/42/incipit/{HASH}.png"
+
+
+def _conn(row):
+    conn = MagicMock()
+    conn.cursor.return_value.fetchone.return_value = row
+    return conn
+
+
+@pytest.mark.unit
+class TestNotationImages:
+    def test_image_url(self):
+        assert notation_images.image_url(42, "incipit", HASH) == URL
+        assert notation_images.image_url(42, "full", None) is None
+        assert notation_images.image_url(None, "full", HASH) is None
+
+    @pytest.mark.parametrize("stored", [PNG, memoryview(PNG), "\\x" + PNG.hex()])
+    def test_image_bytes_accepts_stored_formats(self, stored):
+        assert notation_images.image_bytes(stored) == PNG
+
+    def test_serves_png_with_immutable_caching(self, client):
+        conn = _conn((HASH, "\\x" + PNG.hex()))
+        with patch.object(notation_images, "get_db_connection", return_value=conn):
+            resp = client.get(URL)
+
+        assert resp.status_code == 200
+        assert resp.data == PNG and resp.mimetype == "image/png"
+        assert resp.headers["ETag"] == f'"{HASH}"'
+        assert "immutable" in resp.headers["Cache-Control"]
+        sql = conn.cursor.return_value.execute.call_args[0][0]
+        assert "incipit_image_hash, incipit_image" in sql
+
+    def test_revalidation_skips_the_database(self, client):
+        with patch.object(notation_images, "get_db_connection") as get_conn:
+            resp = client.get(URL, headers={"If-None-Match": f'"{HASH}"'})
+
+        assert resp.status_code == 304
+        get_conn.assert_not_called()
+
+    def test_stale_hash_redirects_to_current_image(self, client):
+        new_hash = "f" * 32
+        with patch.object(notation_images, "get_db_connection", return_value=_conn((new_hash, PNG))):
+            resp = client.get(URL)
+
+        assert resp.status_code == 302
+        assert resp.headers["Location"].endswith(f"/api/tune-settings/42/incipit/{new_hash}.png")
+        assert resp.headers["Cache-Control"] == "no-cache"
+
+    def test_unrendered_setting_is_404(self, client):
+        with patch.object(notation_images, "get_db_connection", return_value=_conn((None, None))):
+            assert client.get(URL).status_code == 404
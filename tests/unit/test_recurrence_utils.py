@@ -12,6 +12,8 @@ from recurrence_utils import (
     SessionRecurrence,
     validate_recurrence_json,
     to_human_readable,
+    parse_recurrence,
+    expand_occurrences,
     WEEKDAY_TO_ISO,
 )
 
@@ -753,3 +755,52 @@ class TestEdgeCases:
         schedule = RecurrenceSchedule(schedule_dict)
 
         assert schedule.weekday == "thursday"  # Stored as lowercase
+
+
+class TestParseRecurrence:
+    """Tests for the memoized parse_recurrence."""
+
+    def test_same_text_returns_same_object(self):
+        text = json.dumps({"schedules": [
+            {"type": "weekly", "weekday": "friday", "start_time": "20:00", "end_time": "23:00"}
+        ]})
+        assert parse_recurrence(text) is parse_recurrence(text)
+
+    def test_invalid_json_raises_every_time(self):
+        for _ in range(2):
+            with pytest.raises(ValueError):
+                parse_recurrence("not json")
+
+
+class TestExpandOccurrences:
+    """Tests for expand_occurrences (all sessions, next N days)."""
+
+    WEEKLY_THURSDAY = json.dumps({"schedules": [
+        {"type": "weekly", "weekday": "thursday", "start_time": "19:00", "end_time": "22:00"}
+    ]})
+
+    def test_expands_each_session_in_its_own_timezone(self):
+        # Thursday 2025-01-09 03:00 UTC is still Wednesday evening in Chicago
+        now = datetime(2025, 1, 9, 3, 0, tzinfo=ZoneInfo("UTC"))
+        result = expand_occurrences([
+            (1, self.WEEKLY_THURSDAY, "America/Chicago"),
+            (2, self.WEEKLY_THURSDAY, "Europe/Dublin"),
+        ], 1, now)
+
+        assert result[1] == []  # Chicago's today is Wednesday
+        assert [start.date() for start, _ in result[2]] == [date(2025, 1, 9)]
+        assert result[2][0][0].tzinfo == ZoneInfo("Europe/Dublin")
+
+    def test_window_covers_n_days(self):
+        now = datetime(2025, 1, 1, 12, 0, tzinfo=ZoneInfo("UTC"))
+        result = expand_occurrences([(1, self.WEEKLY_THURSDAY, "UTC")], 14, now)
+        assert [start.date() for start, _ in result[1]] == [date(2025, 1, 2), date(2025, 1, 9)]
+
+    def test_missing_or_invalid_input_maps_to_empty(self):
+        now = datetime(2025, 1, 1, tzinfo=ZoneInfo("UTC"))
+        result = expand_occurrences([
+            (1, None, "UTC"),
+            (2, "not json", "UTC"),
+            (3, self.WEEKLY_THURSDAY, "Not/AZone"),
+        ], 7, now)
+        assert result == {1: [], 2: [], 3: []}
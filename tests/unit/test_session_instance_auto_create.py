@@ -0,0 +1,92 @@
+"""
+Unit tests for set-based auto-creation (session_instance_auto_create.auto_create_instances_bulk).
+"""
+
+import json
+from datetime import datetime, date, time
+from unittest.mock import MagicMock
+from zoneinfo import ZoneInfo
+
+import pytest
+
+import session_instance_auto_create as auto_create
+
+
+WEEKLY_THURSDAY = json.dumps({"schedules": [
+    {"type": "weekly", "weekday": "thursday", "start_time": "19:00", "end_time": "22:00"}
+]})
+FRIDAY_PAIR = json.dumps({"schedules": [
+    {"type": "weekly", "weekday": "friday", "start_time": "20:00", "end_time": "23:00"},
+    {"type": "weekly", "weekday": "friday", "start_time": "14:00", "end_time": "16:00"},
+]})
+
+# Thursday 2025-01-09 12:00 UTC
+NOW = datetime(2025, 1, 9, 12, 0, tzinfo=ZoneInfo("UTC"))
+
+
+class FakeCursor:
+    def __init__(self, existing=()):
+        self.existing = set(existing)  # (session_id, date) already in session_instance
+        self.executed = []
+        self._rows = []
+
+    def execute(self, sql, params=None):
+        self.executed.append((" ".join(sql.split()), params))
+        session_ids, dates = params[0], params[1]
+        self._rows = [
+            (900 + i, session_id, occ_date)
+            for i, (session_id, occ_date) in enumerate(zip(session_ids, dates))
+            if (session_id, occ_date) not in self.existing
+        ]
+
+    def fetchall(self):
+        return self._rows
+
+    def close(self):
+        pass
+
+
+def _conn(cur):
+    conn = MagicMock()
+    conn.cursor.return_value = cur
+    return conn
+
+
+@pytest.mark.unit
+class TestAutoCreateInstancesBulk:
+    def test_one_insert_for_all_sessions(self):
+        cur = FakeCursor(existing={(2, date(2025, 1, 9))})
+        created = auto_create.auto_create_instances_bulk([
+            (1, WEEKLY_THURSDAY, "America/Chicago", 24),   # 19:00 CST = 01:00Z Friday, in window
+            (2, WEEKLY_THURSDAY, "Europe/Dublin", 24),     # 19:00 today, but an instance exists
+            (3, WEEKLY_THURSDAY, "Europe/Dublin", 168),    # next Thursday is 175h away
+        ], now=NOW, conn=_conn(cur))
+
+        assert created == {1: ["2025-01-09"], 3: ["2025-01-09"]}
+        assert len(cur.executed) == 1
+        sql, params = cur.executed[0]
+        assert "FROM unnest(" in sql and "ON CONFLICT DO NOTHING" in sql and "NOT EXISTS" in sql
+        assert params[0] == [1, 2, 3]
+        assert params[2][0] == time(19, 0) and params[3][0] == time(22, 0)
+
+    def test_window_excludes_started_and_far_occurrences(self):
+        cur = FakeCursor()
+        # 12:00 UTC: Dublin's 19:00 is 7h away, outside a 6h window
+        created = auto_create.auto_create_instances_bulk(
+            [(1, WEEKLY_THURSDAY, "Europe/Dublin", 6)], now=NOW, conn=_conn(cur))
+        assert created == {} and cur.executed == []
+
+    def test_one_row_per_session_date_earliest_first(self):
+        cur = FakeCursor()
+        auto_create.auto_create_instances_bulk(
+            [(1, FRIDAY_PAIR, "UTC", 48)], now=NOW, conn=_conn(cur))
+        _, params = cur.executed[0]
+        assert params[1] == [date(2025, 1, 10)] and params[2] == [time(14, 0)]
+
+    def test_invalid_sessions_are_skipped(self):
+        cur = FakeCursor()
+        created = auto_create.auto_create_instances_bulk([
+            (1, "not json", "UTC", 24),
+            (2, WEEKLY_THURSDAY, "Not/AZone", 24),
+        ], now=NOW, conn=_conn(cur))
+        assert created == {} and cur.executed == []
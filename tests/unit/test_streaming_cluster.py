@@ -0,0 +1,169 @@
+"""
+Unit tests for multi-node presence/typing (streaming/cluster.py and its use in
+streaming/service.py), with nodes wired together by the in-process LocalBroker.
+"""
+
+import asyncio
+import json
+from unittest.mock import patch
+
+import pytest
+
+from streaming import cluster, service
+
+
+@pytest.fixture(autouse=True)
+def clean_state():
+    registries = (service.PRESENCE, service.AWAY, service.TYPING, service._PRESENT, service._pending_flush)
+    for registry in registries:
+        registry.clear()
+    yield
+    for registry in registries:
+        registry.clear()
+    service.CLUSTER = None
+
+
+def _node(broker, node_id, shards, changes):
+    """A Cluster whose local state is the given {instance_id: shard} dict."""
+    empty = {"people": [], "typing": []}
+    return cluster.Cluster(
+        broker,
+        local_shard=lambda i: shards.get(i, empty),
+        local_instances=lambda: list(shards),
+        on_change=changes.append,
+        node_id=node_id,
+    )
+
+
+def _person(pid, name, seq, devices=1):
+    return {"person_id": pid, "name": name, "arrival_seq": seq, "devices": devices}
+
+
+async def _settle():
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.unit
+class TestCluster:
+    def test_shards_replicate_and_empty_shard_removes(self):
+        async def run():
+            broker = cluster.LocalBroker()
+            a_state, a_changes, b_changes = {}, [], []
+            a = _node(broker, "a", a_state, a_changes)
+            b = _node(broker, "b", {}, b_changes)
+            await a._broker.subscribe(a._receive)
+            await b._broker.subscribe(b._receive)
+
+            a_state[7] = {"people": [_person(1, "Ann", 0)], "typing": []}
+            await a.publish_shard(7)
+            replicated = b.remote_people(7)
+
+            a_state[7] = {"people": [], "typing": []}
+            await a.publish_shard(7)
+            return replicated, b.remote_people(7), b_changes, a.shards
+
+        replicated, after, b_changes, a_shards = asyncio.run(run())
+        assert replicated == [("a", _person(1, "Ann", 0))]
+        assert after == [] and b_changes == [7, 7]
+        assert a_shards == {}  # a node ignores its own messages
+
+    def test_hello_prompts_republish(self):
+        async def run():
+            broker = cluster.LocalBroker()
+            a = _node(broker, "a", {3: {"people": [_person(1, "Ann", 0)], "typing": []}}, [])
+            b = _node(broker, "b", {}, [])
+            await a._broker.subscribe(a._receive)
+            await b.start()
+            await _settle()
+            b._task.cancel()
+            return b.remote_people(3), a.nodes
+
+        people, a_nodes = asyncio.run(run())
+        assert people == [("a", _person(1, "Ann", 0))]
+        assert "b" in a_nodes
+
+    def test_bye_and_heartbeat_timeout_drop_a_nodes_shards(self):
+        async def run():
+            b_changes = []
+            b = _node(cluster.LocalBroker(), "b", {}, b_changes)
+            shard = {"n": "a", "t": "shard", "i": 5, "people": [_person(1, "Ann", 0)], "typing": []}
+            b._receive(json.dumps(shard))
+            b._receive(json.dumps({"n": "a", "t": "bye"}))
+            after_bye = b.remote_people(5)
+
+            b._receive(json.dumps(shard))
+            b.nodes["a"] -= cluster.HEARTBEAT_SECONDS * cluster.DEAD_AFTER_HEARTBEATS + 1
+            with patch.object(cluster, "HEARTBEAT_SECONDS", 0.001):
+                task = asyncio.create_task(b._heartbeat_loop())
+                await asyncio.sleep(0.05)
+                task.cancel()
+            return after_bye, b.remote_people(5), b.nodes, b_changes
+
+        after_bye, after_timeout, nodes, changes = asyncio.run(run())
+        assert after_bye == [] and after_timeout == []
+        assert "a" not in nodes
+        assert changes.count(5) == 4
+
+    def test_oversized_shard_is_not_published(self):
+        async def run():
+            sent = []
+            broker = cluster.LocalBroker()
+            await broker.subscribe(sent.append)
+            people = [_person(i, "x" * 100, i) for i in range(100)]
+            a = _node(broker, "a", {1: {"people": people, "typing": []}}, [])
+            await a.publish_shard(1)
+            return sent
+
+        assert asyncio.run(run()) == []
+
+    def test_garbage_payloads_are_ignored(self):
+        b = _node(cluster.LocalBroker(), "b", {}, [])
+        for payload in ("", "not json", "{}", '{"n": "a", "t": "shard", "i": "7"}'):
+            b._receive(payload)
+        assert b.shards == {}
+
+
+@pytest.mark.unit
+class TestServiceMerge:
+    def _remote(self, instance_id, people=(), typing=()):
+        c = _node(cluster.LocalBroker(), "local", {}, [])
+        c._receive(json.dumps({"n": "remote", "t": "shard", "i": instance_id,
+                               "people": list(people), "typing": list(typing)}))
+        return c
+
+    def test_roster_merges_devices_across_nodes(self):
+        service.PRESENCE[9] = {1: {"sub": None, "person_id": 100, "arrival_seq": 0, "name": "Ann"}}
+        service.CLUSTER = self._remote(9, people=[_person(100, "Ann", 0), _person(200, "Bob", 1, devices=2)])
+        roster = service._roster(9)
+        assert [(e["name"], e["devices"], e["away"]) for e in roster] == [("Ann", 2, False), ("Bob", 2, False)]
+
+    def test_person_is_away_only_when_gone_from_every_node(self):
+        service.CLUSTER = self._remote(9, people=[_person(200, "Bob", 1)])
+        service.PRESENCE[9] = {1: {"sub": service._Subscriber(), "person_id": 200, "arrival_seq": 1, "name": "Bob"}}
+        service._flush_presence(9)
+
+        service.PRESENCE.pop(9)  # Bob's local device leaves; still on the remote node
+        service._flush_presence(9)
+        assert service.AWAY.get(9, {}) == {}
+
+        service.CLUSTER._receive(json.dumps({"n": "remote", "t": "shard", "i": 9, "people": [], "typing": []}))
+        service._flush_presence(9)
+        assert [(e["name"], e["away"]) for e in service._roster(9)] == [("Bob", True)]
+
+    def test_typing_merges_local_first(self):
+        service.TYPING[4] = {100: {"name": "Ann", "arrival_seq": 0, "anchor": 1, "ts": 0}}
+        service.CLUSTER = self._remote(4, typing=[
+            {"person_id": 100, "name": "Ann", "arrival_seq": 0, "anchor": 99},
+            {"person_id": 200, "name": "Bob", "arrival_seq": 1, "anchor": None},
+        ])
+        assert [(t["name"], t["anchor"]) for t in service._typing_list(4)] == [("Ann", 1), ("Bob", None)]
+
+    def test_local_shard_describes_only_this_node(self):
+        service.PRESENCE[2] = {
+            1: {"sub": None, "person_id": 100, "arrival_seq": 0, "name": "Ann"},
+            2: {"sub": None, "person_id": 100, "arrival_seq": 0, "name": "Ann"},
+        }
+        service.CLUSTER = self._remote(2, people=[_person(200, "Bob", 1)])
+        assert service._local_shard(2) == {"people": [_person(100, "Ann", 0, devices=2)], "typing": []}
+        assert service._local_instances() == [2]
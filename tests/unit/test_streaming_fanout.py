@@ -0,0 +1,176 @@
+"""
+Unit tests for the streaming service's fan-out (streaming/service.py): shared
+pre-serialized frames, coalesced presence/typing snapshots and the bounded
+per-client outbox.
+"""
+
+import asyncio
+import json
+from unittest.mock import patch
+
+import pytest
+
+from streaming import service
+
+
+@pytest.fixture(autouse=True)
+def clean_state():
+    for registry in (service.PRESENCE, service.AWAY, service.TYPING, service._PRESENT, service._pending_flush, service._OP_FRAMES):
+        registry.clear()
+    yield
+    for registry in (service.PRESENCE, service.AWAY, service.TYPING, service._PRESENT, service._pending_flush, service._OP_FRAMES):
+        registry.clear()
+
+
+def _data(frame):
+    line = [text for text in frame.decode().split("\n") if text.startswith("data: ")][0]
+    return json.loads(line[len("data: "):])
+
+
+def _connect(instance_id, conn_id, person_id, name="", seq=0):
+    sub = service._Subscriber()
+    service.PRESENCE.setdefault(instance_id, {})[conn_id] = {
+        "sub": sub, "person_id": person_id, "arrival_seq": seq, "name": name,
+    }
+    return sub
+
+
+@pytest.mark.unit
+class TestOpFrames:
+    def test_splices_op_type_and_event_id_into_payload(self):
+        frame = service._sse(42, "add_tune", '{"record": {"id": 7}, "op_id": "x"}')
+        assert frame.startswith(b"id: 42\nevent: op\n")
+        assert _data(frame) == {"record": {"id": 7}, "op_id": "x", "op_type": "add_tune", "event_id": 42}
+
+    def test_empty_and_odd_payloads(self):
+        assert _data(service._sse(1, "noop", "{}")) == {"op_type": "noop", "event_id": 1}
+        assert _data(service._sse(2, "noop", None)) == {"op_type": "noop", "event_id": 2}
+        assert _data(service._sse(3, "noop", "[1, 2]")) == {"op_type": "noop", "event_id": 3}
+
+    def test_frame_is_built_once_and_shared(self):
+        a = service._op_frame(5, "add_tune", '{"a": 1}')
+        b = service._op_frame(5, "add_tune", '{"a": 1}')
+        assert a is b
+
+
+@pytest.mark.unit
+class TestSubscriber:
+    def test_drain_skips_replayed_ops_and_keeps_latest_snapshot(self):
+        async def run():
+            sub = service._Subscriber()
+            sub.push_op(3, b"op3")
+            sub.push_op(4, b"op4")
+            sub.set_presence(b"p1")
+            sub.set_presence(b"p2")
+            return sub.drain(skip_through=3), sub.pending()
+
+        assert asyncio.run(run()) == (b"op4p2", False)
+
+    def test_slow_consumer_is_cut_off(self):
+        async def run():
+            with patch.object(service, "CLIENT_QUEUE_MAX_FRAMES", 2):
+                sub = service._Subscriber()
+                for eid in range(1, 4):
+                    sub.push_op(eid, b"x")
+                return sub
+
+        before = service.STATS["slow_consumer_drops"]
+        sub = asyncio.run(run())
+        assert sub.overflowed and not sub.ops
+        assert service.STATS["slow_consumer_drops"] == before + 1
+
+    def test_byte_bound(self):
+        async def run():
+            with patch.object(service, "CLIENT_QUEUE_MAX_BYTES", 10):
+                sub = service._Subscriber()
+                sub.push_op(1, b"12345678")
+                sub.push_op(2, b"12345678")
+                return sub.overflowed
+
+        assert asyncio.run(run()) is True
+
+
+@pytest.mark.unit
+class TestCoalescing:
+    def test_presence_burst_becomes_one_shared_snapshot(self):
+        async def run():
+            a = _connect(9, 1, 100, "Ann", 0)
+            b = _connect(9, 2, 200, "Bob", 1)
+            before = service.STATS["presence_flushes"]
+            for _ in range(5):
+                service._broadcast_presence(9)
+            _connect(9, 3, 300, "Cat", 2)
+            service._broadcast_presence(9)
+            await asyncio.sleep(service.COALESCE_SECONDS + 0.05)
+            return a, b, service.STATS["presence_flushes"] - before
+
+        a, b, flushes = asyncio.run(run())
+        assert flushes == 1
+        assert a.presence is b.presence  # one serialization for every subscriber
+        roster = _data(a.presence)["roster"]
+        assert [e["name"] for e in roster] == ["Ann", "Bob", "Cat"]  # latest state wins
+
+    def test_typing_is_coalesced_too(self):
+        async def run():
+            sub = _connect(4, 1, 100, "Ann")
+            service.TYPING[4] = {100: {"name": "Ann", "arrival_seq": 0, "anchor": None, "ts": 0}}
+            service._broadcast_typing(4)
+            service.TYPING[4][100]["anchor"] = 55
+            service._broadcast_typing(4)
+            await asyncio.sleep(service.COALESCE_SECONDS + 0.05)
+            return sub
+
+        sub = asyncio.run(run())
+        assert _data(sub.typing)["typing"][0]["anchor"] == 55
+
+
+@pytest.mark.unit
+class TestMetrics:
+    def test_drain_reports_notify_times_of_the_ops_it_sends(self):
+        async def run():
+            sub = service._Subscriber()
+            sub.push_op(3, b"op3", notified_at=10.0)
+            sub.push_op(4, b"op4", notified_at=11.0)
+            sub.push_op(5, b"op5")  # not from a NOTIFY (no time to measure from)
+            sub.drain(skip_through=3)
+            return sub.notified
+
+        assert asyncio.run(run()) == [11.0]
+
+    def test_gauges_follow_connections_and_outboxes(self):
+        async def run():
+            a = _connect(9, 1, 100)
+            _connect(9, 2, 200)
+            _connect(12, 3, 300)
+            a.push_op(1, b"12345")
+            a.push_op(2, b"678")
+            return service.METRICS.render()
+
+        text = asyncio.run(run())
+        assert 'ceol_streaming_connections{session_instance_id="9"} 2' in text
+        assert 'ceol_streaming_connections{session_instance_id="12"} 1' in text
+        assert 'ceol_streaming_queued_frames{session_instance_id="9"} 2' in text
+        assert 'ceol_streaming_queued_bytes{session_instance_id="9"} 8' in text
+        assert "ceol_streaming_max_queued_frames 2" in text
+
+        service.PRESENCE.clear()
+        assert "session_instance_id=" not in service.METRICS.render()
+
+    def test_metrics_endpoint_honours_the_token(self):
+        from starlette.requests import Request
+
+        def get(headers=(), client=("10.0.0.5", 4000)):
+            scope = {"type": "http", "method": "GET", "path": "/metrics", "headers": list(headers), "client": client}
+            return asyncio.run(service.metrics_endpoint(Request(scope)))
+
+        with patch.dict("os.environ", {"METRICS_TOKEN": "s3cret"}):
+            assert get().status_code == 401
+            resp = get([(b"authorization", b"Bearer s3cret")])
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert b"# TYPE ceol_streaming_fanout_seconds histogram" in resp.body
+
+        # No token configured: loopback only
+        with patch.dict("os.environ", {"METRICS_TOKEN": ""}):
+            assert get().status_code == 401
+            assert get(client=("127.0.0.1", 4000)).status_code == 200
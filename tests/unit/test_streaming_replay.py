@@ -0,0 +1,109 @@
+"""
+Unit tests for bounded SSE replay: when streaming/service.py starts a client
+from the instance's session_snapshot instead of replaying every event, and how
+live_logging_routes records snapshots.
+"""
+
+import asyncio
+import json
+from unittest.mock import patch
+
+import pytest
+
+from streaming import service
+
+
+class FakeConn:
+    """asyncpg-style connection: one session_snapshot row and a count of events."""
+
+    def __init__(self, snapshot=None, events_behind=0):
+        self.snapshot = snapshot
+        self.events_behind = events_behind
+        self.counted = []
+
+    async def fetchrow(self, sql, *args):
+        return self.snapshot
+
+    async def fetchval(self, sql, instance_id, last, through, limit):
+        self.counted.append((last, through, limit))
+        return min(self.events_behind, limit)
+
+
+def _snapshot(event_id=500, compacted_through=0):
+    return {"event_id": event_id, "payload": '{"records": [], "last_event_id": %d}' % event_id,
+            "compacted_through": compacted_through}
+
+
+def _replay(conn, last):
+    return asyncio.run(service._replay_snapshot(conn, 1, last))
+
+
+@pytest.mark.unit
+class TestReplaySnapshot:
+    def test_no_snapshot_means_plain_replay(self):
+        assert _replay(FakeConn(), 0) is None
+
+    def test_cursor_at_or_past_snapshot_replays_events(self):
+        conn = FakeConn(_snapshot(500), events_behind=10_000)
+        assert _replay(conn, 500) is None
+        assert conn.counted == []
+
+    def test_far_behind_starts_from_snapshot(self):
+        conn = FakeConn(_snapshot(500), events_behind=service.REPLAY_SNAPSHOT_THRESHOLD)
+        assert _replay(conn, 10)["event_id"] == 500
+        assert conn.counted == [(10, 500, service.REPLAY_SNAPSHOT_THRESHOLD)]
+
+    def test_small_gap_replays_events(self):
+        conn = FakeConn(_snapshot(500), events_behind=service.REPLAY_SNAPSHOT_THRESHOLD - 1)
+        assert _replay(conn, 450) is None
+
+    def test_compacted_cursor_always_gets_snapshot(self):
+        conn = FakeConn(_snapshot(500, compacted_through=300), events_behind=1)
+        assert _replay(conn, 200)["event_id"] == 500
+        assert conn.counted == []
+
+    def test_snapshot_frame_moves_the_cursor(self):
+        frame = service._snapshot_event(500, '{"records": []}')
+        assert frame == b'id: 500\nevent: snapshot\ndata: {"records": []}\n\n'
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.executed = []
+
+    def execute(self, sql, params=None):
+        self.executed.append((" ".join(sql.split()), params))
+
+    def fetchone(self):
+        return self.rows.pop(0)
+
+
+@pytest.mark.unit
+class TestRecordSnapshot:
+    def test_nothing_settled_yet(self):
+        import live_logging_routes
+
+        cur = FakeCursor([(None,)])
+        assert live_logging_routes.record_snapshot(cur, 3) is None
+        assert len(cur.executed) == 1
+
+    def test_existing_snapshot_already_covers_it(self):
+        import live_logging_routes
+
+        cur = FakeCursor([(40,), (40,)])
+        assert live_logging_routes.record_snapshot(cur, 3) is None
+
+    def test_stores_state_at_the_settled_event(self):
+        import live_logging_routes
+
+        cur = FakeCursor([(40,), None])
+        state = {"records": [{"session_instance_tune_id": 1}], "last_event_id": 40}
+        with patch.object(live_logging_routes, "_instance_state", return_value=dict(state)) as instance_state:
+            assert live_logging_routes.record_snapshot(cur, 3) == 40
+        # The snapshot claims only the settled event, even if newer ones are visible.
+        assert instance_state.call_args.kwargs == {"high_water": 40}
+        sql, params = cur.executed[-1]
+        assert sql.startswith("INSERT INTO session_snapshot")
+        assert params[:2] == (3, 40)
+        assert json.loads(params[2])["last_event_id"] == 40
@@ -6,6 +6,7 @@ Tests the thesession.org sync service with mocked API responses.
 
 import pytest
 from unittest.mock import Mock, patch, MagicMock
+from services.thesession_client import ThesessionClient, TokenBucket
 from services.thesession_sync_service import ThesessionSyncService
 
 
@@ -14,8 +15,8 @@ class TestThesessionSyncService:
 
     @pytest.fixture
     def sync_service(self):
-        """Create a ThesessionSyncService instance."""
-        return ThesessionSyncService()
+        """Create a ThesessionSyncService instance (unthrottled, no disk cache)."""
+        return ThesessionSyncService(ThesessionClient(rate=1000, burst=1000, cache_dir=None))
 
     @pytest.fixture
     def mock_db_connection(self):
@@ -52,7 +53,7 @@ class TestThesessionSyncService:
     
     # Test fetch_tunebook
     
-    @patch('services.thesession_sync_service.requests.get')
+    @patch('services.thesession_client.requests.Session.get')
     def test_fetch_tunebook_success(self, mock_get, sync_service, mock_tunebook_response):
         """Test successful tunebook fetch."""
         mock_response = Mock()
@@ -69,7 +70,7 @@ class TestThesessionSyncService:
         assert tunebook[0]['name'] == 'The Kesh'
         mock_get.assert_called_once()
     
-    @patch('services.thesession_sync_service.requests.get')
+    @patch('services.thesession_client.requests.Session.get')
     def test_fetch_tunebook_user_not_found(self, mock_get, sync_service):
         """Test tunebook fetch with non-existent user."""
         mock_response = Mock()
@@ -82,7 +83,7 @@ class TestThesessionSyncService:
         assert "not found" in message.lower()
         assert tunebook is None
     
-    @patch('services.thesession_sync_service.requests.get')
+    @patch('services.thesession_client.requests.Session.get')
     def test_fetch_tunebook_server_error(self, mock_get, sync_service):
         """Test tunebook fetch with server error."""
         mock_response = Mock()
@@ -95,7 +96,7 @@ class TestThesessionSyncService:
         assert "status: 500" in message
         assert tunebook is None
     
-    @patch('services.thesession_sync_service.requests.get')
+    @patch('services.thesession_client.requests.Session.get')
     def test_fetch_tunebook_timeout(self, mock_get, sync_service):
         """Test tunebook fetch with timeout."""
         mock_get.side_effect = Exception("Timeout")
@@ -105,7 +106,7 @@ class TestThesessionSyncService:
         assert success is False
         assert tunebook is None
     
-    @patch('services.thesession_sync_service.requests.get')
+    @patch('services.thesession_client.requests.Session.get')
     def test_fetch_tunebook_invalid_data(self, mock_get, sync_service):
         """Test tunebook fetch with invalid response data."""
         mock_response = Mock()
@@ -119,7 +120,7 @@ class TestThesessionSyncService:
         assert "Invalid tunebook data" in message
         assert tunebook is None
     
-    @patch('services.thesession_sync_service.requests.get')
+    @patch('services.thesession_client.requests.Session.get')
     def test_fetch_tunebook_empty(self, mock_get, sync_service):
         """Test tunebook fetch with empty tunebook."""
         mock_response = Mock()
@@ -135,7 +136,7 @@ class TestThesessionSyncService:
     
     # Test fetch_tune_metadata
     
-    @patch('services.thesession_sync_service.requests.get')
+    @patch('services.thesession_client.requests.Session.get')
     def test_fetch_tune_metadata_success(self, mock_get, sync_service, mock_tune_metadata_response):
         """Test successful tune metadata fetch."""
         mock_response = Mock()
@@ -152,7 +153,7 @@ class TestThesessionSyncService:
         assert metadata['tune_type'] == 'Jig'  # Should be title case
         assert metadata['tunebook_count'] == 1234
     
-    @patch('services.thesession_sync_service.requests.get')
+    @patch('services.thesession_client.requests.Session.get')
     def test_fetch_tune_metadata_not_found(self, mock_get, sync_service):
         """Test tune metadata fetch with non-existent tune."""
         mock_response = Mock()
@@ -165,7 +166,7 @@ class TestThesessionSyncService:
         assert "not found" in message.lower()
         assert metadata is None
     
-    @patch('services.thesession_sync_service.requests.get')
+    @patch('services.thesession_client.requests.Session.get')
     def test_fetch_tune_metadata_missing_fields(self, mock_get, sync_service):
         """Test tune metadata fetch with missing required fields."""
         mock_response = Mock()
@@ -179,7 +180,7 @@ class TestThesessionSyncService:
         assert "Invalid tune data" in message
         assert metadata is None
     
-    @patch('services.thesession_sync_service.requests.get')
+    @patch('services.thesession_client.requests.Session.get')
     def test_fetch_tune_metadata_no_tunebook_count(self, mock_get, sync_service):
         """Test tune metadata fetch with missing tunebook count."""
         mock_response = Mock()
@@ -517,7 +518,7 @@ class TestThesessionSyncService:
     # Test retry mechanism
     
     @patch('services.thesession_sync_service.time.sleep')
-    @patch('services.thesession_sync_service.requests.get')
+    @patch('services.thesession_client.requests.Session.get')
     def test_fetch_tunebook_with_retry_success_after_failure(self, mock_get, mock_sleep, sync_service):
         """Test tunebook fetch succeeds after initial timeout with retry."""
         import requests
@@ -540,7 +541,7 @@ class TestThesessionSyncService:
         assert mock_sleep.call_count == 1  # Slept once between retries
     
     @patch('services.thesession_sync_service.time.sleep')
-    @patch('services.thesession_sync_service.requests.get')
+    @patch('services.thesession_client.requests.Session.get')
     def test_fetch_tunebook_with_retry_exhausted(self, mock_get, mock_sleep, sync_service):
         """Test tunebook fetch fails after all retries exhausted."""
         import requests
@@ -557,7 +558,7 @@ class TestThesessionSyncService:
         assert mock_sleep.call_count == 2  # Slept between attempts
     
     @patch('services.thesession_sync_service.time.sleep')
-    @patch('services.thesession_sync_service.requests.get')
+    @patch('services.thesession_client.requests.Session.get')
     def test_fetch_tunebook_no_retry_on_404(self, mock_get, mock_sleep, sync_service):
         """Test tunebook fetch doesn't retry on 404 (non-retryable error)."""
         mock_response = Mock()
@@ -573,7 +574,7 @@ class TestThesessionSyncService:
         assert mock_sleep.call_count == 0
     
     @patch('services.thesession_sync_service.time.sleep')
-    @patch('services.thesession_sync_service.requests.get')
+    @patch('services.thesession_client.requests.Session.get')
     def test_fetch_tunebook_retry_disabled(self, mock_get, mock_sleep, sync_service):
         """Test tunebook fetch doesn't retry when retry=False."""
         import requests
@@ -589,7 +590,7 @@ class TestThesessionSyncService:
         assert mock_sleep.call_count == 0
     
     @patch('services.thesession_sync_service.time.sleep')
-    @patch('services.thesession_sync_service.requests.get')
+    @patch('services.thesession_client.requests.Session.get')
     def test_fetch_tune_metadata_with_retry_success(self, mock_get, mock_sleep, sync_service):
         """Test tune metadata fetch succeeds after retry."""
         import requests
@@ -617,7 +618,7 @@ class TestThesessionSyncService:
         assert mock_sleep.call_count == 1
     
     @patch('services.thesession_sync_service.time.sleep')
-    @patch('services.thesession_sync_service.requests.get')
+    @patch('services.thesession_client.requests.Session.get')
     def test_retry_exponential_backoff(self, mock_get, mock_sleep, sync_service):
         """Test retry mechanism uses exponential backoff."""
         import requests
@@ -697,7 +698,10 @@ class TestThesessionSyncService:
         with patch.object(sync_service, 'fetch_tunebook') as mock_fetch_tb:
             mock_fetch_tb.return_value = (True, "Success", [{'id': 1}])
             
-            with patch.object(sync_service, 'ensure_tune_exists') as mock_ensure:
+            with patch.object(sync_service, 'ensure_tune_exists') as mock_ensure, \
+                    patch.object(sync_service, 'fetch_tunes_metadata') as mock_fetch_meta:
+                mock_fetch_meta.return_value = {
+                    1: (True, "ok", {'tune_id': 1, 'name': 'X', 'tune_type': 'Reel', 'tunebook_count': 0})}
                 mock_ensure.return_value = (True, "Created tune #1")
                 
                 sync_service.sync_tunebook_to_person(
@@ -715,3 +719,120 @@ class TestThesessionSyncService:
                     assert 'errors' in update
                     assert 'status' in update
                     assert 'progress_percent' in update
+
+    # Test concurrent fetching
+
+    def test_fetch_tunebook_pages_concurrently_in_order(self, sync_service):
+        """Pages after the first are fetched in parallel and reassembled in page order."""
+        def get_json(url, timeout):
+            page = int(url.rsplit('=', 1)[1])
+            return 200, {'tunes': [{'id': page, 'name': f'Tune {page}'}], 'pages': 4}
+
+        progress = []
+        with patch.object(sync_service.client, 'get_json', side_effect=get_json) as mock_get_json:
+            success, message, tunebook = sync_service.fetch_tunebook(
+                12345, progress_callback=lambda done, total: progress.append((done, total)))
+
+        assert success is True
+        assert [t['id'] for t in tunebook] == [1, 2, 3, 4]
+        assert "from 4 page(s)" in message
+        assert mock_get_json.call_count == 4
+        assert progress[0] == (1, 4) and progress[-1] == (4, 4)
+
+    def test_fetch_tunebook_fails_if_any_page_fails(self, sync_service):
+        def get_json(url, timeout):
+            page = int(url.rsplit('=', 1)[1])
+            if page == 3:
+                return 500, None
+            return 200, {'tunes': [{'id': page}], 'pages': 3}
+
+        with patch.object(sync_service.client, 'get_json', side_effect=get_json):
+            success, message, tunebook = sync_service.fetch_tunebook(12345)
+
+        assert success is False and "status: 500" in message and tunebook is None
+
+    def test_fetch_tunes_metadata_batch(self, sync_service):
+        def get_json(url, timeout):
+            tune_id = int(url.split('/tunes/')[1].split('?')[0])
+            if tune_id == 3:
+                return 404, None
+            return 200, {'name': f'Tune {tune_id}', 'type': 'reel', 'tunebooks': tune_id}
+
+        with patch.object(sync_service.client, 'get_json', side_effect=get_json):
+            results = sync_service.fetch_tunes_metadata([1, 2, 3])
+
+        assert results[1] == (True, "Successfully fetched tune metadata",
+                              {'tune_id': 1, 'name': 'Tune 1', 'tune_type': 'Reel', 'tunebook_count': 1})
+        assert results[3][0] is False and "not found" in results[3][1]
+
+    @patch('psycopg2.extras.execute_values')
+    @patch('services.thesession_sync_service.get_db_connection')
+    def test_sync_fetches_details_for_nameless_entries(self, mock_get_conn, mock_execute_values, sync_service, mock_db_connection):
+        mock_conn, mock_cur = mock_db_connection
+        mock_get_conn.return_value = mock_conn
+        mock_cur.fetchall.return_value = []
+
+        with patch.object(sync_service, 'fetch_tunebook') as mock_fetch_tb, \
+                patch.object(sync_service, 'fetch_tunes_metadata') as mock_fetch_meta:
+            mock_fetch_tb.return_value = (True, "Success", [
+                {'id': 1, 'name': 'The Kesh', 'type': 'jig'},
+                {'id': 2},
+                {'id': 3},
+            ])
+            connections_open_during_fetch = []
+
+            def fetch_metadata(tune_ids, progress_callback=None):
+                connections_open_during_fetch.append(mock_get_conn.call_count - mock_conn.close.call_count)
+                return {
+                    2: (True, "ok", {'tune_id': 2, 'name': 'The Banshee', 'tune_type': 'Reel', 'tunebook_count': 9}),
+                    3: (False, "Tune #3 not found on thesession.org", None),
+                }
+            mock_fetch_meta.side_effect = fetch_metadata
+
+            success, message, results = sync_service.sync_tunebook_to_person(person_id=1, thesession_user_id=12345)
+
+        assert mock_fetch_meta.call_args[0][0] == [2, 3]
+        # The existence check's transaction was committed and its connection released first
+        assert connections_open_during_fetch == [0]
+        tune_rows = mock_execute_values.call_args_list[0][0][2]
+        assert [row[:4] for row in tune_rows] == [(1, 'The Kesh', 'Jig', 0), (2, 'The Banshee', 'Reel', 9)]
+        assert results['errors'] == ["Tune #3: Tune #3 not found on thesession.org"]
+        person_rows = mock_execute_values.call_args_list[1][0][2]
+        assert [row[1] for row in person_rows] == [1, 2]
+
+
+class TestThesessionClient:
+    """Tests for the shared thesession.org client."""
+
+    def _response(self, status_code, data=None, headers=None):
+        response = Mock()
+        response.status_code = status_code
+        response.json.return_value = data
+        response.headers = headers or {}
+        return response
+
+    def test_etag_revalidation_uses_cached_body(self, tmp_path):
+        client = ThesessionClient(rate=1000, burst=1000, cache_dir=str(tmp_path))
+        url = "https://thesession.org/tunes/1?format=json"
+        with patch.object(client.session, 'get') as mock_get:
+            mock_get.return_value = self._response(200, {'name': 'The Kesh'}, {'ETag': '"abc"'})
+            assert client.get_json(url, 10) == (200, {'name': 'The Kesh'})
+
+            mock_get.return_value = self._response(304)
+            assert client.get_json(url, 10) == (200, {'name': 'The Kesh'})
+            assert mock_get.call_args[1]['headers'] == {'If-None-Match': '"abc"'}
+
+    def test_uncacheable_responses_are_not_stored(self, tmp_path):
+        client = ThesessionClient(rate=1000, burst=1000, cache_dir=str(tmp_path))
+        with patch.object(client.session, 'get', return_value=self._response(200, {'tunes': []})):
+            client.get_json("https://thesession.org/members/1/tunebook?format=json", 10)
+        assert list(tmp_path.iterdir()) == []
+
+    def test_token_bucket_limits_rate(self):
+        bucket = TokenBucket(rate=50, capacity=2)
+        import time as _time
+        started = _time.monotonic()
+        for _ in range(5):
+            bucket.acquire()
+        # Two from the burst, three more at 50/s
+        assert _time.monotonic() - started >= 0.05
@@ -0,0 +1,183 @@
+"""
+Unit tests for the in-process tune-name matching index (tune_match_index.py).
+
+A fake cursor serves the catalog / overlay loads, so the tests also check that a
+warm lookup runs no queries at all.
+"""
+
+from unittest.mock import patch
+
+import pytest
+
+import tune_match_index as tmi
+
+
+class FakeCursor:
+    """Answers the index's load queries from in-memory rows."""
+
+    def __init__(self, tunes, session_tunes=(), aliases=(), plays=()):
+        self.tunes = list(tunes)  # (tune_id, name, tune_type, tunebook_count, redirected)
+        self.session_tunes = list(session_tunes)  # (tune_id, alias)
+        self.aliases = list(aliases)  # (tune_id, alias)
+        self.plays = list(plays)  # (tune_id, count)
+        self.queries = []
+        self._rows = []
+
+    def execute(self, sql, params=None):
+        self.queries.append(sql)
+        if "FROM tune WHERE tune_id = ANY" in sql:
+            wanted = set(params[0])
+            self._rows = [t for t in self.tunes if t[0] in wanted]
+        elif "FROM tune" in sql:
+            self._rows = list(self.tunes)
+        elif "FROM session_tune_alias" in sql:
+            self._rows = list(self.aliases)
+        elif "FROM session_tune_play" in sql:
+            self._rows = list(self.plays)
+        elif "FROM session_tune" in sql:
+            self._rows = list(self.session_tunes)
+        else:
+            raise AssertionError(f"unexpected query: {sql}")
+
+    def fetchall(self):
+        return self._rows
+
+
+@pytest.fixture(autouse=True)
+def clean_index():
+    tmi.invalidate_all()
+    tmi._catalog = None
+    with patch.object(tmi, "_ensure_listener"):
+        yield
+    tmi.invalidate_all()
+    tmi._catalog = None
+
+
+TUNES = [
+    (1, "The Silver Spear", "Reel", 900, False),
+    (2, "Banish Misfortune", "Jig", 800, False),
+    (3, "Sí Bheag, Sí Mhór", "Waltz", 700, False),
+    (4, "Silver Spire", "Reel", 100, False),
+    (5, "Old Silver Spear", "Reel", 50, True),  # redirected: never matched by name
+    (6, "Drowsy Maggie", "Reel", 600, False),
+]
+
+
+@pytest.mark.unit
+class TestNormalize:
+    def test_lowercases_and_strips_accents(self):
+        assert tmi.normalize("Sí Bheag") == "si bheag"
+        assert tmi.normalize("Ærø") == "aero"
+
+    def test_empty(self):
+        assert tmi.normalize(None) == ""
+
+
+@pytest.mark.unit
+class TestFindMatchingTune:
+    def test_session_tune_alias_wins(self):
+        cur = FakeCursor(TUNES, session_tunes=[(6, "Maggie")])
+        assert tmi.find_matching_tune(cur, 10, "maggie") == (6, "maggie", None)
+
+    def test_duplicate_session_alias_is_an_error(self):
+        cur = FakeCursor(TUNES, session_tunes=[(1, "Spear"), (4, "Spear")])
+        tune_id, _, error = tmi.find_matching_tune(cur, 10, "Spear")
+        assert tune_id is None and "Multiple tunes" in error
+
+    def test_session_tune_alias_table(self):
+        cur = FakeCursor(TUNES, aliases=[(2, "Banish")])
+        assert tmi.find_matching_tune(cur, 10, "BANISH")[0] == 2
+
+    def test_name_with_the_folding_both_ways(self):
+        cur = FakeCursor(TUNES)
+        assert tmi.find_matching_tune(cur, 10, "silver spear") == (1, "The Silver Spear", None)
+        assert tmi.find_matching_tune(cur, 10, "The Drowsy Maggie") == (6, "Drowsy Maggie", None)
+
+    def test_accent_insensitive_name(self):
+        cur = FakeCursor(TUNES)
+        assert tmi.find_matching_tune(cur, 10, "si bheag, si mhor")[0] == 3
+
+    def test_redirected_tune_is_not_matched(self):
+        cur = FakeCursor(TUNES)
+        assert tmi.find_matching_tune(cur, 10, "Old Silver Spear") == (None, "Old Silver Spear", None)
+
+
+@pytest.mark.unit
+class TestMatch:
+    def test_exact_match_reports_type_and_session_membership(self):
+        cur = FakeCursor(TUNES, session_tunes=[(2, None)])
+        result = tmi.match(cur, 10, "banish misfortune")
+        assert result["exact_match"] is True
+        assert result["results"] == [
+            {"tune_id": 2, "tune_name": "Banish Misfortune", "tune_type": "Jig", "in_session_tune": True}
+        ]
+
+    def test_wildcard_ranking_prefers_type_then_plays_then_tunebook(self):
+        cur = FakeCursor(TUNES, plays=[(4, 3)])
+        result = tmi.match(cur, 10, "silver")
+        assert [r["tune_id"] for r in result["results"]] == [4, 1]
+        result = tmi.match(cur, 10, "i", previous_tune_type="Waltz", limit=2)
+        assert result["results"][0]["tune_id"] == 3
+
+    def test_alias_replaces_name_in_wildcard(self):
+        cur = FakeCursor(TUNES, session_tunes=[(6, "The Sleepy One")])
+        assert tmi.match(cur, 10, "maggie")["results"] == []
+        result = tmi.match(cur, 10, "sleepy")
+        assert result["matched"] is True
+        assert result["results"][0]["tune_name"] == "The Sleepy One"
+
+    def test_typo_gets_suggestions_but_never_matches(self):
+        cur = FakeCursor(TUNES)
+        result = tmi.match(cur, 10, "drowsey magie")
+        assert result["matched"] is False
+        assert [r["tune_id"] for r in result["results"]] == [6]
+
+    def test_typo_suggestions_rank_closest_first(self):
+        cur = FakeCursor(TUNES)
+        result = tmi.match(cur, 10, "silver spere")
+        assert [r["tune_id"] for r in result["results"]][:2] == [1, 4]
+
+    def test_typo_suggestions_use_session_alias(self):
+        cur = FakeCursor(TUNES, session_tunes=[(6, "The Sleepy One")])
+        result = tmi.match(cur, 10, "sleepie one")
+        assert result["results"][0]["tune_name"] == "The Sleepy One"
+
+    def test_short_query_gets_no_typo_suggestions(self):
+        cur = FakeCursor(TUNES)
+        assert tmi.match(cur, 10, "xyz")["results"] == []
+
+    def test_warm_lookup_runs_no_queries(self):
+        cur = FakeCursor(TUNES)
+        tmi.match(cur, 10, "silver")
+        cur.queries.clear()
+        tmi.match(cur, 10, "spear")
+        assert cur.queries == []
+
+
+@pytest.mark.unit
+class TestInvalidation:
+    def test_dirty_tune_is_reloaded_alone(self):
+        cur = FakeCursor(TUNES)
+        tmi.match(cur, 10, "silver")
+        cur.tunes[3] = (4, "Golden Spire", "Reel", 100, False)
+        tmi._handle_notify(None, tmi.INVALIDATE_CHANNEL, "tune:4")
+        cur.queries.clear()
+        result = tmi.match(cur, 10, "golden")
+        assert [r["tune_id"] for r in result["results"]] == [4]
+        assert any("ANY" in q for q in cur.queries)
+        assert 4 not in [r["tune_id"] for r in tmi.match(cur, 10, "silver spire")["results"]]
+
+    def test_session_notification_drops_overlay(self):
+        cur = FakeCursor(TUNES)
+        tmi.match(cur, 10, "silver")
+        cur.aliases = [(2, "Banny")]
+        tmi._handle_notify(None, tmi.INVALIDATE_CHANNEL, "session:10")
+        assert tmi.find_matching_tune(cur, 10, "banny")[0] == 2
+
+    def test_live_feed_event_drops_its_sessions_overlay(self):
+        cur = FakeCursor(TUNES)
+        tmi.match(cur, 10, "silver")
+        tmi.note_instance_session(77, 10)
+        cur.plays = [(1, 5)]
+        tmi._handle_notify(None, tmi.LIVE_EVENT_CHANNEL, "77:1234")
+        assert [r["tune_id"] for r in tmi.match(cur, 10, "silver")["results"]] == [1, 4]
@@ -0,0 +1,56 @@
+"""
+Unit tests for the shared tune-name search fragments and the in-process
+trigram similarity (tune_search.py).
+"""
+
+import pytest
+
+import tune_search
+
+
+@pytest.mark.unit
+class TestSqlFragments:
+    def test_match_is_normalized_and_escaped(self):
+        sql, params = tune_search.match_sql(" Sí 50%_ ", fuzzy=False)
+        assert sql == "t.name_search LIKE %s"
+        assert params == ["%si 50\\%\\_%"]
+
+    def test_fuzzy_match_adds_similarity(self):
+        sql, params = tune_search.match_sql("Drowsy Magie")
+        assert sql == "(t.name_search LIKE %s OR %s <%% t.name_search)"
+        assert params == ["%drowsy magie%", "drowsy magie"]
+
+    def test_short_query_is_substring_only(self):
+        sql, params = tune_search.match_sql("kes")
+        assert "<%%" not in sql and params == ["%kes%"]
+        assert not tune_search.fuzzy_applies("kes")
+
+    def test_rank_params_follow_placeholders(self):
+        sql, params = tune_search.rank_sql("The Kesh", column="x")
+        assert sql.count("%s") == len(params) == 3
+        assert params == ["the kesh", "the kesh%", "%the kesh%"]
+        assert sql.endswith(f"ELSE {tune_search.TYPO_RANK} END")
+
+    def test_similarity_term(self):
+        assert tune_search.similarity_sql("Kesh") == ("word_similarity(%s, t.name_search)", ["kesh"])
+
+
+@pytest.mark.unit
+class TestWordSimilarity:
+    def test_trigrams_are_padded_per_word(self):
+        assert tune_search.trigrams("Jig") == {"  j", " ji", "jig", "ig "}
+        assert tune_search.trigrams("a-b") == {"  a", " a ", "  b", " b "}
+
+    def test_typo_clears_the_threshold(self):
+        score = tune_search.word_similarity("maid behnd the bar", "The Maid Behind the Bar")
+        assert score >= tune_search.WORD_SIMILARITY_THRESHOLD
+
+    def test_unrelated_name_does_not(self):
+        score = tune_search.word_similarity("banish", "The Silver Spear")
+        assert score < tune_search.WORD_SIMILARITY_THRESHOLD
+
+    def test_accents_do_not_matter(self):
+        assert tune_search.word_similarity("si bheag", "Sí Bheag") == 1.0
+
+    def test_empty_query(self):
+        assert tune_search.word_similarity("", "anything") == 0.0
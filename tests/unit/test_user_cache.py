@@ -0,0 +1,91 @@
+"""
+Unit tests for user_cache (load_user's per-process user cache).
+"""
+
+from unittest.mock import patch
+
+import pytest
+
+import user_cache
+from auth import User
+
+
+def _user(user_id=1, person_id=10, instance_id=None, session_id=None):
+    active_session = None
+    if instance_id is not None:
+        active_session = {"session_instance_id": instance_id, "session_id": session_id}
+    return User(user_id=user_id, person_id=person_id, username=f"u{user_id}", active_session=active_session)
+
+
+@pytest.fixture(autouse=True)
+def clean_cache(monkeypatch):
+    monkeypatch.setattr(user_cache, "_listener_started", True)  # no listener thread
+    monkeypatch.delenv("USER_CACHE", raising=False)
+    user_cache.invalidate_all()
+    yield
+    user_cache.invalidate_all()
+
+
+class Loader:
+    def __init__(self, users):
+        self.users = {u.user_id: u for u in users}
+        self.calls = 0
+
+    def __call__(self, user_id):
+        self.calls += 1
+        return self.users.get(user_id)
+
+
+@pytest.mark.unit
+class TestUserCache:
+    def test_second_load_is_served_from_memory(self):
+        loader = Loader([_user()])
+        first = user_cache.get_user(1, loader)
+        assert user_cache.get_user(1, loader) is first
+        assert loader.calls == 1
+
+    def test_expired_entry_reloads(self):
+        loader = Loader([_user()])
+        user_cache.get_user(1, loader)
+        with patch.object(user_cache, "USER_CACHE_TTL", 0):
+            user_cache.get_user(1, loader)
+        assert loader.calls == 2
+
+    def test_missing_users_are_not_cached(self):
+        loader = Loader([])
+        assert user_cache.get_user(5, loader) is None
+        assert user_cache.get_user(5, loader) is None
+        assert loader.calls == 2
+
+    @pytest.mark.parametrize("payload", ["user:1", "person:10", "instance:77", "session:3"])
+    def test_notify_payloads_drop_the_user(self, payload):
+        loader = Loader([_user(instance_id=77, session_id=3), _user(user_id=2, person_id=20)])
+        user_cache.get_user(1, loader)
+        user_cache.get_user(2, loader)
+
+        user_cache._handle_notify(payload)
+
+        user_cache.get_user(1, loader)
+        user_cache.get_user(2, loader)
+        assert loader.calls == 3  # only user 1 reloaded
+
+    def test_load_racing_an_invalidation_is_not_kept(self):
+        def loader(user_id):
+            user_cache.invalidate_user(user_id)  # NOTIFY lands mid-load
+            return _user()
+
+        user_cache.get_user(1, loader)
+        assert 1 not in user_cache._users
+
+    def test_disabled_always_loads(self, monkeypatch):
+        monkeypatch.setenv("USER_CACHE", "0")
+        loader = Loader([_user()])
+        user_cache.get_user(1, loader)
+        user_cache.get_user(1, loader)
+        assert loader.calls == 2
+
+    def test_user_uses_slots(self):
+        user = _user()
+        assert not hasattr(user, "__dict__")  # every attribute lives in a slot
+        assert user.get_id() == "1" and user.is_active and user.is_authenticated and not user.is_anonymous
+        assert user == _user() and user != _user(user_id=2)
@@ -0,0 +1,477 @@
+"""
+In-process tune-name matching index for type-ahead.
+
+Every keystroke in the live logger (`live_match`) and the legacy pill editor
+(`match_tune_ajax`) goes through `match_tune_core`. Done in SQL that is up to three
+`LOWER(unaccent(...))` equality scans (find_matching_tune) plus a `LIKE '%q%'` over
+the whole `tune` table joined to a per-session play-count aggregate. This module
+answers the same question from memory:
+
+  - a process-wide catalog of `tune` (name, type, tunebook count, redirect flag),
+    with names normalized once in Python (the LOWER(unaccent()) equivalent), an
+    exact-name dict, and a 2/3-gram posting index for the '%q%' wildcard;
+  - a per-session overlay (session_tune aliases, session_tune_alias rows, which
+    tunes are in the session's list, per-tune play counts at the session).
+
+Results are identical to the SQL path: same exact-match precedence (session_tune
+alias -> session_tune_alias -> tune name with "The " folding, redirects excluded)
+and the same wildcard ranking (preferred type, plays here, tunebook count, name).
+When nothing contains the typed string, both offer typo-tolerant suggestions
+ranked by trigram similarity first (tune_search).
+
+Invalidation. Triggers from schema/025_tune_match_notify.sql NOTIFY
+`tune_match_invalidate` with 'session:<id>' (session_tune / session_tune_alias
+writes) or 'tune:<id>' (tune inserts, renames, redirects, count refreshes), so the
+merge procedure, scripts and other workers are all covered. A per-process listener
+thread also follows the live-logging feed (`live_session_events`) and drops the
+session overlay whenever a live op lands, so play counts stay current. Dirty tunes
+are reloaded individually on the next lookup. TTLs are only a safety net for a
+listener that is down.
+
+Loads reuse the caller's cursor, so a warm lookup never touches Postgres.
+Set TUNE_MATCH_INDEX=0 to fall back to the SQL matcher.
+"""
+
+import os
+import time
+import heapq
+import select
+import logging
+import threading
+from collections import Counter
+
+from tune_search import normalize, trigrams, word_similarity, FUZZY_MIN_LENGTH, WORD_SIMILARITY_THRESHOLD
+
+logger = logging.getLogger(__name__)
+
+# Channel the 025 triggers notify on; payload 'session:<id>' or 'tune:<id>'.
+INVALIDATE_CHANNEL = "tune_match_invalidate"
+# The live-logging feed (must match live_logging_routes.LIVE_EVENT_CHANNEL).
+LIVE_EVENT_CHANNEL = "live_session_events"
+
+SESSION_TTL = float(os.environ.get("TUNE_MATCH_SESSION_TTL", 300))
+CATALOG_TTL = float(os.environ.get("TUNE_MATCH_CATALOG_TTL", 3600))
+
+
+def enabled():
+    """True unless TUNE_MATCH_INDEX is explicitly switched off."""
+    return os.environ.get("TUNE_MATCH_INDEX", "1").lower() not in ("0", "false", "no")
+
+
+def _grams(text, n):
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+# Catalog entry tuple layout.
+_NAME, _NORM, _TYPE, _TUNEBOOK, _REDIRECTED = range(5)
+
+
+class _Catalog:
+    """Every tune, with exact-name and n-gram lookups over non-redirected names."""
+
+    def __init__(self):
+        self.tunes = {}  # tune_id -> (name, norm, tune_type, tunebook_count, redirected)
+        self.by_name = {}  # norm -> {tune_id}
+        self.postings = {}  # 2- and 3-gram -> {tune_id}
+        self.loaded_at = time.monotonic()
+
+    def upsert(self, tune_id, name, tune_type, tunebook_count, redirected):
+        self.remove(tune_id)
+        norm = normalize(name)
+        self.tunes[tune_id] = (name, norm, tune_type, tunebook_count, redirected)
+        if redirected:
+            return  # kept for type/flag lookups, never matched by name
+        self.by_name.setdefault(norm, set()).add(tune_id)
+        for gram in _grams(norm, 2) | _grams(norm, 3):
+            self.postings.setdefault(gram, set()).add(tune_id)
+
+    def remove(self, tune_id):
+        entry = self.tunes.pop(tune_id, None)
+        if entry is None or entry[_REDIRECTED]:
+            return
+        norm = entry[_NORM]
+        ids = self.by_name.get(norm)
+        if ids is not None:
+            ids.discard(tune_id)
+            if not ids:
+                del self.by_name[norm]
+        for gram in _grams(norm, 2) | _grams(norm, 3):
+            ids = self.postings.get(gram)
+            if ids is not None:
+                ids.discard(tune_id)
+                if not ids:
+                    del self.postings[gram]
+
+    def search(self, q):
+        """Non-redirected tune ids whose normalized name contains q."""
+        if len(q) < 2:
+            return {tid for tid, e in self.tunes.items() if not e[_REDIRECTED] and q in e[_NORM]}
+        n = 3 if len(q) >= 3 else 2
+        postings = sorted((self.postings.get(g, ()) for g in _grams(q, n)), key=len)
+        if not postings[0]:
+            return set()
+        hits = set(postings[0])
+        for ids in postings[1:]:
+            hits &= ids
+            if not hits:
+                return hits
+        if len(q) > n:  # grams can co-occur without the whole string; confirm
+            hits = {tid for tid in hits if q in self.tunes[tid][_NORM]}
+        return hits
+
+    def similar(self, q):
+        """{tune_id: similarity} for non-redirected names resembling q (typos).
+
+        Candidates must share at least one trigram with q; the survivors are scored
+        with tune_search.word_similarity, the in-process mirror of pg_trgm's `<%`.
+        """
+        if len(q) < FUZZY_MIN_LENGTH:
+            return {}
+        shared = Counter()
+        for gram in _grams(q, 3):
+            shared.update(self.postings.get(gram, ()))
+        q_grams = trigrams(q)
+        scores = {}
+        for tid in shared:
+            score = word_similarity(q, self.tunes[tid][_NORM], q_grams)
+            if score >= WORD_SIMILARITY_THRESHOLD:
+                scores[tid] = score
+        return scores
+
+
+class _SessionOverlay:
+    """What one session adds on top of the catalog."""
+
+    __slots__ = ("session_tune_aliases", "extra_aliases", "display_alias", "in_session", "plays", "loaded_at")
+
+    def __init__(self, session_tune_rows, alias_rows, play_rows):
+        self.session_tune_aliases = {}  # norm alias -> [tune_id] (session_tune.alias)
+        self.extra_aliases = {}  # norm alias -> [tune_id] (session_tune_alias)
+        self.display_alias = {}  # tune_id -> (alias, norm alias); the alias replaces the name
+        self.in_session = set()
+        for tune_id, alias in session_tune_rows:
+            self.in_session.add(tune_id)
+            if alias is not None:
+                norm = normalize(alias)
+                self.session_tune_aliases.setdefault(norm, []).append(tune_id)
+                self.display_alias[tune_id] = (alias, norm)
+        for tune_id, alias in alias_rows:
+            if alias is not None:
+                self.extra_aliases.setdefault(normalize(alias), []).append(tune_id)
+        self.plays = dict(play_rows)
+        self.loaded_at = time.monotonic()
+
+
+_lock = threading.RLock()
+_catalog = None
+_catalog_stale = False  # full reload on next lookup
+_catalog_dirty = set()  # tune ids to reload on next lookup
+_sessions = {}  # session_id -> _SessionOverlay
+_instance_sessions = {}  # session_instance_id -> session_id (for feed notifications)
+
+
+# --- Invalidation -----------------------------------------------------------
+
+
+def invalidate_session(session_id):
+    """Drop a session's overlay (aliases / session list / play counts)."""
+    with _lock:
+        _sessions.pop(session_id, None)
+
+
+def invalidate_tunes(tune_ids=None):
+    """Mark tunes for reload on the next lookup; None reloads the whole catalog."""
+    global _catalog_stale
+    with _lock:
+        if tune_ids is None:
+            _catalog_stale = True
+        else:
+            _catalog_dirty.update(tune_ids)
+
+
+def invalidate_all():
+    global _catalog_stale
+    with _lock:
+        _catalog_stale = True
+        _sessions.clear()
+
+
+def note_instance_session(session_instance_id, session_id):
+    """Remember an instance's session so feed notifications need no lookup."""
+    _instance_sessions[int(session_instance_id)] = session_id
+
+
+# --- Loading ----------------------------------------------------------------
+
+
+def _refresh_catalog(cur):
+    global _catalog, _catalog_stale
+    with _lock:
+        full = (_catalog is None or _catalog_stale
+                or time.monotonic() - _catalog.loaded_at > CATALOG_TTL)
+        dirty = list(_catalog_dirty)
+        _catalog_dirty.clear()
+        _catalog_stale = False  # an invalidation that lands mid-load re-sets it
+    if full:
+        cur.execute(
+            "SELECT tune_id, name, tune_type, tunebook_count_cached, redirect_to_tune_id IS NOT NULL FROM tune"
+        )
+        catalog = _Catalog()
+        for row in cur.fetchall():
+            catalog.upsert(*row)
+        with _lock:
+            _catalog = catalog
+    elif dirty:
+        cur.execute(
+            "SELECT tune_id, name, tune_type, tunebook_count_cached, redirect_to_tune_id IS NOT NULL "
+            "FROM tune WHERE tune_id = ANY(%s)",
+            (dirty,),
+        )
+        rows = cur.fetchall()
+        with _lock:
+            for tune_id in dirty:
+                _catalog.remove(tune_id)
+            for row in rows:
+                _catalog.upsert(*row)
+    return _catalog
+
+
+def _overlay(cur, session_id):
+    with _lock:
+        overlay = _sessions.get(session_id)
+    if overlay is not None and time.monotonic() - overlay.loaded_at < SESSION_TTL:
+        return overlay
+    cur.execute("SELECT tune_id, alias FROM session_tune WHERE session_id = %s", (session_id,))
+    session_tune_rows = cur.fetchall()
+    cur.execute("SELECT tune_id, alias FROM session_tune_alias WHERE session_id = %s", (session_id,))
+    alias_rows = cur.fetchall()
+    cur.execute("SELECT tune_id, play_count FROM session_tune_play WHERE session_id = %s", (session_id,))
+    overlay = _SessionOverlay(session_tune_rows, alias_rows, cur.fetchall())
+    with _lock:
+        _sessions[session_id] = overlay
+    return overlay
+
+
+def _load(cur, session_id):
+    _ensure_listener()
+    catalog = _refresh_catalog(cur)
+    return catalog, _overlay(cur, session_id)
+
+
+# --- Lookups ----------------------------------------------------------------
+
+
+def find_matching_tune(cur, session_id, tune_name, allow_multiple_session_aliases=False):
+    """Same contract as database.find_matching_tune, answered from memory.
+
+    Returns:
+        tuple: (tune_id, final_name, error_message)
+    """
+    catalog, overlay = _load(cur, session_id)
+    return _find(catalog, overlay, tune_name, allow_multiple_session_aliases)
+
+
+def _find(catalog, overlay, tune_name, allow_multiple_session_aliases=False):
+    q = normalize(tune_name.strip())
+
+    matches = overlay.session_tune_aliases.get(q, [])
+    if len(matches) > 1 and not allow_multiple_session_aliases:
+        return (
+            None,
+            tune_name,
+            f'Multiple tunes found with alias "{tune_name}" in this session. Please be more specific.',
+        )
+    if len(matches) == 1:
+        return matches[0], tune_name, None
+    if matches:
+        return None, tune_name, None  # several, allowed, but none chosen (as the SQL path)
+
+    matches = overlay.extra_aliases.get(q, [])
+    if len(matches) > 1:
+        return (
+            None,
+            tune_name,
+            f'Multiple tunes found with alias "{tune_name}" in this session. Please be more specific.',
+        )
+    if len(matches) == 1:
+        return matches[0], tune_name, None
+
+    # Tune name with flexible "The " folding: name = q, name = 'The ' + q, 'The ' + name = q.
+    with _lock:
+        ids = set(catalog.by_name.get(q, ())) | catalog.by_name.get("the " + q, set())
+        if q.startswith("the "):
+            ids |= catalog.by_name.get(q[4:], set())
+        if len(ids) > 1:
+            return (
+                None,
+                tune_name,
+                f'Multiple tunes found with name "{tune_name}". Please be more specific or use an alias.',
+            )
+        if len(ids) == 1:
+            tune_id = ids.pop()
+            return tune_id, catalog.tunes[tune_id][_NAME], None
+    return None, tune_name, None
+
+
+def match(cur, session_id, tune_name, previous_tune_type=None, limit=5):
+    """Same contract as api_routes.match_tune_core, answered from memory."""
+    catalog, overlay = _load(cur, session_id)
+    tune_id, final_name, error_message = _find(catalog, overlay, tune_name)
+    if tune_id and not error_message:
+        entry = catalog.tunes.get(tune_id)
+        return {
+            "matched": True,
+            "exact_match": True,
+            "results": [{
+                "tune_id": tune_id,
+                "tune_name": final_name,
+                "tune_type": entry[_TYPE] if entry else None,
+                "in_session_tune": tune_id in overlay.in_session if entry else False,
+            }],
+        }
+
+    q = normalize(tune_name)
+    candidates = []
+    with _lock:
+        for tid in catalog.search(q):
+            if tid not in overlay.display_alias:  # an alias replaces the name here
+                entry = catalog.tunes[tid]
+                candidates.append((tid, entry[_NAME], entry[_NORM], entry))
+        for tid, (alias, alias_norm) in overlay.display_alias.items():
+            entry = catalog.tunes.get(tid)
+            if entry is not None and not entry[_REDIRECTED] and q in alias_norm:
+                candidates.append((tid, alias, alias_norm, entry))
+
+    # Nothing contains q: offer close spellings instead. A guess at a typo is only
+    # ever a suggestion, never a match.
+    scores = {}
+    if not candidates:
+        with _lock:
+            scores = {tid: score for tid, score in catalog.similar(q).items() if tid not in overlay.display_alias}
+            for tid in scores:
+                entry = catalog.tunes[tid]
+                candidates.append((tid, entry[_NAME], entry[_NORM], entry))
+            if len(q) >= FUZZY_MIN_LENGTH:
+                q_grams = trigrams(q)
+                for tid, (alias, alias_norm) in overlay.display_alias.items():
+                    entry = catalog.tunes.get(tid)
+                    score = word_similarity(q, alias_norm, q_grams)
+                    if entry is not None and not entry[_REDIRECTED] and score >= WORD_SIMILARITY_THRESHOLD:
+                        scores[tid] = score
+                        candidates.append((tid, alias, alias_norm, entry))
+
+    plays = overlay.plays
+
+    def rank(c):
+        tid, _, norm, entry = c
+        n_plays = plays.get(tid)
+        tunebook = entry[_TUNEBOOK]
+        return (
+            -scores.get(tid, 0),
+            0 if previous_tune_type is not None and entry[_TYPE] == previous_tune_type else 1,
+            (0, -n_plays) if n_plays is not None else (1, 0),
+            (0, -tunebook) if tunebook is not None else (1, 0),
+            norm,
+        )
+
+    results = [
+        {"tune_id": tid, "tune_name": name, "tune_type": entry[_TYPE], "in_session_tune": tid in overlay.in_session}
+        for tid, name, _, entry in heapq.nsmallest(limit, candidates, key=rank)
+    ]
+    return {"matched": len(results) == 1 and not scores, "exact_match": False, "results": results}
+
+
+# --- Listener ---------------------------------------------------------------
+
+_listener_started = False
+_listener_lock = threading.Lock()
+
+
+def _ensure_listener():
+    """Start this process's invalidation listener once (lazily, so it also
+    starts per worker after a fork). TUNE_MATCH_INDEX_LISTEN=0 disables it."""
+    global _listener_started
+    if _listener_started:
+        return
+    with _listener_lock:
+        if _listener_started:
+            return
+        _listener_started = True
+        if os.environ.get("TUNE_MATCH_INDEX_LISTEN", "1").lower() in ("0", "false", "no"):
+            return
+        threading.Thread(target=_listen_forever, name="tune-match-listener", daemon=True).start()
+
+
+def _after_fork_in_child():
+    """The listener thread doesn't survive a fork: a forked worker starts its own on
+    first use. Locks are replaced in case another thread held one at the fork."""
+    global _lock, _listener_lock, _listener_started
+    _lock = threading.RLock()
+    _listener_lock = threading.Lock()
+    _listener_started = False
+    invalidate_all()  # no notifications reach us until our listener is up
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def _handle_notify(cur, channel, payload):
+    if channel == INVALIDATE_CHANNEL:
+        kind, _, ident = payload.partition(":")
+        try:
+            ident = int(ident)
+        except ValueError:
+            return
+        if kind == "session":
+            invalidate_session(ident)
+        elif kind == "tune":
+            invalidate_tunes([ident])
+    elif channel == LIVE_EVENT_CHANNEL:
+        # '<instance_id>:<event_id>' -- a live op changed that session's plays.
+        try:
+            instance_id = int(payload.split(":", 1)[0])
+        except ValueError:
+            return
+        session_id = _instance_sessions.get(instance_id)
+        if session_id is None:
+            cur.execute("SELECT session_id FROM session_instance WHERE session_instance_id = %s", (instance_id,))
+            row = cur.fetchone()
+            if row is None:
+                return
+            session_id = row[0]
+            note_instance_session(instance_id, session_id)
+        invalidate_session(session_id)
+
+
+def _listen_forever():
+    from database import _connect  # raw connection: held for good, never pooled
+
+    backoff = 1
+    while True:
+        conn = None
+        try:
+            conn = _connect()
+            conn.autocommit = True
+            cur = conn.cursor()
+            cur.execute(f"LISTEN {INVALIDATE_CHANNEL}")
+            cur.execute(f"LISTEN {LIVE_EVENT_CHANNEL}")
+            invalidate_all()  # anything may have changed while we weren't listening
+            backoff = 1
+            while True:
+                if select.select([conn], [], [], 60) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    _handle_notify(cur, notify.channel, notify.payload)
+        except Exception as e:
+            logger.warning(f"tune match listener disconnected ({e}); retrying in {backoff}s")
+        finally:
+            if conn is not None:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+        time.sleep(backoff)
+        backoff = min(backoff * 2, 60)
@@ -0,0 +1,117 @@
+"""
+Shared tune-name search.
+
+The type-ahead (`search_tunes`), the live deep search, the common-tunes and admin
+tune lists and the SQL fallback of `match_tune_core` all answer "which tunes are
+called something like q". They used to spell it `LOWER(unaccent(name)) LIKE
+'%q%'` each, which no index can serve. They now build their name predicates here,
+against the persisted `tune.name_search` column (schema/029_tune_name_search.sql):
+
+  - `match_sql`      WHERE fragment: substring match, plus (fuzzy=True) typo-tolerant
+                     pg_trgm word similarity. Both are served by the trigram GIN index.
+  - `similar_sql`    the typo-tolerant half on its own.
+  - `rank_sql`       1 exact, 2 prefix, 3 substring, TYPO_RANK for similarity-only hits.
+  - `similarity_sql` ORDER BY term that sorts typo hits by closeness.
+
+`word_similarity` is the in-process counterpart, used by tune_match_index so the
+type-ahead served from memory is just as forgiving as the SQL path.
+
+Every fragment returns (sql, params) with positional %s placeholders, in the order
+the fragment uses them, so callers append the params where they splice the SQL.
+"""
+
+import re
+import unicodedata
+
+# The persisted LOWER(unaccent(name)) column; callers alias `tune` as t.
+NAME_COLUMN = "t.name_search"
+
+# Rank of a row matched only by similarity (after exact, prefix and substring).
+TYPO_RANK = 4
+
+# Shorter queries have too few trigrams for similarity to mean anything.
+FUZZY_MIN_LENGTH = 4
+
+# pg_trgm's default word_similarity_threshold, which the `<%` operator applies.
+WORD_SIMILARITY_THRESHOLD = 0.6
+
+# Characters unaccent() maps to more than "base letter minus combining mark".
+_FOLD = str.maketrans({
+    "ß": "ss", "æ": "ae", "Æ": "AE", "œ": "oe", "Œ": "OE", "ø": "o", "Ø": "O",
+    "ł": "l", "Ł": "L", "đ": "d", "Đ": "D", "ð": "d", "Ð": "D", "þ": "th", "Þ": "TH",
+})
+
+_LIKE_SPECIAL = re.compile(r"([\\%_])")
+_WORD = re.compile(r"[^\W_]+")
+
+
+def normalize(text):
+    """Python equivalent of Postgres LOWER(unaccent(text))."""
+    if not text:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", text.translate(_FOLD))
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def like_escape(text):
+    """Escape LIKE wildcards so user input only ever matches literally."""
+    return _LIKE_SPECIAL.sub(r"\\\1", text)
+
+
+def fuzzy_applies(q):
+    """True when q is long enough for a similarity match."""
+    return len(normalize(q).strip()) >= FUZZY_MIN_LENGTH
+
+
+def match_sql(q, column=NAME_COLUMN, fuzzy=True):
+    """WHERE fragment matching names that contain q, or (fuzzy) resemble it."""
+    norm = normalize(q.strip())
+    sql = f"{column} LIKE %s"
+    params = [f"%{like_escape(norm)}%"]
+    if fuzzy and len(norm) >= FUZZY_MIN_LENGTH:
+        similar, similar_params = similar_sql(q, column)
+        sql = f"({sql} OR {similar})"
+        params += similar_params
+    return sql, params
+
+
+def similar_sql(q, column=NAME_COLUMN):
+    """WHERE fragment for names resembling q only (pg_trgm word similarity)."""
+    return f"%s <%% {column}", [normalize(q.strip())]
+
+
+def rank_sql(q, column=NAME_COLUMN):
+    """CASE expression: 1 exact, 2 prefix, 3 substring, TYPO_RANK otherwise."""
+    norm = normalize(q.strip())
+    escaped = like_escape(norm)
+    sql = (
+        f"CASE WHEN {column} = %s THEN 1 WHEN {column} LIKE %s THEN 2 "
+        f"WHEN {column} LIKE %s THEN 3 ELSE {TYPO_RANK} END"
+    )
+    return sql, [norm, f"{escaped}%", f"%{escaped}%"]
+
+
+def similarity_sql(q, column=NAME_COLUMN):
+    """ORDER BY term putting the closest names first (add DESC)."""
+    return f"word_similarity(%s, {column})", [normalize(q.strip())]
+
+
+# --- In-process similarity ---------------------------------------------------
+
+
+def trigrams(text):
+    """pg_trgm's trigram set: per word, padded with two leading and one trailing space."""
+    grams = set()
+    for word in _WORD.findall(normalize(text)):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def word_similarity(q, text, q_grams=None):
+    """Share of q's trigrams found in text (pg_trgm word_similarity, without its
+    contiguous-extent restriction, so it can only err towards matching)."""
+    q_grams = trigrams(q) if q_grams is None else q_grams
+    if not q_grams:
+        return 0.0
+    return len(q_grams & trigrams(text)) / len(q_grams)
@@ -0,0 +1,190 @@
+"""
+Per-process cache of logged-in users for Flask-Login's `load_user`.
+
+`load_user` runs on every authenticated request, polls included, and
+`User.get_by_id` is a join over user_account, person, session_instance and
+session. This keeps each worker's recently seen users in memory for a short TTL.
+
+Invalidation. Triggers from schema/034_user_cache_notify.sql NOTIFY
+`user_cache_invalidate` whenever a loaded column changes, whichever code path
+wrote it:
+
+  - 'user:<user_id>'          user_account (flags, timezone, beta opt-in, deactivation)
+  - 'person:<person_id>'      person name/email, at_active_session_instance_id
+  - 'instance:<instance_id>'  session_instance date/times/location
+  - 'session:<session_id>'    session name/path
+
+A per-process listener thread applies them (started lazily, so also per worker
+after a fork). The TTL is only a safety net for a listener that is down.
+
+Cached users are shared between requests; treat them as read-only.
+Set USER_CACHE=0 to load from the database on every request.
+"""
+
+import os
+import time
+import select
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Channel the 034 triggers notify on.
+INVALIDATE_CHANNEL = "user_cache_invalidate"
+
+USER_CACHE_TTL = float(os.environ.get("USER_CACHE_TTL", 30))
+
+
+def enabled():
+    """True unless USER_CACHE is explicitly switched off."""
+    return os.environ.get("USER_CACHE", "1").lower() not in ("0", "false", "no")
+
+
+_lock = threading.Lock()
+_users = {}  # user_id -> (User, loaded_at)
+_generation = 0  # bumped by every invalidation, so a load that raced one isn't kept
+
+
+def get_user(user_id, loader):
+    """The cached user, or loader(user_id) (cached if found)."""
+    if not enabled():
+        return loader(user_id)
+    _ensure_listener()
+    now = time.monotonic()
+    with _lock:
+        entry = _users.get(user_id)
+        generation = _generation
+    if entry is not None and now - entry[1] < USER_CACHE_TTL:
+        return entry[0]
+    user = loader(user_id)
+    with _lock:
+        if user is None:
+            _users.pop(user_id, None)  # deactivated or gone; not worth remembering
+        elif generation == _generation:
+            _users[user_id] = (user, now)
+    return user
+
+
+# --- Invalidation -----------------------------------------------------------
+
+
+def invalidate_user(user_id):
+    global _generation
+    with _lock:
+        _generation += 1
+        _users.pop(user_id, None)
+
+
+def invalidate_person(person_id):
+    global _generation
+    with _lock:
+        _generation += 1
+        for user_id in [uid for uid, (user, _) in _users.items() if user.person_id == person_id]:
+            del _users[user_id]
+
+
+def invalidate_instance(session_instance_id):
+    """Drop users whose cached active session is this instance."""
+    global _generation
+    with _lock:
+        _generation += 1
+        for user_id in [uid for uid, (user, _) in _users.items()
+                        if user.active_session and user.active_session['session_instance_id'] == session_instance_id]:
+            del _users[user_id]
+
+
+def invalidate_session(session_id):
+    """Drop users whose cached active session belongs to this session."""
+    global _generation
+    with _lock:
+        _generation += 1
+        for user_id in [uid for uid, (user, _) in _users.items()
+                        if user.active_session and user.active_session['session_id'] == session_id]:
+            del _users[user_id]
+
+
+def invalidate_all():
+    global _generation
+    with _lock:
+        _generation += 1
+        _users.clear()
+
+
+# --- Listener ---------------------------------------------------------------
+
+_listener_started = False
+_listener_lock = threading.Lock()
+
+
+def _ensure_listener():
+    """Start this process's invalidation listener once. USER_CACHE_LISTEN=0 disables it."""
+    global _listener_started
+    if _listener_started:
+        return
+    with _listener_lock:
+        if _listener_started:
+            return
+        _listener_started = True
+        if os.environ.get("USER_CACHE_LISTEN", "1").lower() in ("0", "false", "no"):
+            return
+        threading.Thread(target=_listen_forever, name="user-cache-listener", daemon=True).start()
+
+
+def _after_fork_in_child():
+    """The listener thread doesn't survive a fork: a forked worker starts its own on
+    first use. Locks are replaced in case another thread held one at the fork."""
+    global _lock, _listener_lock, _listener_started
+    _lock = threading.Lock()
+    _listener_lock = threading.Lock()
+    _listener_started = False
+    invalidate_all()  # no notifications reach us until our listener is up
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def _handle_notify(payload):
+    kind, _, ident = payload.partition(":")
+    try:
+        ident = int(ident)
+    except ValueError:
+        return
+    if kind == "user":
+        invalidate_user(ident)
+    elif kind == "person":
+        invalidate_person(ident)
+    elif kind == "instance":
+        invalidate_instance(ident)
+    elif kind == "session":
+        invalidate_session(ident)
+
+
+def _listen_forever():
+    from database import _connect  # raw connection: held for good, never pooled
+
+    backoff = 1
+    while True:
+        conn = None
+        try:
+            conn = _connect()
+            conn.autocommit = True
+            conn.cursor().execute(f"LISTEN {INVALIDATE_CHANNEL}")
+            invalidate_all()  # anything may have changed while we weren't listening
+            backoff = 1
+            while True:
+                if select.select([conn], [], [], 60) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    _handle_notify(conn.notifies.pop(0).payload)
+        except Exception as e:
+            logger.warning(f"user cache listener disconnected ({e}); retrying in {backoff}s")
+        finally:
+            if conn is not None:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+        time.sleep(backoff)
+        backoff = min(backoff * 2, 60)
@@ -16,7 +16,6 @@ import re
 
 # Import from local modules
 from database import get_db_connection, save_to_history, get_current_user_id
-from api_routes import segment_records_into_sets
 from timezone_utils import (
     now_utc,
     get_timezone_display_name,
@@ -33,6 +32,7 @@ from auth import (
 )
 from email_utils import send_password_reset_email, send_verification_email, send_login_link_email
 from recurrence_utils import to_human_readable
+import user_cache
 
 
 def home():
@@ -440,6 +440,8 @@ def session_handler(full_path, active_tab=None, tune_id=None, person_id=None):
                 # Group tunes into sets by break records, then rebuild each tune row with a
                 # synthesized continues_set at index 0 (False for the first tune of a set) to
                 # preserve the structure the template/JS expects.
+                from api_routes import segment_records_into_sets  # deferred: pages needn't load api_routes
+
                 sets = []
                 for tune_set in segment_records_into_sets(tunes, type_index=0):
                     sets.append(
@@ -611,7 +613,7 @@ def session_handler(full_path, active_tab=None, tune_id=None, person_id=None):
 
                 # Get first 20 session tunes with play counts and popularity data for the tunes tab
                 # Rest will be loaded asynchronously
-                # Optimized: Use subquery to calculate play counts more efficiently
+                # Play counts come from the maintained session_tune_play table
                 before_tunes_query = time.time()
                 cur.execute(
                     """
@@ -624,13 +626,8 @@ def session_handler(full_path, active_tab=None, tune_id=None, person_id=None):
                         st.setting_id
                     FROM session_tune st
                     LEFT JOIN tune t ON st.tune_id = t.tune_id
-                    LEFT JOIN (
-                        SELECT sit.tune_id, COUNT(*) as play_count
-                        FROM session_instance_tune sit
-                        JOIN session_instance si ON sit.session_instance_id = si.session_instance_id
-                        WHERE si.session_id = %s
-                        GROUP BY sit.tune_id
-                    ) play_counts ON st.tune_id = play_counts.tune_id
+                    LEFT JOIN session_tune_play play_counts
+                        ON play_counts.session_id = %s AND play_counts.tune_id = st.tune_id
                     WHERE st.session_id = %s
                     ORDER BY play_count DESC, tunebook_count DESC, tune_name ASC
                     LIMIT 20
@@ -1850,6 +1847,7 @@ def setup_profile():
                     )
 
             conn.commit()
+            user_cache.invalidate_user(current_user.user_id)  # don't wait for the NOTIFY
             flash("Profile updated!", "success")
             return redirect(url_for("home"))
 